@@ -0,0 +1,141 @@
+"""
+Đo Hiệu năng Bảng theo Kích thước
+
+So sánh cách xóa hàng cũ (danh sách 2D: `del grid[y]` + `grid.insert(0, ...)`)
+với Board dùng bộ đệm vòng, trên nhiều kích thước bảng khác nhau.
+
+Board được tạo đúng như GameState tạo (game_board): mặc định không có khóa
+Zobrist, và với track_zobrist=True thì có khóa (băm cập nhật ở mỗi lần ghi).
+Cả hai cấu hình đều được đo.
+
+Xóa hàng trên Board tốn theo khoảng cách từ các hàng bị xóa tới mép gần
+hơn (đáy hoặc đỉnh), không phải theo số hàng bị xóa: xóa 4 hàng dưới cùng
+rẻ, xóa 4 hàng giữa một bảng 1000 hàng phải chép lại ~500 hàng.
+
+Mỗi phép đo (chỉ tính thời gian của chính thao tác đó):
+- Kiểm tra hàng đầy sau khi khóa mảnh: quét cả bảng (cũ) hay chỉ các hàng
+  mảnh vừa chiếm với số đếm sẵn (mới)
+- Xóa hàng: xóa 4 hàng dưới cùng đã đầy (như một Tetris), và 4 hàng ở giữa
+  bảng (trường hợp xấu nhất của bộ đệm vòng)
+- Thêm rác: đẩy một hàng rác lên từ đáy
+
+Cách dùng:
+    python src/bench_board.py
+"""
+
+import time
+from game import GameState
+
+SIZES = [(10, 20), (10, 1000), (64, 20), (64, 1000), (64, 4000)]
+REPEATS = 2000
+
+
+def game_board(width, height, track_zobrist=False):
+    """Lưới trống cấu hình như GameState"""
+    return GameState(0, high_score_file=None, width=width, height=height,
+                     track_zobrist=track_zobrist).grid
+
+
+def bench_list_check(width, height):
+    """Cách cũ: quét mọi hàng để tìm hàng đầy"""
+    grid = [[None] * width for _ in range(height)]
+    started = time.perf_counter()
+    for _ in range(REPEATS):
+        [y for y in range(height) if all(grid[y][x] is not None for x in range(width))]
+    return time.perf_counter() - started
+
+
+def bench_board_check(width, height):
+    """Cách mới: chỉ kiểm tra 4 hàng mảnh vừa chiếm bằng số đếm"""
+    board = game_board(width, height)
+    rows = set(range(height - 4, height))
+    started = time.perf_counter()
+    for _ in range(REPEATS):
+        [y for y in sorted(rows) if board.is_full(y)]
+    return time.perf_counter() - started
+
+
+def clear_rows(height, middle):
+    """4 hàng bị xóa: dưới cùng, hoặc giữa bảng"""
+    bottom = height // 2 + 2 if middle else height
+    return list(range(bottom - 4, bottom))
+
+
+def bench_list_clear(width, height, middle=False):
+    """Cách cũ: lưới là danh sách 2D"""
+    grid = [[None] * width for _ in range(height)]
+    rows = clear_rows(height, middle)
+    elapsed = 0.0
+    for _ in range(REPEATS):
+        for y in rows:
+            grid[y][:] = [1] * width
+        started = time.perf_counter()
+        for y in sorted(rows, reverse=True):
+            del grid[y]
+        for _ in rows:
+            grid.insert(0, [None] * width)
+        elapsed += time.perf_counter() - started
+    return elapsed
+
+
+def bench_board_clear(width, height, middle=False, track_zobrist=False):
+    """Cách mới: Board với bộ đệm vòng"""
+    board = game_board(width, height, track_zobrist)
+    rows = clear_rows(height, middle)
+    elapsed = 0.0
+    for _ in range(REPEATS):
+        for y in rows:
+            for x in range(width):
+                board.set(x, y, 1)
+        started = time.perf_counter()
+        board.remove_rows(rows)
+        elapsed += time.perf_counter() - started
+    return elapsed
+
+
+def bench_list_garbage(width, height):
+    """Cách cũ: xóa hàng trên cùng, thêm hàng rác ở cuối danh sách"""
+    grid = [[None] * width for _ in range(height)]
+    started = time.perf_counter()
+    for _ in range(REPEATS):
+        del grid[0]
+        grid.append([1] * (width - 1) + [None])
+    return time.perf_counter() - started
+
+
+def bench_board_garbage(width, height, track_zobrist=False):
+    """Cách mới: Board.push_bottom"""
+    board = game_board(width, height, track_zobrist)
+    started = time.perf_counter()
+    for _ in range(REPEATS):
+        board.push_bottom([1] * (width - 1) + [0])
+    return time.perf_counter() - started
+
+
+def main():
+    """
+    Chạy tất cả phép đo và in bảng kết quả (micro giây mỗi thao tác).
+
+    Cột "+Z" là Board có khóa Zobrist (GameState(track_zobrist=True)).
+    """
+    columns = [
+        ("kiểm tra (cũ)", bench_list_check),
+        ("kiểm tra (mới)", bench_board_check),
+        ("xóa (list)", bench_list_clear),
+        ("xóa (Board)", bench_board_clear),
+        ("xóa (+Z)", lambda w, h: bench_board_clear(w, h, track_zobrist=True)),
+        ("xóa giữa (list)", lambda w, h: bench_list_clear(w, h, middle=True)),
+        ("xóa giữa (Board)", lambda w, h: bench_board_clear(w, h, middle=True)),
+        ("rác (list)", bench_list_garbage),
+        ("rác (Board)", bench_board_garbage),
+        ("rác (+Z)", lambda w, h: bench_board_garbage(w, h, track_zobrist=True)),
+    ]
+    print("%-10s" % "bảng" + "".join(" %16s" % name for name, _ in columns))
+    for width, height in SIZES:
+        results = [bench(width, height) for _, bench in columns]
+        print("%-10s" % ("%dx%d" % (width, height))
+              + "".join(" %16.2f" % (seconds / REPEATS * 1e6) for seconds in results))
+
+
+if __name__ == "__main__":
+    main()
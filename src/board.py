@@ -0,0 +1,261 @@
+"""
+Bảng Game (Lưới các Khối đã Khóa)
+
+Mỗi ô là một số nguyên nhỏ (1 byte): 0 = trống, 1-7 = id loại mảnh,
+8 = hàng rác (xem tetromino.py). Màu sắc chỉ được tra ở lúc vẽ.
+Bảng 10x20 vì vậy chỉ tốn 200 byte (thay vì 200 tuple RGB), so sánh
+hai bảng là so sánh bytes, và có thể đưa thẳng cho NumPy mà không chuyển đổi.
+
+Các hàng được lưu như một bộ đệm vòng (ring buffer): hàng logic y nằm ở
+hàng vật lý (offset + y) % height. Nhờ vậy:
+- Xóa k hàng chỉ cần sắp xếp lại các hàng nằm giữa hàng bị xóa và đáy
+  (hoặc đỉnh, tùy phía nào ít hơn) rồi xoay offset - không phải dịch toàn bộ lưới.
+  Các đoạn hàng còn lại được chép nguyên khối (memmove trong C), nên chi phí
+  tính bằng Python là O(số hàng bị xóa); phần chép là O(khoảng cách tới mép).
+- Thêm một hàng rác ở đáy chỉ là xoay offset đi 1 và ghi một hàng: O(width).
+
+Bộ đệm được nhân đôi (mỗi hàng vật lý p được ghi ở cả p và p + height), nên
+height hàng logic luôn nằm liền nhau trong bộ nhớ, bắt đầu từ hàng offset.
+Đọc không cần phép chia lấy dư, và as_array() trả về một view NumPy không sao chép.
+
+Bảng cũng đếm số ô đầy trên mỗi hàng (cũng nhân đôi như các ô), nên kiểm tra
+hàng đầy/rỗng là O(1).
+Nếu được cho bộ khóa Zobrist (zobrist.py), bảng giữ luôn băm của nội dung,
+cập nhật ở mỗi lần ghi như số đếm: chi phí theo số hàng được ghi lại.
+
+Đọc ô: board[y][x] hoặc board.get(x, y)
+Ghi ô: board.set(x, y, value)  (luôn ghi qua set để bản sao và số đếm đúng)
+"""
+
+
+class Board:
+    """
+    Lưới width x height các id ô (0 = trống).
+
+    Thuộc tính:
+        width, height: Kích thước bảng (theo đơn vị khối)
+        zobrist_hash: Băm Zobrist của nội dung (0 nếu không có bộ khóa)
+    """
+
+    def __init__(self, width, height, zobrist=None):
+        self.width = width
+        self.height = height
+        self._size = width * height
+        self._cells = bytearray(2 * self._size)   # Hai bản sao của các hàng vật lý
+        self._view = memoryview(self._cells)
+        self._counts = [0] * (2 * height)         # Số ô đầy mỗi hàng vật lý (hai bản sao)
+        self._offset = 0                          # Hàng vật lý của hàng logic 0
+        self.zobrist = zobrist                    # ZobristKeys, hoặc None
+        self.zobrist_hash = 0
+
+    def __len__(self):
+        return self.height
+
+    def __getitem__(self, y):
+        """Trả về hàng logic y dưới dạng memoryview (chỉ dùng để đọc)"""
+        if y < 0:
+            y += self.height
+        start = (self._offset + y) * self.width
+        return self._view[start:start + self.width]
+
+    def __iter__(self):
+        width = self.width
+        start = self._offset * width
+        for y in range(self.height):
+            yield self._view[start + y * width:start + (y + 1) * width]
+
+    def __eq__(self, other):
+        """So sánh theo nội dung (với Board khác hoặc danh sách 2D)"""
+        if isinstance(other, Board):
+            return (self.width == other.width and self.height == other.height
+                    and self.to_bytes() == other.to_bytes())
+        if len(other) != self.height:
+            return False
+        return all(list(a) == list(b) for a, b in zip(self, other))
+
+    __hash__ = None
+
+    @property
+    def offset(self):
+        """Hàng vật lý của hàng logic 0"""
+        return self._offset
+
+    def get(self, x, y):
+        """Id của ô (x, y)"""
+        return self._cells[(self._offset + y) * self.width + x]
+
+    def set(self, x, y, value):
+        """Ghi id vào ô (x, y) và cập nhật số đếm của hàng"""
+        slot = (self._offset + y) % self.height
+        index = slot * self.width + x
+        cells = self._cells
+        counts = self._counts
+        if cells[index] == 0:
+            if value:
+                counts[slot] += 1
+                counts[slot + self.height] += 1
+                if self.zobrist is not None:
+                    self.zobrist_hash ^= self.zobrist.cells[slot][x]
+        elif not value:
+            counts[slot] -= 1
+            counts[slot + self.height] -= 1
+            if self.zobrist is not None:
+                self.zobrist_hash ^= self.zobrist.cells[slot][x]
+        cells[index] = value
+        cells[index + self._size] = value
+
+    def set_row(self, y, data):
+        """Ghi đè toàn bộ hàng y bằng `width` byte"""
+        self._write_slot((self._offset + y) % self.height, bytes(data))
+
+    def _write_slot(self, slot, data):
+        """Ghi một hàng vật lý (cả hai bản sao) và đếm lại số ô đầy"""
+        start = slot * self.width
+        end = start + self.width
+        if self.zobrist is not None:
+            self.zobrist_hash ^= (self.zobrist.row_hash(self._view[start:end], slot)
+                                  ^ self.zobrist.row_hash(data, slot))
+        self._cells[start:end] = data
+        self._cells[start + self._size:end + self._size] = data
+        self._counts[slot] = self._counts[slot + self.height] = self.width - data.count(0)
+
+    def row_count(self, y):
+        """Số ô đầy trong hàng y"""
+        return self._counts[self._offset + y]
+
+    def is_full(self, y):
+        """True nếu hàng y đầy"""
+        return self._counts[self._offset + y] == self.width
+
+    def is_empty(self, y):
+        """True nếu hàng y không có ô nào"""
+        return self._counts[self._offset + y] == 0
+
+    def remove_rows(self, rows):
+        """
+        Xóa các hàng đã cho; các hàng phía trên rơi xuống, hàng trống xuất hiện ở trên.
+
+        Các hàng giữa hàng bị xóa và đáy (hoặc đỉnh nếu gần đỉnh hơn) được chép
+        lại theo từng đoạn liền nhau: số bước Python là O(số hàng bị xóa), phần
+        chép (trong C) tỉ lệ với khoảng cách tới mép, không phải chiều cao bảng.
+        Khi có khóa Zobrist, băm được cập nhật theo từng hàng được chép lại.
+        """
+        cleared = sorted(set(rows))
+        if not cleared:
+            return
+        k = len(cleared)
+        highest = cleared[0]
+        lowest = cleared[-1]
+        height = self.height
+
+        if height - highest <= lowest + 1:
+            # Nén các hàng từ `highest` tới đáy lên trên, để k hàng trống ở đáy,
+            # rồi xoay vòng để chúng trở thành k hàng trên cùng
+            start = highest
+            data, counts = self._survivors(cleared, height)
+            data += bytes(k * self.width)
+            counts += [0] * k
+            new_offset = (self._offset - k) % height
+        else:
+            # Các hàng xóa gần đỉnh: dịch phần phía trên xuống như cách truyền thống
+            start = 0
+            data, counts = self._survivors([-1] + cleared, lowest + 1)
+            data = bytes(k * self.width) + data
+            counts = [0] * k + counts
+            new_offset = self._offset
+
+        self._write_rows(start, data, counts)
+        self._set_offset(new_offset)
+
+    def _survivors(self, cleared, end):
+        """
+        Nội dung và số đếm của các hàng logic từ cleared[0] + 1 tới end (không
+        gồm end) trừ các hàng trong `cleared`, chép theo từng đoạn liền nhau.
+        """
+        width = self.width
+        base = self._offset
+        parts = []
+        counts = []
+        for i, y in enumerate(cleared):
+            stop = cleared[i + 1] if i + 1 < len(cleared) else end
+            if stop > y + 1:
+                parts.append(self._view[(base + y + 1) * width:(base + stop) * width])
+                counts += self._counts[base + y + 1:base + stop]
+        return b''.join(parts), counts
+
+    def _set_offset(self, offset):
+        if self.zobrist is not None:
+            self.zobrist_hash ^= self.zobrist.offsets[self._offset] ^ self.zobrist.offsets[offset]
+        self._offset = offset
+
+    def _write_rows(self, start, data, counts):
+        """
+        Ghi liên tiếp các hàng bắt đầu từ hàng logic `start`.
+
+        Args:
+            data: Nội dung các hàng nối liền (len(counts) * width byte)
+            counts: Số ô đầy của từng hàng
+        """
+        width = self.width
+        if self.zobrist is not None:
+            keys = self.zobrist
+            h = self.zobrist_hash
+            for i in range(len(counts)):
+                slot = (self._offset + start + i) % self.height
+                h ^= (keys.row_hash(self._view[slot * width:(slot + 1) * width], slot)
+                      ^ keys.row_hash(data[i * width:(i + 1) * width], slot))
+            self.zobrist_hash = h
+        begin = self._offset + start   # Hàng đầu trong cửa sổ liền nhau
+        self._mirror(self._cells, begin * width, data, self._size)
+        self._mirror(self._counts, begin, counts, self.height)
+
+    @staticmethod
+    def _mirror(buffer, begin, data, size):
+        """
+        Ghi `data` vào bộ đệm nhân đôi (hai bản sao dài `size`) từ vị trí begin
+        (< 2 * size) và cập nhật bản sao còn lại: phần nằm ở nửa đầu được chép
+        sang nửa sau, phần nằm ở nửa sau được chép về nửa đầu.
+        """
+        end = begin + len(data)
+        buffer[begin:end] = data
+        split = max(begin, min(end, size))
+        if split > begin:
+            buffer[begin + size:split + size] = data[:split - begin]
+        if end > split:
+            buffer[split - size:end - size] = data[split - begin:]
+
+    def push_bottom(self, row):
+        """
+        Thêm một hàng ở đáy, đẩy toàn bộ bảng lên một hàng (dùng cho hàng rác).
+
+        Args:
+            row: `width` id ô (bytes, bytearray hoặc danh sách số nguyên)
+
+        Returns:
+            True nếu hàng trên cùng bị đẩy ra ngoài còn khối (người chơi bị tràn)
+        """
+        slot = self._offset
+        overflow = self._counts[slot] > 0
+        self._write_slot(slot, bytes(row))
+        self._set_offset((self._offset + 1) % self.height)
+        return overflow
+
+    def to_bytes(self):
+        """Bản sao nội dung bảng (height * width byte, theo thứ tự logic)"""
+        start = self._offset * self.width
+        return bytes(self._cells[start:start + self._size])
+
+    def to_lists(self):
+        """Bản sao lưới dạng danh sách 2D (theo thứ tự logic)"""
+        return [list(row) for row in self]
+
+    def as_array(self):
+        """
+        View NumPy (height, width) uint8 lên bộ nhớ của bảng, không sao chép.
+
+        View phản ánh mọi thay đổi ô, nhưng xóa hàng hoặc thêm rác làm cửa sổ
+        dịch chuyển, nên cần gọi lại as_array() sau các thao tác đó.
+        """
+        import numpy as np
+        return np.frombuffer(self._cells, dtype=np.uint8, count=self._size,
+                             offset=self._offset * self.width).reshape(self.height, self.width)
@@ -0,0 +1,309 @@
+"""
+Bot Đặt Mảnh (Heuristic)
+
+Bot chơi bằng cách thử mọi vị trí đặt mảnh hiện tại (mọi trạng thái xoay,
+mọi cột có thể tới được), chấm điểm bảng kết quả bằng một hàm tuyến tính
+của các đặc trưng, rồi chọn vị trí điểm cao nhất.
+
+Đặc trưng của bảng sau khi đặt mảnh (và xóa hàng):
+- height:    Tổng chiều cao các cột
+- holes:     Số ô trống có khối phía trên
+- bumpiness: Tổng chênh lệch chiều cao giữa hai cột kề nhau
+- lines:     Số hàng được xóa bởi lần đặt này
+- wells:     Tổng độ sâu các giếng (cột thấp hơn cả hai bên; tường tính là cao)
+
+Để thử hàng chục vị trí mỗi mảnh cho nhanh, bot làm việc trên bitboard:
+mỗi hàng là một số nguyên, bit x bật nếu ô (x, y) đầy. Va chạm là một phép AND,
+kiểm tra hàng đầy là một phép so sánh.
+
+Vị trí được thực hiện trên GameState bằng đúng các hành động người chơi có
+(xoay, trái/phải, thả nhanh), nên game của bot ghi được thành replay.
+"""
+
+from config import *
+from game import GameState
+from tetromino import Tetromino
+from replay import (apply_action, ACTION_LEFT, ACTION_RIGHT, ACTION_ROTATE_CW,
+                    ACTION_ROTATE_CCW, ACTION_HARD_DROP, ACTION_HOLD)
+
+FEATURE_NAMES = ('height', 'holes', 'bumpiness', 'lines', 'wells')
+
+_rotation_cache = {}
+
+
+def piece_rotations(piece_type):
+    """
+    Các trạng thái xoay khác nhau của một loại mảnh.
+
+    Returns:
+        Danh sách (rotation, min_j, cells) trong đó cells là danh sách
+        (i, bits): hàng i của ma trận 4x4 và mặt nạ bit các cột (tính từ min_j).
+        Các trạng thái xoay cho cùng tập vị trí (O; I/S/Z xoay 180 độ) chỉ giữ một.
+    """
+    rotations = _rotation_cache.get(piece_type)
+    if rotations is not None:
+        return rotations
+
+    rotations = []
+    seen = set()
+    piece = Tetromino(piece_type)
+    for rotation in range(4):
+        if rotation:
+            piece.rotate_clockwise()
+            if piece.rotation != rotation:
+                break   # Mảnh O không xoay
+        blocks = [(j, i) for i, row in enumerate(piece.shape)
+                  for j, cell in enumerate(row) if cell]
+        min_i = min(i for _, i in blocks)
+        min_j = min(j for j, _ in blocks)
+        normalized = frozenset((j - min_j, i - min_i) for j, i in blocks)
+        if normalized in seen:
+            continue
+        seen.add(normalized)
+        masks = {}
+        for j, i in blocks:
+            masks[i] = masks.get(i, 0) | (1 << (j - min_j))
+        rotations.append((rotation, min_j, sorted(masks.items())))
+
+    _rotation_cache[piece_type] = rotations
+    return rotations
+
+
+def board_rows(board):
+    """Chuyển Board thành danh sách bitmask các hàng (trên xuống dưới)"""
+    rows = []
+    for row in board:
+        mask = 0
+        for x, cell in enumerate(row):
+            if cell:
+                mask |= 1 << x
+        rows.append(mask)
+    return rows
+
+
+def collides(rows, height, cells, px, y):
+    """True nếu mảnh (cells, cột trái px, hàng y) chạm đáy hoặc khối đã có"""
+    for i, bits in cells:
+        yy = y + i
+        if yy >= height:
+            return True
+        if yy >= 0 and rows[yy] & (bits << px):
+            return True
+    return False
+
+
+def enumerate_placements(rows, width, height, piece_type, spawn_x=None, spawn_y=0):
+    """
+    Liệt kê mọi vị trí đặt tới được bằng: xoay tại chỗ xuất hiện,
+    di chuyển ngang, rồi thả thẳng xuống.
+
+    Args:
+        rows: Bitboard (danh sách mặt nạ hàng)
+        spawn_x, spawn_y: Vị trí mảnh trước khi di chuyển (mặc định: chỗ xuất hiện)
+
+    Yields:
+        (rotation, x, y, cells, px): x, y theo tọa độ Tetromino; cells, px để đặt lên bitboard
+    """
+    if spawn_x is None:
+        spawn_x = width // 2 - 2
+    for rotation, min_j, cells in piece_rotations(piece_type):
+        span = max(bits.bit_length() for _, bits in cells)
+        start = spawn_x + min_j
+        if start < 0 or start + span > width or collides(rows, height, cells, start, spawn_y):
+            continue
+        reachable = [start]
+        px = start - 1
+        while px >= 0 and not collides(rows, height, cells, px, spawn_y):
+            reachable.append(px)
+            px -= 1
+        px = start + 1
+        while px + span <= width and not collides(rows, height, cells, px, spawn_y):
+            reachable.append(px)
+            px += 1
+        for px in reachable:
+            y = spawn_y
+            while not collides(rows, height, cells, px, y + 1):
+                y += 1
+            yield rotation, px - min_j, y, cells, px
+
+
+def place(rows, width, cells, px, y):
+    """
+    Đặt mảnh lên bitboard và xóa các hàng đầy.
+
+    Returns:
+        (bitboard mới, số hàng đã xóa)
+    """
+    new_rows = list(rows)
+    for i, bits in cells:
+        if y + i >= 0:
+            new_rows[y + i] |= bits << px
+    full = (1 << width) - 1
+    kept = [row for row in new_rows if row != full]
+    lines = len(new_rows) - len(kept)
+    if lines:
+        kept = [0] * lines + kept
+    return kept, lines
+
+
+def board_features(rows, width, height, lines):
+    """Tính các đặc trưng (theo thứ tự FEATURE_NAMES) của một bitboard"""
+    heights = [0] * width
+    seen = 0
+    holes = 0
+    for y, row in enumerate(rows):
+        # Ô trống nằm dưới một khối đã gặp là lỗ
+        holes += bin(seen & ~row).count('1')
+        new = row & ~seen
+        while new:
+            low = new & -new
+            heights[low.bit_length() - 1] = height - y
+            new ^= low
+        seen |= row
+
+    bumpiness = 0
+    wells = 0
+    for x in range(width):
+        h = heights[x]
+        if x + 1 < width:
+            bumpiness += abs(h - heights[x + 1])
+        left = heights[x - 1] if x > 0 else height
+        right = heights[x + 1] if x + 1 < width else height
+        depth = min(left, right) - h
+        if depth > 0:
+            wells += depth
+    return (sum(heights), holes, bumpiness, lines, wells)
+
+
+def evaluate(features, weights):
+    """Điểm của một bảng: tích vô hướng đặc trưng và trọng số"""
+    return sum(f * w for f, w in zip(features, weights))
+
+
+def apply_placement(game_state, rotation, x, use_hold=False):
+    """
+    Thực hiện một vị trí đặt trên GameState bằng các hành động người chơi.
+
+    Args:
+        rotation: Trạng thái xoay mong muốn (0-3)
+        x: Cột mong muốn (tọa độ Tetromino.x)
+        use_hold: Giữ mảnh trước (đặt mảnh lấy ra từ ô giữ / hàng đợi)
+
+    Returns:
+        Danh sách hành động đã áp dụng (có thể đưa cho ReplayRecorder)
+    """
+    actions = []
+
+    def act(action):
+        apply_action(game_state, action)
+        actions.append(action)
+
+    if use_hold:
+        act(ACTION_HOLD)
+    if rotation == 3:
+        act(ACTION_ROTATE_CCW)
+    else:
+        for _ in range(rotation):
+            act(ACTION_ROTATE_CW)
+
+    while game_state.current_piece.x != x:
+        before = game_state.current_piece.x
+        act(ACTION_LEFT if x < before else ACTION_RIGHT)
+        if game_state.current_piece.x == before:
+            break   # Bị chặn
+    act(ACTION_HARD_DROP)
+    return actions
+
+
+def finish_line_clear(game_state):
+    """Cho hoạt ảnh xóa hàng chạy xong (game chạy ngầm không cần chờ)"""
+    if game_state.state == GameState.STATE_LINE_CLEAR_ANIMATION:
+        game_state.update(LINE_CLEAR_ANIMATION, False)
+
+
+class Bot:
+    """
+    Bot tham lam: chọn vị trí tốt nhất cho mảnh hiện tại (có tính cả ô giữ).
+
+    Thuộc tính:
+        weights: Trọng số theo thứ tự FEATURE_NAMES
+        book: Sách khai cuộc (opening.OpeningBook) được tra trước khi tìm, hoặc None
+    """
+
+    def __init__(self, weights=BOT_WEIGHTS, use_hold=True, book=None):
+        self.weights = tuple(weights)
+        self.use_hold = use_hold
+        self.book = book
+
+    def candidates(self, game_state):
+        """
+        Các mảnh có thể đặt lượt này.
+
+        Returns:
+            Danh sách (loại mảnh, có dùng giữ không)
+        """
+        options = [(game_state.current_piece.piece_type, False)]
+        if self.use_hold and game_state.can_hold:
+            swap = game_state.held_piece_type or game_state.next_piece_type
+            if swap != options[0][0]:
+                options.append((swap, True))
+        return options
+
+    def choose(self, game_state):
+        """
+        Chọn vị trí đặt.
+
+        Returns:
+            (rotation, x, use_hold), hoặc None nếu không còn vị trí nào
+        """
+        if self.book is not None:
+            move = self.book.lookup(game_state, self.use_hold)
+            if move is not None:
+                return move
+        rows = board_rows(game_state.grid)
+        width, height = game_state.width, game_state.height
+        best = None
+        best_score = None
+        for piece_type, use_hold in self.candidates(game_state):
+            for rotation, x, y, cells, px in enumerate_placements(rows, width, height, piece_type):
+                new_rows, lines = place(rows, width, cells, px, y)
+                score = evaluate(board_features(new_rows, width, height, lines), self.weights)
+                if best_score is None or score > best_score:
+                    best_score = score
+                    best = (rotation, x, use_hold)
+        return best
+
+    def play_turn(self, game_state):
+        """
+        Chơi một mảnh.
+
+        Returns:
+            Danh sách hành động đã áp dụng (rỗng nếu không đặt được)
+        """
+        choice = self.choose(game_state)
+        if choice is None:
+            game_state.game_over = True
+            return []
+        actions = apply_placement(game_state, *choice)
+        finish_line_clear(game_state)
+        return actions
+
+
+def play_game(bot, seed, max_pieces=BOT_MAX_PIECES, width=GRID_WIDTH, height=GRID_HEIGHT):
+    """
+    Cho bot chơi một game chạy ngầm.
+
+    Args:
+        bot: Đối tượng có play_turn(game_state)
+        seed: Seed chuỗi mảnh (cùng seed + cùng bot = cùng kết quả)
+        max_pieces: Số mảnh tối đa (giới hạn thời gian cho bot giỏi)
+
+    Returns:
+        dict gồm lines, score, pieces
+    """
+    game_state = GameState(seed, high_score_file=None, width=width, height=height)
+    pieces = 0
+    while not game_state.game_over and pieces < max_pieces:
+        bot.play_turn(game_state)
+        pieces += 1
+    return {'lines': game_state.lines_cleared, 'score': game_state.score, 'pieces': pieces}
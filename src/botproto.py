@@ -0,0 +1,782 @@
+"""
+Giao thức Bot qua Socket Cục bộ
+
+Máy chủ asyncio cho phép bot ở tiến trình khác chơi qua socket Unix hoặc TCP
+localhost. Mỗi kết nối điều khiển một game riêng (GameState chạy ngầm); nhiều
+kết nối chạy đồng thời trên cùng một vòng lặp sự kiện. Khi BOTPROTO_ENABLED
+bật, TetrisGame cũng mở máy chủ này và bot có thể chơi chính game đang hiển thị.
+
+Trình tự (game = máy chủ, bot = máy khách):
+
+    bot  -> hello        {seed, live}        bắt đầu game mới (live: chơi game đang hiển thị)
+    game -> start        {seed, width, height, board, current, hold, can_hold, queue}
+    game -> suggest      {}                  tới lượt bot
+    bot  -> suggestion   {moves}             danh sách (rotation, x, hold), theo thứ tự ưu tiên
+    game -> play         {move, lines, score}   nước hợp lệ đầu tiên đã được thực hiện
+    game -> new_piece    {piece}             mỗi mảnh mới lộ ra ở cuối hàng đợi
+    game -> suggest / game_over {score, lines, pieces}
+    game -> error        {message}           thông điệp sai (kết nối vẫn mở)
+
+Hai biến thể, nhận biết qua 4 byte đầu tiên bot gửi:
+- JSON: mỗi thông điệp là một dòng JSON có trường "type". Bảng là danh sách
+  các hàng, mỗi hàng là danh sách id ô; mảnh là chữ cái ('I', 'O', ...).
+- Nhị phân: bot gửi BINARY_MAGIC trước. Sau đó mỗi khung là u32 độ dài rồi
+  một lô thông điệp liền nhau, mỗi thông điệp là u8 loại + các trường cố định
+  (xem BINARY_FORMATS). Game gửi play, new_piece và suggest trong cùng một
+  khung, nên mỗi mảnh chỉ tốn một lần ghi socket ở mỗi chiều.
+
+Cách dùng:
+    Máy chủ:  python src/botproto.py serve --address unix:/tmp/tetris.sock
+    Bot mẫu:  python src/botproto.py bot --address unix:/tmp/tetris.sock --binary
+    Đo:       python src/botproto.py bench --connections 32 --pieces 200
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import queue
+import socket
+import stat
+import struct
+import sys
+import threading
+import time
+from config import *
+from game import GameState
+from tetromino import PIECE_IDS, PIECE_TYPES
+from bot import board_rows, enumerate_placements, apply_placement, finish_line_clear
+
+BINARY_MAGIC = b'TBP1'
+
+MSG_HELLO = 1
+MSG_START = 2
+MSG_SUGGEST = 3
+MSG_SUGGESTION = 4
+MSG_PLAY = 5
+MSG_NEW_PIECE = 6
+MSG_GAME_OVER = 7
+MSG_ERROR = 8
+
+MESSAGE_IDS = {
+    'hello': MSG_HELLO, 'start': MSG_START, 'suggest': MSG_SUGGEST,
+    'suggestion': MSG_SUGGESTION, 'play': MSG_PLAY, 'new_piece': MSG_NEW_PIECE,
+    'game_over': MSG_GAME_OVER, 'error': MSG_ERROR,
+}
+MESSAGE_NAMES = {value: name for name, value in MESSAGE_IDS.items()}
+
+# Phần cố định của mỗi loại thông điệp nhị phân (sau byte loại)
+BINARY_FORMATS = {
+    MSG_HELLO: '<BQB',          # có seed, seed, live
+    MSG_START: '<HHQBBBB',      # width, height, seed, current, hold (0 = trống), can_hold, độ dài hàng đợi
+                                # + hàng đợi (id) + lưới (width*height byte)
+    MSG_SUGGEST: '<',
+    MSG_SUGGESTION: '<B',       # số nước + mỗi nước MOVE_FORMAT
+    MSG_PLAY: '<BbBBQ',         # rotation, x, hold, số hàng vừa xóa, điểm
+    MSG_NEW_PIECE: '<B',        # id mảnh
+    MSG_GAME_OVER: '<QII',      # điểm, số hàng, số mảnh
+    MSG_ERROR: '<H',            # độ dài + thông báo UTF-8
+}
+MOVE_FORMAT = '<BbB'            # rotation, x, hold
+MOVE_SIZE = struct.calcsize(MOVE_FORMAT)
+
+
+def parse_move(move):
+    """
+    Kiểm tra một nước đi từ bot: (rotation, x, hold) gồm ba số nguyên.
+
+    Returns:
+        (rotation, x, hold) với hold kiểu bool
+
+    Raises:
+        ValueError: Nước đi không đúng dạng
+    """
+    if not isinstance(move, (list, tuple)) or len(move) != 3 \
+            or not all(isinstance(value, int) for value in move):
+        raise ValueError("nước đi phải là (rotation, x, hold) gồm ba số nguyên: %.60r" % (move,))
+    return move[0], move[1], bool(move[2])
+
+
+def check_message(message):
+    """
+    Kiểm tra các trường của một thông điệp bot gửi tới (sau khi giải mã).
+
+    Raises:
+        ValueError: Thông điệp không đúng dạng
+    """
+    if not isinstance(message, dict) or not isinstance(message.get('type'), str):
+        raise ValueError("thông điệp phải là object có trường \"type\"")
+    kind = message['type']
+    if kind == 'hello':
+        seed = message.get('seed')
+        if seed is not None and (not isinstance(seed, int) or isinstance(seed, bool)
+                                 or not 0 <= seed < 1 << 64):
+            raise ValueError("seed phải là số nguyên không âm 64 bit")
+    elif kind == 'suggestion':
+        moves = message.get('moves')
+        if not isinstance(moves, list):
+            raise ValueError("suggestion thiếu danh sách moves")
+        message['moves'] = [parse_move(move) for move in moves]
+    return message
+
+
+def parse_address(address):
+    """
+    'unix:/đường/dẫn.sock' -> ('unix', đường dẫn); 'host:port' -> ('tcp', (host, port))
+    """
+    if address.startswith('unix:'):
+        return 'unix', address[5:]
+    host, _, port = address.rpartition(':')
+    return 'tcp', (host or '127.0.0.1', int(port))
+
+
+def remove_stale_socket(path):
+    """
+    Xóa file socket Unix còn sót lại từ một máy chủ đã dừng.
+
+    Chỉ xóa khi `path` là socket và không có ai nghe trên đó (kết nối bị từ
+    chối); socket của một máy chủ đang chạy hoặc file không phải socket làm
+    hàm ném lỗi thay vì bị xóa.
+
+    Raises:
+        FileExistsError: `path` đang được dùng hoặc không phải socket
+    """
+    try:
+        mode = os.stat(path).st_mode
+    except FileNotFoundError:
+        return
+    if not stat.S_ISSOCK(mode):
+        raise FileExistsError("%s đã tồn tại và không phải socket" % path)
+    probe = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    probe.settimeout(1.0)
+    try:
+        probe.connect(path)
+    except (ConnectionRefusedError, FileNotFoundError):
+        pass   # Không ai nghe: socket bị bỏ lại
+    except OSError as error:
+        raise FileExistsError("Không kiểm tra được socket %s: %s" % (path, error))
+    else:
+        raise FileExistsError("Đã có máy chủ bot đang nghe trên %s" % path)
+    finally:
+        probe.close()
+    try:
+        os.unlink(path)
+    except FileNotFoundError:
+        pass
+
+
+# ---------------------------------------------------------------------------
+# Mã hóa thông điệp
+# ---------------------------------------------------------------------------
+
+class JsonCodec:
+    """Mỗi thông điệp một dòng JSON"""
+
+    binary = False
+
+    def __init__(self, prefix=b''):
+        self.prefix = prefix   # Các byte đầu đã đọc khi nhận biết biến thể
+
+    def encode(self, messages):
+        lines = []
+        for message in messages:
+            data = dict(message)
+            if 'board' in data:
+                width = data['width']
+                board = data['board']
+                data['board'] = [list(board[y:y + width]) for y in range(0, len(board), width)]
+            lines.append(json.dumps(data, separators=(',', ':')))
+        return ('\n'.join(lines) + '\n').encode()
+
+    async def read_frame(self, reader):
+        """Đọc một dòng (None khi kết nối đóng)"""
+        line = self.prefix + await reader.readline()
+        self.prefix = b''
+        if not line.strip():
+            return None
+        return line
+
+    async def read(self, reader):
+        """Đọc một lô thông điệp (None khi kết nối đóng)"""
+        line = await self.read_frame(reader)
+        return None if line is None else self.decode(line)
+
+    def decode(self, line):
+        """
+        Raises:
+            ValueError: Dòng không phải JSON hợp lệ hoặc thông điệp sai dạng
+        """
+        message = check_message(json.loads(line))
+        if 'board' in message:
+            message['board'] = bytes(cell for row in message['board'] for cell in row)
+        if 'move' in message:
+            message['move'] = tuple(message['move'])
+        return [message]
+
+
+class BinaryCodec:
+    """Khung u32 độ dài + lô thông điệp nhị phân"""
+
+    binary = True
+
+    def encode(self, messages):
+        parts = []
+        for message in messages:
+            kind = MESSAGE_IDS[message['type']]
+            fmt = BINARY_FORMATS[kind]
+            parts.append(bytes((kind,)))
+            if kind == MSG_HELLO:
+                seed = message.get('seed')
+                parts.append(struct.pack(fmt, seed is not None, seed or 0,
+                                         bool(message.get('live'))))
+            elif kind == MSG_START:
+                hold = message['hold']
+                parts.append(struct.pack(fmt, message['width'], message['height'],
+                                         message['seed'], PIECE_IDS[message['current']],
+                                         0 if hold is None else PIECE_IDS[hold],
+                                         message['can_hold'], len(message['queue'])))
+                parts.append(bytes(PIECE_IDS[t] for t in message['queue']))
+                parts.append(message['board'])
+            elif kind == MSG_SUGGESTION:
+                moves = message['moves'][:255]
+                parts.append(struct.pack(fmt, len(moves)))
+                parts.extend(struct.pack(MOVE_FORMAT, r, x, bool(h)) for r, x, h in moves)
+            elif kind == MSG_PLAY:
+                r, x, h = message['move']
+                parts.append(struct.pack(fmt, r, x, bool(h), message['lines'], message['score']))
+            elif kind == MSG_NEW_PIECE:
+                parts.append(struct.pack(fmt, PIECE_IDS[message['piece']]))
+            elif kind == MSG_GAME_OVER:
+                parts.append(struct.pack(fmt, message['score'], message['lines'], message['pieces']))
+            elif kind == MSG_ERROR:
+                text = message['message'].encode()
+                parts.append(struct.pack(fmt, len(text)))
+                parts.append(text)
+        payload = b''.join(parts)
+        return struct.pack('<I', len(payload)) + payload
+
+    async def read_frame(self, reader):
+        """Đọc nội dung một khung (None khi kết nối đóng)"""
+        try:
+            header = await reader.readexactly(4)
+            size = struct.unpack('<I', header)[0]
+            if size > BOTPROTO_MAX_FRAME:
+                raise ValueError("khung quá lớn: %d byte" % size)
+            return await reader.readexactly(size)
+        except asyncio.IncompleteReadError:
+            return None
+
+    async def read(self, reader):
+        """Đọc một khung (None khi kết nối đóng)"""
+        payload = await self.read_frame(reader)
+        return None if payload is None else self.decode(payload)
+
+    def decode(self, payload):
+        """
+        Raises:
+            ValueError: Loại thông điệp không biết, khung bị cắt ngắn hoặc id mảnh sai
+        """
+        try:
+            return self._decode(payload)
+        except (KeyError, IndexError, struct.error, UnicodeDecodeError) as error:
+            raise ValueError("khung nhị phân sai: %s" % error) from None
+
+    def _decode(self, payload):
+        messages = []
+        offset = 0
+        while offset < len(payload):
+            kind = payload[offset]
+            offset += 1
+            if kind not in BINARY_FORMATS:
+                raise ValueError("loại thông điệp không biết: %d" % kind)
+            fmt = BINARY_FORMATS[kind]
+            fields = struct.unpack_from(fmt, payload, offset)
+            offset += struct.calcsize(fmt)
+            message = {'type': MESSAGE_NAMES[kind]}
+            if kind == MSG_HELLO:
+                message['seed'] = fields[1] if fields[0] else None
+                message['live'] = bool(fields[2])
+            elif kind == MSG_START:
+                width, height, seed, current, hold, can_hold, queue_len = fields
+                message.update(width=width, height=height, seed=seed,
+                               current=_piece_type(current),
+                               hold=_piece_type(hold) if hold else None,
+                               can_hold=bool(can_hold),
+                               queue=[_piece_type(i) for i in _take(payload, offset, queue_len)])
+                offset += queue_len
+                message['board'] = _take(payload, offset, width * height)
+                offset += width * height
+            elif kind == MSG_SUGGESTION:
+                moves = []
+                for _ in range(fields[0]):
+                    r, x, h = struct.unpack_from(MOVE_FORMAT, payload, offset)
+                    moves.append((r, x, bool(h)))
+                    offset += MOVE_SIZE
+                message['moves'] = moves
+            elif kind == MSG_PLAY:
+                r, x, h, lines, score = fields
+                message.update(move=(r, x, bool(h)), lines=lines, score=score)
+            elif kind == MSG_NEW_PIECE:
+                message['piece'] = _piece_type(fields[0])
+            elif kind == MSG_GAME_OVER:
+                message.update(score=fields[0], lines=fields[1], pieces=fields[2])
+            elif kind == MSG_ERROR:
+                message['message'] = _take(payload, offset, fields[0]).decode()
+                offset += fields[0]
+            messages.append(message)
+        return messages
+
+
+def _piece_type(piece_id):
+    if not 1 <= piece_id <= len(PIECE_TYPES):
+        raise ValueError("id mảnh sai: %d" % piece_id)
+    return PIECE_TYPES[piece_id - 1]
+
+
+def _take(payload, offset, size):
+    """`size` byte từ offset (ValueError nếu khung bị cắt ngắn)"""
+    if offset + size > len(payload):
+        raise ValueError("khung bị cắt ngắn")
+    return bytes(payload[offset:offset + size])
+
+
+async def open_codec(reader):
+    """Nhận biết biến thể giao thức từ 4 byte đầu tiên của bot"""
+    try:
+        prefix = await reader.readexactly(len(BINARY_MAGIC))
+    except asyncio.IncompleteReadError:
+        return None
+    if prefix == BINARY_MAGIC:
+        return BinaryCodec()
+    return JsonCodec(prefix)
+
+
+# ---------------------------------------------------------------------------
+# Phía game
+# ---------------------------------------------------------------------------
+
+def legal_moves(game_state):
+    """Tập (rotation, x, hold) hợp lệ cho mảnh hiện tại"""
+    rows = board_rows(game_state.grid)
+    options = [(game_state.current_piece.piece_type, False)]
+    if game_state.can_hold:
+        options.append((game_state.held_piece_type or game_state.next_piece_type, True))
+    moves = set()
+    for piece_type, use_hold in options:
+        for rotation, x, _, _, _ in enumerate_placements(
+                rows, game_state.width, game_state.height, piece_type):
+            moves.add((rotation, x, use_hold))
+    return moves
+
+
+def start_message(game_state):
+    """Thông điệp start mô tả đầy đủ trạng thái hiện tại"""
+    return {
+        'type': 'start',
+        'seed': game_state.seed,
+        'width': game_state.width,
+        'height': game_state.height,
+        'board': game_state.grid.to_bytes(),
+        'current': game_state.current_piece.piece_type,
+        'hold': game_state.held_piece_type,
+        'can_hold': game_state.can_hold,
+        'queue': list(game_state.next_queue),
+    }
+
+
+def play_move(game_state, moves, legal=None, finish=True):
+    """
+    Thực hiện nước hợp lệ đầu tiên trong danh sách đề xuất (nước sai dạng
+    bị bỏ qua như nước không hợp lệ, nên hàm không ném lỗi vì đề xuất).
+
+    Args:
+        finish: Cho hoạt ảnh xóa hàng chạy xong ngay (game chạy ngầm)
+
+    Returns:
+        (thông điệp trả lời, danh sách hành động đã áp dụng)
+    """
+    if legal is None:
+        legal = legal_moves(game_state)
+    for move in moves:
+        try:
+            move = parse_move(move)
+        except ValueError:
+            continue
+        if move not in legal:
+            continue
+        drawn = game_state.bag_randomizer.drawn
+        lines = game_state.lines_cleared
+        actions = apply_placement(game_state, *move)
+        if finish:
+            finish_line_clear(game_state)
+        replies = [{'type': 'play', 'move': move,
+                    'lines': game_state.lines_cleared - lines, 'score': game_state.score}]
+        revealed = game_state.bag_randomizer.drawn - drawn
+        for piece_type in game_state.next_queue[len(game_state.next_queue) - revealed:]:
+            replies.append({'type': 'new_piece', 'piece': piece_type})
+        return replies, actions
+    return [{'type': 'error', 'message': "không có nước hợp lệ trong đề xuất"}], []
+
+
+def error_message(error):
+    """Thông điệp error trả lời một thông điệp sai (kết nối vẫn mở)"""
+    return {'type': 'error', 'message': ("thông điệp sai: %s" % error)[:BOTPROTO_MAX_ERROR]}
+
+
+class Session:
+    """
+    Một game chạy ngầm do một kết nối điều khiển.
+    """
+
+    def __init__(self, seed=None, max_pieces=BOT_MAX_PIECES, width=GRID_WIDTH, height=GRID_HEIGHT):
+        self.game_state = GameState(seed, high_score_file=None, width=width, height=height)
+        self.max_pieces = max_pieces
+        self.pieces = 0
+        self.legal = None
+
+    def next_turn(self):
+        """suggest cho lượt tiếp theo, hoặc game_over nếu game đã hết"""
+        game_state = self.game_state
+        if not game_state.game_over and self.pieces < self.max_pieces:
+            self.legal = legal_moves(game_state)
+            if self.legal:
+                return {'type': 'suggest'}
+            game_state.game_over = True
+        return {'type': 'game_over', 'score': game_state.score,
+                'lines': game_state.lines_cleared, 'pieces': self.pieces}
+
+    def begin(self):
+        return [start_message(self.game_state), self.next_turn()]
+
+    def play(self, moves):
+        if self.legal is None:
+            return [{'type': 'error', 'message': "chưa tới lượt"}]
+        replies, actions = play_move(self.game_state, moves, self.legal)
+        if not actions:
+            return replies + [{'type': 'suggest'}]
+        self.legal = None
+        self.pieces += 1
+        return replies + [self.next_turn()]
+
+
+class LiveLink:
+    """
+    Nối máy chủ (chạy trong luồng riêng) với game đang hiển thị.
+
+    Luồng chính (TetrisGame.run) gọi publish để gửi thông điệp tới bot và
+    poll để lấy đề xuất. Chỉ một bot được chơi game đang hiển thị cùng lúc.
+    """
+
+    def __init__(self):
+        self.loop = None
+        self.outbox = None
+        self.suggestions = queue.Queue()
+        self.connected = False
+
+    def publish(self, messages):
+        """Gửi thông điệp tới bot (gọi từ luồng chính)"""
+        if self.connected:
+            self.loop.call_soon_threadsafe(self.outbox.put_nowait, messages)
+
+    def poll(self):
+        """Đề xuất mới nhất của bot, hoặc None (gọi từ luồng chính)"""
+        moves = None
+        while True:
+            try:
+                moves = self.suggestions.get_nowait()
+            except queue.Empty:
+                return moves
+
+
+class BotServer:
+    """
+    Máy chủ giao thức bot.
+
+    Thuộc tính:
+        max_pieces: Số mảnh tối đa mỗi game chạy ngầm
+        live: LiveLink tới game đang hiển thị (None = chỉ game chạy ngầm)
+    """
+
+    def __init__(self, max_pieces=BOT_MAX_PIECES, live=None):
+        self.max_pieces = max_pieces
+        self.live = live
+        self.server = None
+        self.games_started = 0
+
+    async def start(self, address=BOTPROTO_ADDRESS):
+        kind, target = parse_address(address)
+        if kind == 'unix':
+            remove_stale_socket(target)
+            self.server = await asyncio.start_unix_server(self.handle, path=target)
+        else:
+            self.server = await asyncio.start_server(self.handle, *target)
+        if self.live is not None:
+            self.live.loop = asyncio.get_running_loop()
+        return self.server
+
+    async def handle(self, reader, writer):
+        """Phục vụ một kết nối cho tới khi bot đóng nó"""
+        codec = await open_codec(reader)
+        session = None
+        try:
+            while codec is not None:
+                frame = await codec.read_frame(reader)
+                if frame is None:
+                    break
+                try:
+                    messages = codec.decode(frame)
+                except ValueError as error:
+                    messages = []
+                    replies = [error_message(error)]
+                else:
+                    replies = []
+                for message in messages:
+                    kind = message.get('type')
+                    if kind == 'hello':
+                        if message.get('live') and self.live is not None:
+                            await self.serve_live(codec, reader, writer)
+                            return
+                        session = Session(message.get('seed'), self.max_pieces)
+                        self.games_started += 1
+                        replies.extend(session.begin())
+                    elif kind == 'suggestion' and session is not None:
+                        replies.extend(session.play(message['moves']))
+                    else:
+                        replies.append({'type': 'error', 'message': "thông điệp không mong đợi: %s" % kind})
+                if replies:
+                    writer.write(codec.encode(replies))
+                    await writer.drain()
+        except (ConnectionError, ValueError):
+            # Kết nối đứt, hoặc khung quá dài (không thể đọc tiếp khung sau)
+            pass
+        finally:
+            writer.close()
+
+    async def serve_live(self, codec, reader, writer):
+        """Nối kết nối với game đang hiển thị (qua LiveLink)"""
+        live = self.live
+        if live.connected:
+            writer.write(codec.encode([{'type': 'error', 'message': "game đang hiển thị đã có bot"}]))
+            await writer.drain()
+            return
+        live.outbox = asyncio.Queue()
+        live.connected = True
+
+        async def forward():
+            while True:
+                writer.write(codec.encode(await live.outbox.get()))
+                await writer.drain()
+
+        sender = asyncio.ensure_future(forward())
+        try:
+            while True:
+                frame = await codec.read_frame(reader)
+                if frame is None:
+                    break
+                try:
+                    messages = codec.decode(frame)
+                except ValueError as error:
+                    live.outbox.put_nowait([error_message(error)])
+                    continue
+                for message in messages:
+                    if message.get('type') == 'suggestion':
+                        live.suggestions.put(message['moves'])
+        finally:
+            live.connected = False
+            sender.cancel()
+
+    def serve_in_thread(self, address=BOTPROTO_ADDRESS):
+        """Chạy máy chủ trong một luồng nền (dùng bởi TetrisGame)"""
+        started = threading.Event()
+
+        def run():
+            loop = asyncio.new_event_loop()
+            asyncio.set_event_loop(loop)
+            loop.run_until_complete(self.start(address))
+            started.set()
+            loop.run_forever()
+
+        thread = threading.Thread(target=run, name='botproto', daemon=True)
+        thread.start()
+        started.wait()
+        return thread
+
+
+# ---------------------------------------------------------------------------
+# Bot mẫu (phía máy khách)
+# ---------------------------------------------------------------------------
+
+class StandInBot:
+    """
+    Bot mẫu nói giao thức: giữ bản sao bitboard từ start/play/new_piece và
+    chọn nước bằng đánh giá tĩnh của search.Searcher (độ sâu 1, có ô giữ).
+    """
+
+    def __init__(self, weights=BOT_WEIGHTS):
+        self.weights = weights
+        self.searcher = None
+        self.position = None
+        self.pending = {}
+
+    def on_start(self, message):
+        from search import Searcher, Position
+        width, height = message['width'], message['height']
+        if self.searcher is None or (self.searcher.width, self.searcher.height) != (width, height):
+            self.searcher = Searcher(self.weights, width, height)
+        board = message['board']
+        rows = board_rows([board[y:y + width] for y in range(0, len(board), width)])
+        self.position = Position(rows, message['current'], message['hold'],
+                                 tuple(message['queue']), frozenset(), message['can_hold'])
+
+    def suggest(self):
+        """Danh sách nước đi, tốt nhất trước"""
+        moves = self.searcher.moves(self.position)
+        moves.sort(key=lambda move: -move[1])
+        self.pending = {move[0]: move for move in moves}
+        return [move[0] for move in moves[:BOTPROTO_SUGGESTIONS]]
+
+    def on_play(self, message):
+        from search import Position
+        _, _, rows, _, hold, queue_, _ = self.pending[message['move']]
+        self.position = Position(rows, queue_[0] if queue_ else None, hold, queue_[1:], frozenset())
+
+    def on_new_piece(self, message):
+        position = self.position
+        if position.current is None:
+            position.current = message['piece']
+        else:
+            position.queue = position.queue + (message['piece'],)
+
+
+async def run_bot(address=BOTPROTO_ADDRESS, binary=True, seed=None, live=False,
+                  bot=None, latencies=None):
+    """
+    Cho một bot chơi một game qua giao thức.
+
+    Args:
+        latencies: Danh sách để ghi độ trễ khứ hồi suggestion -> play (giây)
+
+    Returns:
+        Thông điệp game_over (hoặc None nếu kết nối đóng trước)
+    """
+    bot = bot or StandInBot()
+    kind, target = parse_address(address)
+    if kind == 'unix':
+        reader, writer = await asyncio.open_unix_connection(target)
+    else:
+        reader, writer = await asyncio.open_connection(*target)
+    codec = BinaryCodec() if binary else JsonCodec()
+    if binary:
+        writer.write(BINARY_MAGIC)
+    writer.write(codec.encode([{'type': 'hello', 'seed': seed, 'live': live}]))
+    sent = None
+    try:
+        while True:
+            messages = await codec.read(reader)
+            if messages is None:
+                return None
+            for message in messages:
+                kind = message['type']
+                if kind == 'start':
+                    bot.on_start(message)
+                elif kind == 'play':
+                    if latencies is not None and sent is not None:
+                        latencies.append(time.perf_counter() - sent)
+                    bot.on_play(message)
+                elif kind == 'new_piece':
+                    bot.on_new_piece(message)
+                elif kind == 'suggest':
+                    moves = bot.suggest()
+                    sent = time.perf_counter()
+                    writer.write(codec.encode([{'type': 'suggestion', 'moves': moves}]))
+                    await writer.drain()
+                elif kind == 'game_over':
+                    return message
+                elif kind == 'error':
+                    raise RuntimeError(message['message'])
+    finally:
+        writer.close()
+
+
+# ---------------------------------------------------------------------------
+# Đo độ trễ
+# ---------------------------------------------------------------------------
+
+def _bench_clients(address, connections, binary, result_queue):
+    """Tiến trình máy khách của phép đo: nhiều bot mẫu đồng thời"""
+    async def main():
+        latencies = []
+        started = time.perf_counter()
+        results = await asyncio.gather(*[run_bot(address, binary, seed, latencies=latencies)
+                                         for seed in range(connections)])
+        elapsed = time.perf_counter() - started
+        return latencies, sum(result['pieces'] for result in results), elapsed
+
+    result_queue.put(asyncio.run(main()))
+
+
+def benchmark(address=None, connections=32, pieces=200):
+    """
+    Đo độ trễ khứ hồi (suggestion gửi đi -> play nhận về) và số mảnh mỗi giây
+    cho cả hai biến thể, với `connections` bot mẫu đồng thời ở tiến trình khác.
+    """
+    import multiprocessing
+    import tempfile
+
+    if address is None:
+        address = 'unix:' + os.path.join(tempfile.mkdtemp(), 'botproto.sock')
+
+    for binary in (False, True):
+        server = BotServer(max_pieces=pieces)
+        server.serve_in_thread(address)
+        result_queue = multiprocessing.Queue()
+        process = multiprocessing.Process(target=_bench_clients,
+                                          args=(address, connections, binary, result_queue))
+        process.start()
+        latencies, total_pieces, elapsed = result_queue.get()
+        process.join()
+        server.server.close()
+
+        latencies.sort()
+        print("%-6s %3d kết nối: trung vị %.2f ms, p99 %.2f ms, %.0f mảnh/s (%d lõi CPU)"
+              % ('nhị phân' if binary else 'JSON', connections,
+                 latencies[len(latencies) // 2] * 1e3,
+                 latencies[int(len(latencies) * 0.99)] * 1e3,
+                 total_pieces / elapsed, os.cpu_count()))
+
+
+def main(argv=None):
+    """Điểm khởi đầu dòng lệnh"""
+    parser = argparse.ArgumentParser(description="Máy chủ và bot mẫu của giao thức bot")
+    sub = parser.add_subparsers(dest='command', required=True)
+
+    serve = sub.add_parser('serve', help="Chạy máy chủ cho các game chạy ngầm")
+    serve.add_argument('--address', default=BOTPROTO_ADDRESS)
+    serve.add_argument('--max-pieces', type=int, default=BOT_MAX_PIECES)
+
+    client = sub.add_parser('bot', help="Chạy bot mẫu")
+    client.add_argument('--address', default=BOTPROTO_ADDRESS)
+    client.add_argument('--binary', action='store_true')
+    client.add_argument('--seed', type=int, default=None)
+    client.add_argument('--live', action='store_true', help="Chơi game đang hiển thị")
+
+    bench = sub.add_parser('bench', help="Đo độ trễ với nhiều bot mẫu đồng thời")
+    bench.add_argument('--address', default=None)
+    bench.add_argument('--connections', type=int, default=32)
+    bench.add_argument('--pieces', type=int, default=200)
+
+    args = parser.parse_args(argv)
+    if args.command == 'serve':
+        async def serve():
+            server = await BotServer(args.max_pieces).start(args.address)
+            async with server:
+                await server.serve_forever()
+        asyncio.run(serve())
+    elif args.command == 'bot':
+        print(asyncio.run(run_bot(args.address, args.binary, args.seed, args.live)))
+    else:
+        benchmark(args.address, args.connections, args.pieces)
+
+
+if __name__ == "__main__":
+    main(sys.argv[1:])
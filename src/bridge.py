@@ -0,0 +1,363 @@
+"""
+Cầu Bộ nhớ Chung cho Bot Ngoài Tiến trình
+
+Game ghi trạng thái hiện tại (lưới, mảnh hiện tại/giữ/hàng đợi, điểm) vào một
+khối multiprocessing.shared_memory; bot ở tiến trình khác (có thể viết bằng
+ngôn ngữ khác) đọc trực tiếp khối đó và gửi hành động qua một vòng đệm đầu vào
+cũng nằm trong khối. Không có pipe, không tuần tự hóa, không khóa.
+
+Bố cục khối (little-endian, mọi số nguyên được căn theo kích thước):
+
+    0   HEADER_FORMAT   magic 'TBRG', phiên bản, width, height, số ô vòng đệm,
+                        pid của game, seq, 4 byte đệm
+    24  STATE_FORMAT    khung, số đầu vào đã xử lý, điểm, cấp, số hàng, game over,
+                        trạng thái, mảnh hiện tại (id, x, y, xoay), mảnh giữ,
+                        được giữ, độ dài hàng đợi
+        QUEUE_SLOTS     id các mảnh xem trước
+        width*height    lưới (id ô, giống Board)
+    ... RING_FORMAT     head (bot ghi), tail (game ghi)
+        ring_capacity   mỗi ô 1 byte: mã hành động ACTION_* (replay.py)
+
+Seqlock: trước khi ghi, game tăng seq lên số lẻ; ghi xong tăng tiếp lên số
+chẵn. Người đọc đọc seq, sao chép vùng trạng thái, đọc lại seq; nếu seq lẻ
+hoặc đã đổi thì đọc lại. Người đọc không bao giờ chặn người ghi.
+
+Vòng đệm đầu vào là SPSC (một bên ghi, một bên đọc): bot ghi ô head % capacity
+rồi tăng head; game đọc từ tail tới head rồi cập nhật tail. Mỗi chỉ số chỉ
+có một bên ghi, nên không cần khóa. (Python không có rào bộ nhớ tường minh;
+trên x86 thứ tự ghi được giữ nguyên. Bot viết bằng C/Rust nên dùng
+load-acquire/store-release cho seq, head và tail.)
+
+Cách dùng:
+    Trong game: đặt BRIDGE_ENABLED = True trong config.py
+    Bot:        client = BridgeClient(); state = client.read_state(); client.send(ACTION_LEFT)
+    Đo độ trễ:  python src/bridge.py
+"""
+
+import os
+import struct
+import sys
+import time
+from multiprocessing import shared_memory
+from config import *
+from tetromino import PIECE_IDS, PIECE_TYPES
+
+BRIDGE_MAGIC = b'TBRG'
+BRIDGE_VERSION = 2
+QUEUE_SLOTS = 16
+
+HEADER_FORMAT = '<4sHHHHII4x'           # magic, phiên bản, width, height, số ô vòng đệm, pid, seq
+STATE_FORMAT = '<IIQIIBBBhhBBBB'        # xem docstring của module
+RING_FORMAT = '<II'                     # head, tail
+
+HEADER_SIZE = struct.calcsize(HEADER_FORMAT)
+SEQ_OFFSET = HEADER_SIZE - 8
+STATE_OFFSET = HEADER_SIZE
+STATE_SIZE = struct.calcsize(STATE_FORMAT)
+QUEUE_OFFSET = STATE_OFFSET + STATE_SIZE
+BOARD_OFFSET = QUEUE_OFFSET + QUEUE_SLOTS
+
+
+def layout(width, height, ring_capacity):
+    """
+    Vị trí các vùng trong khối.
+
+    Returns:
+        (vị trí hết vùng trạng thái, vị trí head, vị trí vòng đệm, tổng kích thước)
+    """
+    state_end = BOARD_OFFSET + width * height
+    head_offset = (state_end + 7) & ~7
+    ring_offset = head_offset + struct.calcsize(RING_FORMAT)
+    return state_end, head_offset, ring_offset, ring_offset + ring_capacity
+
+
+def _attach(name):
+    """Mở một khối đã có mà không để resource_tracker xóa nó khi tiến trình này thoát"""
+    try:
+        return shared_memory.SharedMemory(name=name, track=False)
+    except TypeError:
+        # Python < 3.13 không có track=False. Không dùng unregister sau khi mở:
+        # nếu game chạy cùng resource_tracker (ví dụ tiến trình con tạo bằng fork)
+        # thì unregister sẽ xóa luôn đăng ký của game.
+        from multiprocessing import resource_tracker
+        register = resource_tracker.register
+        resource_tracker.register = lambda name, rtype: None
+        try:
+            return shared_memory.SharedMemory(name=name)
+        finally:
+            resource_tracker.register = register
+
+
+def _process_alive(pid):
+    """True nếu tiến trình pid còn chạy (hoặc không kiểm tra được)"""
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True    # Còn chạy, của người dùng khác
+    return True
+
+
+def _is_stale(name):
+    """
+    True nếu khối `name` chắc chắn bị bỏ lại: là khối của cầu bot và tiến trình
+    game đã tạo nó không còn chạy. Khối không đọc được, của chương trình khác
+    hay của một game còn chạy đều không được coi là bị bỏ lại.
+    """
+    try:
+        block = _attach(name)
+    except (OSError, ValueError):
+        return False
+    try:
+        if block.size < HEADER_SIZE:
+            return False
+        magic, version, _, _, _, pid, _ = struct.unpack_from(HEADER_FORMAT, block.buf, 0)
+        if magic != BRIDGE_MAGIC or version != BRIDGE_VERSION or pid <= 0:
+            return False
+        return not _process_alive(pid)
+    finally:
+        block.close()
+
+
+class BridgeServer:
+    """
+    Phía game: tạo khối, công bố trạng thái mỗi khung và nhận hành động.
+
+    Thuộc tính:
+        name: Tên khối bộ nhớ chung
+        frame: Số lần đã công bố
+    """
+
+    def __init__(self, name=BRIDGE_NAME, width=GRID_WIDTH, height=GRID_HEIGHT,
+                 ring_capacity=BRIDGE_RING_CAPACITY):
+        self.width = width
+        self.height = height
+        self.ring_capacity = ring_capacity
+        self.state_end, self.head_offset, self.ring_offset, size = \
+            layout(width, height, ring_capacity)
+
+        try:
+            self.block = shared_memory.SharedMemory(name=name, create=True, size=size)
+        except FileExistsError:
+            # Chỉ xóa khối còn sót lại từ một lần chạy bị ngắt; khối của game
+            # khác đang chạy (hoặc không phải của cầu bot) được giữ nguyên
+            if not _is_stale(name):
+                raise FileExistsError(
+                    "Khối bộ nhớ chung %r đang được dùng bởi tiến trình khác "
+                    "(hoặc không phải của cầu bot); đổi BRIDGE_NAME trong config.py" % name)
+            stale = shared_memory.SharedMemory(name=name)
+            stale.close()
+            stale.unlink()
+            self.block = shared_memory.SharedMemory(name=name, create=True, size=size)
+        self.name = self.block.name
+        self.buf = self.block.buf
+        self.frame = 0
+        self.inputs_consumed = 0
+        self._seq = 0
+
+        struct.pack_into(HEADER_FORMAT, self.buf, 0, BRIDGE_MAGIC, BRIDGE_VERSION,
+                         width, height, ring_capacity, os.getpid(), 0)
+        struct.pack_into(RING_FORMAT, self.buf, self.head_offset, 0, 0)
+
+    def publish(self, game_state):
+        """Ghi trạng thái hiện tại vào khối (trong seqlock)"""
+        if (game_state.width, game_state.height) != (self.width, self.height):
+            raise ValueError("Kích thước bảng khác với khối bộ nhớ chung")
+        buf = self.buf
+        self.frame += 1
+        piece = game_state.current_piece
+        held = game_state.held_piece_type
+        queue = game_state.next_queue[:QUEUE_SLOTS]
+
+        self._seq += 1
+        struct.pack_into('<I', buf, SEQ_OFFSET, self._seq & 0xFFFFFFFF)
+        struct.pack_into(STATE_FORMAT, buf, STATE_OFFSET,
+                         self.frame, self.inputs_consumed, game_state.score,
+                         game_state.level, game_state.lines_cleared,
+                         game_state.game_over, game_state.state,
+                         PIECE_IDS[piece.piece_type], piece.x, piece.y, piece.rotation,
+                         0 if held is None else PIECE_IDS[held],
+                         game_state.can_hold, len(queue))
+        buf[QUEUE_OFFSET:QUEUE_OFFSET + len(queue)] = bytes(PIECE_IDS[t] for t in queue)
+        buf[BOARD_OFFSET:self.state_end] = game_state.grid.to_bytes()
+        self._seq += 1
+        struct.pack_into('<I', buf, SEQ_OFFSET, self._seq & 0xFFFFFFFF)
+
+    def drain(self, limit=None):
+        """
+        Lấy các hành động bot đã gửi (theo thứ tự).
+
+        Args:
+            limit: Số hành động tối đa (None = tất cả)
+        """
+        head, tail = struct.unpack_from(RING_FORMAT, self.buf, self.head_offset)
+        count = (head - tail) & 0xFFFFFFFF
+        if limit is not None:
+            count = min(count, limit)
+        if not count:
+            return []
+        capacity = self.ring_capacity
+        ring = self.ring_offset
+        actions = [self.buf[ring + (tail + i) % capacity] for i in range(count)]
+        struct.pack_into('<I', self.buf, self.head_offset + 4, (tail + count) & 0xFFFFFFFF)
+        self.inputs_consumed = (self.inputs_consumed + count) & 0xFFFFFFFF
+        return actions
+
+    def close(self):
+        """Đóng và xóa khối"""
+        if self.block is None:
+            return
+        self.buf = None
+        self.block.close()
+        self.block.unlink()
+        self.block = None
+
+
+class BridgeClient:
+    """
+    Phía bot: đọc trạng thái và gửi hành động.
+    """
+
+    def __init__(self, name=BRIDGE_NAME):
+        self.block = _attach(name)
+        self.buf = self.block.buf
+        magic, version, self.width, self.height, self.ring_capacity, _, _ = \
+            struct.unpack_from(HEADER_FORMAT, self.buf, 0)
+        if magic != BRIDGE_MAGIC or version != BRIDGE_VERSION:
+            self.close()
+            raise ValueError("Khối bộ nhớ chung không phải của cầu bot: %s" % name)
+        self.state_end, self.head_offset, self.ring_offset, _ = \
+            layout(self.width, self.height, self.ring_capacity)
+
+    def read_raw(self):
+        """
+        Sao chép vùng trạng thái một cách nhất quán (seqlock).
+
+        Returns:
+            bytes từ STATE_OFFSET tới hết lưới
+        """
+        buf = self.buf
+        while True:
+            (seq,) = struct.unpack_from('<I', buf, SEQ_OFFSET)
+            if seq & 1:
+                continue   # Game đang ghi
+            data = bytes(buf[STATE_OFFSET:self.state_end])
+            if struct.unpack_from('<I', buf, SEQ_OFFSET)[0] == seq:
+                return data
+
+    def read_state(self):
+        """
+        Đọc trạng thái hiện tại.
+
+        Returns:
+            dict gồm frame, inputs_consumed, score, level, lines, game_over,
+            state, piece (loại, x, y, xoay), hold, can_hold, queue, board (bytes)
+        """
+        data = self.read_raw()
+        (frame, consumed, score, level, lines, game_over, state,
+         piece_id, x, y, rotation, hold_id, can_hold, queue_len) = \
+            struct.unpack_from(STATE_FORMAT, data, 0)
+        queue_start = QUEUE_OFFSET - STATE_OFFSET
+        board_start = BOARD_OFFSET - STATE_OFFSET
+        return {
+            'frame': frame,
+            'inputs_consumed': consumed,
+            'score': score,
+            'level': level,
+            'lines': lines,
+            'game_over': bool(game_over),
+            'state': state,
+            'piece': (PIECE_TYPES[piece_id - 1], x, y, rotation),
+            'hold': PIECE_TYPES[hold_id - 1] if hold_id else None,
+            'can_hold': bool(can_hold),
+            'queue': [PIECE_TYPES[i - 1] for i in data[queue_start:queue_start + queue_len]],
+            'board': data[board_start:],
+        }
+
+    def frame(self):
+        """Số khung đã công bố (đọc nhanh, không qua seqlock)"""
+        return struct.unpack_from('<I', self.buf, STATE_OFFSET)[0]
+
+    def send(self, action):
+        """
+        Gửi một hành động ACTION_*.
+
+        Returns:
+            False nếu vòng đệm đầy (game chưa kịp xử lý)
+        """
+        head, tail = struct.unpack_from(RING_FORMAT, self.buf, self.head_offset)
+        if (head - tail) & 0xFFFFFFFF >= self.ring_capacity:
+            return False
+        self.buf[self.ring_offset + head % self.ring_capacity] = action
+        struct.pack_into('<I', self.buf, self.head_offset, (head + 1) & 0xFFFFFFFF)
+        return True
+
+    def close(self):
+        self.buf = None
+        self.block.close()
+
+
+def _bench_client(name, rounds, result_queue):
+    """Tiến trình bot của phép đo: gửi một hành động rồi chờ game xác nhận"""
+    from replay import ACTION_LEFT, ACTION_RIGHT
+    client = BridgeClient(name)
+    latencies = []
+    for i in range(rounds):
+        expected = (client.read_state()['inputs_consumed'] + 1) & 0xFFFFFFFF
+        started = time.perf_counter()
+        while not client.send(ACTION_LEFT if i % 2 else ACTION_RIGHT):
+            os.sched_yield()
+        while client.read_state()['inputs_consumed'] != expected:
+            os.sched_yield()
+        latencies.append(time.perf_counter() - started)
+    client.close()
+    result_queue.put(latencies)
+
+
+def benchmark(rounds=2000):
+    """
+    Đo độ trễ khứ hồi: bot gửi hành động -> game áp dụng và công bố -> bot thấy.
+
+    Game chạy vòng lặp bận (không vẽ) để chỉ đo chi phí của cầu.
+    """
+    import multiprocessing
+    from game import GameState
+    from replay import apply_action
+
+    game_state = GameState(0, high_score_file=None)
+    server = BridgeServer(name=BRIDGE_NAME + '_bench')
+    server.publish(game_state)
+
+    started = time.perf_counter()
+    for _ in range(10000):
+        server.publish(game_state)
+    publish_us = (time.perf_counter() - started) / 10000 * 1e6
+
+    result_queue = multiprocessing.Queue()
+    process = multiprocessing.Process(target=_bench_client,
+                                      args=(server.name, rounds, result_queue))
+    process.start()
+    latencies = None
+    try:
+        while latencies is None:
+            for action in server.drain():
+                apply_action(game_state, action)
+            server.publish(game_state)
+            if not result_queue.empty():
+                latencies = result_queue.get()
+            else:
+                os.sched_yield()
+    finally:
+        process.join()
+        server.close()
+
+    latencies.sort()
+    print("publish: %.2f µs" % publish_us)
+    print("khứ hồi: trung vị %.1f µs, p99 %.1f µs (%d lần, %d lõi CPU)"
+          % (latencies[len(latencies) // 2] * 1e6,
+             latencies[int(len(latencies) * 0.99)] * 1e6, len(latencies), os.cpu_count()))
+
+
+if __name__ == "__main__":
+    benchmark(int(sys.argv[1]) if len(sys.argv) > 1 else 2000)
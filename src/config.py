@@ -31,10 +31,14 @@ INITIAL_FALL_SPEED = 1.0      # Số giây trước khi mảnh rơi xuống mộ
 FAST_DROP_SPEED = 0.05        # Tốc độ khi giữ phím mũi tên xuống
 LOCK_DELAY = 0.5              # Thời gian mảnh ở đáy trước khi khóa
 LINE_CLEAR_ANIMATION = 0.2    # Thời lượng hoạt ảnh xóa hàng
+TIMER_EPSILON = 1e-9          # Khoảng vượt thời hạn khi tua nhanh theo sự kiện (chống sai số làm tròn)
 
 # Thời gian đầu vào (hệ thống DAS/ARR cho điều khiển phản hồi nhanh)
 DAS_DELAY = 0.15              # Delayed Auto Shift: độ trễ ban đầu trước khi lặp lại tự động (giây)
-ARR_DELAY = 0.033             # Auto Repeat Rate: độ trễ giữa các di chuyển lặp lại (giây, ~30 lần/giây)
+ARR_DELAY = 0.033             # Auto Repeat Rate: độ trễ giữa các di chuyển lặp lại (giây, ~30 lần/giây; 0 = dịch ngay tới tường)
+FPS = 60                      # Tốc độ khung hình tối đa
+INPUT_POLL_RATE = 1000        # Số lần lấy sự kiện mỗi giây giữa hai khung (0 = chỉ lấy ở đầu khung) (inputs.py)
+INPUT_LATENCY_SAMPLES = 512   # Số mẫu độ trễ đầu vào gần nhất được giữ để báo cáo
 
 # Hệ thống tính điểm (điểm được trao khi xóa hàng)
 SCORE_SINGLE = 100    # Xóa 1 hàng
@@ -60,6 +64,7 @@ COLOR_Z = (230, 0, 0)      # Đỏ - Mảnh Z
 COLOR_J = (0, 0, 230)      # Xanh dương - Mảnh J
 COLOR_L = (230, 128, 0)    # Cam - Mảnh L
 COLOR_WHITE = (255, 255, 255)  # Trắng cho viền
+COLOR_GARBAGE = (110, 110, 120)  # Xám - Hàng rác (chế độ rác/puzzle)
 
 # File lưu điểm cao
 HIGHSCORE_FILE = "highscore.txt"
@@ -100,3 +105,120 @@ def get_gravity_speed(level):
         # Không nên xảy ra, nhưng fallback về tốc độ cấp 1
         return 1.0
 
+
+# Hàng đợi xem trước: số mảnh tiếp theo được hiển thị (và bot tìm kiếm được biết), tối đa 16
+PREVIEW_COUNT = 5
+
+# Truyền trực tiếp cho khán giả: số khung giữa hai khung chính (keyframe)
+STREAM_KEYFRAME_INTERVAL = 120  # ~2 giây ở 60 FPS
+ROW_SHIFT_LOG_SIZE = 64         # Số lần dịch hàng (xóa hàng / thêm rác) gần nhất GameState giữ lại
+
+# Băm Zobrist và bảng chuyển vị (transposition table) cho bot tìm kiếm
+ZOBRIST_SEED = 20250101        # Seed cố định để các khóa băm giống nhau giữa các lần chạy
+TT_CAPACITY = 1 << 16          # Số mục tối đa trong bảng chuyển vị
+TT_POLICY = 'lru'              # Chính sách thay thế: 'lru', 'always' hoặc 'depth'
+
+# Bot đặt mảnh: trọng số theo thứ tự (height, holes, bumpiness, lines, wells)
+BOT_WEIGHTS = (-0.51, -0.36, -0.18, 0.76, -0.10)
+BOT_MAX_PIECES = 1000          # Số mảnh tối đa mỗi game chạy ngầm của bot
+
+# Bot tìm kiếm nhìn trước (search.py)
+SEARCH_TIME_BUDGET = 0.05      # Thời gian suy nghĩ tối đa cho mỗi mảnh (giây)
+SEARCH_BEAM_WIDTH = 6          # Số nước đi tốt nhất được mở rộng ở mỗi nút
+SEARCH_ROOT_WIDTH = 12         # Số nước đi ở gốc được tìm sâu hơn độ sâu 1
+SEARCH_MAX_DEPTH = 6           # Số mảnh nhìn trước tối đa
+
+# Môi trường học tăng cường (env.py)
+ENV_FRAME_TIME = 1.0 / 60      # Thời gian mỗi bước ở kiểu hành động raw (giây)
+ENV_MAX_STEPS = 10000          # Số bước tối đa mỗi ván (None = không giới hạn)
+
+# Cầu bộ nhớ chung cho bot ngoài tiến trình (bridge.py)
+BRIDGE_ENABLED = False         # Công bố trạng thái và nhận hành động qua bộ nhớ chung
+BRIDGE_NAME = "tetris_bridge"  # Tên khối bộ nhớ chung
+BRIDGE_RING_CAPACITY = 256     # Số ô của vòng đệm đầu vào (hành động chờ xử lý)
+
+# Giao thức bot qua socket (botproto.py)
+BOTPROTO_ENABLED = False       # TetrisGame mở máy chủ để bot chơi game đang hiển thị
+BOTPROTO_ADDRESS = "127.0.0.1:47474"  # 'host:port' hoặc 'unix:/đường/dẫn.sock'
+BOTPROTO_SUGGESTIONS = 4       # Số nước bot mẫu đề xuất mỗi lượt (phòng nước bị từ chối)
+BOTPROTO_MAX_FRAME = 1 << 20   # Độ dài tối đa một khung nhị phân (byte); lớn hơn thì đóng kết nối
+BOTPROTO_MAX_ERROR = 200       # Độ dài tối đa thông báo trong thông điệp error
+
+# Xuất dữ liệu huấn luyện (dataset.py)
+DATASET_SHARD_SIZE = 65536     # Số mẫu mỗi file shard
+
+# Dò trọng số bot (tuner.py, cross-entropy method)
+TUNER_GENERATIONS = 50         # Số thế hệ
+TUNER_POPULATION = 100         # Số ứng viên mỗi thế hệ
+TUNER_ELITE_FRACTION = 0.1     # Tỉ lệ ứng viên tốt nhất được giữ để cập nhật phân phối
+TUNER_GAMES = 5                # Số game chấm mỗi ứng viên
+TUNER_INITIAL_STD = 0.5        # Độ lệch chuẩn ban đầu của mỗi trọng số
+TUNER_NOISE = 0.05             # Phương sai cộng thêm (giảm dần) để tránh hội tụ sớm
+
+# Replay: lưu seed + đầu vào của mỗi game để phát lại hoặc render thành video
+SAVE_REPLAYS = True            # Tự động lưu replay khi game kết thúc
+REPLAY_DIR = "replays"         # Thư mục chứa file replay
+ARCHIVE_KEYFRAME_INTERVAL = 600  # Kho replay: chụp GameState mỗi N khung (~10 giây) để tua nhanh
+
+# Tạm dừng và chế độ chờ (giảm CPU khi không có gì chạy)
+IDLE_WAIT_TIMEOUT = 1000          # Thời gian chờ sự kiện tối đa ở chế độ chờ (mili giây)
+AUTO_PAUSE_ON_FOCUS_LOSS = True   # Tự động tạm dừng khi cửa sổ mất focus
+
+# Vẽ bảng bằng NumPy/surfarray (raster.py): một lần blit thay vì từng ô
+RASTERIZE_BOARD = True
+
+# Màn hình nhiều bảng (wall.py)
+WALL_SCREEN_WIDTH = 1600       # Kích thước cửa sổ (pixels)
+WALL_SCREEN_HEIGHT = 900
+WALL_MARGIN = 8                # Khoảng cách giữa các bảng
+WALL_LABEL_HEIGHT = 14         # Chiều cao dòng điểm phía trên mỗi bảng
+WALL_BOT_PPS = 1.0             # Số mảnh mỗi giây của mỗi bot
+
+# Kiểm chứng điểm bằng replay (verify.py)
+VERIFY_MAX_FRAME_MS = 5000          # Thời gian khung dài nhất được chấp nhận (mili giây)
+VERIFY_MAX_ACTIONS_PER_FRAME = 64   # Số hành động tối đa trong một khung
+VERIFY_POLL_INTERVAL = 0.5          # Số giây giữa hai lần quét thư mục nộp bài
+
+# Sinh chuỗi mảnh hàng loạt cho mô phỏng (randomizers.py)
+RANDOMIZER_CHUNK_SIZE = 1 << 16   # Số mảnh mỗi khối khi sinh theo luồng
+RANDOMIZER_CHECK_COUNT = 1000000  # Số mảnh mỗi kiểu khi kiểm tra phân phối
+RANDOMIZER_CHECK_Z = 4.0       # Ngưỡng |z| để một phép thử phân phối đạt
+TGM_ROLLS = 4                  # Số lần rút lại tối đa của kiểu TGM
+TGM_INITIAL_HISTORY = ('Z', 'Z', 'Z', 'Z')   # Lịch sử ban đầu của kiểu TGM
+
+# Sách khai cuộc cho túi đầu tiên (opening.py)
+OPENING_BOOK_FILE = "opening_book.bin"   # Bảng tra (python src/opening.py build)
+OPENING_BEAM_WIDTH = 16        # Độ rộng beam khi tạo sách
+SHOW_OPENING_HINT = True       # Vẽ gợi ý vị trí đặt theo sách (nếu đã có file sách)
+
+# Giải perfect clear (solver.py)
+SOLVER_MAX_NODES = 200000      # Số trạng thái tối đa mỗi lần tìm (None = không giới hạn)
+SOLVER_BENCH_OPENINGS = 12     # Số chuỗi mở đầu ngẫu nhiên khi đo (solver.py --bench)
+
+# Phân tích finesse (finesse.py)
+FINESSE_WORST = 5              # Số lỗi nặng nhất được liệt kê cho mỗi game
+
+# Thống kê trực tiếp (stats.py): PPS, APM, số hàng mỗi phút
+SHOW_STATS = True              # Hiển thị thống kê trong bảng giao diện
+STATS_WINDOW = 60.0            # Độ dài cửa sổ trượt (giây)
+STATS_BUCKETS = 240            # Số ngăn thời gian của cửa sổ trượt
+SAVE_STATS = True              # Lưu thống kê ra file JSON khi game kết thúc
+STATS_DIR = "stats"            # Thư mục chứa file thống kê
+
+# Chế độ luyện tập: giữ Backspace để lùi từng mảnh, Shift+Backspace để lùi từng khung (rewind.py)
+PRACTICE_MODE = False
+REWIND_MEMORY_BUDGET = 4 * 1024 * 1024   # Bộ nhớ tối đa của bộ đệm tua lùi (byte)
+REWIND_KEYFRAME_INTERVAL = 32  # Số mốc giữa hai mốc chính (lưu cả lưới)
+REWIND_TICK_INTERVAL = 60      # Số khung tối đa giữa hai mốc (giới hạn số khung mô phỏng lại)
+REWIND_PIECE_REPEAT = 0.25     # Số giây giữa hai lần lùi một mảnh khi giữ phím
+REWIND_TICKS_PER_FRAME = 2     # Số khung lùi mỗi khung hình khi giữ phím lùi từng khung
+
+# Telemetry: luồng sự kiện gameplay (ghi theo lô bởi luồng nền)
+TELEMETRY_ENABLED = False         # Bật để ghi sự kiện khi chơi
+TELEMETRY_DIR = "telemetry"       # Thư mục chứa file log
+TELEMETRY_BUFFER_SIZE = 65536     # Số sự kiện tối đa chờ ghi (vượt quá sẽ bị bỏ và đếm)
+TELEMETRY_FLUSH_INTERVAL = 0.5    # Số giây giữa hai lần ghi
+TELEMETRY_BATCH_SIZE = 4096       # Số sự kiện tối đa mỗi lô
+TELEMETRY_MAX_BYTES = 8 * 1024 * 1024  # Kích thước tối đa mỗi file trước khi xoay vòng
+TELEMETRY_BACKUP_COUNT = 5        # Số file cũ được giữ lại
+FRAME_SPIKE_MS = 50               # Khung hình dài hơn giá trị này được ghi là "giật"
@@ -0,0 +1,315 @@
+"""
+Xuất Dữ liệu Huấn luyện từ Game của Bot
+
+Cho bot (bot.py) chơi các game chạy ngầm có seed trên một nhóm tiến trình và
+ghi mỗi lượt đặt mảnh thành một mẫu vào các file shard NumPy nén
+(np.savez_compressed), mỗi shard đúng DATASET_SHARD_SIZE mẫu (trừ shard cuối).
+
+Mỗi mẫu gồm:
+    board      uint8[height, width]  lưới trước khi đặt (id ô, giống Board)
+    current    uint8                 id mảnh hiện tại
+    hold       uint8                 id mảnh giữ (0 = trống)
+    queue      uint8[preview]        id các mảnh xem trước
+    placement  int8[3]               nước bot chọn: rotation, x, dùng ô giữ
+    lines      uint8                 số hàng xóa bởi nước này
+    future     int32                 tổng số hàng xóa từ nước này tới hết game
+    game_over  bool                  game kết thúc bằng thua (không phải hết giới hạn mảnh)
+    game       uint32                số thứ tự game (seed suy ra từ đó)
+
+Bộ nhớ bị chặn: các game được tạo bởi một generator, chỉ tối đa 2 * workers
+game đang chạy/đang chờ cùng lúc, và chỉ một shard được giữ trong bộ nhớ.
+
+Tiếp tục: sau mỗi shard, manifest.json được cập nhật (ghi file tạm rồi đổi
+tên) với vị trí (game, mẫu trong game) nơi shard tiếp theo bắt đầu. Chạy lại
+cùng lệnh sẽ bỏ các shard dở dang và tiếp tục từ shard hoàn chỉnh cuối cùng;
+vì mỗi game chỉ phụ thuộc seed của nó, kết quả giống hệt một lần chạy liền.
+
+Cách dùng:
+    python src/dataset.py out_dir --samples 1000000 --workers 16
+"""
+
+import argparse
+import json
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+import numpy as np
+from config import *
+from game import GameState
+from tetromino import PIECE_IDS
+from bot import Bot, apply_placement, finish_line_clear
+
+DATASET_VERSION = 1
+MANIFEST_NAME = 'manifest.json'
+
+
+def game_seed(seed, index):
+    """Seed của game thứ `index` (không phụ thuộc các game khác)"""
+    return (seed * 1000003 + index) & 0xFFFFFFFFFFFFFFFF
+
+
+def shard_name(index):
+    return 'shard-%05d.npz' % index
+
+
+def play_recorded_game(index, seed, weights, max_pieces, width, height, preview):
+    """
+    Chơi một game và ghi mọi lượt (chạy trong tiến trình con).
+
+    Returns:
+        dict tên trường -> mảng NumPy (một hàng mỗi lượt)
+    """
+    game_state = GameState(game_seed(seed, index), high_score_file=None,
+                           width=width, height=height, preview_count=preview)
+    bot = Bot(weights)
+    boards, pieces, placements, lines = [], [], [], []
+
+    while not game_state.game_over and len(placements) < max_pieces:
+        choice = bot.choose(game_state)
+        if choice is None:
+            game_state.game_over = True
+            break
+        held = game_state.held_piece_type
+        boards.append(game_state.grid.to_bytes())
+        pieces.append(bytes([PIECE_IDS[game_state.current_piece.piece_type],
+                             0 if held is None else PIECE_IDS[held]]
+                            + [PIECE_IDS[t] for t in game_state.next_queue]))
+        placements.append(choice)
+        before = game_state.lines_cleared
+        apply_placement(game_state, *choice)
+        finish_line_clear(game_state)
+        lines.append(game_state.lines_cleared - before)
+
+    count = len(placements)
+    piece_array = np.frombuffer(b''.join(pieces), dtype=np.uint8).reshape(count, 2 + preview)
+    line_array = np.array(lines, dtype=np.uint8)
+    # Tổng hàng từ lượt này tới hết game (tổng dồn từ cuối)
+    future = np.cumsum(line_array[::-1], dtype=np.int32)[::-1]
+    return {
+        'board': np.frombuffer(b''.join(boards), dtype=np.uint8).reshape(count, height, width),
+        'current': piece_array[:, 0],
+        'hold': piece_array[:, 1],
+        'queue': piece_array[:, 2:],
+        'placement': np.array(placements, dtype=np.int8).reshape(count, 3),
+        'lines': line_array,
+        'future': np.ascontiguousarray(future),
+        'game_over': np.full(count, game_state.game_over, dtype=bool),
+        'game': np.full(count, index, dtype=np.uint32),
+    }
+
+
+def iter_games(first_game, seed, weights, max_pieces, width, height, preview, workers=None):
+    """
+    Generator: các game theo thứ tự, bắt đầu từ `first_game`, vô hạn.
+
+    Chỉ tối đa 2 * workers game được giao cho nhóm tiến trình cùng lúc, nên
+    bộ nhớ không tăng theo số game đã tạo.
+
+    Yields:
+        (số thứ tự game, dict mảng của game)
+    """
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        window = 2 * (workers or os.cpu_count() or 1)
+        pending = []
+        next_game = first_game
+        while True:
+            while len(pending) < window:
+                pending.append((next_game, pool.submit(play_recorded_game, next_game, seed, weights,
+                                                       max_pieces, width, height, preview)))
+                next_game += 1
+            index, future = pending.pop(0)
+            yield index, future.result()
+
+
+def iter_samples(first_game, first_offset, **options):
+    """
+    Generator: các khối mẫu liên tiếp bắt đầu từ mẫu `first_offset` của game `first_game`.
+
+    Yields:
+        (số thứ tự game, vị trí trong game của hàng đầu, dict mảng)
+    """
+    for index, arrays in iter_games(first_game, **options):
+        offset = first_offset if index == first_game else 0
+        if offset:
+            arrays = {name: array[offset:] for name, array in arrays.items()}
+        yield index, offset, arrays
+
+
+class ShardWriter:
+    """
+    Gom mẫu vào bộ đệm cố định của một shard rồi ghi ra file nén.
+
+    Thuộc tính:
+        manifest: dict được ghi ra manifest.json sau mỗi shard
+    """
+
+    def __init__(self, out_dir, manifest):
+        self.out_dir = out_dir
+        self.manifest = manifest
+        self.shard_size = manifest['shard_size']
+        self.buffers = None
+        self.filled = 0
+
+    def _allocate(self, arrays):
+        self.buffers = {name: np.empty((self.shard_size,) + array.shape[1:], dtype=array.dtype)
+                        for name, array in arrays.items()}
+
+    def add(self, index, offset, arrays, limit):
+        """
+        Thêm mẫu của một game (có thể tràn sang nhiều shard).
+
+        Args:
+            limit: Số mẫu tối đa còn được thêm
+
+        Returns:
+            Số mẫu đã thêm
+        """
+        count = min(len(arrays['game']), limit)
+        if self.buffers is None and count:
+            self._allocate(arrays)
+        taken = 0
+        while taken < count:
+            n = min(count - taken, self.shard_size - self.filled)
+            for name, array in arrays.items():
+                self.buffers[name][self.filled:self.filled + n] = array[taken:taken + n]
+            self.filled += n
+            taken += n
+            if self.filled == self.shard_size:
+                self.flush(index, offset + taken)
+        return taken
+
+    def flush(self, next_game, next_offset):
+        """Ghi shard hiện tại và cập nhật manifest (shard tiếp theo bắt đầu ở next_game/next_offset)"""
+        if not self.filled:
+            return
+        shards = self.manifest['shards']
+        name = shard_name(len(shards))
+        path = os.path.join(self.out_dir, name)
+        temp_path = path + '.tmp.npz'
+        np.savez_compressed(temp_path, **{key: buffer[:self.filled]
+                                          for key, buffer in self.buffers.items()})
+        os.replace(temp_path, path)
+        shards.append({'file': name, 'samples': self.filled,
+                       'next_game': next_game, 'next_offset': next_offset})
+        self.manifest['samples'] += self.filled
+        self.filled = 0
+        save_manifest(self.out_dir, self.manifest)
+
+
+def save_manifest(out_dir, manifest):
+    """Ghi manifest (ghi file tạm rồi đổi tên)"""
+    path = os.path.join(out_dir, MANIFEST_NAME)
+    with open(path + '.tmp', 'w') as f:
+        json.dump(manifest, f, indent=1)
+    os.replace(path + '.tmp', path)
+
+
+def load_manifest(out_dir):
+    path = os.path.join(out_dir, MANIFEST_NAME)
+    if not os.path.exists(path):
+        return None
+    with open(path, 'r') as f:
+        return json.load(f)
+
+
+def export(out_dir, samples, seed=0, workers=None, shard_size=DATASET_SHARD_SIZE,
+           weights=BOT_WEIGHTS, max_pieces=BOT_MAX_PIECES, width=GRID_WIDTH,
+           height=GRID_HEIGHT, preview=PREVIEW_COUNT):
+    """
+    Xuất (hoặc tiếp tục xuất) `samples` mẫu vào out_dir.
+
+    Returns:
+        manifest sau khi xong
+    """
+    os.makedirs(out_dir, exist_ok=True)
+    settings = {
+        'version': DATASET_VERSION, 'seed': seed, 'shard_size': shard_size,
+        'weights': list(weights), 'max_pieces': max_pieces,
+        'width': width, 'height': height, 'preview': preview,
+    }
+    manifest = load_manifest(out_dir)
+    if manifest is not None:
+        if any(manifest.get(key) != value for key, value in settings.items()):
+            raise ValueError("Thư mục %s chứa dữ liệu với cấu hình khác" % out_dir)
+        print("Tiếp tục sau %d shard (%d mẫu)" % (len(manifest['shards']), manifest['samples']))
+    else:
+        manifest = dict(settings, samples=0, shards=[], complete=False)
+
+    # Mở rộng một tập đã xong: shard cuối chưa đủ cỡ được tạo lại để mọi shard
+    # (trừ shard cuối) luôn đúng shard_size
+    shards = manifest['shards']
+    if manifest['samples'] < samples and shards and shards[-1]['samples'] < shard_size:
+        manifest['samples'] -= shards.pop()['samples']
+
+    # Bỏ các shard dở dang còn sót lại từ lần chạy bị ngắt
+    done = {shard['file'] for shard in manifest['shards']}
+    for name in os.listdir(out_dir):
+        if name.startswith('shard-') and name not in done:
+            os.remove(os.path.join(out_dir, name))
+
+    manifest['complete'] = manifest['samples'] >= samples
+    if manifest['complete']:
+        save_manifest(out_dir, manifest)
+        return manifest
+
+    if manifest['shards']:
+        first_game = manifest['shards'][-1]['next_game']
+        first_offset = manifest['shards'][-1]['next_offset']
+    else:
+        first_game, first_offset = 0, 0
+
+    writer = ShardWriter(out_dir, manifest)
+    remaining = samples - manifest['samples']
+    produced = remaining
+    started = time.perf_counter()
+    generator = iter_samples(first_game, first_offset, seed=seed, weights=weights,
+                             max_pieces=max_pieces, width=width, height=height,
+                             preview=preview, workers=workers)
+    try:
+        for index, offset, arrays in generator:
+            added = writer.add(index, offset, arrays, remaining)
+            remaining -= added
+            if remaining <= 0:
+                if added < len(arrays['game']):
+                    writer.flush(index, offset + added)
+                else:
+                    writer.flush(index + 1, 0)
+                break
+    finally:
+        generator.close()
+
+    manifest['complete'] = True
+    save_manifest(out_dir, manifest)
+    elapsed = time.perf_counter() - started
+    print("%d mẫu trong %d shard (%.0f mẫu/s)"
+          % (manifest['samples'], len(manifest['shards']),
+             produced / max(elapsed, 1e-9)))
+    return manifest
+
+
+def iter_shards(out_dir):
+    """Đọc lại tập dữ liệu: mỗi shard một dict mảng (chỉ một shard trong bộ nhớ)"""
+    manifest = load_manifest(out_dir)
+    for shard in manifest['shards']:
+        with np.load(os.path.join(out_dir, shard['file'])) as data:
+            yield {name: data[name] for name in data.files}
+
+
+def main(argv=None):
+    """Điểm khởi đầu dòng lệnh"""
+    parser = argparse.ArgumentParser(description="Xuất dữ liệu huấn luyện từ game của bot")
+    parser.add_argument('out_dir', help="Thư mục shard (tiếp tục nếu đã có manifest)")
+    parser.add_argument('--samples', type=int, required=True, help="Tổng số mẫu")
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--workers', type=int, default=None, help="Số tiến trình")
+    parser.add_argument('--shard-size', type=int, default=DATASET_SHARD_SIZE)
+    parser.add_argument('--max-pieces', type=int, default=BOT_MAX_PIECES)
+    args = parser.parse_args(argv)
+
+    export(args.out_dir, args.samples, args.seed, args.workers, args.shard_size,
+           max_pieces=args.max_pieces)
+
+
+if __name__ == "__main__":
+    main(sys.argv[1:])
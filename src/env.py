@@ -0,0 +1,327 @@
+"""
+Môi trường Học Tăng cường (Kiểu Gym) trên GameState Chạy ngầm
+
+Giao diện giống Gymnasium (không phụ thuộc thư viện đó):
+    obs, info = env.reset(seed=...)
+    obs, reward, terminated, truncated, info = env.step(action)
+
+Hai kiểu hành động:
+- ACTION_MODE_RAW: mỗi bước là một khung hình (1/60 giây) với một đầu vào
+  như người chơi: không làm gì, trái, phải, xoay, rơi chậm, thả nhanh, giữ.
+- ACTION_MODE_PLACEMENT: mỗi bước đặt hẳn một mảnh. Hành động là chỉ số
+  ((giữ * 4 + xoay) * width + cột trái nhất); info['action_mask'] cho biết
+  chỉ số nào hợp lệ với mảnh hiện tại.
+
+Quan sát không sao chép bảng: obs['board'] là view NumPy (height, width)
+uint8 trỏ thẳng vào bộ nhớ của Board (0 = trống, 1-7 = loại mảnh, 8 = rác).
+View có thể thay đổi ở bước sau, nên hãy .copy() nếu cần giữ lại.
+
+Phần thưởng là điểm tăng thêm sau mỗi bước (đúng cách complete_line_clear,
+hard_drop và rơi chậm cộng điểm). Khi một ván kết thúc, info['episode'] chứa
+điểm, số hàng, cấp độ và số bước của ván.
+
+Cách dùng (đo tốc độ):
+    python src/env.py --steps 20000
+"""
+
+import argparse
+import random
+import sys
+import time
+import numpy as np
+from config import *
+from game import GameState
+from tetromino import PIECE_IDS
+from replay import (apply_action, ACTION_LEFT, ACTION_RIGHT, ACTION_ROTATE_CW,
+                    ACTION_ROTATE_CCW, ACTION_HARD_DROP, ACTION_HOLD)
+from bot import (board_rows, enumerate_placements, apply_placement, finish_line_clear)
+
+ACTION_MODE_RAW = 'raw'
+ACTION_MODE_PLACEMENT = 'placement'
+
+# Hành động của kiểu raw
+RAW_NOOP = 0
+RAW_LEFT = 1
+RAW_RIGHT = 2
+RAW_ROTATE_CW = 3
+RAW_ROTATE_CCW = 4
+RAW_SOFT_DROP = 5
+RAW_HARD_DROP = 6
+RAW_HOLD = 7
+RAW_ACTION_COUNT = 8
+
+_RAW_TO_ACTION = {
+    RAW_LEFT: ACTION_LEFT,
+    RAW_RIGHT: ACTION_RIGHT,
+    RAW_ROTATE_CW: ACTION_ROTATE_CW,
+    RAW_ROTATE_CCW: ACTION_ROTATE_CCW,
+    RAW_HARD_DROP: ACTION_HARD_DROP,
+    RAW_HOLD: ACTION_HOLD,
+}
+
+
+class TetrisEnv:
+    """
+    Một môi trường Tetris.
+
+    Thuộc tính:
+        action_mode: ACTION_MODE_RAW hoặc ACTION_MODE_PLACEMENT
+        action_count: Số hành động rời rạc
+        game_state: GameState của ván hiện tại
+    """
+
+    def __init__(self, action_mode=ACTION_MODE_PLACEMENT, seed=None, width=GRID_WIDTH,
+                 height=GRID_HEIGHT, max_steps=ENV_MAX_STEPS, frame_time=ENV_FRAME_TIME):
+        """
+        Args:
+            action_mode: Kiểu hành động
+            seed: Seed của chuỗi ván (mỗi lần reset không có seed lấy seed tiếp theo)
+            width, height: Kích thước bảng
+            max_steps: Số bước tối đa mỗi ván (None = không giới hạn); vượt quá thì truncated
+            frame_time: Thời gian mỗi bước ở kiểu raw (giây)
+        """
+        if action_mode not in (ACTION_MODE_RAW, ACTION_MODE_PLACEMENT):
+            raise ValueError("Kiểu hành động không hợp lệ: %r" % (action_mode,))
+        self.action_mode = action_mode
+        self.width = width
+        self.height = height
+        self.max_steps = max_steps
+        self.frame_time = frame_time
+        if action_mode == ACTION_MODE_RAW:
+            self.action_count = RAW_ACTION_COUNT
+        else:
+            self.action_count = 2 * 4 * width
+        self.seed_rng = random.Random(seed)
+        self.game_state = None
+        self.steps = 0
+
+        # Các mảng nhỏ được tạo một lần và ghi đè tại chỗ mỗi bước
+        self._piece = np.zeros(4, dtype=np.int16)          # id, x, y, xoay
+        self._queue = np.zeros(PREVIEW_COUNT, dtype=np.uint8)
+        self._mask = np.zeros(self.action_count, dtype=bool)
+        self._placements = {}                              # chỉ số -> (rotation, x, use_hold)
+
+    def reset(self, seed=None):
+        """
+        Bắt đầu ván mới.
+
+        Returns:
+            (obs, info)
+        """
+        if seed is None:
+            seed = self.seed_rng.randrange(1 << 32)
+        self.game_state = GameState(seed, high_score_file=None, width=self.width,
+                                    height=self.height)
+        self.steps = 0
+        return self.observation(), self._info()
+
+    def step(self, action):
+        """
+        Thực hiện một hành động.
+
+        Returns:
+            (obs, reward, terminated, truncated, info)
+        """
+        game_state = self.game_state
+        score_before = game_state.score
+
+        if self.action_mode == ACTION_MODE_RAW:
+            self._step_raw(action)
+        else:
+            placement = self._placements.get(action)
+            if placement is None:
+                raise ValueError("Vị trí đặt không hợp lệ: %r (xem info['action_mask'])" % (action,))
+            apply_placement(game_state, *placement)
+            finish_line_clear(game_state)
+
+        self.steps += 1
+        reward = game_state.score - score_before
+        terminated = game_state.game_over
+        truncated = not terminated and self.max_steps is not None and self.steps >= self.max_steps
+        info = self._info()
+        if terminated or truncated:
+            info['episode'] = self.episode_stats()
+        return self.observation(), reward, terminated, truncated, info
+
+    def _step_raw(self, action):
+        """Một khung hình: áp dụng đầu vào (khi đang chơi) rồi cập nhật"""
+        game_state = self.game_state
+        if game_state.state == GameState.STATE_PLAYING and not game_state.game_over:
+            game_action = _RAW_TO_ACTION.get(action)
+            if game_action is not None:
+                apply_action(game_state, game_action)
+            elif not 0 <= action < RAW_ACTION_COUNT:
+                raise ValueError("Hành động không hợp lệ: %r" % (action,))
+        game_state.update(self.frame_time, action == RAW_SOFT_DROP)
+
+    def observation(self):
+        """
+        Quan sát hiện tại.
+
+        Returns:
+            dict: board (view không sao chép), piece [id, x, y, xoay],
+            hold (id, 0 = trống), queue (id các mảnh xem trước)
+        """
+        game_state = self.game_state
+        piece = game_state.current_piece
+        self._piece[0] = PIECE_IDS[piece.piece_type]
+        self._piece[1] = piece.x
+        self._piece[2] = piece.y
+        self._piece[3] = piece.rotation
+        queue = game_state.next_queue
+        for i in range(min(len(queue), len(self._queue))):
+            self._queue[i] = PIECE_IDS[queue[i]]
+        held = game_state.held_piece_type
+        return {
+            'board': game_state.grid.as_array(),
+            'piece': self._piece,
+            'hold': 0 if held is None else PIECE_IDS[held],
+            'queue': self._queue,
+        }
+
+    def action_mask(self):
+        """
+        Mặt nạ các hành động hợp lệ (kiểu placement: các vị trí tới được
+        của mảnh hiện tại và của mảnh lấy từ ô giữ).
+        """
+        if self.action_mode == ACTION_MODE_RAW:
+            self._mask[:] = True
+            return self._mask
+
+        game_state = self.game_state
+        self._mask[:] = False
+        self._placements = {}
+        if game_state.game_over:
+            return self._mask
+
+        rows = board_rows(game_state.grid)
+        options = [(game_state.current_piece.piece_type, 0)]
+        if game_state.can_hold:
+            options.append((game_state.held_piece_type or game_state.next_piece_type, 1))
+        for piece_type, use_hold in options:
+            for rotation, x, y, cells, px in enumerate_placements(
+                    rows, self.width, self.height, piece_type):
+                index = (use_hold * 4 + rotation) * self.width + px
+                self._mask[index] = True
+                self._placements[index] = (rotation, x, bool(use_hold))
+        return self._mask
+
+    def legal_actions(self):
+        """Danh sách chỉ số hành động hợp lệ"""
+        return list(np.flatnonzero(self.action_mask()))
+
+    def episode_stats(self):
+        """Thống kê của ván hiện tại"""
+        game_state = self.game_state
+        return {
+            'score': game_state.score,
+            'lines': game_state.lines_cleared,
+            'level': game_state.level,
+            'length': self.steps,
+            'seed': game_state.seed,
+        }
+
+    def _info(self):
+        return {'action_mask': self.action_mask()}
+
+
+class VectorTetrisEnv:
+    """
+    N môi trường chạy cùng nhau, tự reset ván đã kết thúc.
+
+    step(actions) nhận một hành động cho mỗi môi trường. Khi một ván kết
+    thúc, môi trường đó được reset ngay; quan sát trả về là của ván mới,
+    còn thống kê ván cũ nằm trong infos[i]['episode'].
+
+    Quan sát là danh sách N dict như của TetrisEnv (mỗi bảng một view không
+    sao chép, vì mỗi Board có vị trí bộ đệm vòng riêng); dùng stacked_boards()
+    để lấy một mảng (N, height, width) được ghi vào bộ đệm tạo sẵn.
+    """
+
+    def __init__(self, num_envs, action_mode=ACTION_MODE_PLACEMENT, seed=None, **options):
+        seeds = random.Random(seed).sample(range(1 << 32), num_envs)
+        self.envs = [TetrisEnv(action_mode, seed=s, **options) for s in seeds]
+        self.num_envs = num_envs
+        self.action_count = self.envs[0].action_count
+        self._boards = np.zeros((num_envs, self.envs[0].height, self.envs[0].width), dtype=np.uint8)
+
+    def reset(self, seed=None):
+        """
+        Reset mọi môi trường.
+
+        Returns:
+            (danh sách obs, danh sách info)
+        """
+        seeds = random.Random(seed).sample(range(1 << 32), self.num_envs) if seed is not None \
+            else [None] * self.num_envs
+        results = [env.reset(s) for env, s in zip(self.envs, seeds)]
+        return [obs for obs, _ in results], [info for _, info in results]
+
+    def step(self, actions):
+        """
+        Returns:
+            (danh sách obs, mảng reward, mảng terminated, mảng truncated, danh sách info)
+        """
+        observations = []
+        rewards = np.zeros(self.num_envs, dtype=np.int64)
+        terminated = np.zeros(self.num_envs, dtype=bool)
+        truncated = np.zeros(self.num_envs, dtype=bool)
+        infos = []
+        for i, (env, action) in enumerate(zip(self.envs, actions)):
+            obs, rewards[i], terminated[i], truncated[i], info = env.step(action)
+            if terminated[i] or truncated[i]:
+                episode = info['episode']
+                obs, info = env.reset()
+                info['episode'] = episode
+            observations.append(obs)
+            infos.append(info)
+        return observations, rewards, terminated, truncated, infos
+
+    def action_masks(self):
+        """Mảng (N, action_count) các mặt nạ hành động hiện tại"""
+        return np.stack([env._mask for env in self.envs])
+
+    def stacked_boards(self):
+        """Ghi mọi bảng vào một mảng (N, height, width) tạo sẵn (được dùng lại)"""
+        for i, env in enumerate(self.envs):
+            self._boards[i] = env.game_state.grid.as_array()
+        return self._boards
+
+
+def benchmark(action_mode, steps, seed=0):
+    """
+    Đo số bước mỗi giây trên một lõi với hành động ngẫu nhiên hợp lệ.
+
+    Returns:
+        (số bước mỗi giây, số ván đã kết thúc)
+    """
+    env = TetrisEnv(action_mode, seed=seed)
+    rng = random.Random(seed)
+    _, info = env.reset()
+    episodes = 0
+    started = time.perf_counter()
+    for _ in range(steps):
+        if action_mode == ACTION_MODE_RAW:
+            action = rng.randrange(RAW_ACTION_COUNT)
+        else:
+            action = rng.choice(np.flatnonzero(info['action_mask']))
+        _, _, terminated, truncated, info = env.step(action)
+        if terminated or truncated:
+            episodes += 1
+            env.reset()
+    elapsed = time.perf_counter() - started
+    return steps / elapsed, episodes
+
+
+def main(argv=None):
+    """Điểm khởi đầu dòng lệnh: đo tốc độ môi trường"""
+    parser = argparse.ArgumentParser(description="Đo tốc độ môi trường Tetris")
+    parser.add_argument('--steps', type=int, default=20000)
+    args = parser.parse_args(argv)
+    for action_mode in (ACTION_MODE_RAW, ACTION_MODE_PLACEMENT):
+        rate, episodes = benchmark(action_mode, args.steps)
+        print("%-10s %10.0f bước/giây/lõi (%d ván)" % (action_mode, rate, episodes))
+
+
+if __name__ == "__main__":
+    main(sys.argv[1:])
@@ -0,0 +1,236 @@
+"""
+Phân tích Finesse (Số Phím Tối thiểu)
+
+Finesse: đặt mỗi mảnh bằng ít lần nhấn phím nhất. Module này:
+
+1. Tính trước, một lần cho mỗi độ rộng bảng, bảng tra số phím tối thiểu để
+   đưa mỗi loại mảnh từ chỗ xuất hiện tới mọi vị trí (trạng thái xoay, cột)
+   trên mặt bằng trống, bằng BFS dùng đúng luật xoay/wall kick của GameState.
+   Các phím: trái, phải, xoay phải, xoay trái (mỗi lần nhấn 1 phím), và giữ
+   trái/phải tới tường (DAS: cũng chỉ 1 lần nhấn, các bước lặp không tính).
+   Vị trí được so theo hình chiếm chỗ (các ô), nên hai trạng thái xoay cho
+   cùng hình (mảnh O, hoặc S/Z/I dựng đứng) được coi là một vị trí.
+
+2. Quét replay: với mỗi mảnh được thả nhanh, đếm số lần nhấn phím người chơi
+   đã dùng (không tính ACTION_*_REPEAT, ô giữ và phím thả) và so với bảng tra.
+   Mảnh có dùng rơi chậm hoặc khóa do trọng lực (có thể là tuck/spin) không
+   được chấm.
+
+Nhiều replay được quét song song trên một nhóm tiến trình; mỗi mảnh chỉ tốn
+một lần tra bảng, không tìm kiếm lại.
+
+Cách dùng:
+    python src/finesse.py replays/ --workers 8
+    python src/finesse.py games.trpa
+"""
+
+import argparse
+import os
+import sys
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from config import *
+from game import GameState
+from tetromino import Tetromino, TetrominoType
+from replay import (Replay, ACTION_LEFT, ACTION_RIGHT, ACTION_ROTATE_CW, ACTION_ROTATE_CCW,
+                    ACTION_HARD_DROP, ACTION_HOLD, apply_action)
+
+# Phím của bảng tra (tên dùng khi in chuỗi phím)
+INPUT_LEFT = 'L'
+INPUT_RIGHT = 'R'
+INPUT_CW = 'CW'
+INPUT_CCW = 'CCW'
+INPUT_DAS_LEFT = 'DL'     # Giữ trái tới tường
+INPUT_DAS_RIGHT = 'DR'    # Giữ phải tới tường
+
+# Hành động trong replay được tính là một lần nhấn phím di chuyển/xoay
+COUNTED_ACTIONS = (ACTION_LEFT, ACTION_RIGHT, ACTION_ROTATE_CW, ACTION_ROTATE_CCW)
+
+_table_cache = {}
+
+
+def placement_key(piece):
+    """
+    Khóa vị trí của mảnh: loại + các ô (cột tuyệt đối, hàng tương đối).
+
+    Hàng được tính từ hàng trên cùng của mảnh vì mảnh sẽ được thả thẳng xuống.
+    """
+    blocks = piece.get_blocks()
+    top = min(y for _, y in blocks)
+    return piece.piece_type, tuple(sorted((x, y - top) for x, y in blocks))
+
+
+def _apply_input(game_state, name):
+    if name == INPUT_LEFT:
+        game_state.move_left()
+    elif name == INPUT_RIGHT:
+        game_state.move_right()
+    elif name == INPUT_CW:
+        game_state.rotate_clockwise()
+    elif name == INPUT_CCW:
+        game_state.rotate_counterclockwise()
+    else:
+        move = game_state.move_left if name == INPUT_DAS_LEFT else game_state.move_right
+        while True:
+            x = game_state.current_piece.x
+            move()
+            if game_state.current_piece.x == x:
+                break
+
+
+def build_table(width=GRID_WIDTH, height=GRID_HEIGHT):
+    """
+    BFS trên mặt bằng trống cho mọi loại mảnh.
+
+    Returns:
+        dict placement_key -> tuple các phím (ngắn nhất)
+    """
+    game_state = GameState(0, high_score_file=None, width=width, height=height)
+    inputs = (INPUT_LEFT, INPUT_RIGHT, INPUT_CW, INPUT_CCW, INPUT_DAS_LEFT, INPUT_DAS_RIGHT)
+    table = {}
+    for piece_type in TetrominoType.all_types():
+        start = Tetromino(piece_type, width)
+        seen = {(start.rotation, start.x, start.y)}
+        frontier = deque([(start, ())])
+        while frontier:
+            piece, path = frontier.popleft()
+            key = placement_key(piece)
+            if key not in table:
+                table[key] = path
+            for name in inputs:
+                game_state.current_piece = piece.copy()
+                _apply_input(game_state, name)
+                moved = game_state.current_piece
+                state = (moved.rotation, moved.x, moved.y)
+                if state not in seen:
+                    seen.add(state)
+                    frontier.append((moved, path + (name,)))
+    return table
+
+
+def finesse_table(width=GRID_WIDTH, height=GRID_HEIGHT):
+    """Bảng tra (được tính một lần cho mỗi kích thước bảng)"""
+    key = (width, height)
+    table = _table_cache.get(key)
+    if table is None:
+        table = _table_cache[key] = build_table(width, height)
+    return table
+
+
+def analyze_replay(replay):
+    """
+    Chấm finesse từng mảnh của một replay.
+
+    Returns:
+        dict gồm seed, pieces (số mảnh đã khóa), judged, faults, extra_inputs
+        (tổng số phím thừa) và worst: danh sách (số thứ tự mảnh, loại, đã dùng, tối thiểu, chuỗi tối ưu)
+    """
+    game_state = GameState(replay.seed, high_score_file=None)
+    table = finesse_table(game_state.width, game_state.height)
+    bag = game_state.bag_randomizer
+    # Mảnh mới được nhận ra qua số mảnh đã lấy khỏi túi (xoay cũng thay
+    # đối tượng current_piece nên không so được bằng `is`)
+    drawn = bag.drawn
+    used = 0
+    soft = False
+    pieces = judged = faults = extra = 0
+    worst = []
+
+    for dt_ms, soft_drop, actions in replay.frames:
+        for action in actions:
+            if action == ACTION_HARD_DROP and not soft:
+                optimal = table.get(placement_key(game_state.current_piece))
+                if optimal is not None:
+                    judged += 1
+                    if used > len(optimal):
+                        faults += 1
+                        extra += used - len(optimal)
+                        worst.append((pieces, game_state.current_piece.piece_type,
+                                      used, len(optimal), ' '.join(optimal)))
+            elif action in COUNTED_ACTIONS:
+                used += 1
+            apply_action(game_state, action)
+            if action == ACTION_HOLD or bag.drawn != drawn:
+                # Mảnh mới (sau khi khóa hoặc giữ)
+                if action != ACTION_HOLD:
+                    pieces += 1
+                drawn = bag.drawn
+                used = 0
+                soft = False
+        game_state.update(dt_ms / 1000.0, soft_drop)
+        if bag.drawn != drawn:
+            pieces += 1
+            drawn = bag.drawn
+            used = 0
+            soft = False
+        elif soft_drop:
+            soft = True
+
+    worst.sort(key=lambda fault: fault[3] - fault[2])
+    return {'seed': replay.seed, 'pieces': pieces, 'judged': judged, 'faults': faults,
+            'extra_inputs': extra, 'worst': worst[:FINESSE_WORST]}
+
+
+def _analyze_path(source):
+    """Chạy trong tiến trình con: source là đường dẫn .json hoặc (kho, chỉ số)"""
+    if isinstance(source, tuple):
+        from replay_archive import ReplayArchive
+        path, index = source
+        replay = ReplayArchive(path).load_replay(index)
+        name = '%s#%d' % (os.path.basename(path), index)
+    else:
+        replay = Replay.load(source)
+        name = os.path.basename(source)
+    result = analyze_replay(replay)
+    result['name'] = name
+    return result
+
+
+def list_sources(path):
+    """Các replay cần quét: file .json, thư mục .json, hoặc kho replay"""
+    if os.path.isdir(path):
+        return [os.path.join(path, name) for name in sorted(os.listdir(path))
+                if name.endswith('.json')]
+    if path.endswith('.json'):
+        return [path]
+    from replay_archive import ReplayArchive
+    return [(path, index) for index in range(len(ReplayArchive(path)))]
+
+
+def analyze_many(sources, workers=None):
+    """
+    Quét nhiều replay song song.
+
+    Yields:
+        Kết quả của analyze_replay (kèm 'name'), theo thứ tự sources
+    """
+    chunksize = max(1, len(sources) // (4 * (workers or os.cpu_count() or 1)))
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        yield from pool.map(_analyze_path, sources, chunksize=chunksize)
+
+
+def main(argv=None):
+    """Điểm khởi đầu dòng lệnh"""
+    parser = argparse.ArgumentParser(description="Phân tích finesse của replay")
+    parser.add_argument('path', help="File/thư mục replay .json hoặc kho replay")
+    parser.add_argument('--workers', type=int, default=None, help="Số tiến trình")
+    args = parser.parse_args(argv)
+
+    totals = [0, 0, 0]
+    for result in analyze_many(list_sources(args.path), args.workers):
+        totals[0] += result['judged']
+        totals[1] += result['faults']
+        totals[2] += result['extra_inputs']
+        print("%-32s %5d mảnh, %5d được chấm, %4d lỗi, %4d phím thừa"
+              % (result['name'], result['pieces'], result['judged'],
+                 result['faults'], result['extra_inputs']))
+        for index, piece_type, used, optimal, sequence in result['worst']:
+            print("    mảnh %d (%s): %d phím, tối thiểu %d: %s"
+                  % (index, piece_type, used, optimal, sequence))
+    if totals[0]:
+        print("Tổng: %d lỗi / %d mảnh (%.1f%%), %d phím thừa"
+              % (totals[1], totals[0], 100.0 * totals[1] / totals[0], totals[2]))
+
+
+if __name__ == "__main__":
+    main(sys.argv[1:])
@@ -12,9 +12,15 @@ File này chứa logic game chính bao gồm:
 
 import pygame
 import os
+import random
+from collections import deque
 from config import *
 from config import get_gravity_speed
-from tetromino import Tetromino, BagRandomizer
+from tetromino import Tetromino, BagRandomizer, CELL_EMPTY, CELL_GARBAGE
+from board import Board
+from zobrist import get_zobrist_keys
+from telemetry import *
+from scheduler import Scheduler, EVENT_GRAVITY, EVENT_LOCK, EVENT_ANIMATION_END
 
 
 class GameState:
@@ -33,18 +39,51 @@ class GameState:
     # Các trạng thái game cho hoạt ảnh
     STATE_PLAYING = 0
     STATE_LINE_CLEAR_ANIMATION = 1
+
+    # Các loại mục trong nhật ký dịch hàng (row_shifts)
+    SHIFT_CLEAR = 0      # Dữ liệu: tuple chỉ số các hàng đã xóa
+    SHIFT_GARBAGE = 1    # Dữ liệu: cột lỗ của hàng rác vừa đẩy lên từ đáy
     
-    def __init__(self):
-        """Khởi tạo game mới"""
-        # Tạo lưới (danh sách 2D các màu, None nghĩa là ô trống)
-        self.grid = [[None for _ in range(GRID_WIDTH)] for _ in range(GRID_HEIGHT)]
+    def __init__(self, seed=None, high_score_file=HIGHSCORE_FILE,
+                 width=GRID_WIDTH, height=GRID_HEIGHT, preview_count=PREVIEW_COUNT,
+                 track_zobrist=False):
+        """
+        Khởi tạo game mới.
+
+        Args:
+            seed: Seed cho chuỗi mảnh (None = ngẫu nhiên). Cùng seed và cùng
+                  đầu vào luôn cho cùng kết quả, nên replay chỉ cần lưu seed + đầu vào.
+            high_score_file: File lưu điểm cao, hoặc None để không đọc/ghi file
+                             (dùng cho game chạy ngầm như replay, bot)
+            width, height: Kích thước bảng (mặc định 10x20; các biến thể có thể
+                           dùng bảng rộng tới 64 cột hoặc cao hàng nghìn hàng)
+            preview_count: Số mảnh trong hàng đợi xem trước (1-16)
+            track_zobrist: Lưới giữ băm Zobrist cập nhật dần ở mỗi lần ghi (cho
+                           người đọc zobrist_hash mỗi bước, như bảng chuyển vị).
+                           Tắt thì băm chỉ được tính khi đọc, và xóa hàng / thêm
+                           rác không tốn thêm gì
+        """
+        self.high_score_file = high_score_file
+        self.width = width
+        self.height = height
+
+        # Tạo lưới (bộ đệm vòng các id ô, 0 nghĩa là ô trống; xem board.py).
+        # Khi track_zobrist, lưới tự giữ băm Zobrist của nội dung (khóa theo
+        # hàng vật lý của vòng)
+        self.zobrist = get_zobrist_keys(width, height)
+        self.track_zobrist = track_zobrist
+        self.grid = Board(width, height, self.zobrist if track_zobrist else None)
         
         # Khởi tạo bộ tạo mảnh ngẫu nhiên (hệ thống túi 7 mảnh)
-        self.bag_randomizer = BagRandomizer()
+        self.bag_randomizer = BagRandomizer(seed)
+        self.seed = self.bag_randomizer.seed
         
-        # Tạo mảnh đầu tiên và xem trước mảnh tiếp theo
-        self.current_piece = Tetromino(self.bag_randomizer.next())
-        self.next_piece_type = self.bag_randomizer.peek()
+        # Tạo mảnh đầu tiên và hàng đợi xem trước các mảnh tiếp theo
+        # (next_piece_type luôn là phần tử đầu của next_queue)
+        self.preview_count = preview_count
+        self.current_piece = Tetromino(self.bag_randomizer.next(), width)
+        self.next_queue = self.bag_randomizer.preview(preview_count)
+        self.next_piece_type = self.next_queue[0]
         
         # Hệ thống giữ mảnh
         self.held_piece_type = None
@@ -74,6 +113,28 @@ class GameState:
         self.line_clear_timer = 0.0
         self.lines_being_cleared = []  # Danh sách chỉ số hàng đang được xóa
 
+        # Nhật ký các lần dịch hàng gần nhất (SHIFT_*, dữ liệu), để người xem
+        # (stream.py) biết chính xác hàng nào đã dịch thay vì đoán từ nội dung lưới
+        self.row_shifts = deque(maxlen=ROW_SHIFT_LOG_SIZE)
+        self.row_shift_count = 0       # Tổng số mục đã ghi (kể cả mục đã rơi khỏi nhật ký)
+
+        # Bộ sinh số cho vị trí lỗ của hàng rác (tất định theo seed)
+        self.garbage_rng = random.Random(self.seed)
+
+        # Telemetry (None = tắt); giữ nguyên qua reset(), và game mới cũng báo mảnh đầu tiên
+        self.attach_telemetry(getattr(self, 'telemetry', None))
+
+    def attach_telemetry(self, telemetry):
+        """
+        Gắn luồng telemetry (hoặc None để tắt).
+
+        Mảnh đầu tiên được tạo trong __init__, trước khi có telemetry, nên sự
+        kiện piece_spawn của nó được phát ở đây.
+        """
+        self.telemetry = telemetry
+        if telemetry is not None and not self.game_over:
+            telemetry.emit(EVENT_PIECE_SPAWN, self.current_piece.piece_type)
+
     def update(self, delta_time, soft_drop):
         """
         Cập nhật trạng thái game mỗi khung hình.
@@ -138,6 +199,51 @@ class GameState:
                 self.lock_reset_count += 1
             # Nếu đạt số lần reset tối đa, không reset bộ đếm (mảnh sẽ khóa sớm)
 
+    def schedule_timers(self, scheduler, soft_drop):
+        """
+        Đặt thời hạn các sự kiện hẹn giờ (trọng lực, khóa, hết hoạt ảnh)
+        tính từ scheduler.now, theo giá trị hiện tại của các bộ đếm.
+        """
+        scheduler.clear()
+        now = scheduler.now
+        if self.state == self.STATE_LINE_CLEAR_ANIMATION:
+            scheduler.schedule(EVENT_ANIMATION_END, now + LINE_CLEAR_ANIMATION - self.line_clear_timer)
+            return
+        fall_speed = FAST_DROP_SPEED if soft_drop else get_gravity_speed(self.level)
+        scheduler.schedule(EVENT_GRAVITY, now + fall_speed - self.fall_timer)
+        if self.check_collision(0, 1):
+            if self.lock_reset_count >= self.max_lock_resets:
+                scheduler.schedule(EVENT_LOCK, now)
+            else:
+                scheduler.schedule(EVENT_LOCK, now + LOCK_DELAY - self.lock_timer)
+
+    def advance(self, duration, soft_drop=False):
+        """
+        Tua nhanh `duration` giây không có đầu vào (game chạy ngầm).
+
+        Thay vì cập nhật mỗi khung, chỉ cập nhật một lần cho mỗi sự kiện hẹn
+        giờ: nhảy thẳng tới thời hạn sớm nhất trong bộ lập lịch. Kết quả là
+        mô phỏng thời gian liên tục (sự kiện xảy ra đúng thời hạn, không
+        làm tròn lên khung kế tiếp như khi chơi trực tiếp).
+
+        Returns:
+            Số lần gọi update
+        """
+        scheduler = Scheduler()
+        updates = 0
+        while scheduler.now < duration and not self.game_over:
+            self.schedule_timers(scheduler, soft_drop)
+            # Cộng thêm một chút để bộ đếm chắc chắn đạt ngưỡng dù có sai số làm tròn
+            due = min(max(scheduler.next_due(), scheduler.now) + TIMER_EPSILON, duration)
+            self.update(due - scheduler.now, soft_drop)
+            scheduler.now = due
+            updates += 1
+        return updates
+
+    def accepts_input(self):
+        """True nếu mảnh hiện tại nhận hành động (chưa game over, không trong hoạt ảnh xóa hàng)"""
+        return not self.game_over and self.state == GameState.STATE_PLAYING
+
     def move_left(self):
         """Thử di chuyển mảnh hiện tại sang trái"""
         if not self.check_collision(-1, 0):
@@ -225,11 +331,16 @@ class GameState:
 
         if self.held_piece_type is not None:
             # Hoán đổi với mảnh đã giữ
-            self.current_piece = Tetromino(self.held_piece_type)
+            self.current_piece = Tetromino(self.held_piece_type, self.width)
             self.held_piece_type = current_type
+            if self.telemetry is not None:
+                self.telemetry.emit(EVENT_HOLD, current_type, self.current_piece.piece_type)
+                self.telemetry.emit(EVENT_PIECE_SPAWN, self.current_piece.piece_type)
         else:
             # Giữ mảnh hiện tại và tạo mảnh tiếp theo
             self.held_piece_type = current_type
+            if self.telemetry is not None:
+                self.telemetry.emit(EVENT_HOLD, current_type, None)
             self.spawn_next_piece()
 
         self.can_hold = False
@@ -252,11 +363,11 @@ class GameState:
             new_y = y + dy
             
             # Kiểm tra ranh giới
-            if new_x < 0 or new_x >= GRID_WIDTH or new_y >= GRID_HEIGHT:
+            if new_x < 0 or new_x >= self.width or new_y >= self.height:
                 return True
             
             # Kiểm tra va chạm với các khối đã khóa (bỏ qua các khối phía trên lưới)
-            if new_y >= 0 and self.grid[new_y][new_x] is not None:
+            if new_y >= 0 and self.grid.get(new_x, new_y):
                 return True
         
         return False
@@ -277,11 +388,11 @@ class GameState:
         
         for x, y in blocks:
             # Kiểm tra ranh giới
-            if x < 0 or x >= GRID_WIDTH or y >= GRID_HEIGHT:
+            if x < 0 or x >= self.width or y >= self.height:
                 return True
             
             # Kiểm tra va chạm với các khối đã khóa
-            if y >= 0 and self.grid[y][x] is not None:
+            if y >= 0 and self.grid.get(x, y):
                 return True
         
         return False
@@ -322,15 +433,19 @@ class GameState:
         4. Kiểm tra kết thúc game
         """
         blocks = self.current_piece.get_blocks()
-        color = self.current_piece.get_color()
+        cell_id = self.current_piece.get_id()
+
+        if self.telemetry is not None:
+            piece = self.current_piece
+            self.telemetry.emit(EVENT_PIECE_LOCK, piece.piece_type, piece.x, piece.y, piece.rotation)
 
         # Thêm các khối mảnh vào lưới
         for x, y in blocks:
-            if 0 <= y < GRID_HEIGHT and 0 <= x < GRID_WIDTH:
-                self.grid[y][x] = color
+            if 0 <= y < self.height and 0 <= x < self.width:
+                self.grid.set(x, y, cell_id)
 
-        # Kiểm tra các hàng hoàn thành
-        self.check_line_clears()
+        # Kiểm tra các hàng hoàn thành (chỉ những hàng mảnh vừa chiếm)
+        self.check_line_clears(set(y for _, y in blocks))
         
         # Reset combo nếu không có hàng nào được xóa
         if not self.lines_being_cleared:
@@ -352,30 +467,41 @@ class GameState:
         Kiểm tra xem nó có thể tạo không (nếu không, kết thúc game).
         """
         next_type = self.bag_randomizer.next()
-        self.current_piece = Tetromino(next_type)
-        self.next_piece_type = self.bag_randomizer.peek()
+        self.current_piece = Tetromino(next_type, self.width)
+        self.next_queue = self.bag_randomizer.preview(self.preview_count)
+        self.next_piece_type = self.next_queue[0]
         self.fall_timer = 0.0
 
+        if self.telemetry is not None:
+            self.telemetry.emit(EVENT_PIECE_SPAWN, next_type)
+
         # Kiểm tra kết thúc game (mảnh không thể tạo)
         if self.check_collision_piece(self.current_piece):
             self.game_over = True
+            if self.telemetry is not None:
+                self.telemetry.emit(EVENT_GAME_OVER, self.score, self.lines_cleared, self.level)
             # Cập nhật điểm cao nếu cần
             if self.score > self.high_score:
                 self.high_score = self.score
                 self.save_high_score(self.high_score)
 
-    def check_line_clears(self):
+    def check_line_clears(self, rows=None):
         """
         Kiểm tra các hàng hoàn thành và bắt đầu hoạt ảnh xóa.
         
         Một hàng hoàn thành khi tất cả các khối trong hàng đều được lấp đầy.
+
+        Args:
+            rows: Các hàng cần kiểm tra (None = toàn bộ bảng)
         """
         lines_to_clear = []
 
-        # Kiểm tra từng hàng
-        for y in range(GRID_HEIGHT):
-            # Kiểm tra xem tất cả các khối trong hàng có được lấp đầy không
-            if all(self.grid[y][x] is not None for x in range(GRID_WIDTH)):
+        if rows is None:
+            rows = range(self.height)
+
+        # Kiểm tra từng hàng (bảng đếm sẵn số ô đầy nên mỗi hàng là O(1))
+        for y in sorted(rows):
+            if 0 <= y < self.height and self.grid.is_full(y):
                 lines_to_clear.append(y)
 
         # Nếu tìm thấy hàng, bắt đầu hoạt ảnh
@@ -395,13 +521,9 @@ class GameState:
 
         num_lines = len(self.lines_being_cleared)
 
-        # Xóa các hàng đã được xóa (bắt đầu từ dưới để tránh vấn đề chỉ số)
-        for y in sorted(self.lines_being_cleared, reverse=True):
-            del self.grid[y]
-
-        # Thêm các hàng trống mới ở trên cùng
-        for _ in range(num_lines):
-            self.grid.insert(0, [None for _ in range(GRID_WIDTH)])
+        # Xóa các hàng (bảng dùng bộ đệm vòng nên không phải dịch toàn bộ lưới)
+        self.grid.remove_rows(self.lines_being_cleared)
+        self.log_row_shift(self.SHIFT_CLEAR, tuple(self.lines_being_cleared))
 
         # Cập nhật điểm dựa trên số hàng đã xóa
         score_table = {
@@ -423,16 +545,78 @@ class GameState:
         self.lines_cleared += num_lines
 
         # Cập nhật cấp độ (mỗi 10 hàng tăng cấp độ)
+        old_level = self.level
         self.level = (self.lines_cleared // 10) + 1
 
+        if self.telemetry is not None:
+            self.telemetry.emit(EVENT_LINE_CLEAR, num_lines, self.combo_count, self.score)
+            if self.level != old_level:
+                self.telemetry.emit(EVENT_LEVEL_UP, self.level)
+
         # Cập nhật và lưu điểm cao ngay lập tức (ngăn mất dữ liệu khi thoát)
         if self.score > self.high_score:
             self.high_score = self.score
             self.save_high_score(self.high_score)
 
+    def add_garbage(self, count, hole_x=None):
+        """
+        Đẩy các hàng rác (đầy trừ một lỗ) lên từ đáy bảng.
+
+        Mỗi hàng là O(width) nhờ bộ đệm vòng, kể cả cập nhật băm Zobrist khi
+        track_zobrist (chỉ hàng vật lý được ghi và khóa offset thay đổi). Nếu
+        khối bị đẩy ra khỏi đỉnh bảng thì game kết thúc.
+
+        Args:
+            count: Số hàng rác
+            hole_x: Cột của lỗ (None = ngẫu nhiên theo seed cho mỗi hàng)
+        """
+        for _ in range(count):
+            x_hole = hole_x if hole_x is not None else self.garbage_rng.randrange(self.width)
+            row = bytearray([CELL_GARBAGE]) * self.width
+            row[x_hole] = CELL_EMPTY
+            if self.grid.push_bottom(row):
+                self.game_over = True
+            self.log_row_shift(self.SHIFT_GARBAGE, x_hole)
+
+        # Mảnh hiện tại bị đẩy lên theo nếu nó chồng lên rác
+        while self.check_collision_piece(self.current_piece) and self.current_piece.y > -4:
+            self.current_piece.y -= 1
+
+    def log_row_shift(self, kind, data):
+        """Ghi một lần dịch hàng vào nhật ký row_shifts"""
+        self.row_shifts.append((kind, data))
+        self.row_shift_count += 1
+
+    @property
+    def zobrist_hash(self):
+        """
+        Băm Zobrist của (lưới, mảnh hiện tại, mảnh giữ, hàng đợi).
+
+        Phần lưới lấy từ băm lưới giữ dần nếu track_zobrist, nếu không thì tính
+        lại cả lưới (O(width * height)); phần mảnh luôn được tính khi đọc
+        (vài phép tra), nên không bao giờ cũ dù mảnh bị sửa từ bên ngoài.
+        """
+        if self.grid.zobrist is not None:
+            grid_hash = self.grid.zobrist_hash
+        else:
+            grid_hash = self.zobrist.board_hash(self.grid)
+        return grid_hash ^ self.pieces_hash()
+
+    def pieces_hash(self):
+        """Phần băm của mảnh hiện tại, mảnh giữ và hàng đợi"""
+        return (self.zobrist.current[self.current_piece.piece_type]
+                ^ self.zobrist.hold[self.held_piece_type]
+                ^ self.zobrist.queue_hash(self.next_queue))
+
+    def compute_zobrist_hash(self):
+        """Băm Zobrist tính lại từ đầu (dùng để kiểm tra băm lưới giữ dần)"""
+        return self.zobrist.board_hash(self.grid) ^ self.pieces_hash()
+
     def reset(self):
-        """Reset game về trạng thái ban đầu (khởi động lại)"""
-        self.__init__()
+        """Reset game về trạng thái ban đầu (khởi động lại) với seed mới"""
+        self.__init__(high_score_file=self.high_score_file, width=self.width,
+                      height=self.height, preview_count=self.preview_count,
+                      track_zobrist=self.track_zobrist)
 
     def load_high_score(self):
         """
@@ -441,9 +625,11 @@ class GameState:
         Returns:
             Điểm cao đã lưu, hoặc 0 nếu file không tồn tại
         """
+        if self.high_score_file is None:
+            return 0
         try:
-            if os.path.exists(HIGHSCORE_FILE):
-                with open(HIGHSCORE_FILE, 'r') as f:
+            if os.path.exists(self.high_score_file):
+                with open(self.high_score_file, 'r') as f:
                     return int(f.read().strip())
         except:
             pass
@@ -456,8 +642,10 @@ class GameState:
         Args:
             score: Điểm số cần lưu
         """
+        if self.high_score_file is None:
+            return
         try:
-            with open(HIGHSCORE_FILE, 'w') as f:
+            with open(self.high_score_file, 'w') as f:
                 f.write(str(score))
         except:
             pass
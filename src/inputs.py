@@ -0,0 +1,177 @@
+"""
+Đầu vào Có Dấu thời gian (Chính xác Dưới Mức Khung hình)
+
+Trước đây mỗi khung lấy hết sự kiện một lần rồi áp dụng tất cả ở đầu khung:
+ở 60 FPS, một phím có thể được áp dụng trễ tới ~16 ms so với lúc nhấn, và
+các lần lặp ARR bị làm tròn theo khung.
+
+Ở đây, trong thời gian rảnh giữa hai khung (thay cho lần ngủ của
+clock.tick), InputPoller lấy sự kiện với tần số INPUT_POLL_RATE lần mỗi giây
+và đóng dấu thời gian lúc đến (mili giây của pygame.time.get_ticks, cùng
+đồng hồ với delta time của khung). Vòng lặp game chia khung tại dấu thời
+gian của từng phím: mô phỏng tới đúng thời điểm đó, áp dụng phím, rồi mô
+phỏng tiếp. Mỗi đoạn là một khung trong replay, nên replay vẫn phát lại
+chính xác.
+
+Hàng đợi sự kiện của SDL chỉ được bơm trên luồng đã tạo cửa sổ, nên việc
+lấy sự kiện tần số cao chạy trên luồng chính, trong lúc chờ khung kế tiếp,
+không phải trên một luồng riêng.
+
+LatencyMeter đo độ trễ từ lúc sự kiện đến tới lúc nó được áp dụng vào mô
+phỏng (thời gian thực) trên các mẫu gần nhất.
+
+Đo (không cần cửa sổ):  python src/inputs.py
+"""
+
+import sys
+import threading
+import time
+import random
+from collections import deque
+import pygame
+from config import *
+
+
+class LatencyMeter:
+    """
+    Độ trễ của INPUT_LATENCY_SAMPLES mẫu gần nhất.
+
+    Thuộc tính:
+        count: Tổng số mẫu đã ghi
+    """
+
+    def __init__(self, size=INPUT_LATENCY_SAMPLES):
+        self.samples = deque(maxlen=size)
+        self.count = 0
+
+    def add(self, seconds):
+        self.samples.append(seconds)
+        self.count += 1
+
+    def summary(self):
+        """dict gồm count, mean, p50, p99, max (mili giây) trên các mẫu gần nhất"""
+        if not self.samples:
+            return {'count': self.count, 'mean': 0.0, 'p50': 0.0, 'p99': 0.0, 'max': 0.0}
+        ordered = sorted(self.samples)
+        n = len(ordered)
+        return {
+            'count': self.count,
+            'mean': 1000.0 * sum(ordered) / n,
+            'p50': 1000.0 * ordered[n // 2],
+            'p99': 1000.0 * ordered[min(n - 1, int(n * 0.99))],
+            'max': 1000.0 * ordered[-1],
+        }
+
+
+class InputPoller:
+    """
+    Lấy sự kiện pygame kèm dấu thời gian và giới hạn tốc độ khung hình.
+
+    Thuộc tính:
+        rate: Số lần lấy sự kiện mỗi giây khi chờ (0 = chỉ lấy ở đầu khung, như trước)
+        pending: Danh sách (mili giây, giây perf_counter, sự kiện) chưa được lấy ra
+    """
+
+    def __init__(self, rate=INPUT_POLL_RATE, fps=FPS):
+        self.rate = rate
+        self.fps = fps
+        self.frame_time = 1.0 / fps
+        self.pending = []
+        self.next_frame = time.perf_counter()
+        self.clock = pygame.time.Clock()
+
+    def poll(self):
+        """Lấy các sự kiện đang chờ và đóng dấu thời gian hiện tại"""
+        events = pygame.event.get()
+        if events:
+            ms = pygame.time.get_ticks()
+            arrived = time.perf_counter()
+            self.pending.extend((ms, arrived, event) for event in events)
+
+    def wait(self, timeout):
+        """
+        Ngủ cho tới khi có sự kiện (hoặc hết `timeout` mili giây), rồi lấy như poll().
+
+        Không ngủ nếu pending còn sự kiện chưa được lấy ra.
+        """
+        if self.pending:
+            return
+        event = pygame.event.wait(timeout)
+        if event.type != pygame.NOEVENT:
+            self.pending.append((pygame.time.get_ticks(), time.perf_counter(), event))
+        self.poll()
+
+    def drain(self):
+        """Lấy ra mọi sự kiện đã đến (theo thứ tự đến)"""
+        self.poll()
+        events = self.pending
+        self.pending = []
+        return events
+
+    def wait_frame(self):
+        """Chờ tới đầu khung kế tiếp, lấy sự kiện trong lúc chờ"""
+        if not self.rate:
+            self.clock.tick(self.fps)
+            return
+        interval = 1.0 / self.rate
+        now = time.perf_counter()
+        # Khung bị trễ không cố bắt kịp (giống clock.tick)
+        self.next_frame = max(self.next_frame + self.frame_time, now)
+        while True:
+            self.poll()
+            remaining = self.next_frame - time.perf_counter()
+            if remaining <= 0:
+                break
+            time.sleep(min(interval, remaining))
+
+
+def benchmark(seconds=5.0, presses_per_second=20.0):
+    """
+    So sánh lấy sự kiện mỗi khung với lấy tần số cao.
+
+    Một luồng đẩy sự kiện vào hàng đợi của SDL ở các thời điểm ngẫu nhiên;
+    vòng lặp khung (60 FPS) lấy chúng ra. Đo độ trễ tới lúc được lấy ra
+    (thời gian thực), và sai số thời điểm trong mô phỏng: lấy mỗi khung thì
+    mọi sự kiện được áp dụng ở đầu khung, có dấu thời gian thì ở dấu của nó.
+    """
+    import os
+    os.environ.setdefault('SDL_VIDEODRIVER', 'dummy')
+    pygame.init()
+    pygame.display.set_mode((1, 1))
+
+    for label, rate in (('mỗi khung', 0), ('%d Hz' % INPUT_POLL_RATE, INPUT_POLL_RATE)):
+        poller = InputPoller(rate)
+        latency = LatencyMeter(1 << 20)
+        error = LatencyMeter(1 << 20)
+        stop = threading.Event()
+
+        def press():
+            rng = random.Random(0)
+            while not stop.wait(rng.expovariate(presses_per_second)):
+                pygame.event.post(pygame.event.Event(pygame.USEREVENT, sent=time.perf_counter(),
+                                                     ms=pygame.time.get_ticks()))
+
+        thread = threading.Thread(target=press, daemon=True)
+        thread.start()
+        end = time.perf_counter() + seconds
+        while time.perf_counter() < end:
+            frame_ms = pygame.time.get_ticks()
+            now = time.perf_counter()
+            for ms, arrived, event in poller.drain():
+                if event.type == pygame.USEREVENT:
+                    latency.add(now - event.sent)
+                    # Thời điểm trong mô phỏng: đầu khung (không dấu) hoặc dấu thời gian
+                    applied = frame_ms if not rate else ms
+                    error.add(max(0, applied - event.ms) / 1000.0)
+            poller.wait_frame()
+        stop.set()
+        thread.join()
+        lag, off = latency.summary(), error.summary()
+        print("%-10s %4d phím: tới mô phỏng trung bình %.1f ms (p99 %.1f); "
+              "sai số thời điểm trung bình %.1f ms (tối đa %.0f)"
+              % (label, lag['count'], lag['mean'], lag['p99'], off['mean'], off['max']))
+    pygame.quit()
+
+
+if __name__ == "__main__":
+    benchmark(float(sys.argv[1]) if len(sys.argv) > 1 else 5.0)
@@ -10,10 +10,18 @@ Bao gồm:
 """
 
 import pygame
+import math
+import os
 import sys
+import time
 from config import *
 from game import GameState
-from tetromino import TetrominoType
+from tetromino import TetrominoType, CELL_COLORS
+from replay import *
+from telemetry import Telemetry, JsonLinesSink, EVENT_FRAME_SPIKE
+from scheduler import Scheduler, EVENT_LEFT_REPEAT, EVENT_RIGHT_REPEAT, EVENT_REWIND_REPEAT
+from stats import GameStats
+from inputs import InputPoller, LatencyMeter
 
 
 class TetrisGame:
@@ -21,13 +29,20 @@ class TetrisGame:
     Class game chính xử lý vòng lặp game và rendering.
     """
     
-    def __init__(self):
-        """Khởi tạo pygame và tạo cửa sổ game"""
+    def __init__(self, screen=None):
+        """
+        Khởi tạo pygame và tạo cửa sổ game.
+
+        Args:
+            screen: Surface để vẽ lên thay cho cửa sổ (dùng cho render ngoài màn hình)
+        """
         pygame.init()
         
         # Tạo cửa sổ game
-        self.screen = pygame.display.set_mode((SCREEN_WIDTH, SCREEN_HEIGHT))
-        pygame.display.set_caption("Tetris")
+        if screen is None:
+            screen = pygame.display.set_mode((SCREEN_WIDTH, SCREEN_HEIGHT))
+            pygame.display.set_caption("Tetris")
+        self.screen = screen
         
         # Tạo đồng hồ để kiểm soát tốc độ khung hình
         self.clock = pygame.time.Clock()
@@ -41,15 +56,166 @@ class TetrisGame:
         # Tạo trạng thái game
         self.game_state = GameState()
         
-        # Hệ thống đầu vào DAS/ARR (Delayed Auto Shift / Auto Repeat Rate)
-        self.left_das_timer = 0.0      # Bộ đếm DAS cho phím trái
-        self.right_das_timer = 0.0     # Bộ đếm DAS cho phím phải
+        # Hệ thống đầu vào DAS/ARR (Delayed Auto Shift / Auto Repeat Rate):
+        # mỗi phím đang giữ có một thời hạn lặp trong bộ lập lịch (scheduler.py).
+        # Đồng hồ của nó chỉ chạy khi mảnh đang nhận đầu vào.
+        self.input_scheduler = Scheduler()
         self.left_key_held = False     # Phím trái có đang được giữ không?
         self.right_key_held = False    # Phím phải có đang được giữ không?
-        self.left_in_arr = False       # Phím trái có ở chế độ lặp lại tự động không?
-        self.right_in_arr = False      # Phím phải có ở chế độ lặp lại tự động không?
-        
-        self.last_frame_time = pygame.time.get_ticks() / 1000.0
+        self.left_charged = False      # ARR = 0: DAS trái đã nạp (mảnh luôn sát tường trái)
+        self.right_charged = False
+        self.soft_drop_held = False    # Phím xuống (theo thời điểm của sự kiện, không theo khung)
+        
+        # Đầu vào có dấu thời gian: lấy sự kiện tần số cao giữa hai khung (inputs.py)
+        # và đo độ trễ từ lúc phím đến tới lúc được áp dụng vào mô phỏng
+        self.input_poller = InputPoller()
+        self.input_latency = LatencyMeter()
+        
+        # Tạm dừng và chế độ chờ (không vẽ lại khi không có gì thay đổi)
+        self.paused = False
+        self.needs_redraw = True
+        self.running = False
+        
+        # Ghi replay (seed + đầu vào của mỗi khung); finished_frames: các khung của
+        # replay đã lưu khi game over (để ghi tiếp nếu người chơi tua lùi sau đó)
+        self.recorder = ReplayRecorder(self.game_state.seed)
+        self.finished_frames = None
+        
+        # Thống kê trực tiếp (PPS, APM, ...); stats_saved: đã lưu file cho game này chưa
+        self.stats = GameStats(self.game_state)
+        self.stats_saved = False
+        
+        # Chế độ luyện tập: bộ đệm tua lùi (rewind.py); rewinding_ticks: đang giữ phím lùi từng khung;
+        # practice: game hiện tại đã bị tua lùi (replay được đánh dấu, không lưu điểm cao)
+        self.rewind = None
+        self.rewinding_ticks = False
+        self.practice = False
+        if PRACTICE_MODE:
+            from rewind import RewindBuffer
+            self.rewind = RewindBuffer(self.game_state)
+        
+        # Telemetry: sự kiện gameplay được ghi bởi luồng nền
+        self.telemetry = None
+        if TELEMETRY_ENABLED:
+            self.telemetry = Telemetry(JsonLinesSink(TELEMETRY_DIR))
+            self.telemetry.start()
+            self.game_state.attach_telemetry(self.telemetry)
+        
+        # Cầu bộ nhớ chung: bot ở tiến trình khác đọc trạng thái và gửi hành động
+        self.bridge = None
+        if BRIDGE_ENABLED:
+            from bridge import BridgeServer
+            self.bridge = BridgeServer()
+            self.bridge.publish(self.game_state)
+        
+        # Giao thức bot qua socket: một bot có thể chơi game đang hiển thị
+        self.bot_link = None
+        self.bot_turn = None   # (số mảnh đã lấy, còn được giữ) của lượt bot đã nhận
+        if BOTPROTO_ENABLED:
+            from botproto import BotServer, LiveLink
+            self.bot_link = LiveLink()
+            BotServer(live=self.bot_link).serve_in_thread()
+        
+        # Vẽ bảng bằng NumPy thay vì từng ô (raster.py)
+        self.rasterizer = None
+        if RASTERIZE_BOARD:
+            from raster import BoardRasterizer
+            self.rasterizer = BoardRasterizer()
+        
+        # Gợi ý khai cuộc từ sách tính sẵn (opening.py), nếu đã tạo file sách
+        self.opening_book = None
+        if SHOW_OPENING_HINT:
+            from opening import load_book
+            self.opening_book = load_book()
+        
+        self.last_frame_ms = pygame.time.get_ticks()
+
+    def perform(self, action):
+        """
+        Áp dụng một hành động lên game và ghi nó vào replay.
+
+        Args:
+            action: Một trong các hằng số ACTION_* (xem replay.py)
+        """
+        apply_action(self.game_state, action)
+        self.stats.observe(self.game_state, action)
+        if self.recorder is not None:
+            self.recorder.record_action(action)
+        if self.rewind is not None:
+            self.rewind.record_action(action)
+
+    def update_bot_link(self):
+        """
+        Trao đổi với bot qua giao thức socket: gửi trạng thái khi có mảnh mới,
+        thực hiện đề xuất của bot (được ghi vào replay như phím bấm).
+        """
+        from botproto import start_message, play_move
+        link = self.bot_link
+        if not link.connected:
+            self.bot_turn = None
+            return
+        # Mảnh mới lộ ra khi túi bị rút (xoay/dịch thay current_piece nhưng không đổi lượt);
+        # giữ mảnh có thể đổi mảnh mà không rút túi, nên can_hold cũng là một phần của lượt
+        turn = (self.game_state.bag_randomizer.drawn, self.game_state.can_hold)
+        if turn != self.bot_turn:
+            self.bot_turn = turn
+            link.poll()   # Bỏ đề xuất cũ cho mảnh trước
+            link.publish([start_message(self.game_state), {'type': 'suggest'}])
+            return
+        moves = link.poll()
+        if moves:
+            replies, actions = play_move(self.game_state, moves, finish=False)
+            for action in actions:
+                self.stats.observe(self.game_state, action)
+                if self.rewind is not None:
+                    self.rewind.record_action(action)
+            if self.recorder is not None:
+                for action in actions:
+                    self.recorder.record_action(action)
+            link.publish(replies)
+
+    def save_replay(self):
+        """Lưu replay của game hiện tại (nếu bật) và dừng ghi"""
+        if self.recorder is None:
+            return
+        if SAVE_REPLAYS and self.recorder.frames:
+            try:
+                os.makedirs(REPLAY_DIR, exist_ok=True)
+                self.recorder.to_replay(self.game_state.score).save(
+                    replay_filename(self.recorder.seed))
+            except OSError:
+                pass
+        self.finished_frames = self.recorder.frames
+        self.recorder = None
+
+    def save_stats(self):
+        """Lưu thống kê của game hiện tại (nếu bật), một lần mỗi game"""
+        if self.stats_saved:
+            return
+        self.stats_saved = True
+        if SAVE_STATS and self.stats.pieces:
+            try:
+                self.stats.export()
+            except OSError:
+                pass
+
+    def restart(self):
+        """Lưu replay và thống kê của game cũ rồi bắt đầu game mới"""
+        self.save_replay()
+        self.save_stats()
+        if self.practice:
+            # Game luyện tập đã tắt việc lưu điểm cao; game mới lưu lại như thường
+            self.game_state.high_score_file = HIGHSCORE_FILE
+            self.practice = False
+        self.game_state.reset()
+        self.recorder = ReplayRecorder(self.game_state.seed)
+        self.finished_frames = None
+        self.stats = GameStats(self.game_state)
+        self.stats_saved = False
+        if self.rewind is not None:
+            self.rewind.reset(self.game_state)
+        self.set_paused(False)
+        self.needs_redraw = True
 
     def run(self):
         """
@@ -60,144 +226,410 @@ class TetrisGame:
         2. Cập nhật trạng thái game
         3. Vẽ mọi thứ lên màn hình
         4. Lặp lại 60 lần mỗi giây
+        
+        Khi không có gì chạy (tạm dừng hoặc game over), vòng lặp chuyển sang
+        chế độ chờ: ngủ trong pygame.event.wait cho tới khi có đầu vào, thay vì
+        vẽ lại màn hình 60 lần mỗi giây.
         """
-        running = True
+        self.running = True
         
-        while running:
-            # Tính thời gian từ khung hình cuối (delta time)
-            current_time = pygame.time.get_ticks() / 1000.0
-            delta_time = current_time - self.last_frame_time
-            self.last_frame_time = current_time
+        while self.running:
+            # Chế độ chờ: gần như không tốn CPU cho tới khi người chơi quay lại
+            if self.is_idle():
+                self.wait_idle()
+                continue
             
-            # Xử lý sự kiện (đầu vào bàn phím, đóng cửa sổ, v.v.)
-            for event in pygame.event.get():
-                if event.type == pygame.QUIT:
-                    # Lưu điểm cao trước khi thoát (ngăn mất dữ liệu)
-                    if self.game_state.score > self.game_state.high_score:
-                        self.game_state.save_high_score(self.game_state.score)
-                    running = False
-                
-                # Xử lý phím nhấn (hành động một lần)
-                if event.type == pygame.KEYDOWN:
-                    if not self.game_state.game_over and self.game_state.state == GameState.STATE_PLAYING:
-                        # Xoay
-                        if event.key == pygame.K_UP or event.key == pygame.K_x:
-                            self.game_state.rotate_clockwise()
-                        elif event.key == pygame.K_z:
-                            self.game_state.rotate_counterclockwise()
-                        
-                        # Rơi nhanh
-                        elif event.key == pygame.K_SPACE:
-                            self.game_state.hard_drop()
-                        
-                        # Giữ mảnh
-                        elif event.key == pygame.K_c:
-                            self.game_state.hold_piece()
-                        
-                        # Di chuyển Trái/Phải - phản hồi ngay lập tức khi nhấn phím
-                        elif event.key == pygame.K_LEFT:
-                            self.game_state.move_left()
-                            self.left_key_held = True
-                            self.left_das_timer = 0.0
-                            self.left_in_arr = False
-                        
-                        elif event.key == pygame.K_RIGHT:
-                            self.game_state.move_right()
-                            self.right_key_held = True
-                            self.right_das_timer = 0.0
-                            self.right_in_arr = False
-                    
-                    # Khởi động lại (hoạt động ngay cả khi game over)
-                    if event.key == pygame.K_r:
-                        self.game_state.reset()
-                    
-                    # Thoát
-                    if event.key == pygame.K_ESCAPE:
-                        # Lưu điểm cao trước khi thoát (ngăn mất dữ liệu)
-                        if self.game_state.score > self.game_state.high_score:
-                            self.game_state.save_high_score(self.game_state.score)
-                        running = False
-                
-                # Xử lý phím thả (reset bộ đếm DAS/ARR)
-                if event.type == pygame.KEYUP:
-                    if event.key == pygame.K_LEFT:
-                        self.left_key_held = False
-                        self.left_das_timer = 0.0
-                        self.left_in_arr = False
-                    
-                    elif event.key == pygame.K_RIGHT:
-                        self.right_key_held = False
-                        self.right_das_timer = 0.0
-                        self.right_in_arr = False
+            # Tính thời gian từ khung hình cuối (delta time, theo mili giây để replay chính xác)
+            current_ms = pygame.time.get_ticks()
+            delta_ms = current_ms - self.last_frame_ms
             
-            # Xử lý di chuyển liên tục (hệ thống DAS/ARR cho phím được giữ)
-            if not self.game_state.game_over and self.game_state.state == GameState.STATE_PLAYING:
-                keys = pygame.key.get_pressed()
-                
-                # Di chuyển trái với DAS/ARR
-                if self.left_key_held and keys[pygame.K_LEFT]:
-                    self.left_das_timer += delta_time
-                    
-                    # Kiểm tra xem đã qua độ trễ DAS chưa (bắt đầu lặp lại tự động)
-                    if not self.left_in_arr and self.left_das_timer >= DAS_DELAY:
-                        self.left_in_arr = True
-                        self.left_das_timer = 0.0
-                    
-                    # Nếu ở chế độ lặp lại tự động, di chuyển với tốc độ ARR
-                    if self.left_in_arr and self.left_das_timer >= ARR_DELAY:
-                        self.game_state.move_left()
-                        self.left_das_timer = 0.0
-                
-                # Di chuyển phải với DAS/ARR
-                if self.right_key_held and keys[pygame.K_RIGHT]:
-                    self.right_das_timer += delta_time
-                    
-                    # Kiểm tra xem đã qua độ trễ DAS chưa (bắt đầu lặp lại tự động)
-                    if not self.right_in_arr and self.right_das_timer >= DAS_DELAY:
-                        self.right_in_arr = True
-                        self.right_das_timer = 0.0
-                    
-                    # Nếu ở chế độ lặp lại tự động, di chuyển với tốc độ ARR
-                    if self.right_in_arr and self.right_das_timer >= ARR_DELAY:
-                        self.game_state.move_right()
-                        self.right_das_timer = 0.0
-                
-                # Kiểm tra xem rơi chậm có đang hoạt động không
-                soft_drop = keys[pygame.K_DOWN]
-                
-                # Cập nhật trạng thái game
-                self.game_state.update(delta_time, soft_drop)
-            else:
-                # Trong khi hoạt ảnh, chỉ cập nhật không có đầu vào
-                self.game_state.update(delta_time, False)
+            if self.telemetry is not None and delta_ms > FRAME_SPIKE_MS:
+                self.telemetry.emit(EVENT_FRAME_SPIKE, delta_ms)
+            
+            # Sự kiện đã đến từ khung trước (kèm dấu thời gian lúc đến)
+            events = self.input_poller.drain()
+            keys = pygame.key.get_pressed()
+            
+            # Chế độ luyện tập: đang giữ phím lùi từng khung thì chỉ lùi, không mô phỏng
+            if self.rewinding_ticks and not self.paused:
+                for _, _, event in events:
+                    self.handle_event(event)
+                self.last_frame_ms = current_ms
+                if self.rewinding_ticks:
+                    self.rewind_to(self.rewind.tick - REWIND_TICKS_PER_FRAME)
+                self.draw()
+                pygame.display.flip()
+                self.input_poller.wait_frame()
+                continue
+            
+            # Hành động từ bot ngoài tiến trình (được ghi vào replay như phím bấm).
+            # Lấy từng cái một: sau một lần xóa hàng, phần còn lại chờ hết hoạt ảnh
+            while self.bridge is not None and self.is_accepting_input():
+                actions = self.bridge.drain(1)
+                if not actions:
+                    break
+                self.perform(actions[0])
+            
+            if self.bot_link is not None and self.is_accepting_input():
+                self.update_bot_link()
+            
+            # Mô phỏng khung, áp dụng mỗi phím đúng thời điểm nó đến
+            self.simulate_frame(events, current_ms, keys)
+            
+            # Người chơi vừa tạm dừng/thoát: không vẽ khung này
+            if self.paused or not self.running:
+                continue
+            
+            if self.bridge is not None:
+                self.bridge.publish(self.game_state)
+            
+            # Lưu replay và thống kê ngay khi game kết thúc
+            if self.game_state.game_over:
+                self.save_replay()
+                self.save_stats()
             
             # Vẽ mọi thứ
             self.draw()
             
-            # Cập nhật màn hình và giới hạn ở 60 FPS
+            # Cập nhật màn hình, rồi chờ khung kế tiếp (giới hạn FPS) trong khi lấy đầu vào
             pygame.display.flip()
-            self.clock.tick(60)
+            self.input_poller.wait_frame()
         
         pygame.quit()
         sys.exit()
 
+    def is_simulating(self):
+        """True nếu thời gian game đang chạy (không tạm dừng, chưa thoát, chưa game over)"""
+        return self.running and not self.paused and not self.rewinding_ticks and not self.game_state.game_over
+
+    def simulate_frame(self, events, frame_end, keys):
+        """
+        Mô phỏng từ last_frame_ms tới frame_end (mili giây).
+
+        Mỗi sự kiện được xử lý ở đúng dấu thời gian của nó: mô phỏng tới đó,
+        xử lý, rồi mô phỏng tiếp. Mỗi đoạn là một khung trong replay.
+
+        Args:
+            events: Danh sách (mili giây, giây perf_counter, sự kiện) từ InputPoller
+            keys: pygame.key.get_pressed() (để bỏ phím đang giữ nếu mất sự kiện thả)
+        """
+        for ms, arrived, event in events:
+            simulating = self.is_simulating()
+            if simulating:
+                self.simulate_until(min(max(ms, self.last_frame_ms), frame_end), keys)
+            self.handle_event(event)
+            if simulating and event.type == pygame.KEYDOWN:
+                self.input_latency.add(time.perf_counter() - arrived)
+        
+        # Phím được giữ mà không còn nhấn: sự kiện thả đã bị mất (ví dụ khi mất focus)
+        if self.left_key_held and not keys[pygame.K_LEFT]:
+            self.release_shift(EVENT_LEFT_REPEAT)
+        if self.right_key_held and not keys[pygame.K_RIGHT]:
+            self.release_shift(EVENT_RIGHT_REPEAT)
+        if not keys[pygame.K_DOWN]:
+            self.soft_drop_held = False
+        
+        if self.is_simulating():
+            self.simulate_until(frame_end, keys)
+        elif self.recorder is not None and self.recorder.pending_actions and self.game_state.game_over:
+            # Hành động kết thúc game (vd. thả nhanh) vẫn phải nằm trong một khung của replay
+            self.step(0, False)
+        self.last_frame_ms = frame_end
+
+    def simulate_until(self, target_ms, keys):
+        """
+        Mô phỏng tới target_ms, chia đoạn tại các lần lặp DAS/ARR tới hạn.
+
+        Đồng hồ lặp phím chỉ chạy khi mảnh đang nhận đầu vào (không chạy
+        trong hoạt ảnh xóa hàng).
+        """
+        scheduler = self.input_scheduler
+        while self.last_frame_ms < target_ms and self.is_simulating():
+            end = target_ms
+            accepting = self.is_accepting_input()
+            if accepting:
+                self.fire_repeats(keys)
+                due = scheduler.next_due()
+                if due is not None:
+                    wait_ms = math.ceil((due - scheduler.now) * 1000.0 - TIMER_EPSILON)
+                    end = min(end, self.last_frame_ms + max(1, wait_ms))
+            self.step(end - self.last_frame_ms, accepting and self.soft_drop_held)
+
+    def fire_repeats(self, keys):
+        """Thực hiện các lần lặp phím tới hạn ở thời điểm hiện tại của bộ lập lịch"""
+        scheduler = self.input_scheduler
+        for due, event in scheduler.pop_due(scheduler.now + TIMER_EPSILON):
+            if event == EVENT_LEFT_REPEAT and self.left_key_held and keys[pygame.K_LEFT]:
+                self.repeat_shift(event, due)
+            elif event == EVENT_RIGHT_REPEAT and self.right_key_held and keys[pygame.K_RIGHT]:
+                self.repeat_shift(event, due)
+            elif event == EVENT_REWIND_REPEAT and keys[pygame.K_BACKSPACE]:
+                self.rewind_to(self.rewind.previous_piece_tick())
+                scheduler.schedule(event, due + REWIND_PIECE_REPEAT)
+        # ARR = 0: DAS đã nạp thì mảnh (kể cả mảnh mới, sau khi xoay) luôn nằm sát tường
+        if self.left_charged and self.left_key_held:
+            self.shift_to_wall(EVENT_LEFT_REPEAT)
+        if self.right_charged and self.right_key_held:
+            self.shift_to_wall(EVENT_RIGHT_REPEAT)
+
+    def repeat_shift(self, event, due):
+        """Một lần lặp DAS/ARR tới hạn: dịch một ô, hoặc tới tường nếu ARR_DELAY = 0"""
+        if ARR_DELAY > 0:
+            self.perform(ACTION_LEFT_REPEAT if event == EVENT_LEFT_REPEAT else ACTION_RIGHT_REPEAT)
+            self.input_scheduler.schedule(event, due + ARR_DELAY)
+        elif event == EVENT_LEFT_REPEAT:
+            self.left_charged = True
+        else:
+            self.right_charged = True
+
+    def shift_to_wall(self, event):
+        """Dịch mảnh tới khi bị chặn (chỉ ghi các bước thật sự di chuyển)"""
+        if event == EVENT_LEFT_REPEAT:
+            dx, action = -1, ACTION_LEFT_REPEAT
+        else:
+            dx, action = 1, ACTION_RIGHT_REPEAT
+        while not self.game_state.check_collision(dx, 0):
+            self.perform(action)
+
+    def release_shift(self, event):
+        """Thả phím trái/phải: dừng DAS/ARR của hướng đó"""
+        if event == EVENT_LEFT_REPEAT:
+            self.left_key_held = False
+            self.left_charged = False
+        else:
+            self.right_key_held = False
+            self.right_charged = False
+        self.input_scheduler.cancel(event)
+
+    def step(self, delta_ms, soft_drop):
+        """Một đoạn mô phỏng: ghi khung rồi cập nhật game delta_ms mili giây"""
+        accepting = self.is_accepting_input()
+        self.end_frame(delta_ms, soft_drop)
+        self.game_state.update(delta_ms / 1000.0, soft_drop)
+        if accepting:
+            self.input_scheduler.now += delta_ms / 1000.0
+        self.last_frame_ms += delta_ms
+        self.stats.observe(self.game_state)
+        if self.rewind is not None:
+            self.rewind.observe(self.game_state)
+
+    def handle_event(self, event):
+        """
+        Xử lý một sự kiện pygame (phím, đóng cửa sổ, mất focus).
+
+        Args:
+            event: Sự kiện pygame (lấy qua InputPoller)
+        """
+        if event.type == pygame.QUIT:
+            self.quit()
+        
+        # Tự động tạm dừng khi cửa sổ mất focus (người chơi chuyển sang việc khác)
+        if event.type == pygame.WINDOWFOCUSLOST and AUTO_PAUSE_ON_FOCUS_LOSS:
+            self.set_paused(True)
+        
+        # Xử lý phím nhấn (hành động một lần)
+        if event.type == pygame.KEYDOWN:
+            if not self.paused and self.game_state.accepts_input():
+                # Xoay
+                if event.key == pygame.K_UP or event.key == pygame.K_x:
+                    self.perform(ACTION_ROTATE_CW)
+                elif event.key == pygame.K_z:
+                    self.perform(ACTION_ROTATE_CCW)
+                
+                # Rơi nhanh
+                elif event.key == pygame.K_SPACE:
+                    self.perform(ACTION_HARD_DROP)
+                
+                # Giữ mảnh
+                elif event.key == pygame.K_c:
+                    self.perform(ACTION_HOLD)
+                
+                # Di chuyển Trái/Phải - phản hồi ngay lập tức khi nhấn phím
+                # Lần lặp đầu tiên sau DAS_DELAY + ARR_DELAY
+                elif event.key == pygame.K_LEFT:
+                    self.perform(ACTION_LEFT)
+                    self.left_key_held = True
+                    self.left_charged = False
+                    self.input_scheduler.schedule_in(EVENT_LEFT_REPEAT, DAS_DELAY + ARR_DELAY)
+                
+                elif event.key == pygame.K_RIGHT:
+                    self.perform(ACTION_RIGHT)
+                    self.right_key_held = True
+                    self.right_charged = False
+                    self.input_scheduler.schedule_in(EVENT_RIGHT_REPEAT, DAS_DELAY + ARR_DELAY)
+            
+            # Rơi chậm: trạng thái giữ phím theo thời điểm của sự kiện
+            if event.key == pygame.K_DOWN:
+                self.soft_drop_held = True
+            
+            # Tạm dừng / tiếp tục
+            if event.key == pygame.K_p and not self.game_state.game_over:
+                self.set_paused(not self.paused)
+            
+            # Tua lùi (chế độ luyện tập, cả khi game over): Backspace lùi từng
+            # mảnh (lặp khi giữ), Shift+Backspace lùi từng khung khi giữ
+            if event.key == pygame.K_BACKSPACE and self.rewind is not None and not self.paused:
+                if event.mod & pygame.KMOD_SHIFT:
+                    self.rewinding_ticks = True
+                    self.rewind_to(self.rewind.tick - REWIND_TICKS_PER_FRAME)
+                else:
+                    self.rewind_to(self.rewind.previous_piece_tick())
+                    self.input_scheduler.schedule_in(EVENT_REWIND_REPEAT, REWIND_PIECE_REPEAT)
+            
+            # Khởi động lại (hoạt động ngay cả khi game over)
+            if event.key == pygame.K_r:
+                self.restart()
+            
+            # Thoát
+            if event.key == pygame.K_ESCAPE:
+                self.quit()
+        
+        # Xử lý phím thả (reset bộ đếm DAS/ARR)
+        if event.type == pygame.KEYUP:
+            if event.key == pygame.K_LEFT:
+                self.release_shift(EVENT_LEFT_REPEAT)
+            
+            elif event.key == pygame.K_RIGHT:
+                self.release_shift(EVENT_RIGHT_REPEAT)
+            
+            elif event.key == pygame.K_DOWN:
+                self.soft_drop_held = False
+            
+            elif event.key == pygame.K_BACKSPACE:
+                self.rewinding_ticks = False
+                self.input_scheduler.cancel(EVENT_REWIND_REPEAT)
+
+    def rewind_to(self, tick):
+        """
+        Chế độ luyện tập: quay game về khung `tick` (giới hạn trong bộ đệm tua lùi).
+
+        Replay đang ghi bị cắt về cùng khung, nên vẫn phát lại đúng dòng thời gian
+        cuối cùng. Game bị tua lùi thành game luyện tập: replay được đánh dấu
+        practice (verify.py từ chối) và điểm cao không được lưu nữa. Nếu game đã
+        kết thúc (replay đã lưu), việc ghi tiếp tục từ các khung đã cắt.
+        """
+        game_state, tick = self.rewind.restore_tick(tick)
+        old = self.game_state
+        game_state.high_score_file = None
+        game_state.high_score = max(game_state.high_score, old.high_score)
+        game_state.telemetry = old.telemetry
+        self.game_state = game_state
+        self.practice = True
+        if self.recorder is None and self.finished_frames is not None:
+            self.recorder = ReplayRecorder(game_state.seed, self.finished_frames)
+            self.finished_frames = None
+        if self.recorder is not None:
+            del self.recorder.frames[tick:]
+            self.recorder.pending_actions = []
+            self.recorder.practice = True
+        self.stats_saved = False
+        self.stats.resync(game_state)
+        self.needs_redraw = True
+
+    def quit(self):
+        """Lưu điểm cao, replay và thống kê rồi dừng vòng lặp"""
+        # Lưu điểm cao trước khi thoát (ngăn mất dữ liệu)
+        if self.game_state.score > self.game_state.high_score:
+            self.game_state.save_high_score(self.game_state.score)
+        self.save_replay()
+        self.save_stats()
+        if self.telemetry is not None:
+            self.telemetry.stop()
+            self.telemetry = None
+        if self.bridge is not None:
+            self.bridge.close()
+            self.bridge = None
+        self.running = False
+
+    def set_paused(self, paused):
+        """
+        Tạm dừng hoặc tiếp tục game.
+
+        Khi tạm dừng, bộ đếm DAS/ARR được reset để phím đang giữ không
+        tự lặp ngay khi tiếp tục.
+        """
+        if paused == self.paused:
+            return
+        self.paused = paused
+        self.left_key_held = False
+        self.right_key_held = False
+        self.left_charged = False
+        self.right_charged = False
+        self.input_scheduler.clear()
+        self.needs_redraw = True
+
+    def is_accepting_input(self):
+        """True nếu mảnh hiện tại đang nhận hành động"""
+        return self.game_state.accepts_input()
+
+    def is_idle(self):
+        """True nếu không có mô phỏng hay hoạt ảnh nào đang chạy"""
+        return self.paused or self.game_state.game_over
+
+    def wait_idle(self):
+        """
+        Một bước của chế độ chờ.
+
+        Vẽ lại màn hình chỉ khi có gì đó thay đổi, sau đó ngủ trong
+        pygame.event.wait cho tới khi có sự kiện (hoặc hết IDLE_WAIT_TIMEOUT).
+        Sự kiện được xử lý ngay khi đến nên không có thêm độ trễ khi người chơi quay lại.
+        
+        Mọi sự kiện đi qua InputPoller, kể cả những sự kiện nó đã lấy trước khi
+        vào chế độ chờ: không sự kiện nào bị để lại trong pending rồi xử lý lần
+        nữa ở khung sau (ví dụ chơi lại hai lần).
+        """
+        if self.needs_redraw:
+            self.draw()
+            pygame.display.flip()
+            self.needs_redraw = False
+        
+        self.input_poller.wait(IDLE_WAIT_TIMEOUT)
+        events = self.input_poller.drain()
+        for index, (_, _, event) in enumerate(events):
+            if not self.is_idle():
+                # Đã rời chế độ chờ (bỏ tạm dừng, chơi lại): phần còn lại được
+                # mô phỏng đúng thời điểm ở khung kế tiếp
+                self.input_poller.pending[:0] = events[index:]
+                break
+            self.handle_event(event)
+        if events:
+            self.needs_redraw = True
+        
+        # Thời gian chờ không được tính vào delta time của khung tiếp theo
+        self.last_frame_ms = pygame.time.get_ticks()
+
+    def end_frame(self, delta_ms, soft_drop):
+        """Ghi khung hiện tại vào replay (gọi ngay trước GameState.update)"""
+        if self.recorder is not None:
+            self.recorder.end_frame(delta_ms, bool(soft_drop))
+        self.stats.on_frame(delta_ms / 1000.0)
+        if self.rewind is not None:
+            self.rewind.end_frame(delta_ms, bool(soft_drop))
+
     def draw(self):
         """Vẽ tất cả các phần tử game lên màn hình"""
         # Xóa màn hình với màu nền
         self.screen.fill(COLOR_BACKGROUND)
         
         # Vẽ lưới game và các mảnh
-        self.draw_grid()
-        self.draw_locked_pieces()
+        if self.rasterizer is not None:
+            self.draw_board_raster()
+        else:
+            self.draw_grid()
+            self.draw_locked_pieces()
+        if self.opening_book is not None and not self.game_state.game_over:
+            self.draw_opening_hint()
         self.draw_ghost_piece()
         self.draw_current_piece()
         
         # Vẽ UI (điểm, mảnh tiếp theo, v.v.)
         self.draw_ui()
         
-        # Vẽ màn hình game over nếu cần
+        # Vẽ màn hình game over hoặc tạm dừng nếu cần
         if self.game_state.game_over:
             self.draw_game_over()
+        elif self.paused:
+            self.draw_paused()
 
     def draw_grid(self):
         """
@@ -206,8 +638,8 @@ class TetrisGame:
         Điều này cho người chơi thấy vị trí của mỗi ô khối.
         """
         # Vẽ các ô lưới
-        for y in range(GRID_HEIGHT):
-            for x in range(GRID_WIDTH):
+        for y in range(self.game_state.height):
+            for x in range(self.game_state.width):
                 px = GRID_OFFSET_X + x * BLOCK_SIZE
                 py = GRID_OFFSET_Y + y * BLOCK_SIZE
                 
@@ -215,24 +647,49 @@ class TetrisGame:
                 pygame.draw.rect(self.screen, COLOR_GRID, 
                                (px, py, BLOCK_SIZE, BLOCK_SIZE), 1)
         
-        # Vẽ viền xung quanh lưới
+        self.draw_grid_border()
+
+    def draw_grid_border(self):
+        """Vẽ viền xung quanh lưới"""
         border_rect = pygame.Rect(
             GRID_OFFSET_X - 2,
             GRID_OFFSET_Y - 2,
-            GRID_WIDTH * BLOCK_SIZE + 4,
-            GRID_HEIGHT * BLOCK_SIZE + 4
+            self.game_state.width * BLOCK_SIZE + 4,
+            self.game_state.height * BLOCK_SIZE + 4
         )
         pygame.draw.rect(self.screen, COLOR_TEXT, border_rect, 2)
 
-    def draw_locked_pieces(self):
+    def draw_board_raster(self):
+        """
+        Vẽ lưới và các mảnh đã khóa bằng một lần blit (raster.py).
+
+        Các hàng đang trong hoạt ảnh xóa được vẽ trống rồi vẽ đè bằng
+        draw_locked_pieces để giữ hiệu ứng.
+        """
+        game_state = self.game_state
+        clearing = ()
+        if game_state.state == GameState.STATE_LINE_CLEAR_ANIMATION:
+            clearing = game_state.lines_being_cleared
+        self.screen.blit(self.rasterizer.render(game_state.grid, clearing),
+                         (GRID_OFFSET_X, GRID_OFFSET_Y))
+        self.draw_grid_border()
+        if clearing:
+            self.draw_locked_pieces(clearing)
+
+    def draw_locked_pieces(self, rows=None):
         """
         Vẽ tất cả các mảnh đã khóa trên lưới.
         
         Bao gồm hiệu ứng hoạt ảnh xóa hàng.
+
+        Args:
+            rows: Chỉ vẽ các hàng này (None = mọi hàng)
         """
-        for y in range(GRID_HEIGHT):
-            for x in range(GRID_WIDTH):
-                color = self.game_state.grid[y][x]
+        for y in (range(self.game_state.height) if rows is None else rows):
+            row = self.game_state.grid[y]
+            for x in range(self.game_state.width):
+                # Lưới chỉ lưu id ô; màu được tra ở đây
+                color = CELL_COLORS[row[x]]
                 
                 if color is not None:
                     px = GRID_OFFSET_X + x * BLOCK_SIZE
@@ -305,6 +762,23 @@ class TetrisGame:
                 pygame.draw.rect(self.screen, (*color, COLOR_GHOST_ALPHA),
                                (px, py, BLOCK_SIZE, BLOCK_SIZE), 1)
 
+    def draw_opening_hint(self):
+        """
+        Vẽ viền vị trí đặt mà sách khai cuộc gợi ý cho mảnh hiện tại.
+
+        Gợi ý biến mất khi hết túi đầu hoặc khi bảng đã đi lệch khỏi sách.
+        """
+        hint = self.opening_book.hint(self.game_state)
+        if hint is None:
+            return
+        piece_type, blocks = hint
+        color = TetrominoType.get_color(piece_type)
+        for x, y in blocks:
+            if y >= 0:
+                px = GRID_OFFSET_X + x * BLOCK_SIZE
+                py = GRID_OFFSET_Y + y * BLOCK_SIZE
+                pygame.draw.rect(self.screen, color, (px + 3, py + 3, BLOCK_SIZE - 6, BLOCK_SIZE - 6), 2)
+
     def draw_current_piece(self):
         """Vẽ mảnh đang rơi hiện tại"""
         blocks = self.game_state.current_piece.get_blocks()
@@ -333,11 +807,15 @@ class TetrisGame:
         - Số hàng đã xóa
         - Xem trước mảnh tiếp theo
         - Xem trước mảnh đã giữ
+        - Thống kê trực tiếp (PPS, APM, ...)
         - Hướng dẫn điều khiển
         """
         ui_x = UI_OFFSET_X
         ui_y = UI_OFFSET_Y
         
+        if SHOW_STATS:
+            self.draw_stats(ui_x + 150, ui_y)
+        
         # Điểm số
         text = self.font_small.render("SCORE", True, COLOR_TEXT)
         self.screen.blit(text, (ui_x, ui_y))
@@ -380,6 +858,11 @@ class TetrisGame:
         ui_y += 30
         
         self.draw_preview_piece(self.game_state.next_piece_type, ui_x, ui_y)
+
+        # Các mảnh sau trong hàng đợi: nhỏ hơn, xếp thành cột bên phải
+        queue_x = ui_x + 150
+        for i, piece_type in enumerate(self.game_state.next_queue[1:]):
+            self.draw_preview_piece(piece_type, queue_x, ui_y - 30 + i * 40, 12)
         ui_y += 120
         
         # Mảnh đã giữ
@@ -402,25 +885,48 @@ class TetrisGame:
             "Space Rơi nhanh",
             "Z/X Xoay",
             "C Giữ",
+            "P Tạm dừng",
             "R Khởi động lại"
         ]
+        if self.rewind is not None:
+            controls.append("Backspace Tua lùi")
         
         for control in controls:
             text = self.font_tiny.render(control, True, COLOR_TEXT)
             self.screen.blit(text, (ui_x, ui_y))
             ui_y += 20
 
-    def draw_preview_piece(self, piece_type, x, y):
+    def draw_stats(self, x, y):
+        """Vẽ thống kê trực tiếp (trung bình trong cửa sổ trượt) thành một cột"""
+        stats = self.stats
+        level, started = stats.splits[-1]
+        level_time = stats.clock - started
+        lines = [
+            "PPS  %.2f" % stats.pps(),
+            "APM  %.0f" % stats.apm(),
+            "KPP  %.1f" % stats.inputs_per_piece(),
+            "LPM  %.1f" % stats.lpm(),
+            "LV%d  %d:%02d" % (level, level_time // 60, level_time % 60),
+        ]
+        if self.input_latency.count:
+            latency = self.input_latency.summary()
+            lines.append("LAG  %.1f/%.0f ms" % (latency['mean'], latency['p99']))
+        for line in lines:
+            text = self.font_tiny.render(line, True, COLOR_TEXT)
+            self.screen.blit(text, (x, y))
+            y += 20
+
+    def draw_preview_piece(self, piece_type, x, y, preview_size=20):
         """
         Vẽ xem trước một mảnh (cho màn hình KẾ TIẾP và ĐÃ GIỮ).
         
         Args:
             piece_type: Loại mảnh cần xem trước
             x, y: Vị trí để vẽ xem trước
+            preview_size: Kích thước mỗi khối (pixel)
         """
         shape = TetrominoType.get_shape(piece_type)
         color = TetrominoType.get_color(piece_type)
-        preview_size = 20
         
         for i in range(len(shape)):
             for j in range(len(shape[i])):
@@ -453,6 +959,22 @@ class TetrisGame:
         self.screen.blit(text, text_rect)
 
 
+    def draw_paused(self):
+        """Vẽ lớp phủ tạm dừng"""
+        overlay = pygame.Surface((SCREEN_WIDTH, SCREEN_HEIGHT))
+        overlay.set_alpha(150)
+        overlay.fill((0, 0, 0))
+        self.screen.blit(overlay, (0, 0))
+        
+        text = self.font_large.render("PAUSED", True, COLOR_WHITE)
+        text_rect = text.get_rect(center=(SCREEN_WIDTH // 2, SCREEN_HEIGHT // 2 - 50))
+        self.screen.blit(text, text_rect)
+        
+        text = self.font_small.render("PRESS P TO RESUME", True, COLOR_TEXT)
+        text_rect = text.get_rect(center=(SCREEN_WIDTH // 2, SCREEN_HEIGHT // 2 + 20))
+        self.screen.blit(text, text_rect)
+
+
 def main():
     """
     Điểm khởi đầu của chương trình.
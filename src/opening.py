@@ -0,0 +1,440 @@
+"""
+Sách Khai cuộc (Opening Book) - Bảng Tra Tính Sẵn, Đọc bằng mmap
+
+Túi 7 mảnh đầu tiên là phần được nghiên cứu kỹ nhất của game, và chuỗi của
+nó được biết trước hoàn toàn (BagRandomizer suy ra mỗi túi từ seed). Thay vì
+tìm kiếm từ đầu mỗi game, một công cụ chạy ngoại tuyến tính sẵn cho mọi
+hoán vị của túi đầu (7! = 5040) và mỗi chế độ ô giữ (không giữ / có giữ)
+chuỗi 7 vị trí đặt tốt nhất, rồi ghi ra một bảng nhị phân gọn:
+
+    [Header]  HEADER_FORMAT: magic 'TROB', phiên bản, rộng, cao,
+              số hoán vị, số bước mỗi dòng
+    [Bảng]    (5040 x 2) dòng, mỗi dòng 7 byte (một byte mỗi vị trí đặt):
+              bit 7 = dùng ô giữ, bit 5-6 = trạng thái xoay,
+              bit 0-4 = cột x + X_OFFSET; EMPTY_MOVE = không có nước
+
+Dòng của một game nằm ở (hạng hoán vị * 2 + chế độ) * 7: tìm dòng là một
+phép tính hạng (Lehmer) trên 7 mảnh và một lát cắt của mmap. Lần tra đầu
+tiên của mỗi game còn mô phỏng lại dòng đó để có các bảng dự kiến (đo được
+khoảng 0.5-0.94 ms); các lần sau dùng dòng đã nhớ (khoảng 40-80 µs).
+
+Dòng được chọn bằng tìm kiếm beam trên bitboard của bot.py với các trọng số
+của bot, biết trước cả 7 mảnh: giá trị = đánh giá tĩnh của bảng cuối + trọng
+số hàng * tổng số hàng đã xóa. Ở chế độ có giữ, dòng đặt đúng 7 mảnh của túi
+đầu (nước cuối có thể đổi mảnh giữ lấy mảnh đầu túi thứ hai), nên khóa chỉ
+phụ thuộc túi đầu. Vì beam chỉ dùng đánh giá tĩnh, các hoán vị có chung tiền
+tố có chung beam: công cụ duyệt cây tiền tố một lần thay vì 5040 lần.
+
+Khi tra cứu, bảng hiện tại được so với bảng dự kiến (mô phỏng lại tối đa
+7 nước trên bitboard, nhớ cho dòng gần nhất), nên người chơi (hoặc bot) đi
+lệch khỏi sách thì sách thôi gợi ý.
+
+Cách dùng:
+    python src/opening.py build --workers 4
+    python src/opening.py show IOTLJSZ --hold
+"""
+
+import argparse
+import math
+import mmap
+import os
+import struct
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+from config import *
+from tetromino import TetrominoType
+from bot import (board_rows, enumerate_placements, place, board_features, evaluate,
+                 FEATURE_NAMES)
+
+BOOK_MAGIC = b'TROB'
+BOOK_VERSION = 1
+
+HEADER_FORMAT = '<4sHHHHH'   # magic, phiên bản, rộng, cao, số hoán vị, số bước
+HEADER_SIZE = struct.calcsize(HEADER_FORMAT)
+
+BAG_SIZE = 7
+PERMUTATIONS = math.factorial(BAG_SIZE)
+MODES = 2            # 0 = không giữ, 1 = có giữ
+EMPTY_MOVE = 0xFF
+X_OFFSET = 4         # Tetromino.x có thể âm (cột trống bên trái ma trận 4x4)
+
+_HOLD_FLAG = 0x80
+_LINES = FEATURE_NAMES.index('lines')
+_PIECES = tuple(TetrominoType.all_types())
+
+_books = {}
+
+
+def encode_move(rotation, x, use_hold):
+    code = x + X_OFFSET
+    if not 0 <= code < 0x20:
+        raise ValueError("Cột ngoài phạm vi mã hóa: %d" % x)
+    return (_HOLD_FLAG if use_hold else 0) | (rotation << 5) | code
+
+
+def decode_move(byte):
+    """Returns: (rotation, x, use_hold), hoặc None với EMPTY_MOVE"""
+    if byte == EMPTY_MOVE:
+        return None
+    return (byte >> 5) & 3, (byte & 0x1F) - X_OFFSET, bool(byte & _HOLD_FLAG)
+
+
+def sequence_rank(pieces):
+    """Hạng (0..5039) của một hoán vị 7 mảnh, theo thứ tự TetrominoType.all_types()"""
+    remaining = list(_PIECES)
+    rank = 0
+    for i, piece_type in enumerate(pieces):
+        k = remaining.index(piece_type)
+        rank += k * math.factorial(BAG_SIZE - 1 - i)
+        del remaining[k]
+    return rank
+
+
+def sequence_from_rank(rank):
+    remaining = list(_PIECES)
+    pieces = []
+    for i in range(BAG_SIZE):
+        k, rank = divmod(rank, math.factorial(BAG_SIZE - 1 - i))
+        pieces.append(remaining.pop(k))
+    return tuple(pieces)
+
+
+def first_bag(bag_randomizer):
+    """Thứ tự rút của túi đầu tiên (make_bag trả về các mảnh được lấy từ cuối)"""
+    return tuple(bag_randomizer.make_bag(0)[::-1])
+
+
+# ---------------------------------------------------------------------------
+# Công cụ tạo sách (ngoại tuyến)
+# ---------------------------------------------------------------------------
+
+class _Line:
+    """Một trạng thái trong beam: bảng, ô giữ, số mảnh đã lấy, các nước đã đi"""
+
+    __slots__ = ('value', 'rows', 'hold', 'taken', 'lines', 'moves')
+
+    def __init__(self, value, rows, hold, taken, lines, moves):
+        self.value = value
+        self.rows = rows
+        self.hold = hold
+        self.taken = taken
+        self.lines = lines
+        self.moves = moves
+
+
+class BookBuilder:
+    """
+    Tìm dòng khai cuộc cho mọi hoán vị bằng beam search trên cây tiền tố.
+
+    Ở bước k (đã đặt k mảnh), mỗi trạng thái đã lấy k hoặc k + 1 mảnh khỏi
+    chuỗi (k + 1 nếu đang có mảnh trong ô giữ), nên bước k chỉ cần biết
+    k + 1 mảnh đầu (không giữ) hoặc k + 2 mảnh đầu (có giữ).
+    """
+
+    def __init__(self, weights=BOT_WEIGHTS, width=GRID_WIDTH, height=GRID_HEIGHT,
+                 beam_width=OPENING_BEAM_WIDTH):
+        self.weights = tuple(weights)
+        self.width = width
+        self.height = height
+        self.beam_width = beam_width
+
+    def value(self, rows, lines):
+        static = evaluate(board_features(rows, self.width, self.height, 0), self.weights)
+        return static + self.weights[_LINES] * lines
+
+    def options(self, line, pieces, use_hold):
+        """Các (mảnh được đặt, có dùng giữ, ô giữ mới, số mảnh đã lấy mới) từ một trạng thái"""
+        taken, hold = line.taken, line.hold
+        if taken < BAG_SIZE:
+            yield pieces[taken], False, hold, taken + 1
+        if not use_hold:
+            return
+        if hold is None:
+            if taken + 1 < BAG_SIZE:
+                # Giữ khi ô trống: mảnh được đặt là mảnh kế tiếp
+                yield pieces[taken + 1], True, pieces[taken], taken + 2
+        elif taken < BAG_SIZE:
+            if hold != pieces[taken]:
+                yield hold, True, pieces[taken], taken + 1
+        else:
+            # Nước cuối: đổi mảnh giữ lấy mảnh đầu túi thứ hai (không thuộc sách)
+            yield hold, True, None, taken
+
+    def step(self, beam, pieces, use_hold):
+        """Đặt thêm một mảnh cho mọi trạng thái trong beam, giữ beam_width trạng thái tốt nhất"""
+        children = {}
+        for line in beam:
+            for piece_type, hold_used, hold, taken in self.options(line, pieces, use_hold):
+                for rotation, x, y, cells, px in enumerate_placements(
+                        line.rows, self.width, self.height, piece_type):
+                    rows, lines = place(line.rows, self.width, cells, px, y)
+                    key = (tuple(rows), hold, taken)
+                    total = line.lines + lines
+                    value = self.value(rows, total)
+                    old = children.get(key)
+                    if old is None or value > old.value:
+                        children[key] = _Line(value, rows, hold, taken, total,
+                                              line.moves + (encode_move(rotation, x, hold_used),))
+        ranked = sorted(children.values(), key=lambda line: -line.value)
+        return ranked[:self.beam_width]
+
+    def known_for_step(self, step, use_hold):
+        """Số mảnh đầu cần biết để đi bước `step`"""
+        return min(BAG_SIZE, step + (2 if use_hold else 1))
+
+    def build_subtree(self, prefix, use_hold, results):
+        """
+        Duyệt mọi hoán vị bắt đầu bằng `prefix`.
+
+        Args:
+            results: dict hạng -> bytes của dòng (được điền vào)
+        """
+        start = _Line(0.0, [0] * self.height, None, 0, 0, ())
+        self._walk(tuple(prefix), [start], 0, use_hold, results)
+        return results
+
+    def _walk(self, prefix, beam, step, use_hold, results):
+        while step < BAG_SIZE and self.known_for_step(step, use_hold) <= len(prefix):
+            beam = self.step(beam, prefix, use_hold)
+            step += 1
+        if step == BAG_SIZE:
+            moves = beam[0].moves if beam else (EMPTY_MOVE,) * BAG_SIZE
+            results[sequence_rank(prefix)] = bytes(moves)
+            return
+        for piece_type in _PIECES:
+            if piece_type not in prefix:
+                self._walk(prefix + (piece_type,), beam, step, use_hold, results)
+
+
+def _build_task(task):
+    """Chạy trong tiến trình con: một cây con (chế độ, mảnh đầu)"""
+    mode, first, weights, width, height, beam_width = task
+    builder = BookBuilder(weights, width, height, beam_width)
+    return mode, builder.build_subtree((first,), bool(mode), {})
+
+
+def build_book(path=OPENING_BOOK_FILE, weights=BOT_WEIGHTS, width=GRID_WIDTH,
+               height=GRID_HEIGHT, beam_width=OPENING_BEAM_WIDTH, workers=None):
+    """
+    Tính và ghi sách khai cuộc.
+
+    Mỗi (chế độ, mảnh đầu) là một việc độc lập (14 việc) cho nhóm tiến trình.
+
+    Returns:
+        Số dòng đã ghi
+    """
+    table = bytearray([EMPTY_MOVE]) * (PERMUTATIONS * MODES * BAG_SIZE)
+    tasks = [(mode, first, tuple(weights), width, height, beam_width)
+             for mode in range(MODES) for first in _PIECES]
+    count = 0
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        for mode, results in pool.map(_build_task, tasks):
+            for rank, moves in results.items():
+                offset = (rank * MODES + mode) * BAG_SIZE
+                table[offset:offset + BAG_SIZE] = moves
+                count += 1
+
+    # Ghi ra tên tạm rồi đổi tên, để người đọc đang mmap không thấy file ghi dở
+    temp = path + '.tmp'
+    with open(temp, 'wb') as f:
+        f.write(struct.pack(HEADER_FORMAT, BOOK_MAGIC, BOOK_VERSION, width, height,
+                            PERMUTATIONS, BAG_SIZE))
+        f.write(table)
+    os.replace(temp, path)
+    return count
+
+
+# ---------------------------------------------------------------------------
+# Tra cứu (khi chạy)
+# ---------------------------------------------------------------------------
+
+class OpeningBook:
+    """
+    Đọc một file sách khai cuộc qua mmap.
+
+    Thuộc tính:
+        width, height: Kích thước bảng của sách (sách không dùng cho bảng khác)
+    """
+
+    def __init__(self, path=OPENING_BOOK_FILE):
+        self.file = open(path, 'rb')
+        self.map = mmap.mmap(self.file.fileno(), 0, access=mmap.ACCESS_READ)
+        magic, version, self.width, self.height, permutations, steps = \
+            struct.unpack_from(HEADER_FORMAT, self.map, 0)
+        if magic != BOOK_MAGIC or version != BOOK_VERSION:
+            self.close()
+            raise ValueError("Không phải file sách khai cuộc: %s" % path)
+        if permutations != PERMUTATIONS or steps != BAG_SIZE:
+            self.close()
+            raise ValueError("Kích thước bảng không hợp lệ: %s" % path)
+        self._line_key = None    # Dòng được mô phỏng gần nhất
+        self._line = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def close(self):
+        self.map.close()
+        self.file.close()
+
+    def moves(self, pieces, use_hold):
+        """Dòng của một túi đầu: bytes 7 nước (mã hóa bằng encode_move)"""
+        offset = HEADER_SIZE + (sequence_rank(pieces) * MODES + int(use_hold)) * BAG_SIZE
+        return self.map[offset:offset + BAG_SIZE]
+
+    def expected_line(self, pieces, use_hold):
+        """
+        Mô phỏng một dòng trên bitboard.
+
+        Returns:
+            Danh sách, mỗi bước một bộ (bảng trước nước đi, ô giữ trước nước đi,
+            mảnh hiện tại trước nước đi (None = mảnh của túi thứ hai), loại mảnh
+            được đặt, nước đi, các ô (x, y) của mảnh sau khi đặt);
+            dừng ở nước EMPTY_MOVE hoặc không đặt được
+        """
+        key = (pieces, use_hold)
+        if key == self._line_key:
+            return self._line
+        rows = [0] * self.height
+        hold = None
+        taken = 0
+        line = []
+        for byte in self.moves(pieces, use_hold):
+            move = decode_move(byte)
+            if move is None:
+                break
+            rotation, x, hold_used = move
+            before = (rows, hold, pieces[taken] if taken < BAG_SIZE else None)
+            if not hold_used:
+                piece_type, taken = pieces[taken], taken + 1
+            elif hold is None:
+                piece_type, hold, taken = pieces[taken + 1], pieces[taken], taken + 2
+            elif taken < BAG_SIZE:
+                piece_type, hold, taken = hold, pieces[taken], taken + 1
+            else:
+                piece_type, hold = hold, None
+            found = None
+            for rot, px_x, y, cells, px in enumerate_placements(rows, self.width, self.height,
+                                                                piece_type):
+                if rot == rotation and px_x == x:
+                    found = (y, cells, px)
+                    break
+            if found is None:
+                break
+            y, cells, px = found
+            blocks = [(px + j, y + i) for i, bits in cells
+                      for j in range(bits.bit_length()) if bits >> j & 1]
+            line.append(before + (piece_type, move, blocks))
+            rows, _ = place(rows, self.width, cells, px, y)
+        self._line_key, self._line = key, line
+        return line
+
+    def probe(self, game_state, use_hold=True):
+        """
+        Bước sách khớp với trạng thái game hiện tại.
+
+        Thử dòng có giữ trước (nếu use_hold) rồi dòng không giữ; một dòng
+        khớp nếu bảng và ô giữ giống hệt bảng dự kiến ở bước đó. Nếu người
+        chơi đã giữ mảnh này (can_hold = False), chỉ nước có giữ mới khớp, và ô
+        giữ phải là mảnh hiện tại trước nước đi (số bước không đổi khi giữ).
+
+        Returns:
+            Bộ của expected_line cho bước hiện tại, hoặc None (hết sách / đi lệch)
+        """
+        if (game_state.width, game_state.height) != (self.width, self.height):
+            return None
+        bag = game_state.bag_randomizer
+        held = game_state.held_piece_type
+        step = bag.drawn - 1 - (held is not None)
+        if not 0 <= step < BAG_SIZE:
+            return None
+        pieces = first_bag(bag)
+        rows = None
+        for mode in ((True, False) if use_hold else (False,)):
+            line = self.expected_line(pieces, mode)
+            if step >= len(line):
+                continue
+            expected = line[step]
+            if game_state.can_hold:
+                if expected[1] != held:
+                    continue
+            elif not expected[4][2] or expected[2] not in (None, held):
+                continue
+            if rows is None:
+                rows = board_rows(game_state.grid)
+            if rows == expected[0]:
+                return expected
+        return None
+
+    def lookup(self, game_state, use_hold=True):
+        """Nước sách cho mảnh hiện tại: (rotation, x, use_hold) như Bot.choose, hoặc None"""
+        expected = self.probe(game_state, use_hold)
+        if expected is None:
+            return None
+        rotation, x, hold_used = expected[4]
+        return rotation, x, hold_used and game_state.can_hold
+
+    def hint(self, game_state, use_hold=True):
+        """Gợi ý cho người chơi: (loại mảnh, các ô (x, y)), hoặc None"""
+        expected = self.probe(game_state, use_hold)
+        return (expected[3], expected[5]) if expected is not None else None
+
+
+def load_book(path=OPENING_BOOK_FILE):
+    """Sách khai cuộc dùng chung theo đường dẫn (mở một lần), hoặc None nếu chưa tạo"""
+    book = _books.get(path)
+    if book is None and os.path.exists(path):
+        book = _books[path] = OpeningBook(path)
+    return book
+
+
+def main(argv=None):
+    """Điểm khởi đầu dòng lệnh"""
+    parser = argparse.ArgumentParser(description="Sách khai cuộc cho túi 7 mảnh đầu tiên")
+    commands = parser.add_subparsers(dest='command', required=True)
+
+    build = commands.add_parser('build', help="Tính và ghi sách")
+    build.add_argument('--output', default=OPENING_BOOK_FILE)
+    build.add_argument('--beam', type=int, default=OPENING_BEAM_WIDTH, help="Độ rộng beam")
+    build.add_argument('--workers', type=int, default=None, help="Số tiến trình")
+
+    show = commands.add_parser('show', help="In dòng sách của một túi đầu")
+    show.add_argument('pieces', help="7 mảnh theo thứ tự rút, ví dụ IOTLJSZ")
+    show.add_argument('--hold', action='store_true', help="Dòng có dùng ô giữ")
+    show.add_argument('--book', default=OPENING_BOOK_FILE)
+
+    args = parser.parse_args(argv)
+
+    if args.command == 'build':
+        started = time.perf_counter()
+        count = build_book(args.output, beam_width=args.beam, workers=args.workers)
+        print("%d dòng -> %s (%d byte) trong %.1fs"
+              % (count, args.output, os.path.getsize(args.output), time.perf_counter() - started))
+        return
+
+    pieces = tuple(args.pieces.upper())
+    if sorted(pieces) != sorted(_PIECES):
+        parser.error("Cần đúng 7 mảnh khác nhau")
+    with OpeningBook(args.book) as book:
+        line = book.expected_line(pieces, args.hold)
+        for _, _, _, piece_type, (rotation, x, hold_used), _ in line:
+            print("%s xoay %d cột %d%s" % (piece_type, rotation, x, " (giữ)" if hold_used else ""))
+        if not line:
+            return
+        rows = list(line[-1][0])
+        for bx, by in line[-1][5]:
+            rows[by] |= 1 << bx
+        full = (1 << book.width) - 1
+        for row in rows:
+            if row == full:
+                continue
+            if row:
+                print(''.join('X' if row >> x & 1 else '.' for x in range(book.width)))
+
+
+if __name__ == "__main__":
+    main(sys.argv[1:])
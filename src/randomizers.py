@@ -0,0 +1,349 @@
+"""
+Bộ Sinh Chuỗi Mảnh Hàng loạt (Nhiều Kiểu Ngẫu nhiên)
+
+BagRandomizer của game lấy từng mảnh một và phải giữ nguyên chuỗi của mỗi
+seed (replay phụ thuộc vào nó). Mô phỏng (bot, tuner, thống kê) lại cần
+hàng triệu mảnh: module này sinh chuỗi mảnh theo từng khối dưới dạng mảng
+NumPy uint8 (id mảnh 1-7, như trong Board), bằng các phép tính trên cả
+khối thay vì một lần gọi Python mỗi mảnh.
+
+Các kiểu ngẫu nhiên (RANDOMIZERS):
+- 7bag:   túi 7 mảnh, mỗi túi một hoán vị (như game)
+- 14bag:  túi 14 mảnh, mỗi loại hai lần
+- random: mỗi mảnh độc lập, đều 1/7
+- tgm:    kiểu TGM: nhớ 4 mảnh gần nhất, rút lại tối đa `rolls` lần nếu
+          mảnh rút được nằm trong lịch sử; mảnh đầu không là S, Z, O
+
+Mọi số ngẫu nhiên được suy ra từ Generator.random() của NumPy (dãy số thực
+không phụ thuộc cách chia lần gọi), nên cùng seed cho cùng chuỗi bất kể
+kích thước khối. chunks() sinh một chuỗi vô hạn (hoặc `total` mảnh) theo
+từng khối: bộ nhớ chỉ tốn một khối cộng phần dư của túi cuối.
+
+check_randomizer kiểm tra chuỗi sinh ra có đúng phân phối của nó:
+tần suất (chi bình phương), nội dung và vị trí trong túi, cặp mảnh liên
+tiếp (ngẫu nhiên thuần), và tỉ lệ mảnh trùng lịch sử (TGM, xác suất đúng
+là (h/7)^rolls với h là số loại mảnh khác nhau trong lịch sử).
+
+Cách dùng:
+    python src/randomizers.py check --count 2000000
+    python src/randomizers.py bench
+    python src/randomizers.py dump tgm --seed 1 --count 100000000 --output pieces.u8
+"""
+
+import argparse
+import math
+import random
+import sys
+import time
+import numpy as np
+from config import *
+from tetromino import PIECE_TYPES, PIECE_IDS
+
+PIECE_COUNT = len(PIECE_TYPES)
+PIECE_ARRAY = np.arange(1, PIECE_COUNT + 1, dtype=np.uint8)
+
+
+def to_types(pieces):
+    """Chuyển mảng id mảnh thành chuỗi loại mảnh, ví dụ 'IOTLJSZ'"""
+    return ''.join(PIECE_TYPES[i - 1] for i in pieces)
+
+
+def _uniform_ids(rng, shape):
+    """Id mảnh đều 1-7 suy ra từ Generator.random (không phụ thuộc cách chia khối)"""
+    return (rng.random(shape) * PIECE_COUNT).astype(np.uint8) + 1
+
+
+class Randomizer:
+    """
+    Lớp cơ sở: sinh chuỗi mảnh theo khối.
+
+    Lớp con cài đặt _produce(count), trả về ít nhất `count` mảnh tiếp theo
+    (có thể nhiều hơn, ví dụ trọn túi); phần dư được giữ lại cho lần sau.
+
+    Thuộc tính:
+        seed: Seed của chuỗi
+        produced: Số mảnh đã trả ra
+    """
+
+    name = None
+
+    def __init__(self, seed=None):
+        if seed is None:
+            seed = random.randrange(1 << 32)
+        self.seed = seed
+        self.rng = np.random.default_rng(seed)
+        self.leftover = np.empty(0, dtype=np.uint8)
+        self.produced = 0
+
+    def _produce(self, count):
+        raise NotImplementedError
+
+    def generate(self, count):
+        """`count` mảnh tiếp theo (mảng uint8)"""
+        pieces = self.leftover
+        if len(pieces) < count:
+            pieces = np.concatenate((pieces, self._produce(count - len(pieces))))
+        self.leftover = pieces[count:].copy()
+        self.produced += count
+        return pieces[:count]
+
+    def chunks(self, chunk_size=RANDOMIZER_CHUNK_SIZE, total=None):
+        """
+        Sinh chuỗi theo khối.
+
+        Args:
+            total: Tổng số mảnh (None = vô hạn)
+
+        Yields:
+            Mảng uint8 dài chunk_size (khối cuối có thể ngắn hơn)
+        """
+        remaining = total
+        while remaining is None or remaining > 0:
+            count = chunk_size if remaining is None else min(chunk_size, remaining)
+            yield self.generate(count)
+            if remaining is not None:
+                remaining -= count
+
+
+class SevenBagRandomizer(Randomizer):
+    """Túi 7 mảnh: mỗi túi là một hoán vị đều (sắp xếp theo khóa ngẫu nhiên)"""
+
+    name = '7bag'
+    bag_size = 7
+
+    def _produce(self, count):
+        bags = -(-count // self.bag_size)
+        contents = np.tile(PIECE_ARRAY, self.bag_size // PIECE_COUNT)
+        order = np.argsort(self.rng.random((bags, self.bag_size)), axis=1)
+        return contents[order].ravel()
+
+
+class FourteenBagRandomizer(SevenBagRandomizer):
+    """Túi 14 mảnh: mỗi loại hai lần trong mỗi túi"""
+
+    name = '14bag'
+    bag_size = 14
+
+
+class PureRandomizer(Randomizer):
+    """Mỗi mảnh độc lập, đều trên 7 loại"""
+
+    name = 'random'
+
+    def _produce(self, count):
+        return _uniform_ids(self.rng, count)
+
+
+class TGMRandomizer(Randomizer):
+    """
+    Kiểu TGM: lịch sử `history_size` mảnh gần nhất; mỗi mảnh được rút tối đa
+    `rolls` lần, dừng ở lần đầu không nằm trong lịch sử (nếu hết lượt, lấy
+    lần rút cuối). Mảnh đầu tiên được rút trong các loại không phải S, Z, O.
+
+    Các lần rút được sinh cả khối một lần; chỉ việc chọn (phụ thuộc lịch sử)
+    chạy theo từng mảnh.
+    """
+
+    name = 'tgm'
+
+    def __init__(self, seed=None, rolls=TGM_ROLLS, history=TGM_INITIAL_HISTORY):
+        super().__init__(seed)
+        self.rolls = rolls
+        self.history = [PIECE_IDS[piece_type] for piece_type in history]
+        # Rút mảnh đầu trước mọi lượt rút khác, để mảnh thứ i luôn dùng hàng
+        # lượt rút thứ i của dãy số (không phụ thuộc kích thước khối)
+        starters = [PIECE_IDS[t] for t in PIECE_TYPES if t not in ('S', 'Z', 'O')]
+        self.first_piece = starters[int(self.rng.random() * len(starters))]
+        self.first = True
+
+    def _produce(self, count):
+        draws = _uniform_ids(self.rng, (count, self.rolls)).tolist()
+        history = self.history
+        out = np.empty(count, dtype=np.uint8)
+        start = 0
+        if self.first:
+            out[0] = self.first_piece
+            history.pop(0)
+            history.append(self.first_piece)
+            self.first = False
+            start = 1
+        for i in range(start, count):
+            rolls = draws[i]
+            for piece in rolls:
+                if piece not in history:
+                    break
+            out[i] = piece
+            history.pop(0)
+            history.append(piece)
+        return out
+
+
+RANDOMIZERS = {cls.name: cls for cls in (SevenBagRandomizer, FourteenBagRandomizer,
+                                         PureRandomizer, TGMRandomizer)}
+
+
+def make_randomizer(name, seed=None):
+    """Tạo bộ sinh theo tên trong RANDOMIZERS"""
+    try:
+        return RANDOMIZERS[name](seed)
+    except KeyError:
+        raise ValueError("Không có kiểu ngẫu nhiên '%s' (có: %s)"
+                         % (name, ', '.join(sorted(RANDOMIZERS)))) from None
+
+
+# ---------------------------------------------------------------------------
+# Kiểm tra phân phối
+# ---------------------------------------------------------------------------
+
+def chi_square_z(observed, expected):
+    """
+    Chi bình phương của các ô đếm, đổi sang điểm z (xấp xỉ Wilson-Hilferty).
+
+    Returns:
+        (chi bình phương, bậc tự do, z)
+    """
+    observed = np.asarray(observed, dtype=np.float64).ravel()
+    expected = np.asarray(expected, dtype=np.float64).ravel()
+    chi2 = float(((observed - expected) ** 2 / expected).sum())
+    k = len(observed) - 1
+    z = ((chi2 / k) ** (1.0 / 3) - (1 - 2.0 / (9 * k))) / math.sqrt(2.0 / (9 * k))
+    return chi2, k, z
+
+
+def check_randomizer(randomizer, count=RANDOMIZER_CHECK_COUNT, chunk_size=RANDOMIZER_CHUNK_SIZE):
+    """
+    Kiểm tra `count` mảnh đầu của một bộ sinh mới (đọc theo khối, bộ nhớ cố định).
+
+    Returns:
+        Danh sách (tên phép thử, mô tả, z, đạt). Phép thử chi bình phương đạt
+        khi z < RANDOMIZER_CHECK_Z (chỉ lệch quá xa mới sai: túi cho tần suất
+        đều tuyệt đối, z rất âm là đúng); phép thử lịch sử TGM đạt khi
+        |z| < RANDOMIZER_CHECK_Z; phép thử đúng/sai có z = 0 hoặc vô cùng
+    """
+    bag_size = getattr(randomizer, 'bag_size', None)
+    if bag_size:
+        # Khối là bội của túi để mỗi túi nằm gọn trong một khối
+        chunk_size = max(bag_size, chunk_size // bag_size * bag_size)
+        count = count // bag_size * bag_size
+    frequency = np.zeros(PIECE_COUNT, dtype=np.int64)
+    pairs = np.zeros((PIECE_COUNT, PIECE_COUNT), dtype=np.int64)
+    positions = np.zeros((bag_size or 1, PIECE_COUNT), dtype=np.int64)
+    bad_bags = 0
+    previous = None
+    history_hits = 0
+    history_expected = 0.0
+    history_variance = 0.0
+    is_tgm = isinstance(randomizer, TGMRandomizer)
+    if is_tgm:
+        history = list(randomizer.history)
+        first = randomizer.first
+
+    for chunk in randomizer.chunks(chunk_size, count):
+        ids = chunk.astype(np.intp) - 1
+        frequency += np.bincount(ids, minlength=PIECE_COUNT)
+        if previous is not None:
+            pairs[previous, ids[0]] += 1
+        pairs += np.bincount(ids[:-1] * PIECE_COUNT + ids[1:],
+                             minlength=PIECE_COUNT ** 2).reshape(PIECE_COUNT, PIECE_COUNT)
+        previous = ids[-1]
+        if bag_size:
+            bags = ids.reshape(-1, bag_size)
+            per_bag = np.stack([(bags == piece).sum(axis=1) for piece in range(PIECE_COUNT)], axis=1)
+            bad_bags += int((per_bag != bag_size // PIECE_COUNT).any(axis=1).sum())
+            slots = np.tile(np.arange(bag_size), len(bags))
+            positions += np.bincount(slots * PIECE_COUNT + ids,
+                                     minlength=bag_size * PIECE_COUNT).reshape(bag_size, PIECE_COUNT)
+        if is_tgm:
+            rolls = randomizer.rolls
+            for piece in chunk.tolist():
+                if first:
+                    first = False
+                else:
+                    p = (len(set(history)) / PIECE_COUNT) ** rolls
+                    history_expected += p
+                    history_variance += p * (1 - p)
+                    history_hits += piece in history
+                history.pop(0)
+                history.append(piece)
+
+    results = []
+
+    def chi_square_test(name, observed, expected):
+        chi2, k, z = chi_square_z(observed, expected)
+        results.append((name, "chi2 = %.1f (bậc %d)" % (chi2, k), z, z < RANDOMIZER_CHECK_Z))
+
+    chi_square_test('tần suất', frequency, np.full(PIECE_COUNT, count / PIECE_COUNT))
+    if bag_size:
+        results.append(('nội dung túi', "%d túi sai" % bad_bags,
+                        0.0 if not bad_bags else math.inf, not bad_bags))
+        chi_square_test('vị trí trong túi', positions,
+                        np.full(positions.shape, count / bag_size / PIECE_COUNT))
+    elif is_tgm:
+        z = (history_hits - history_expected) / math.sqrt(history_variance) if history_variance else 0.0
+        results.append(('trùng lịch sử', "%d lần, kỳ vọng %.1f" % (history_hits, history_expected),
+                        z, abs(z) < RANDOMIZER_CHECK_Z))
+    else:
+        chi_square_test('cặp liên tiếp', pairs, np.full(pairs.shape, (count - 1) / PIECE_COUNT ** 2))
+    return results
+
+
+def benchmark(count=10000000):
+    """Tốc độ sinh của mỗi kiểu (mảnh mỗi giây), so với BagRandomizer của game"""
+    from tetromino import BagRandomizer
+    bag = BagRandomizer(0)
+    small = count // 100
+    started = time.perf_counter()
+    for _ in range(small):
+        bag.next()
+    rate = small / (time.perf_counter() - started)
+    print("%-14s %8.2f triệu mảnh/giây" % ('BagRandomizer', rate / 1e6))
+    for name in sorted(RANDOMIZERS):
+        randomizer = make_randomizer(name, 0)
+        n = count if name != 'tgm' else count // 10
+        started = time.perf_counter()
+        for _ in randomizer.chunks(total=n):
+            pass
+        rate = n / (time.perf_counter() - started)
+        print("%-14s %8.2f triệu mảnh/giây" % (name, rate / 1e6))
+
+
+def main(argv=None):
+    """Điểm khởi đầu dòng lệnh"""
+    parser = argparse.ArgumentParser(description="Sinh và kiểm tra chuỗi mảnh")
+    commands = parser.add_subparsers(dest='command', required=True)
+
+    check = commands.add_parser('check', help="Kiểm tra phân phối của mọi kiểu")
+    check.add_argument('--count', type=int, default=RANDOMIZER_CHECK_COUNT)
+    check.add_argument('--seed', type=int, default=0)
+
+    bench = commands.add_parser('bench', help="Đo tốc độ sinh")
+    bench.add_argument('--count', type=int, default=10000000)
+
+    dump = commands.add_parser('dump', help="Ghi chuỗi ra file nhị phân (1 byte mỗi mảnh)")
+    dump.add_argument('name', choices=sorted(RANDOMIZERS))
+    dump.add_argument('--seed', type=int, default=None)
+    dump.add_argument('--count', type=int, required=True)
+    dump.add_argument('--output', required=True)
+
+    args = parser.parse_args(argv)
+
+    if args.command == 'bench':
+        benchmark(args.count)
+    elif args.command == 'dump':
+        randomizer = make_randomizer(args.name, args.seed)
+        with open(args.output, 'wb') as f:
+            for chunk in randomizer.chunks(total=args.count):
+                f.write(chunk.tobytes())
+        print("%d mảnh (seed %d) -> %s" % (args.count, randomizer.seed, args.output))
+    else:
+        failed = 0
+        for name in sorted(RANDOMIZERS):
+            for test, detail, z, passed in check_randomizer(make_randomizer(name, args.seed), args.count):
+                failed += not passed
+                print("%-7s %-17s %-28s z = %6.2f  %s"
+                      % (name, test, detail, z, 'đạt' if passed else 'KHÔNG ĐẠT'))
+        sys.exit(1 if failed else 0)
+
+
+if __name__ == "__main__":
+    main(sys.argv[1:])
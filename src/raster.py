@@ -0,0 +1,162 @@
+"""
+Vẽ Bảng bằng NumPy (surfarray)
+
+Thay vì duyệt từng ô và gọi pygame.draw.rect tới 400 lần cho bảng 10x20,
+bảng (mảng id ô từ Board.as_array) được biến thành điểm ảnh bằng một phép
+tra bảng NumPy: mỗi id có một ô mẫu (tile) block_size x block_size, và
+tiles[board] phóng to mỗi ô thành một khối điểm ảnh. Kết quả được ghi vào
+một Surface bằng pygame.surfarray.blit_array rồi blit một lần.
+
+Ô mẫu mặc định được vẽ bằng đúng các lệnh của TetrisGame.draw_grid và
+draw_locked_pieces (nền + viền lưới, hoặc khối màu + viền trắng), nên ảnh
+giống từng điểm ảnh với cách vẽ từng ô. Có thể thay ô mẫu của một id bằng
+texture bất kỳ (set_texture).
+
+Surface được giữ lại giữa các khung; nếu bảng không đổi thì không vẽ lại.
+Chi phí gần như không phụ thuộc số ô, nên có lợi nhất cho bảng lớn và
+màn hình nhiều bảng.
+
+Đo:  python src/raster.py
+"""
+
+import os
+import time
+import numpy as np
+import pygame
+from config import *
+from tetromino import CELL_COLORS, CELL_EMPTY
+
+
+def make_tile(block_size, color):
+    """
+    Ô mẫu của một id, vẽ giống draw_grid + draw_locked_pieces.
+
+    Args:
+        color: Màu khối, hoặc None cho ô trống
+    """
+    tile = pygame.Surface((block_size, block_size))
+    tile.fill(COLOR_BACKGROUND)
+    pygame.draw.rect(tile, COLOR_GRID, (0, 0, block_size, block_size), 1)
+    if color is not None:
+        pygame.draw.rect(tile, color, (1, 1, block_size - 2, block_size - 2))
+        pygame.draw.rect(tile, COLOR_WHITE, (0, 0, block_size, block_size), 2)
+    return tile
+
+
+class BoardRasterizer:
+    """
+    Biến bảng id ô thành Surface bằng một phép tra bảng NumPy.
+
+    Thuộc tính:
+        block_size: Cạnh mỗi ô (điểm ảnh)
+        tiles: Mảng (số id, block_size, block_size, 3) uint8, theo trục (x, y)
+               như pygame.surfarray
+    """
+
+    def __init__(self, block_size=BLOCK_SIZE, colors=CELL_COLORS):
+        self.block_size = block_size
+        self.tiles = np.stack([pygame.surfarray.array3d(make_tile(block_size, color))
+                               for color in colors])
+        self.surface = None
+        self.cache_key = None
+
+    def set_texture(self, cell_id, texture):
+        """Dùng một Surface bất kỳ (được co giãn) làm ô mẫu cho một id"""
+        scaled = pygame.transform.smoothscale(texture, (self.block_size, self.block_size))
+        self.tiles[cell_id] = pygame.surfarray.array3d(scaled)
+        self.cache_key = None
+
+    def rasterize(self, cells):
+        """
+        Args:
+            cells: Mảng (height, width) id ô
+
+        Returns:
+            Mảng (width * block_size, height * block_size, 3) uint8
+        """
+        height, width = cells.shape
+        size = self.block_size
+        # (h, w, bx, by, 3) -> (w, bx, h, by, 3): trục x trước như surfarray
+        blocks = self.tiles[cells]
+        return blocks.transpose(1, 2, 0, 3, 4).reshape(width * size, height * size, 3)
+
+    def render(self, board, hidden_rows=()):
+        """
+        Vẽ một Board (chỉ khi nó thay đổi từ lần trước).
+
+        Args:
+            board: Board (hoặc mảng (height, width) id ô)
+            hidden_rows: Các hàng vẽ như trống (ví dụ hàng đang trong hoạt ảnh xóa)
+
+        Returns:
+            Surface của bảng (được dùng lại giữa các lần gọi)
+        """
+        if isinstance(board, np.ndarray):
+            cells = board
+            key = (cells.tobytes(), tuple(hidden_rows))
+        else:
+            cells = board.as_array()
+            key = (board.to_bytes(), tuple(hidden_rows))
+        if key == self.cache_key and self.surface is not None:
+            return self.surface
+
+        if hidden_rows:
+            cells = cells.copy()
+            cells[list(hidden_rows)] = CELL_EMPTY
+        height, width = cells.shape
+        size = (width * self.block_size, height * self.block_size)
+        if self.surface is None or self.surface.get_size() != size:
+            self.surface = pygame.Surface(size)
+        pygame.surfarray.blit_array(self.surface, self.rasterize(cells))
+        self.cache_key = key
+        return self.surface
+
+
+def draw_cells(surface, cells, block_size):
+    """Cách vẽ cũ (từng ô một) để so sánh"""
+    height, width = cells.shape
+    for y in range(height):
+        for x in range(width):
+            rect = (x * block_size, y * block_size, block_size, block_size)
+            pygame.draw.rect(surface, COLOR_GRID, rect, 1)
+    for y in range(height):
+        row = cells[y]
+        for x in range(width):
+            color = CELL_COLORS[row[x]]
+            if color is not None:
+                px, py = x * block_size, y * block_size
+                pygame.draw.rect(surface, color, (px + 1, py + 1, block_size - 2, block_size - 2))
+                pygame.draw.rect(surface, COLOR_WHITE, (px, py, block_size, block_size), 2)
+
+
+def benchmark(sizes=((10, 20, 30), (40, 100, 8), (100, 400, 2)), frames=50):
+    """So sánh vẽ từng ô với rasterizer trên bảng ngẫu nhiên (mỗi khung một bảng mới)"""
+    rng = np.random.default_rng(0)
+    for width, height, block_size in sizes:
+        boards = [rng.integers(0, len(CELL_COLORS), (height, width), dtype=np.uint8)
+                  for _ in range(frames)]
+        surface = pygame.Surface((width * block_size, height * block_size))
+        rasterizer = BoardRasterizer(block_size)
+
+        started = time.perf_counter()
+        for cells in boards:
+            surface.fill(COLOR_BACKGROUND)
+            draw_cells(surface, cells, block_size)
+        per_cell = (time.perf_counter() - started) / frames
+        reference = pygame.surfarray.array3d(surface)
+
+        started = time.perf_counter()
+        for cells in boards:
+            surface.blit(rasterizer.render(cells), (0, 0))
+        raster = (time.perf_counter() - started) / frames
+
+        same = np.array_equal(reference, pygame.surfarray.array3d(surface))
+        print("%3dx%-4d ô %2dpx: từng ô %.2f ms, raster %.2f ms (x%.1f), giống nhau: %s"
+              % (width, height, block_size, per_cell * 1e3, raster * 1e3,
+                 per_cell / raster, same))
+
+
+if __name__ == "__main__":
+    os.environ.setdefault('SDL_VIDEODRIVER', 'dummy')
+    pygame.init()
+    benchmark()
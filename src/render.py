@@ -0,0 +1,174 @@
+"""
+Render Replay Ngoài Màn hình (Offscreen)
+
+Biến một replay đã lưu thành chuỗi ảnh (PNG hoặc RGB thô) mà không cần
+cửa sổ: dùng driver video "dummy" của SDL và vẽ lên một pygame.Surface
+bằng chính các hàm TetrisGame.draw_* của game.
+
+Khoảng khung cần render được chia thành nhiều đoạn liên tiếp và giao cho
+một nhóm tiến trình (process pool). Mỗi tiến trình tự mô phỏng nhanh
+(không vẽ) tới đầu đoạn của mình rồi render và ghi ảnh trực tiếp ra đĩa.
+
+Cách dùng:
+    python src/render.py replays/game.json out_frames --workers 8
+    python src/render.py replays/game.json out_frames --format raw --step 2
+
+Ảnh RGB thô có thể ghép thành video bằng ffmpeg, ví dụ:
+    cat out_frames/*.rgb | ffmpeg -f rawvideo -pix_fmt rgb24 -s 800x650 -r 60 -i - game.mp4
+"""
+
+import argparse
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+# Driver "dummy" phải được đặt trước khi pygame khởi tạo video
+os.environ.setdefault('SDL_VIDEODRIVER', 'dummy')
+os.environ.setdefault('SDL_AUDIODRIVER', 'dummy')
+
+import pygame
+from config import *
+from replay import Replay, ReplayPlayer
+
+FORMAT_PNG = 'png'
+FORMAT_RAW = 'raw'
+
+
+class OffscreenRenderer:
+    """
+    Vẽ GameState lên một Surface ngoài màn hình bằng các hàm vẽ của TetrisGame.
+    """
+
+    def __init__(self):
+        # Nhập ở đây để main.py không phải là phụ thuộc khi chỉ cần Replay
+        from main import TetrisGame
+        self.surface = pygame.Surface((SCREEN_WIDTH, SCREEN_HEIGHT))
+        self.game = TetrisGame(screen=self.surface)
+        self.game.recorder = None  # Không ghi replay khi render
+
+    def render(self, game_state):
+        """
+        Vẽ một trạng thái game.
+
+        Returns:
+            Surface chứa khung hình (được dùng lại giữa các lần gọi)
+        """
+        self.game.game_state = game_state
+        self.game.draw()
+        return self.surface
+
+    def save(self, path, fmt):
+        """Ghi khung hình vừa vẽ ra file PNG hoặc RGB thô"""
+        if fmt == FORMAT_PNG:
+            pygame.image.save(self.surface, path)
+        else:
+            with open(path, 'wb') as f:
+                f.write(pygame.image.tostring(self.surface, 'RGB'))
+
+
+def frame_path(out_dir, frame, fmt):
+    """Đường dẫn file cho một khung (đánh số để sắp xếp đúng thứ tự)"""
+    extension = 'png' if fmt == FORMAT_PNG else 'rgb'
+    return os.path.join(out_dir, 'frame_%06d.%s' % (frame, extension))
+
+
+def render_chunk(replay_path, start, stop, step, out_dir, fmt):
+    """
+    Render các khung [start, stop) của một replay (chạy trong tiến trình con).
+
+    Khung thứ i là trạng thái ngay sau khi áp dụng i khung của replay.
+
+    Returns:
+        Số ảnh đã ghi
+    """
+    replay = Replay.load(replay_path)
+    player = ReplayPlayer(replay)
+    renderer = OffscreenRenderer()
+
+    written = 0
+    for frame in range(start, stop, step):
+        player.seek(frame)
+        renderer.render(player.game_state)
+        renderer.save(frame_path(out_dir, frame, fmt), fmt)
+        written += 1
+    return written
+
+
+def split_range(start, stop, step, chunks):
+    """
+    Chia khoảng khung thành tối đa `chunks` đoạn liên tiếp.
+
+    Mỗi đoạn bắt đầu ở một khung thuộc lưới bước (start + k * step).
+    """
+    frames = len(range(start, stop, step))
+    chunks = max(1, min(chunks, frames))
+    per_chunk = (frames + chunks - 1) // chunks
+    ranges = []
+    for i in range(0, frames, per_chunk):
+        chunk_start = start + i * step
+        chunk_stop = min(stop, start + (i + per_chunk) * step)
+        ranges.append((chunk_start, chunk_stop))
+    return ranges
+
+
+def render_replay(replay_path, out_dir, workers=None, fmt=FORMAT_PNG,
+                  start=0, stop=None, step=1):
+    """
+    Render một replay thành chuỗi ảnh, chia việc cho nhiều tiến trình.
+
+    Args:
+        replay_path: File replay (JSON)
+        out_dir: Thư mục ghi ảnh
+        workers: Số tiến trình (None = số lõi CPU)
+        fmt: 'png' hoặc 'raw'
+        start, stop, step: Khoảng khung cần render (stop=None là hết replay)
+
+    Returns:
+        Số ảnh đã ghi
+    """
+    if fmt not in (FORMAT_PNG, FORMAT_RAW):
+        raise ValueError("Định dạng không hợp lệ: %r" % (fmt,))
+
+    replay = Replay.load(replay_path)
+    if stop is None or stop > len(replay) + 1:
+        stop = len(replay) + 1
+    os.makedirs(out_dir, exist_ok=True)
+
+    workers = workers or os.cpu_count() or 1
+    # Nhiều đoạn hơn số tiến trình để cân bằng tải (đoạn sau tốn thêm thời gian mô phỏng)
+    ranges = split_range(start, stop, step, workers * 2)
+
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        futures = [pool.submit(render_chunk, replay_path, chunk_start, chunk_stop,
+                               step, out_dir, fmt)
+                   for chunk_start, chunk_stop in ranges]
+        return sum(future.result() for future in futures)
+
+
+def main(argv=None):
+    """Điểm khởi đầu dòng lệnh"""
+    parser = argparse.ArgumentParser(description="Render replay Tetris thành chuỗi ảnh")
+    parser.add_argument('replay', help="File replay (JSON)")
+    parser.add_argument('out_dir', help="Thư mục ghi ảnh")
+    parser.add_argument('--workers', type=int, default=None, help="Số tiến trình")
+    parser.add_argument('--format', choices=[FORMAT_PNG, FORMAT_RAW], default=FORMAT_PNG)
+    parser.add_argument('--start', type=int, default=0)
+    parser.add_argument('--stop', type=int, default=None)
+    parser.add_argument('--step', type=int, default=1, help="Chỉ render mỗi N khung")
+    args = parser.parse_args(argv)
+
+    started = time.perf_counter()
+    written = render_replay(args.replay, args.out_dir, args.workers, args.format,
+                            args.start, args.stop, args.step)
+    elapsed = time.perf_counter() - started
+
+    # Thời lượng game tương ứng với khoảng khung đã render
+    frames = Replay.load(args.replay).frames[args.start:args.stop]
+    duration = sum(frame[0] for frame in frames) / 1000.0
+    print("Đã render %d khung trong %.1fs (đoạn game dài %.1fs, nhanh gấp %.1f lần thời gian thực)"
+          % (written, elapsed, duration, duration / elapsed if elapsed else 0.0))
+
+
+if __name__ == "__main__":
+    main(sys.argv[1:])
@@ -0,0 +1,194 @@
+"""
+Ghi và Phát lại Game (Replay)
+
+Vì GameState hoàn toàn tất định khi biết seed, một replay chỉ cần lưu:
+- Seed của chuỗi mảnh
+- Với mỗi khung hình: thời gian khung (ms), phím rơi chậm có được giữ không,
+  và danh sách hành động đã áp dụng trong khung đó
+
+Phát lại = tạo GameState với cùng seed rồi áp dụng lại từng khung
+theo đúng thứ tự mà TetrisGame.run đã làm: hành động trước, update sau.
+"""
+
+import json
+import os
+import time
+from config import *
+from game import GameState
+
+
+# Mã hành động (1 byte mỗi hành động khi lưu nhị phân)
+ACTION_LEFT = 1
+ACTION_RIGHT = 2
+ACTION_ROTATE_CW = 3
+ACTION_ROTATE_CCW = 4
+ACTION_HARD_DROP = 5
+ACTION_HOLD = 6
+ACTION_LEFT_REPEAT = 7    # Di chuyển trái do tự động lặp (DAS/ARR), không phải nhấn phím
+ACTION_RIGHT_REPEAT = 8   # Di chuyển phải do tự động lặp (DAS/ARR)
+
+ALL_ACTIONS = (ACTION_LEFT, ACTION_RIGHT, ACTION_ROTATE_CW, ACTION_ROTATE_CCW,
+               ACTION_HARD_DROP, ACTION_HOLD, ACTION_LEFT_REPEAT, ACTION_RIGHT_REPEAT)
+
+
+def apply_action(game_state, action):
+    """
+    Áp dụng một hành động lên GameState.
+
+    Args:
+        game_state: GameState cần thay đổi
+        action: Một trong các hằng số ACTION_*
+    """
+    if action == ACTION_LEFT or action == ACTION_LEFT_REPEAT:
+        game_state.move_left()
+    elif action == ACTION_RIGHT or action == ACTION_RIGHT_REPEAT:
+        game_state.move_right()
+    elif action == ACTION_ROTATE_CW:
+        game_state.rotate_clockwise()
+    elif action == ACTION_ROTATE_CCW:
+        game_state.rotate_counterclockwise()
+    elif action == ACTION_HARD_DROP:
+        game_state.hard_drop()
+    elif action == ACTION_HOLD:
+        game_state.hold_piece()
+    else:
+        raise ValueError("Hành động không hợp lệ: %r" % (action,))
+
+
+class Replay:
+    """
+    Dữ liệu của một game đã chơi.
+
+    Thuộc tính:
+        seed: Seed của chuỗi mảnh
+        frames: Danh sách (dt_ms, soft_drop, actions) cho mỗi khung hình
+        score: Điểm cuối cùng được ghi nhận
+        practice: Game đã bị tua lùi ở chế độ luyện tập (không dùng để nộp điểm)
+    """
+
+    def __init__(self, seed, frames=None, score=0, practice=False):
+        self.seed = seed
+        self.frames = frames if frames is not None else []
+        self.score = score
+        self.practice = practice
+
+    def __len__(self):
+        return len(self.frames)
+
+    @property
+    def duration(self):
+        """Tổng thời lượng replay tính bằng giây"""
+        return sum(frame[0] for frame in self.frames) / 1000.0
+
+    def to_dict(self):
+        """Chuyển thành dict để lưu JSON"""
+        data = {
+            'seed': self.seed,
+            'score': self.score,
+            'frames': [[dt_ms, int(soft_drop), list(actions)]
+                       for dt_ms, soft_drop, actions in self.frames],
+        }
+        if self.practice:
+            data['practice'] = True
+        return data
+
+    @classmethod
+    def from_dict(cls, data):
+        """Tạo Replay từ dict đã đọc từ JSON"""
+        frames = [(dt_ms, bool(soft_drop), tuple(actions))
+                  for dt_ms, soft_drop, actions in data['frames']]
+        return cls(data['seed'], frames, data.get('score', 0), bool(data.get('practice')))
+
+    def save(self, path):
+        """Lưu replay ra file JSON"""
+        with open(path, 'w') as f:
+            json.dump(self.to_dict(), f, separators=(',', ':'))
+
+    @classmethod
+    def load(cls, path):
+        """Đọc replay từ file JSON"""
+        with open(path, 'r') as f:
+            return cls.from_dict(json.load(f))
+
+
+class ReplayRecorder:
+    """
+    Ghi lại đầu vào của một game đang chơi.
+
+    Cách dùng trong vòng lặp game:
+        recorder.record_action(ACTION_LEFT)   # mỗi khi áp dụng một hành động
+        recorder.end_frame(dt_ms, soft_drop)  # cuối mỗi khung, ngay trước update
+    """
+
+    def __init__(self, seed, frames=None):
+        self.seed = seed
+        self.frames = frames if frames is not None else []
+        self.pending_actions = []
+        self.practice = False
+
+    def record_action(self, action):
+        """Ghi một hành động đã áp dụng trong khung hiện tại"""
+        self.pending_actions.append(action)
+
+    def end_frame(self, dt_ms, soft_drop):
+        """Kết thúc khung hiện tại"""
+        self.frames.append((dt_ms, soft_drop, tuple(self.pending_actions)))
+        self.pending_actions = []
+
+    def to_replay(self, score):
+        """Tạo đối tượng Replay từ những gì đã ghi"""
+        return Replay(self.seed, list(self.frames), score, self.practice)
+
+
+class ReplayPlayer:
+    """
+    Phát lại một Replay trên GameState chạy ngầm (không cần màn hình).
+
+    Thuộc tính:
+        game_state: GameState đang được phát lại
+        frame: Số khung đã áp dụng
+    """
+
+    def __init__(self, replay):
+        self.replay = replay
+        self.restart()
+
+    def restart(self):
+        """Quay về đầu replay"""
+        self.game_state = GameState(self.replay.seed, high_score_file=None)
+        self.frame = 0
+
+    def finished(self):
+        """True nếu đã áp dụng hết các khung"""
+        return self.frame >= len(self.replay.frames)
+
+    def step(self):
+        """Áp dụng khung tiếp theo (hành động rồi update)"""
+        dt_ms, soft_drop, actions = self.replay.frames[self.frame]
+        for action in actions:
+            apply_action(self.game_state, action)
+        self.game_state.update(dt_ms / 1000.0, soft_drop)
+        self.frame += 1
+
+    def seek(self, frame):
+        """
+        Nhảy tới ngay sau khung thứ frame.
+
+        Tua lùi phải phát lại từ đầu vì replay chỉ lưu đầu vào.
+        """
+        if frame < self.frame:
+            self.restart()
+        frame = min(frame, len(self.replay.frames))
+        while self.frame < frame:
+            self.step()
+
+    def run_to_end(self):
+        """Phát hết replay và trả về GameState cuối cùng"""
+        self.seek(len(self.replay.frames))
+        return self.game_state
+
+
+def replay_filename(seed):
+    """Tên file replay mới trong REPLAY_DIR"""
+    stamp = time.strftime('%Y%m%d-%H%M%S')
+    return os.path.join(REPLAY_DIR, '%s_%d.json' % (stamp, seed))
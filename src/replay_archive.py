@@ -0,0 +1,421 @@
+"""
+Kho Replay (Archive) - Nhiều Game trong Một File, Tua được, Đọc bằng mmap
+
+Khi có hàng triệu game, mỗi game một file JSON là không quản lý nổi.
+File kho gói nhiều replay lại, kèm một bảng chỉ mục ở cuối file:
+
+    [Header]  magic 'TRPA', phiên bản, số game, vị trí bảng chỉ mục,
+              khoảng cách giữa hai khung chính
+    [Game 0][Game 1]...[Game n-1]
+    [Chỉ mục] mỗi game một bản ghi cố định INDEX_FORMAT:
+              game_id, vị trí, độ dài, seed, điểm, số khung, số khung chính
+
+Mỗi game:
+    GAME_FORMAT               seed, điểm, số khung, số khung chính
+    Bảng khung chính          (khung, vị trí ảnh chụp, độ dài, vị trí trong luồng khung)
+    Các ảnh chụp GameState    (snapshot.py) sau mỗi keyframe_interval khung
+    Luồng khung               mỗi khung: u16 dt_ms (0xFFFF = có thêm u32 theo sau),
+                              u8 cờ (bit 7 = rơi chậm, 7 bit thấp = số hành động),
+                              rồi mỗi hành động 1 byte
+
+File được đọc qua mmap: bảng chỉ mục và từng game chỉ là các lát cắt
+memoryview (không sao chép), nên công cụ có thể quét điểm của cả kho mà
+không phân tích game nào. Để tua tới khung N, người xem khôi phục khung chính
+gần nhất trước N rồi chỉ mô phỏng phần còn lại (tối đa keyframe_interval khung).
+
+Cách dùng:
+    python src/replay_archive.py pack games.trpa replays/*.json
+    python src/replay_archive.py info games.trpa
+    python src/replay_archive.py top games.trpa --count 10
+"""
+
+import argparse
+import heapq
+import mmap
+import os
+import struct
+import sys
+from config import *
+from replay import Replay, ReplayPlayer
+from snapshot import pack_state, unpack_state
+
+ARCHIVE_MAGIC = b'TRPA'
+ARCHIVE_VERSION = 1
+
+HEADER_FORMAT = '<4sHHIQI'    # magic, phiên bản, dự trữ, số game, vị trí chỉ mục, khoảng khung chính
+INDEX_FORMAT = '<QQIQQII'     # game_id, vị trí, độ dài, seed, điểm, số khung, số khung chính
+GAME_FORMAT = '<QQII'         # seed, điểm, số khung, số khung chính
+KEYFRAME_FORMAT = '<IIII'     # khung, vị trí ảnh chụp, độ dài ảnh chụp, vị trí trong luồng khung
+
+HEADER_SIZE = struct.calcsize(HEADER_FORMAT)
+INDEX_SIZE = struct.calcsize(INDEX_FORMAT)
+GAME_SIZE = struct.calcsize(GAME_FORMAT)
+KEYFRAME_SIZE = struct.calcsize(KEYFRAME_FORMAT)
+
+# Vị trí các trường trong một bản ghi chỉ mục
+INDEX_GAME_ID = 0
+INDEX_OFFSET = 1
+INDEX_LENGTH = 2
+INDEX_SEED = 3
+INDEX_SCORE = 4
+INDEX_FRAMES = 5
+INDEX_KEYFRAMES = 6
+
+_DT_ESCAPE = 0xFFFF
+_SOFT_DROP_FLAG = 0x80
+_MAX_ACTIONS = 0x7F
+
+
+def encode_frames(frames):
+    """
+    Mã hóa danh sách khung (dt_ms, soft_drop, actions) thành bytes.
+
+    Returns:
+        (bytes, danh sách vị trí byte bắt đầu của mỗi khung)
+    """
+    out = bytearray()
+    positions = []
+    for dt_ms, soft_drop, actions in frames:
+        positions.append(len(out))
+        if len(actions) > _MAX_ACTIONS:
+            raise ValueError("Quá nhiều hành động trong một khung: %d" % len(actions))
+        if 0 <= dt_ms < _DT_ESCAPE:
+            out += struct.pack('<H', dt_ms)
+        else:
+            out += struct.pack('<HI', _DT_ESCAPE, dt_ms)
+        out.append((_SOFT_DROP_FLAG if soft_drop else 0) | len(actions))
+        out += bytes(actions)
+    return bytes(out), positions
+
+
+def decode_frames(data, count, offset=0):
+    """
+    Giải mã `count` khung từ data (bytes hoặc memoryview) bắt đầu ở offset.
+
+    Returns:
+        Danh sách (dt_ms, soft_drop, actions), cùng dạng Replay.frames
+    """
+    frames = []
+    for _ in range(count):
+        dt_ms = data[offset] | (data[offset + 1] << 8)
+        offset += 2
+        if dt_ms == _DT_ESCAPE:
+            (dt_ms,) = struct.unpack_from('<I', data, offset)
+            offset += 4
+        flags = data[offset]
+        n = flags & _MAX_ACTIONS
+        frames.append((dt_ms, bool(flags & _SOFT_DROP_FLAG),
+                       tuple(data[offset + 1:offset + 1 + n])))
+        offset += 1 + n
+    return frames
+
+
+def encode_game(replay, keyframe_interval):
+    """
+    Mã hóa một replay thành khối bytes của một game trong kho.
+
+    Replay được mô phỏng một lần (không vẽ) để chụp GameState
+    sau mỗi keyframe_interval khung.
+    """
+    frame_data, positions = encode_frames(replay.frames)
+
+    snapshots = []
+    if keyframe_interval > 0:
+        player = ReplayPlayer(replay)
+        for frame in range(keyframe_interval, len(replay.frames), keyframe_interval):
+            player.seek(frame)
+            snapshots.append((frame, pack_state(player.game_state)))
+
+    # Vị trí được tính tương đối với đầu khối game
+    table_end = GAME_SIZE + KEYFRAME_SIZE * len(snapshots)
+    snapshots_size = sum(len(data) for _, data in snapshots)
+    frames_start = table_end + snapshots_size
+
+    table = []
+    position = table_end
+    for frame, data in snapshots:
+        table.append(struct.pack(KEYFRAME_FORMAT, frame, position, len(data),
+                                 frames_start + positions[frame]))
+        position += len(data)
+
+    return b''.join([
+        struct.pack(GAME_FORMAT, replay.seed, replay.score, len(replay.frames), len(snapshots)),
+        b''.join(table),
+        b''.join(data for _, data in snapshots),
+        frame_data,
+    ]), len(snapshots)
+
+
+class ReplayArchiveWriter:
+    """
+    Ghi (hoặc nối thêm vào) một file kho replay.
+
+    Các game được ghi thẳng xuống file ngay khi thêm; chỉ bảng chỉ mục
+    được giữ trong bộ nhớ và ghi ở cuối file khi close().
+
+    Cách dùng:
+        with ReplayArchiveWriter('games.trpa') as writer:
+            writer.add(replay)
+    """
+
+    def __init__(self, path, keyframe_interval=ARCHIVE_KEYFRAME_INTERVAL, append=False):
+        """
+        Args:
+            path: Đường dẫn file kho
+            keyframe_interval: Số khung giữa hai ảnh chụp GameState (0 = không chụp)
+            append: Nối thêm vào kho đã có thay vì ghi đè
+        """
+        self.path = path
+        self.keyframe_interval = keyframe_interval
+        self.entries = []
+
+        if append and os.path.exists(path):
+            with ReplayArchive(path) as archive:
+                self.entries = list(archive.iter_index())
+                self.keyframe_interval = archive.keyframe_interval
+                index_offset = archive.index_offset
+            self.file = open(path, 'r+b')
+            # Game mới ghi đè lên bảng chỉ mục cũ; chỉ mục mới được ghi lại khi đóng
+            self.file.seek(index_offset)
+            self.file.truncate()
+        else:
+            self.file = open(path, 'wb')
+            self.file.write(b'\0' * HEADER_SIZE)
+
+        self.next_id = max((entry[INDEX_GAME_ID] for entry in self.entries), default=-1) + 1
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def add(self, replay, game_id=None):
+        """
+        Thêm một replay vào kho.
+
+        Args:
+            replay: Đối tượng Replay
+            game_id: Mã số game (None = số tiếp theo)
+
+        Returns:
+            game_id đã dùng
+        """
+        if game_id is None:
+            game_id = self.next_id
+        self.next_id = max(self.next_id, game_id + 1)
+
+        data, keyframes = encode_game(replay, self.keyframe_interval)
+        offset = self.file.tell()
+        self.file.write(data)
+        self.entries.append((game_id, offset, len(data), replay.seed, replay.score,
+                             len(replay.frames), keyframes))
+        return game_id
+
+    def close(self):
+        """Ghi bảng chỉ mục và header rồi đóng file"""
+        if self.file is None:
+            return
+        index_offset = self.file.tell()
+        self.file.write(b''.join(struct.pack(INDEX_FORMAT, *entry) for entry in self.entries))
+        self.file.seek(0)
+        self.file.write(struct.pack(HEADER_FORMAT, ARCHIVE_MAGIC, ARCHIVE_VERSION, 0,
+                                    len(self.entries), index_offset, self.keyframe_interval))
+        self.file.close()
+        self.file = None
+
+
+class ReplayArchive:
+    """
+    Đọc một file kho replay qua mmap.
+
+    Mọi lát cắt trả về (game_bytes, index_view) là memoryview trỏ thẳng
+    vào mmap và chỉ dùng được cho tới khi close().
+
+    Thuộc tính:
+        game_count: Số game trong kho
+        keyframe_interval: Số khung giữa hai ảnh chụp
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self.file = open(path, 'rb')
+        self.map = mmap.mmap(self.file.fileno(), 0, access=mmap.ACCESS_READ)
+        self.view = memoryview(self.map)
+
+        magic, version, _, self.game_count, self.index_offset, self.keyframe_interval = \
+            struct.unpack_from(HEADER_FORMAT, self.view, 0)
+        if magic != ARCHIVE_MAGIC:
+            self.close()
+            raise ValueError("Không phải file kho replay: %s" % path)
+        if version != ARCHIVE_VERSION:
+            self.close()
+            raise ValueError("Phiên bản kho không hỗ trợ: %d" % version)
+
+        self.index_view = self.view[self.index_offset:self.index_offset + self.game_count * INDEX_SIZE]
+        self._positions = None   # game_id -> vị trí trong chỉ mục (tạo khi cần)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def __len__(self):
+        return self.game_count
+
+    def close(self):
+        """Đóng mmap và file (mọi memoryview đã trả ra phải được giải phóng trước)"""
+        if self.map is None:
+            return
+        if getattr(self, 'index_view', None) is not None:
+            self.index_view.release()
+        self.view.release()
+        self.map.close()
+        self.file.close()
+        self.map = None
+
+    def entry(self, i):
+        """Bản ghi chỉ mục thứ i (xem các hằng INDEX_*)"""
+        return struct.unpack_from(INDEX_FORMAT, self.index_view, i * INDEX_SIZE)
+
+    def iter_index(self):
+        """Duyệt toàn bộ bảng chỉ mục (không đọc dữ liệu game)"""
+        return struct.iter_unpack(INDEX_FORMAT, self.index_view)
+
+    def scores(self):
+        """Điểm của mọi game, theo thứ tự trong kho"""
+        return [entry[INDEX_SCORE] for entry in self.iter_index()]
+
+    def top(self, count=10):
+        """`count` bản ghi chỉ mục có điểm cao nhất"""
+        return heapq.nlargest(count, self.iter_index(), key=lambda entry: entry[INDEX_SCORE])
+
+    def find(self, game_id):
+        """Vị trí trong chỉ mục của một game_id (KeyError nếu không có)"""
+        if self._positions is None:
+            self._positions = {entry[INDEX_GAME_ID]: i for i, entry in enumerate(self.iter_index())}
+        return self._positions[game_id]
+
+    def game_bytes(self, i):
+        """Khối bytes của game thứ i (memoryview, không sao chép)"""
+        _, offset, length = self.entry(i)[:3]
+        return self.view[offset:offset + length]
+
+    def keyframes(self, i):
+        """Danh sách (khung, vị trí, độ dài, vị trí luồng khung) của game thứ i"""
+        data = self.game_bytes(i)
+        count = struct.unpack_from(GAME_FORMAT, data, 0)[3]
+        return list(struct.iter_unpack(KEYFRAME_FORMAT, data[GAME_SIZE:GAME_SIZE + count * KEYFRAME_SIZE]))
+
+    def load_replay(self, i):
+        """Giải mã game thứ i thành đối tượng Replay"""
+        data = self.game_bytes(i)
+        seed, score, frame_count, keyframe_count = struct.unpack_from(GAME_FORMAT, data, 0)
+        if keyframe_count:
+            # Luồng khung bắt đầu ngay sau ảnh chụp cuối cùng
+            _, position, length, _ = struct.unpack_from(
+                KEYFRAME_FORMAT, data, GAME_SIZE + (keyframe_count - 1) * KEYFRAME_SIZE)
+            frames_start = position + length
+        else:
+            frames_start = GAME_SIZE
+        return Replay(seed, decode_frames(data, frame_count, frames_start), score)
+
+    def restore_keyframe(self, i, keyframe):
+        """Dựng lại GameState từ một mục của keyframes(i)"""
+        _, position, length, _ = keyframe
+        return unpack_state(self.game_bytes(i)[position:position + length])
+
+    def player(self, i):
+        """ArchivePlayer cho game thứ i"""
+        return ArchivePlayer(self, i)
+
+
+class ArchivePlayer(ReplayPlayer):
+    """
+    ReplayPlayer tua được nhờ các ảnh chụp trong kho.
+
+    seek(frame) khôi phục ảnh chụp gần nhất trước frame (nếu nó gần hơn
+    vị trí hiện tại) rồi chỉ mô phỏng phần còn thiếu.
+    """
+
+    def __init__(self, archive, i):
+        self.archive = archive
+        self.index = i
+        self.keyframe_list = archive.keyframes(i)
+        super().__init__(archive.load_replay(i))
+
+    def seek(self, frame):
+        frame = min(frame, len(self.replay.frames))
+        best = None
+        for keyframe in self.keyframe_list:
+            if keyframe[0] > frame:
+                break
+            best = keyframe
+        if best is not None and (frame < self.frame or best[0] > self.frame):
+            self.game_state = self.archive.restore_keyframe(self.index, best)
+            self.frame = best[0]
+        super().seek(frame)
+
+
+def pack_files(archive_path, replay_paths, keyframe_interval=ARCHIVE_KEYFRAME_INTERVAL,
+               append=False):
+    """
+    Gói nhiều file replay JSON vào một kho. Replay luyện tập (đã tua lùi) bị
+    bỏ qua: kho không lưu cờ này.
+
+    Returns:
+        Số game đã thêm
+    """
+    added = 0
+    with ReplayArchiveWriter(archive_path, keyframe_interval, append) as writer:
+        for path in replay_paths:
+            replay = Replay.load(path)
+            if not replay.practice:
+                writer.add(replay)
+                added += 1
+    return added
+
+
+def main(argv=None):
+    """Điểm khởi đầu dòng lệnh"""
+    parser = argparse.ArgumentParser(description="Kho replay Tetris")
+    commands = parser.add_subparsers(dest='command', required=True)
+
+    pack = commands.add_parser('pack', help="Gói các file replay JSON vào kho")
+    pack.add_argument('archive')
+    pack.add_argument('replays', nargs='+')
+    pack.add_argument('--keyframe-interval', type=int, default=ARCHIVE_KEYFRAME_INTERVAL)
+    pack.add_argument('--append', action='store_true', help="Nối thêm vào kho đã có")
+
+    info = commands.add_parser('info', help="Thông tin tổng quát của kho")
+    info.add_argument('archive')
+
+    top = commands.add_parser('top', help="Các game điểm cao nhất")
+    top.add_argument('archive')
+    top.add_argument('--count', type=int, default=10)
+
+    args = parser.parse_args(argv)
+
+    if args.command == 'pack':
+        count = pack_files(args.archive, args.replays, args.keyframe_interval, args.append)
+        print("Đã gói %d replay vào %s" % (count, args.archive))
+    elif args.command == 'info':
+        with ReplayArchive(args.archive) as archive:
+            scores = archive.scores()
+            frames = sum(entry[INDEX_FRAMES] for entry in archive.iter_index())
+            print("%d game, %d khung, khung chính mỗi %d khung"
+                  % (len(archive), frames, archive.keyframe_interval))
+            if scores:
+                print("Điểm: thấp nhất %d, cao nhất %d, trung bình %.1f"
+                      % (min(scores), max(scores), sum(scores) / len(scores)))
+    else:
+        with ReplayArchive(args.archive) as archive:
+            for entry in archive.top(args.count):
+                print("game %-8d điểm %-8d seed %-12d %d khung"
+                      % (entry[INDEX_GAME_ID], entry[INDEX_SCORE], entry[INDEX_SEED],
+                         entry[INDEX_FRAMES]))
+
+
+if __name__ == "__main__":
+    main(sys.argv[1:])
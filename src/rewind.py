@@ -0,0 +1,324 @@
+"""
+Tua Lùi cho Chế độ Luyện tập (Rewind)
+
+Người chơi giữ một phím để lùi game từng mảnh (thử lại một lần đặt mảnh)
+hoặc từng khung. Chụp toàn bộ GameState mỗi khung sẽ tốn quá nhiều bộ nhớ
+và thời gian, nên bộ đệm chỉ lưu:
+
+- Một điểm mốc (checkpoint) mỗi khi có mảnh mới, và thêm một mốc sau mỗi
+  REWIND_TICK_INTERVAL khung nếu mảnh chưa khóa. Mỗi mốc gồm phần đầu của
+  ảnh chụp snapshot.pack_state (mọi thứ trừ lưới, ~100 byte) và:
+    - mốc chính (mỗi REWIND_KEYFRAME_INTERVAL mốc): toàn bộ lưới
+    - mốc thường: chỉ các ô khác với mốc trước (một mảnh khóa = 4 ô).
+      Nếu số ô khác lớn (xóa hàng dịch cả bảng), mốc được lưu như mốc chính.
+- Đầu vào của các khung sau mỗi mốc (cùng mã hóa với kho replay, ~3 byte mỗi khung).
+
+Khôi phục mốc i: lấy lưới của mốc chính gần nhất trước i, áp các ô khác
+của các mốc sau nó tới i, rồi dựng GameState bằng snapshot.unpack_state.
+Lùi tới một khung bất kỳ: khôi phục mốc ngay trước nó rồi mô phỏng lại tối
+đa REWIND_TICK_INTERVAL khung. Cả hai đều nằm gọn trong một khung hình.
+
+Bộ nhớ bị giới hạn bởi REWIND_MEMORY_BUDGET: khi vượt, mốc cũ nhất bị bỏ
+(mốc kế tiếp được chuyển thành mốc chính nếu cần), nên bộ đệm luôn giữ
+được vài phút chơi gần nhất.
+
+Đo:  python src/rewind.py
+"""
+
+import sys
+import time
+from collections import deque
+import numpy as np
+from config import *
+from replay import apply_action
+from replay_archive import encode_frames, decode_frames
+from snapshot import pack_state, unpack_state
+
+
+class Checkpoint:
+    """
+    Một điểm mốc trong bộ đệm tua lùi.
+
+    Thuộc tính:
+        tick: Số khung đã chạy từ đầu game tại mốc
+        piece_start: True nếu mốc là lúc bắt đầu một mảnh
+        header: Phần đầu ảnh chụp (không gồm lưới)
+        grid: Toàn bộ lưới (mốc chính) hoặc None
+        positions, values: Các ô khác với mốc trước (mốc thường)
+        frames: Đầu vào đã mã hóa của các khung sau mốc
+        count: Số khung trong frames
+    """
+
+    __slots__ = ('tick', 'piece_start', 'header', 'grid', 'positions', 'values',
+                 'frames', 'count')
+
+    def __init__(self, tick, piece_start, header):
+        self.tick = tick
+        self.piece_start = piece_start
+        self.header = header
+        self.grid = None
+        self.positions = None
+        self.values = None
+        self.frames = bytearray()
+        self.count = 0
+
+    def size(self):
+        """Số byte bộ nhớ ước tính"""
+        total = sys.getsizeof(self) + sys.getsizeof(self.header) + sys.getsizeof(self.frames)
+        if self.grid is not None:
+            total += sys.getsizeof(self.grid)
+        else:
+            total += self.positions.nbytes + self.values.nbytes
+        return total
+
+
+class RewindBuffer:
+    """
+    Bộ đệm tua lùi giới hạn bộ nhớ.
+
+    Cách dùng trong vòng lặp game (giống ReplayRecorder):
+        rewind.record_action(action)        # mỗi hành động đã áp dụng
+        rewind.end_frame(dt_ms, soft_drop)  # cuối mỗi khung, ngay trước update
+        rewind.observe(game_state)          # sau update: tạo mốc nếu cần
+
+    Thuộc tính:
+        tick: Số khung đã chạy từ đầu game
+        used: Số byte đang dùng (ước tính)
+    """
+
+    def __init__(self, game_state, budget=REWIND_MEMORY_BUDGET,
+                 keyframe_interval=REWIND_KEYFRAME_INTERVAL, tick_interval=REWIND_TICK_INTERVAL):
+        self.budget = budget
+        self.keyframe_interval = keyframe_interval
+        self.tick_interval = tick_interval
+        self.reset(game_state)
+
+    def reset(self, game_state, tick=0):
+        """Xóa bộ đệm và đặt mốc đầu tiên tại trạng thái hiện tại"""
+        self.checkpoints = deque()
+        self.used = 0
+        self.tick = tick
+        self.since_keyframe = 0
+        self.last_grid = None
+        self.pending_actions = []
+        self.piece = None
+        self.checkpoint(game_state)
+
+    def __len__(self):
+        return len(self.checkpoints)
+
+    @property
+    def oldest_tick(self):
+        return self.checkpoints[0].tick
+
+    def record_action(self, action):
+        self.pending_actions.append(action)
+
+    def end_frame(self, dt_ms, soft_drop):
+        current = self.checkpoints[-1]
+        frames, _ = encode_frames([(dt_ms, soft_drop, self.pending_actions)])
+        current.frames += frames
+        current.count += 1
+        self.pending_actions = []
+        self.tick += 1
+
+    @staticmethod
+    def piece_key(game_state):
+        """
+        Đổi khi có mảnh mới (lấy thêm mảnh khỏi túi) hoặc khi giữ mảnh.
+
+        Không so current_piece bằng `is` vì xoay cũng thay đối tượng mảnh.
+        """
+        return game_state.bag_randomizer.drawn, game_state.can_hold
+
+    def observe(self, game_state):
+        """Tạo mốc khi có mảnh mới hoặc mốc hiện tại đã đủ dài"""
+        if self.piece_key(game_state) != self.piece or \
+                self.checkpoints[-1].count >= self.tick_interval:
+            self.checkpoint(game_state)
+
+    def checkpoint(self, game_state):
+        """Thêm một mốc tại trạng thái hiện tại (giữa hai khung)"""
+        key = self.piece_key(game_state)
+        piece_start = key != self.piece
+        self.piece = key
+        data = pack_state(game_state)
+        cells = game_state.width * game_state.height
+        header, grid = data[:-cells], data[-cells:]
+
+        entry = Checkpoint(self.tick, piece_start, header)
+        if self.last_grid is not None and self.since_keyframe < self.keyframe_interval:
+            previous = np.frombuffer(self.last_grid, dtype=np.uint8)
+            current = np.frombuffer(grid, dtype=np.uint8)
+            positions = np.flatnonzero(previous != current).astype(np.uint32)
+            if positions.nbytes + positions.size < cells:
+                entry.positions = positions
+                entry.values = current[positions]
+        if entry.positions is None:
+            entry.grid = grid
+            self.since_keyframe = 0
+        self.since_keyframe += 1
+        self.last_grid = grid
+
+        # Mốc trước đã đóng: tính bộ nhớ của nó
+        if self.checkpoints:
+            self.used += self.checkpoints[-1].size()
+        self.checkpoints.append(entry)
+        self._evict()
+
+    def _evict(self):
+        """Bỏ các mốc cũ nhất cho tới khi vừa ngân sách bộ nhớ (luôn giữ ít nhất 2)"""
+        checkpoints = self.checkpoints
+        while self.used > self.budget and len(checkpoints) > 2:
+            oldest = checkpoints.popleft()
+            self.used -= oldest.size()
+            following = checkpoints[0]
+            if following.grid is None:
+                # Mốc kế tiếp thành mốc chính: lưới = lưới cũ + các ô khác
+                grid = bytearray(oldest.grid)
+                np.frombuffer(grid, dtype=np.uint8)[following.positions] = following.values
+                self.used -= following.size()
+                following.grid = bytes(grid)
+                following.positions = following.values = None
+                self.used += following.size()
+
+    def _grid_at(self, index):
+        """Dựng lại lưới của mốc thứ index"""
+        checkpoints = self.checkpoints
+        start = index
+        while checkpoints[start].grid is None:
+            start -= 1
+        grid = bytearray(checkpoints[start].grid)
+        cells = np.frombuffer(grid, dtype=np.uint8)
+        for i in range(start + 1, index + 1):
+            entry = checkpoints[i]
+            cells[entry.positions] = entry.values
+        return grid
+
+    def _find(self, tick):
+        """Chỉ số của mốc cuối cùng có tick <= tick (tìm nhị phân)"""
+        checkpoints = self.checkpoints
+        low, high = 0, len(checkpoints) - 1
+        while low < high:
+            middle = (low + high + 1) // 2
+            if checkpoints[middle].tick <= tick:
+                low = middle
+            else:
+                high = middle - 1
+        return low
+
+    def state_at(self, tick):
+        """
+        Dựng lại GameState tại khung `tick` mà không thay đổi bộ đệm.
+
+        Returns:
+            (GameState mới, chỉ số mốc, các khung đã mô phỏng lại sau mốc)
+        """
+        index = self._find(tick)
+        entry = self.checkpoints[index]
+        game_state = unpack_state(entry.header + self._grid_at(index))
+        frames = decode_frames(entry.frames, tick - entry.tick)
+        for dt_ms, soft_drop, actions in frames:
+            for action in actions:
+                apply_action(game_state, action)
+            game_state.update(dt_ms / 1000.0, soft_drop)
+        return game_state, index, frames
+
+    def restore_tick(self, tick):
+        """
+        Lùi tới khung `tick` (được giới hạn trong bộ đệm) và bỏ mọi thứ sau
+        đó, để game tiếp tục từ điểm này.
+
+        Returns:
+            (GameState mới, tick thực sự được khôi phục)
+        """
+        tick = max(self.oldest_tick, min(tick, self.tick))
+        game_state, index, frames = self.state_at(tick)
+
+        # Cắt bỏ tương lai cũ; mốc index trở thành mốc hiện tại
+        checkpoints = self.checkpoints
+        while len(checkpoints) > index + 1:
+            checkpoints.pop()
+        entry = checkpoints[index]
+        self.used = sum(checkpoints[i].size() for i in range(index))
+        entry.frames = bytearray(encode_frames(frames)[0])
+        entry.count = len(frames)
+        self.tick = tick
+        self.pending_actions = []
+        self.piece = self.piece_key(game_state)
+        self.last_grid = bytes(self._grid_at(index))
+        self.since_keyframe = self.keyframe_interval   # Mốc tiếp theo là mốc chính
+        return game_state, tick
+
+    def previous_piece_tick(self):
+        """Khung bắt đầu của mảnh hiện tại, hoặc của mảnh trước nếu đang ở ngay đầu mảnh"""
+        for entry in reversed(self.checkpoints):
+            if entry.piece_start and entry.tick < self.tick:
+                return entry.tick
+        return self.oldest_tick
+
+    def rewind_piece(self):
+        """Lùi về đầu mảnh (xem previous_piece_tick)"""
+        return self.restore_tick(self.previous_piece_tick())
+
+    def rewind_ticks(self, ticks=1):
+        """Lùi `ticks` khung"""
+        return self.restore_tick(self.tick - ticks)
+
+
+def benchmark(minutes=20.0, restores=500):
+    """
+    Cho bot chơi một game (mỗi mảnh ~0.5 giây, đầu vào được ghi như phím
+    bấm), đo bộ nhớ, thời gian ghi mỗi khung và thời gian dựng lại một khung
+    bất kỳ; kiểm tra kết quả với phát lại từ đầu.
+    """
+    import random
+    from game import GameState
+    from bot import Bot, apply_placement
+    from replay import Replay, ReplayPlayer
+
+    rng = random.Random(0)
+    bot = Bot()
+    game_state = GameState(0, high_score_file=None)
+    rewind = RewindBuffer(game_state)
+    replay = Replay(0)
+    started = time.perf_counter()
+    for frame in range(int(minutes * 60 * 60)):
+        if game_state.game_over:
+            break
+        actions = []
+        if frame % 30 == 29 and game_state.state == GameState.STATE_PLAYING:
+            choice = bot.choose(game_state)
+            if choice is None:
+                break
+            actions = apply_placement(game_state, *choice)
+        for action in actions:
+            rewind.record_action(action)
+        replay.frames.append((16, False, tuple(actions)))
+        rewind.end_frame(16, False)
+        game_state.update(0.016, False)
+        rewind.observe(game_state)
+    record = time.perf_counter() - started
+
+    worst = total = 0.0
+    ticks = sorted(rng.randint(rewind.oldest_tick, rewind.tick) for _ in range(restores))
+    player = ReplayPlayer(replay)
+    matches = 0
+    for tick in ticks:
+        t0 = time.perf_counter()
+        restored = rewind.state_at(tick)[0]
+        elapsed = time.perf_counter() - t0
+        worst = max(worst, elapsed)
+        total += elapsed
+        player.seek(tick)
+        matches += (restored.grid == player.game_state.grid
+                    and restored.score == player.game_state.score)
+    print("%d khung, %d mốc, %.0f KB (ngân sách %.0f KB), giữ %.1f phút; ghi %.1f µs/khung"
+          % (rewind.tick, len(rewind), rewind.used / 1024, rewind.budget / 1024,
+             (rewind.tick - rewind.oldest_tick) / 3600, record / rewind.tick * 1e6))
+    print("Dựng lại một khung: trung bình %.3f ms, chậm nhất %.3f ms; khớp phát lại: %d/%d"
+          % (total / restores * 1e3, worst * 1e3, matches, restores))
+
+
+if __name__ == "__main__":
+    benchmark()
@@ -0,0 +1,136 @@
+"""
+Bộ Lập lịch Hẹn giờ (Heap các Thời hạn)
+
+Thay cho việc mỗi khung cộng delta_time vào từng bộ đếm rồi so với ngưỡng,
+mỗi sự kiện hẹn giờ (trọng lực, khóa mảnh, hết hoạt ảnh, lặp phím DAS/ARR)
+được đặt một thời hạn tuyệt đối trong một heap. Chỉ cần nhìn đỉnh heap là
+biết sự kiện sớm nhất; các sự kiện tới hạn được lấy ra đúng thứ tự thời gian.
+
+- Chơi trực tiếp: TetrisGame lấy các sự kiện lặp phím tới hạn mỗi khung.
+- Chạy ngầm: GameState.advance nhảy thẳng tới sự kiện kế tiếp thay vì mô
+  phỏng từng khung trống (một mảnh rơi tự do 20 hàng ở cấp 1 tốn ~20 lần
+  cập nhật thay vì ~1200 khung).
+
+Đo:  python src/scheduler.py
+"""
+
+import heapq
+import sys
+import time
+from config import *
+
+# Sự kiện hẹn giờ của GameState
+EVENT_GRAVITY = 'gravity'
+EVENT_LOCK = 'lock'
+EVENT_ANIMATION_END = 'animation_end'
+
+# Sự kiện lặp phím của TetrisGame
+EVENT_LEFT_REPEAT = 'left_repeat'
+EVENT_RIGHT_REPEAT = 'right_repeat'
+EVENT_REWIND_REPEAT = 'rewind_repeat'   # Giữ phím lùi từng mảnh (chế độ luyện tập)
+
+
+class Scheduler:
+    """
+    Heap các (thời hạn, sự kiện); mỗi sự kiện có tối đa một thời hạn.
+
+    Hủy hoặc đặt lại thời hạn không xóa khỏi heap ngay (O(log n) mỗi thao
+    tác): mục cũ bị bỏ qua khi nó lên tới đỉnh.
+
+    Thuộc tính:
+        now: Thời điểm hiện tại của đồng hồ lập lịch (giây)
+    """
+
+    def __init__(self, now=0.0):
+        self.now = now
+        self.heap = []
+        self.tokens = {}   # sự kiện -> số thứ tự của mục còn hiệu lực
+        self.counter = 0
+
+    def __len__(self):
+        return len(self.tokens)
+
+    def schedule(self, event, due):
+        """Đặt (hoặc đặt lại) thời hạn tuyệt đối của một sự kiện"""
+        self.counter += 1
+        self.tokens[event] = self.counter
+        heapq.heappush(self.heap, (due, self.counter, event))
+
+    def schedule_in(self, event, delay):
+        """Đặt thời hạn sau `delay` giây tính từ now"""
+        self.schedule(event, self.now + delay)
+
+    def cancel(self, event):
+        """Hủy sự kiện (không lỗi nếu không có)"""
+        self.tokens.pop(event, None)
+
+    def clear(self):
+        self.heap.clear()
+        self.tokens.clear()
+
+    def is_scheduled(self, event):
+        return event in self.tokens
+
+    def _skip_stale(self):
+        heap = self.heap
+        while heap and self.tokens.get(heap[0][2]) != heap[0][1]:
+            heapq.heappop(heap)
+
+    def next_due(self):
+        """Thời hạn sớm nhất, hoặc None nếu không có sự kiện nào"""
+        self._skip_stale()
+        return self.heap[0][0] if self.heap else None
+
+    def pop_due(self, now=None):
+        """
+        Lấy lần lượt các sự kiện tới hạn tới thời điểm `now` (và tiến đồng hồ tới đó).
+
+        Sự kiện được đặt lại trong lúc lặp mà cũng tới hạn sẽ được lấy tiếp,
+        nên một sự kiện lặp (ARR) có thể xảy ra nhiều lần trong một khung.
+
+        Yields:
+            (thời hạn, sự kiện)
+        """
+        if now is None:
+            now = self.now
+        heap = self.heap
+        while True:
+            self._skip_stale()
+            if not heap or heap[0][0] > now:
+                break
+            due, token, event = heapq.heappop(heap)
+            del self.tokens[event]
+            self.now = due
+            yield due, event
+        self.now = now
+
+
+def benchmark(seconds=600.0, frame_time=1.0 / 60):
+    """
+    So sánh mô phỏng từng khung với nhảy theo sự kiện cho một game không có
+    đầu vào (mảnh chỉ rơi theo trọng lực rồi khóa), trên cùng seed.
+    """
+    from game import GameState
+
+    def by_frame(game_state):
+        frames = 0
+        while not game_state.game_over and frames * frame_time < seconds:
+            game_state.update(frame_time, False)
+            frames += 1
+        return frames
+
+    def by_event(game_state):
+        return game_state.advance(seconds, False)
+
+    boards = []
+    for label, run in (('từng khung', by_frame), ('theo sự kiện', by_event)):
+        game_state = GameState(0, high_score_file=None)
+        started = time.perf_counter()
+        updates = run(game_state)
+        print("%-13s %7d lần cập nhật, %.3fs" % (label, updates, time.perf_counter() - started))
+        boards.append(game_state.grid.to_bytes())
+    print("Bảng cuối giống nhau:", boards[0] == boards[1])
+
+
+if __name__ == "__main__":
+    benchmark(float(sys.argv[1]) if len(sys.argv) > 1 else 600.0)
@@ -0,0 +1,297 @@
+"""
+Bot Tìm kiếm Nhìn trước (Lookahead) qua Hàng đợi và Ô giữ
+
+Mở rộng bot.py: thay vì chỉ chấm bảng ngay sau mảnh hiện tại, bot xét
+chuỗi vài mảnh liên tiếp, mỗi bước được chọn đặt mảnh hiện tại hoặc dùng ô giữ.
+
+- Mảnh trong hàng đợi xem trước (GameState.next_queue) được biết chắc.
+- Mảnh sau hàng đợi chưa biết: dùng expectimax, lấy trung bình giá trị trên
+  các loại mảnh còn có thể ra. Nhờ quy tắc túi 7 mảnh, đó chỉ là các mảnh
+  chưa xuất hiện trong túi hiện tại (BagRandomizer.unseen_in_bag), không phải cả 7.
+- Mỗi nút chỉ mở rộng SEARCH_BEAM_WIDTH nước đi tốt nhất theo đánh giá tĩnh
+  (SEARCH_ROOT_WIDTH ở gốc).
+- Giá trị các nút được nhớ trong bảng chuyển vị (transposition.py).
+
+Tìm kiếm là "anytime": đào sâu dần (độ sâu 1, 2, 3...) cho tới khi hết ngân
+sách thời gian của mảnh, rồi trả về nước tốt nhất của độ sâu cuối cùng đã xong.
+
+Các nước đi ở gốc được chia cho một nhóm tiến trình; mỗi tiến trình đào sâu
+dần trên phần của mình, và nước đi được so sánh ở độ sâu mà mọi tiến trình
+đều đã hoàn thành.
+"""
+
+import time
+from concurrent.futures import ProcessPoolExecutor
+from config import *
+from tetromino import TetrominoType
+from transposition import TranspositionTable
+from bot import (Bot, board_rows, enumerate_placements, place, board_features,
+                 FEATURE_NAMES)
+
+ALL_PIECES = frozenset(TetrominoType.all_types())
+DEAD_VALUE = -1e9   # Giá trị của vị trí không còn chỗ đặt mảnh (thua)
+_LINES = FEATURE_NAMES.index('lines')
+
+
+class SearchTimeout(Exception):
+    """Hết ngân sách thời gian giữa chừng một độ sâu"""
+
+
+class Position:
+    """
+    Trạng thái tối thiểu cần cho tìm kiếm (không phải GameState đầy đủ).
+
+    Thuộc tính:
+        rows: Bitboard (danh sách mặt nạ hàng)
+        current: Loại mảnh hiện tại
+        hold: Loại mảnh giữ (None = trống)
+        queue: Tuple các mảnh đã biết tiếp theo
+        unseen: Tập các mảnh còn lại trong túi sau hàng đợi (rỗng = túi mới)
+        can_hold: Có được dùng ô giữ không (chỉ có thể False ở gốc)
+    """
+
+    __slots__ = ('rows', 'current', 'hold', 'queue', 'unseen', 'can_hold')
+
+    def __init__(self, rows, current, hold, queue, unseen, can_hold=True):
+        self.rows = rows
+        self.current = current
+        self.hold = hold
+        self.queue = queue
+        self.unseen = unseen
+        self.can_hold = can_hold
+
+    @classmethod
+    def from_game(cls, game_state):
+        queue = tuple(game_state.next_queue)
+        return cls(board_rows(game_state.grid), game_state.current_piece.piece_type,
+                   game_state.held_piece_type, queue,
+                   game_state.bag_randomizer.unseen_in_bag(len(queue)),
+                   game_state.can_hold)
+
+    def key(self):
+        """
+        Khóa bảng chuyển vị (độ sâu được lưu kèm giá trị trong bảng).
+
+        Chính là tuple trạng thái, không phải băm của nó: bảng so sánh cả khóa
+        khi tra, nên hai vị trí trùng băm không bao giờ lấy nhầm giá trị của nhau.
+        """
+        return (tuple(self.rows), self.current, self.hold, self.queue, self.unseen)
+
+
+def draw_outcomes(queue, unseen):
+    """
+    Các khả năng của mảnh kế tiếp.
+
+    Returns:
+        Danh sách (xác suất, loại mảnh, hàng đợi còn lại, tập chưa thấy còn lại)
+    """
+    if queue:
+        return [(1.0, queue[0], queue[1:], unseen)]
+    pool = unseen or ALL_PIECES
+    p = 1.0 / len(pool)
+    return [(p, piece_type, (), pool - {piece_type}) for piece_type in sorted(pool)]
+
+
+class Searcher:
+    """
+    Đánh giá vị trí bằng expectimax có giới hạn độ sâu và beam.
+
+    Dùng trong tiến trình chính hoặc tiến trình con; mỗi Searcher có
+    bảng chuyển vị riêng.
+    """
+
+    def __init__(self, weights, width, height, beam_width=SEARCH_BEAM_WIDTH):
+        self.weights = tuple(weights)
+        self.width = width
+        self.height = height
+        self.beam_width = beam_width
+        self.table = TranspositionTable()
+        self.deadline = None
+        self.nodes = 0
+
+    def static_value(self, rows):
+        """Đánh giá bảng, không tính số hàng (được cộng riêng cho từng nước)"""
+        features = board_features(rows, self.width, self.height, 0)
+        return sum(f * w for f, w in zip(features, self.weights))
+
+    def root_moves(self, position):
+        """Các nước đi ở gốc (theo thứ tự cố định, để tiến trình con chọn theo chỉ số)"""
+        return self.moves(position)
+
+    def moves(self, position):
+        """
+        Mọi nước đi từ một vị trí.
+
+        Returns:
+            Danh sách (nước đi, giá trị tĩnh, bitboard mới, số hàng xóa,
+            mảnh giữ mới, hàng đợi mới, tập chưa thấy mới).
+            Nước đi là (rotation, x, use_hold).
+        """
+        options = [(position.current, False, position.hold, position.queue, position.unseen)]
+        if position.can_hold:
+            if position.hold is not None:
+                if position.hold != position.current:
+                    options.append((position.hold, True, position.current,
+                                    position.queue, position.unseen))
+            elif position.queue:
+                # Giữ khi ô trống: mảnh được đặt là mảnh đầu hàng đợi
+                options.append((position.queue[0], True, position.current,
+                                position.queue[1:], position.unseen))
+
+        line_weight = self.weights[_LINES]
+        result = []
+        for piece_type, use_hold, hold, queue, unseen in options:
+            for rotation, x, y, cells, px in enumerate_placements(
+                    position.rows, self.width, self.height, piece_type):
+                rows, lines = place(position.rows, self.width, cells, px, y)
+                value = line_weight * lines + self.static_value(rows)
+                result.append(((rotation, x, use_hold), value, rows, lines, hold, queue, unseen))
+        return result
+
+    def value(self, position, depth):
+        """Giá trị expectimax của một vị trí (mảnh hiện tại đã biết)"""
+        if self.deadline is not None and time.perf_counter() > self.deadline:
+            raise SearchTimeout()
+        return self.table.memoize(position.key(),
+                                  lambda: self._compute(position, depth), depth)
+
+    def _compute(self, position, depth):
+        self.nodes += 1
+        moves = self.moves(position)
+        if not moves:
+            return DEAD_VALUE
+        if depth <= 1:
+            return max(move[1] for move in moves)
+        moves.sort(key=lambda move: -move[1])
+        return max(self.move_value(move, depth) for move in moves[:self.beam_width])
+
+    def move_value(self, move, depth):
+        """Giá trị của một nước đi khi còn `depth` mảnh (tính cả nước này)"""
+        _, static, rows, lines, hold, queue, unseen = move
+        if depth <= 1:
+            return static
+        line_value = self.weights[_LINES] * lines
+        total = 0.0
+        for p, piece_type, rest, rest_unseen in draw_outcomes(queue, unseen):
+            child = Position(rows, piece_type, hold, rest, rest_unseen)
+            total += p * self.value(child, depth - 1)
+        return line_value + total
+
+    def search_moves(self, moves, budget, max_depth=SEARCH_MAX_DEPTH):
+        """
+        Đào sâu dần trên một tập nước đi ở gốc cho tới khi hết thời gian.
+
+        Returns:
+            dict độ sâu -> danh sách (giá trị, nước đi) cho mỗi độ sâu đã xong
+        """
+        self.deadline = time.perf_counter() + budget
+        results = {1: [(move[1], move[0]) for move in moves]}
+        try:
+            for depth in range(2, max_depth + 1):
+                results[depth] = [(self.move_value(move, depth), move[0]) for move in moves]
+        except SearchTimeout:
+            pass
+        finally:
+            self.deadline = None
+        return results
+
+
+# Searcher của tiến trình con (giữ lại giữa các lần gọi để dùng lại bảng chuyển vị)
+_worker_searcher = None
+
+
+def _search_worker(weights, width, height, beam_width, position, move_indices, budget, max_depth):
+    """Chạy trong tiến trình con: tìm trên một phần các nước đi ở gốc"""
+    global _worker_searcher
+    searcher = _worker_searcher
+    if (searcher is None or searcher.weights != tuple(weights)
+            or (searcher.width, searcher.height) != (width, height)):
+        searcher = _worker_searcher = Searcher(weights, width, height, beam_width)
+    searcher.beam_width = beam_width
+    moves = searcher.root_moves(position)
+    return searcher.search_moves([moves[i] for i in move_indices], budget, max_depth)
+
+
+def pick_best(results_list):
+    """
+    Chọn nước đi từ kết quả của nhiều tiến trình.
+
+    So sánh ở độ sâu lớn nhất mà mọi tiến trình đều đã hoàn thành.
+
+    Returns:
+        (nước đi, giá trị, độ sâu)
+    """
+    depth = min(max(results) for results in results_list)
+    best = None
+    for results in results_list:
+        for value, move in results[depth]:
+            if best is None or value > best[1]:
+                best = (move, value, depth)
+    return best
+
+
+class SearchBot(Bot):
+    """
+    Bot nhìn trước nhiều mảnh, dùng hàng đợi xem trước và ô giữ.
+
+    Có cùng giao diện với Bot (choose, play_turn) nên dùng được với
+    bot.play_game và tuner.
+
+    Thuộc tính:
+        budget: Ngân sách thời gian cho mỗi mảnh (giây)
+        workers: Số tiến trình cho các nước đi ở gốc (0 = chạy trong tiến trình này)
+        last_depth: Độ sâu đã hoàn thành ở lần chọn gần nhất
+    """
+
+    def __init__(self, weights=BOT_WEIGHTS, budget=SEARCH_TIME_BUDGET, workers=0,
+                 beam_width=SEARCH_BEAM_WIDTH, root_width=SEARCH_ROOT_WIDTH,
+                 max_depth=SEARCH_MAX_DEPTH, book=None):
+        super().__init__(weights, book=book)
+        self.budget = budget
+        self.workers = workers
+        self.beam_width = beam_width
+        self.root_width = root_width
+        self.max_depth = max_depth
+        self.searcher = None
+        self.pool = None
+        self.last_depth = 0
+
+    def choose(self, game_state):
+        if self.book is not None:
+            move = self.book.lookup(game_state, self.use_hold)
+            if move is not None:
+                return move
+        position = Position.from_game(game_state)
+        width, height = game_state.width, game_state.height
+
+        if self.searcher is None or (self.searcher.width, self.searcher.height) != (width, height):
+            self.searcher = Searcher(self.weights, width, height, self.beam_width)
+        moves = self.searcher.root_moves(position)
+        if not moves:
+            return None
+
+        # Chỉ các nước tốt nhất theo đánh giá tĩnh được tìm sâu hơn độ sâu 1
+        order = sorted(range(len(moves)), key=lambda i: -moves[i][1])[:self.root_width]
+
+        if self.workers and len(order) > 1:
+            if self.pool is None:
+                self.pool = ProcessPoolExecutor(max_workers=self.workers)
+            # Chia vòng tròn theo thứ tự đánh giá tĩnh để các phần nặng như nhau
+            parts = [order[k::self.workers] for k in range(self.workers)]
+            futures = [self.pool.submit(_search_worker, self.weights, width, height,
+                                        self.beam_width, position, part, self.budget,
+                                        self.max_depth)
+                       for part in parts if part]
+            results_list = [future.result() for future in futures]
+        else:
+            results_list = [self.searcher.search_moves([moves[i] for i in order],
+                                                       self.budget, self.max_depth)]
+
+        move, _, self.last_depth = pick_best(results_list)
+        return move
+
+    def close(self):
+        """Dừng nhóm tiến trình (nếu có)"""
+        if self.pool is not None:
+            self.pool.shutdown()
+            self.pool = None
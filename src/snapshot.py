@@ -0,0 +1,143 @@
+"""
+Ảnh chụp Trạng thái Game (Snapshot)
+
+Đóng gói toàn bộ GameState thành bytes gọn và dựng lại từ bytes đó, để có
+thể nhảy thẳng tới giữa một replay thay vì mô phỏng lại từ đầu.
+
+Một ảnh chụp gồm đủ mọi thứ ảnh hưởng tới các khung tiếp theo:
+- Lưới (mỗi ô 1 byte, đúng như Board lưu)
+- Mảnh hiện tại (loại, x, y, trạng thái xoay), mảnh kế tiếp, mảnh giữ,
+  độ dài hàng đợi xem trước
+- Túi mảnh (seed, số túi đã đổ, các mảnh còn lại trong túi)
+- Điểm, cấp độ, số hàng, combo, trạng thái hoạt ảnh
+- Các bộ đếm thời gian (lưu dạng double nên khôi phục chính xác từng bit)
+
+Không lưu: bộ sinh số của hàng rác (replay không có hàng rác, nên nó luôn
+ở trạng thái ban đầu theo seed) và telemetry.
+
+Bố cục (little-endian):
+    STATE_FORMAT            các trường cố định (xem bên dưới)
+    bag_len byte            các mảnh còn trong túi (id 1-7)
+    clearing_count * u16    các hàng đang trong hoạt ảnh xóa
+    width * height byte     lưới
+"""
+
+import struct
+from config import *
+from game import GameState
+from tetromino import Tetromino, PIECE_TYPES, PIECE_IDS
+
+SNAPSHOT_VERSION = 2
+
+# version, width, height, preview_count, seed, bag_index, bag_len,
+# current (id, x, y, rotation), next id, held id (0 = không có), can_hold,
+# score, high_score, level, lines_cleared, combo_count, game_over, state,
+# fall_timer, lock_timer, line_clear_timer, is_on_ground,
+# lock_reset_count, max_lock_resets, clearing_count
+STATE_FORMAT = '<BHHBQIB BhhB BBB QQIIiBB dddB HHH'
+STATE_SIZE = struct.calcsize(STATE_FORMAT)
+
+
+def pack_state(game_state):
+    """
+    Đóng gói một GameState thành bytes.
+
+    Args:
+        game_state: GameState cần chụp (không được ở giữa một hành động)
+
+    Returns:
+        bytes của ảnh chụp
+    """
+    bag = game_state.bag_randomizer
+    piece = game_state.current_piece
+    held = game_state.held_piece_type
+    clearing = game_state.lines_being_cleared
+
+    header = struct.pack(
+        STATE_FORMAT,
+        SNAPSHOT_VERSION, game_state.width, game_state.height, game_state.preview_count,
+        bag.seed, bag.bag_index, len(bag.bag),
+        PIECE_IDS[piece.piece_type], piece.x, piece.y, piece.rotation,
+        PIECE_IDS[game_state.next_piece_type],
+        0 if held is None else PIECE_IDS[held],
+        game_state.can_hold,
+        game_state.score, game_state.high_score, game_state.level,
+        game_state.lines_cleared, game_state.combo_count,
+        game_state.game_over, game_state.state,
+        game_state.fall_timer, game_state.lock_timer, game_state.line_clear_timer,
+        game_state.is_on_ground,
+        game_state.lock_reset_count, game_state.max_lock_resets, len(clearing))
+
+    return b''.join([
+        header,
+        bytes(PIECE_IDS[t] for t in bag.bag),
+        struct.pack('<%dH' % len(clearing), *clearing),
+        game_state.grid.to_bytes(),
+    ])
+
+
+def unpack_state(data):
+    """
+    Dựng lại GameState từ bytes do pack_state tạo ra.
+
+    Args:
+        data: bytes, bytearray hoặc memoryview (ví dụ một lát cắt của mmap)
+
+    Returns:
+        GameState mới (không đọc/ghi file điểm cao)
+    """
+    fields = struct.unpack_from(STATE_FORMAT, data, 0)
+    (version, width, height, preview_count, seed, bag_index, bag_len,
+     piece_id, x, y, rotation, next_id, held_id, can_hold,
+     score, high_score, level, lines_cleared, combo_count, game_over, state,
+     fall_timer, lock_timer, line_clear_timer, is_on_ground,
+     lock_reset_count, max_lock_resets, clearing_count) = fields
+    if version != SNAPSHOT_VERSION:
+        raise ValueError("Phiên bản ảnh chụp không hỗ trợ: %d" % version)
+
+    offset = STATE_SIZE
+    bag = [PIECE_TYPES[i - 1] for i in data[offset:offset + bag_len]]
+    offset += bag_len
+    clearing = list(struct.unpack_from('<%dH' % clearing_count, data, offset))
+    offset += 2 * clearing_count
+    cells = data[offset:offset + width * height]
+
+    game_state = GameState(seed, high_score_file=None, width=width, height=height,
+                           preview_count=preview_count)
+
+    # Túi mảnh: đặt lại đúng vị trí trong chuỗi (các túi sau vẫn suy ra từ seed)
+    game_state.bag_randomizer.bag_index = bag_index
+    game_state.bag_randomizer.bag = bag
+
+    # Lưới
+    for row in range(height):
+        game_state.grid.set_row(row, cells[row * width:(row + 1) * width])
+
+    # Mảnh hiện tại: hình dạng được dựng lại bằng cách xoay từ hình gốc
+    piece = Tetromino(PIECE_TYPES[piece_id - 1], width)
+    for _ in range(rotation):
+        piece.rotate_clockwise()
+    piece.x = x
+    piece.y = y
+    game_state.current_piece = piece
+    game_state.next_queue = game_state.bag_randomizer.preview(game_state.preview_count)
+    game_state.next_piece_type = PIECE_TYPES[next_id - 1]
+    game_state.held_piece_type = PIECE_TYPES[held_id - 1] if held_id else None
+    game_state.can_hold = bool(can_hold)
+
+    game_state.score = score
+    game_state.high_score = high_score
+    game_state.level = level
+    game_state.lines_cleared = lines_cleared
+    game_state.combo_count = combo_count
+    game_state.game_over = bool(game_over)
+    game_state.state = state
+
+    game_state.fall_timer = fall_timer
+    game_state.lock_timer = lock_timer
+    game_state.line_clear_timer = line_clear_timer
+    game_state.is_on_ground = bool(is_on_ground)
+    game_state.lock_reset_count = lock_reset_count
+    game_state.max_lock_resets = max_lock_resets
+    game_state.lines_being_cleared = clearing
+    return game_state
@@ -0,0 +1,674 @@
+"""
+Giải Perfect Clear và Câu đố Xếp Mảnh
+
+Cho một bảng và một chuỗi mảnh biết trước, tìm chuỗi vị trí đặt để xóa sạch
+bảng (perfect clear) trong `lines` hàng dưới cùng, hoặc để các hàng dưới
+cùng trở thành một mẫu cho trước.
+
+Vị trí đặt là các vị trí tới được bằng xoay, di chuyển ngang rồi thả thẳng,
+như bot (bot.enumerate_placements), nên lời giải đưa thẳng được cho
+bot.apply_placement.
+
+Perfect clear: tìm theo hai bước, thay vì thử mọi thứ tự đặt mảnh.
+1. Phủ vùng: liệt kê các cách lấp kín vùng trống bằng các mảnh có trong
+   chuỗi (cộng ô giữ), bỏ qua thứ tự. Mỗi bước lấp ô trống đầu tiên theo
+   thứ tự cột (trái sang phải, trên xuống dưới): mảnh phủ ô đó nhận nó làm
+   ô đầu tiên của mình, nên mỗi cách phủ chỉ được sinh ra một lần và ô không
+   lấp được bị phát hiện ngay, không phải sau vài mảnh nữa. Mảnh được tính
+   theo tọa độ gốc của vùng (trước mọi lần xóa hàng): một mảnh có thể vắt qua
+   các hàng bị xóa trước nó (ví dụ I dựng ở các hàng 0, 1, 3 sau khi hàng 2
+   đã xóa). Trạng thái (ô đã lấp, số mảnh còn mỗi loại) đã biết là không phủ
+   kín được được ghi nhớ.
+2. Thứ tự: với mỗi cách phủ, tìm một thứ tự đặt hợp với chuỗi mảnh và ô giữ
+   sao cho mỗi mảnh, lúc được đặt, thả thẳng xuống được đúng chỗ của nó
+   (cột phía trên trống, nằm tựa lên khối hoặc đáy) và các hàng nó vắt qua
+   đã bị xóa. Tối đa 2^số mảnh tập con, có ghi nhớ.
+Các chiều cao perfect clear nhỏ hơn `lines` (ít mảnh hơn) được thử trước.
+
+Câu đố theo mẫu dùng tìm kiếm theo chiều sâu trên thứ tự đặt mảnh, trên
+`lines` hàng dưới cùng cộng 4 hàng trống cho chỗ xuất hiện, với bảng ghi nhớ
+các trạng thái không giải được.
+
+Thời gian đo (một lõi, Python 3.11), perfect clear 4 hàng từ bảng trống với
+11 mảnh đầu của BagRandomizer (có giữ, mảnh thứ 11 để đổi ô giữ), 12 chuỗi
+của `python src/solver.py --bench`: giải được cả 12, trung vị 0.41s, chậm
+nhất 0.89s (63k trạng thái). Chuỗi SZTLJOIIOSZ: 0.85s; cách tìm theo thứ tự
+đặt mảnh trước đây chạy 48s mà chưa ra lời giải. Trên 120 bảng 4 hàng
+ngẫu nhiên (phần lớn không giải được): 5.8s tổng, trước đây 257s.
+
+Với chuỗi chưa biết hết, solve_bag thử mọi phần tiếp theo hợp với luật túi
+7 mảnh và báo tỉ lệ chuỗi giải được; các cách phủ được dùng lại giữa những
+chuỗi có cùng tập mảnh. Tìm kiếm perfect clear có thể chia các mảnh phủ ô
+đầu tiên cho nhiều tiến trình (workers).
+
+Cách dùng:
+    python src/solver.py --pieces IOTLJSZIOT
+    python src/solver.py --pieces TJJ --board "XXX....XXX" "XXX....XXX" --lines 2
+    python src/solver.py --pieces IO --bag --board "XX......XX" "XX......XX" --lines 2
+    python src/solver.py --bench
+"""
+
+import argparse
+import itertools
+import random
+import sys
+import time
+from config import *
+from tetromino import TetrominoType, BagRandomizer
+from bot import board_rows, enumerate_placements, place, piece_rotations
+
+SPAWN_ROWS = 4   # Hàng trống phía trên vùng cho chỗ xuất hiện và di chuyển ngang
+
+_PIECE_TYPES = tuple(TetrominoType.all_types())
+_PIECE_INDEX = {piece_type: i for i, piece_type in enumerate(_PIECE_TYPES)}
+
+
+class _SearchAborted(Exception):
+    """Vượt quá max_nodes"""
+
+
+def _popcount(value):
+    return bin(value).count('1')
+
+
+class Placement:
+    """
+    Một cách đặt mảnh trong vùng, theo tọa độ gốc của vùng (trước mọi lần xóa hàng).
+
+    Thuộc tính:
+        piece_type, rotation, x: Như enumerate_placements (x theo tọa độ Tetromino)
+        mask: Các ô của mảnh, bit x * lines + y (thứ tự cột)
+        rows: Danh sách (y, mặt nạ bit của hàng) các hàng mảnh chiếm
+        gaps: Mặt nạ (bit y) các hàng nằm giữa các hàng của mảnh, phải đã bị xóa
+        above: Danh sách (y, mặt nạ cột) các ô nằm trên mảnh, phải trống lúc thả
+        columns: Danh sách (bit cột, hàng dưới cùng) của mảnh mỗi cột
+    """
+
+    __slots__ = ('piece_type', 'rotation', 'x', 'mask', 'rows', 'gaps', 'above', 'columns')
+
+    def __init__(self, piece_type, rotation, x, mask, rows, gaps, above, columns):
+        self.piece_type = piece_type
+        self.rotation = rotation
+        self.x = x
+        self.mask = mask
+        self.rows = rows
+        self.gaps = gaps
+        self.above = above
+        self.columns = columns
+
+
+_placement_cache = {}
+
+
+def region_placements(width, lines):
+    """
+    Mọi vị trí của mọi mảnh trong vùng `lines` hàng, kể cả vắt qua các hàng bị xóa trước.
+
+    Returns:
+        dict loại mảnh -> dict bit ô đầu tiên (thứ tự cột) -> danh sách Placement
+    """
+    key = (width, lines)
+    result = _placement_cache.get(key)
+    if result is not None:
+        return result
+
+    result = {}
+    for piece_type in _PIECE_TYPES:
+        by_cell = result[piece_type] = {}
+        for rotation, min_j, cells in piece_rotations(piece_type):
+            span = max(bits.bit_length() for _, bits in cells)
+            for px in range(width - span + 1):
+                for used in itertools.combinations(range(lines), len(cells)):
+                    rows = [(y, bits << px) for y, (_, bits) in zip(used, cells)]
+                    gaps = 0
+                    for y in range(used[0] + 1, used[-1]):
+                        if y not in used:
+                            gaps |= 1 << y
+                    mask = 0
+                    columns = {}
+                    for y, bits in rows:
+                        for x in range(width):
+                            if bits >> x & 1:
+                                mask |= 1 << (x * lines + y)
+                                top, bottom = columns.get(x, (y, y))
+                                columns[x] = (min(top, y), max(bottom, y))
+                    above = []
+                    for y in range(used[-1]):
+                        bits = 0
+                        for x, (top, _) in columns.items():
+                            if y < top:
+                                bits |= 1 << x
+                        if bits:
+                            above.append((y, bits))
+                    placement = Placement(piece_type, rotation, px - min_j, mask, rows, gaps,
+                                          above, [(1 << x, bottom)
+                                                  for x, (_, bottom) in sorted(columns.items())])
+                    first = (mask & -mask).bit_length() - 1
+                    by_cell.setdefault(first, []).append(placement)
+
+    _placement_cache[key] = result
+    return result
+
+
+class Solver:
+    """
+    Tìm kiếm có ghi nhớ cho một bảng rộng `width`.
+
+    Thuộc tính:
+        use_hold: Cho phép dùng ô giữ
+        target: Mẫu đích (danh sách mặt nạ hàng, trên xuống dưới) hoặc None = perfect clear
+        dead: Tập các trạng thái đã biết là không giải được / không phủ kín được
+        tiling_cache: dict lưu mọi cách phủ của một vùng với một tập mảnh
+                      (None = không lưu; solve_bag bật để dùng lại giữa các chuỗi)
+        nodes: Số trạng thái đã mở rộng
+        max_nodes: Dừng tìm sau ngần này trạng thái (None = không giới hạn)
+        aborted: True nếu lần tìm cuối dừng vì max_nodes
+    """
+
+    def __init__(self, width=GRID_WIDTH, use_hold=True, target=None, max_nodes=SOLVER_MAX_NODES,
+                 cache_tilings=False):
+        self.width = width
+        self.max_nodes = max_nodes
+        self.aborted = False
+        self.use_hold = use_hold
+        self.target = list(target) if target is not None else None
+        self.full = (1 << width) - 1
+        self.dead = set()
+        self.tiling_cache = {} if cache_tilings else None
+        self.nodes = 0
+
+    def count_node(self):
+        self.nodes += 1
+        if self.max_nodes is not None and self.nodes > self.max_nodes:
+            raise _SearchAborted()
+
+    def options(self, pieces, index, hold, can_hold=True):
+        """
+        Các mảnh có thể đặt tiếp theo.
+
+        Args:
+            can_hold: False nếu ô giữ đã dùng cho mảnh hiện tại (chỉ ở nước đầu)
+
+        Returns:
+            Danh sách (loại, use_hold, ô giữ mới, chỉ số mới trong chuỗi)
+        """
+        options = [(pieces[index], False, hold, index + 1)] if index < len(pieces) else []
+        if self.use_hold and can_hold:
+            if hold is not None:
+                if index < len(pieces) and hold != pieces[index]:
+                    options.append((hold, True, pieces[index], index + 1))
+                elif index == len(pieces):
+                    # Hết chuỗi biết trước: đổi mảnh giữ với mảnh kế tiếp (chưa biết,
+                    # nên sau đó ô giữ coi như trống)
+                    options.append((hold, True, None, index))
+            elif index + 1 < len(pieces) and pieces[index + 1] != pieces[index]:
+                options.append((pieces[index + 1], True, pieces[index], index + 2))
+        return options
+
+    # --- Perfect clear: phủ vùng rồi tìm thứ tự ------------------------------
+
+    def tilings(self, lines, filled, counts):
+        """
+        Các cách phủ kín vùng `lines` hàng.
+
+        Args:
+            filled: Ô đã đầy của vùng (bit x * lines + y)
+            counts: Số mảnh còn dùng được của mỗi loại (theo TetrominoType.all_types())
+
+        Returns:
+            Iterable các danh sách Placement
+        """
+        if self.tiling_cache is None:
+            return self._tile(region_placements(self.width, lines), lines,
+                              (1 << (lines * self.width)) - 1, filled, counts)
+        key = (lines, filled, counts)
+        found = self.tiling_cache.get(key)
+        if found is None:
+            found = list(self._tile(region_placements(self.width, lines), lines,
+                                    (1 << (lines * self.width)) - 1, filled, counts))
+            self.tiling_cache[key] = found
+        return found
+
+    def _tile(self, placements, lines, region, filled, counts):
+        if filled == region:
+            yield []
+            return
+        key = (lines, filled, counts)
+        if key in self.dead:
+            return
+        self.count_node()
+        empty = ~filled & region
+        first = (empty & -empty).bit_length() - 1
+        complete = False
+        for i, count in enumerate(counts):
+            if not count:
+                continue
+            rest = counts[:i] + (count - 1,) + counts[i + 1:]
+            for placement in placements[_PIECE_TYPES[i]].get(first, ()):
+                if placement.mask & filled:
+                    continue
+                for tiling in self._tile(placements, lines, region, filled | placement.mask, rest):
+                    complete = True
+                    yield [placement] + tiling
+        if not complete:
+            self.dead.add(key)
+
+    def droppable(self, placement, rows, cleared, lines):
+        """
+        True nếu mảnh thả thẳng xuống đúng vị trí của nó trên bảng hiện tại.
+
+        Args:
+            rows: Các hàng của vùng theo tọa độ gốc (ô đầy, gồm cả hàng đã xóa)
+            cleared: Mặt nạ (bit y) các hàng đã bị xóa
+        """
+        for y, bits in placement.above:
+            if rows[y] & bits and not cleared >> y & 1:
+                return False       # Cột phía trên có khối: không thả tới được
+        for bit, bottom in placement.columns:
+            y = bottom + 1
+            while y < lines and cleared >> y & 1:
+                y += 1
+            if y == lines or rows[y] & bit:
+                return True        # Tựa lên khối hoặc đáy: mảnh dừng ở đây
+        return False
+
+    def order(self, tiling, start_rows, pieces, hold, can_hold):
+        """
+        Tìm thứ tự đặt các mảnh của một cách phủ.
+
+        Returns:
+            Danh sách (Placement, use_hold) theo thứ tự đặt, hoặc None
+        """
+        lines = len(start_rows)
+        complete = (1 << len(tiling)) - 1
+        by_type = {}
+        for i, placement in enumerate(tiling):
+            by_type.setdefault(placement.piece_type, []).append(i)
+        dead = set()
+        full = self.full
+
+        def visit(placed, rows, cleared, index, hold, can_hold):
+            if placed == complete:
+                return []
+            key = (placed, index, hold)
+            if key in dead:
+                return None
+            self.count_node()
+            for piece_type, use_hold, new_hold, new_index in self.options(
+                    pieces, index, hold, can_hold):
+                for i in by_type.get(piece_type, ()):
+                    placement = tiling[i]
+                    if placed >> i & 1 or placement.gaps & ~cleared:
+                        continue
+                    if not self.droppable(placement, rows, cleared, lines):
+                        continue
+                    new_rows = list(rows)
+                    new_cleared = cleared
+                    for y, bits in placement.rows:
+                        new_rows[y] |= bits
+                        if new_rows[y] == full:
+                            new_cleared |= 1 << y
+                    path = visit(placed | 1 << i, new_rows, new_cleared, new_index, new_hold, True)
+                    if path is not None:
+                        return [(placement, use_hold)] + path
+            dead.add(key)
+            return None
+
+        cleared = 0
+        for y, row in enumerate(start_rows):
+            if row == full:
+                cleared |= 1 << y
+        return visit(0, list(start_rows), cleared, 0, hold, can_hold)
+
+    def region(self, rows, lines):
+        """(hàng của vùng `lines` hàng dưới cùng, ô đầy theo thứ tự cột)"""
+        region = list(rows[len(rows) - lines:])
+        filled = 0
+        for y, row in enumerate(region):
+            for x in range(self.width):
+                if row >> x & 1:
+                    filled |= 1 << (x * lines + y)
+        return region, filled
+
+    def clear_heights(self, rows, lines, pieces, hold):
+        """Các chiều cao perfect clear có thể (không quá `lines`), thấp trước"""
+        used = [y for y, row in enumerate(rows) if row]
+        lowest = len(rows) - used[0] if used else 1
+        available = len(pieces) + (hold is not None)
+        heights = []
+        for height in range(max(lowest, 1), lines + 1):
+            empty = height * self.width - sum(_popcount(row) for row in rows[len(rows) - height:])
+            if empty and empty % 4 == 0 and empty // 4 <= available:
+                heights.append(height)
+        return heights
+
+    def piece_counts(self, pieces, hold):
+        counts = [0] * len(_PIECE_TYPES)
+        for piece_type in list(pieces) + ([hold] if hold is not None else []):
+            counts[_PIECE_INDEX[piece_type]] += 1
+        return tuple(counts)
+
+    def solve_clear(self, rows, lines, pieces, hold, can_hold):
+        """Perfect clear trong một tiến trình"""
+        counts = self.piece_counts(pieces, hold)
+        for height in self.clear_heights(rows, lines, pieces, hold):
+            region, filled = self.region(rows, height)
+            for tiling in self.tilings(height, filled, counts):
+                path = self.order(tiling, region, pieces, hold, can_hold)
+                if path is not None:
+                    return [(p.piece_type, p.rotation, p.x, use_hold) for p, use_hold in path]
+        return None
+
+    def solve_clear_parallel(self, rows, lines, pieces, hold, can_hold, workers):
+        """
+        Mỗi mảnh phủ ô trống đầu tiên là một việc; trả về lời giải đầu tiên tìm được.
+
+        Dùng multiprocessing.Pool để có thể dừng ngay các nhánh còn đang chạy
+        (terminate) khi đã có lời giải.
+        """
+        import multiprocessing
+        counts = self.piece_counts(pieces, hold)
+        pool = multiprocessing.Pool(workers)
+        try:
+            for height in self.clear_heights(rows, lines, pieces, hold):
+                region, filled = self.region(rows, height)
+                placements = region_placements(self.width, height)
+                empty = ~filled & ((1 << (height * self.width)) - 1)
+                first = (empty & -empty).bit_length() - 1
+                branches = []
+                for i, count in enumerate(counts):
+                    if not count:
+                        continue
+                    rest = counts[:i] + (count - 1,) + counts[i + 1:]
+                    for placement in placements[_PIECE_TYPES[i]].get(first, ()):
+                        if not placement.mask & filled:
+                            branches.append((self.width, self.use_hold, self.max_nodes, height,
+                                             region, filled, rest, placement, pieces, hold,
+                                             can_hold))
+                for path, nodes, aborted in pool.imap_unordered(_clear_branch, branches):
+                    self.nodes += nodes
+                    self.aborted |= aborted
+                    if path is not None:
+                        return path
+        finally:
+            pool.terminate()
+            pool.join()
+        return None
+
+    # --- Câu đố theo mẫu: tìm theo thứ tự đặt ------------------------------
+
+    def feasible(self, rows, limit, pieces, index, hold):
+        """
+        Kiểm tra nhanh một trạng thái có thể còn đạt mẫu không.
+
+        Args:
+            rows: Bitboard cục bộ (SPAWN_ROWS hàng trống + các hàng vùng)
+            limit: Số hàng vùng còn lại (hàng dưới cùng)
+        """
+        height = len(rows)
+        # Không ô nào nằm trên vùng
+        for y in range(height - limit):
+            if rows[y]:
+                return False
+        region = rows[height - limit:]
+        remaining = len(pieces) - index + (hold is not None)
+        target = self.target[len(self.target) - limit:] if limit else []
+        missing = 0
+        for row, goal in zip(region, target):
+            if row & ~goal:
+                return True   # Còn ô thừa: phải xóa hàng, không đếm được đơn giản
+            missing += _popcount(goal & ~row)
+        return missing % 4 == 0 and missing // 4 <= remaining
+
+    def solved(self, rows):
+        height = len(rows)
+        return (not any(rows[:height - len(self.target)])
+                and rows[height - len(self.target):] == self.target)
+
+    def moves(self, rows, limit, pieces, index, hold, can_hold=True):
+        """
+        Các nước đi từ một trạng thái, hàng thấp trước.
+
+        Yields:
+            ((loại, rotation, x, use_hold), bitboard mới, limit mới, index mới, hold mới)
+        """
+        height = len(rows)
+        top = height - limit
+        result = []
+        for piece_type, use_hold, new_hold, new_index in self.options(
+                pieces, index, hold, can_hold):
+            for rotation, x, y, cells, px in enumerate_placements(
+                    rows, self.width, height, piece_type):
+                if y + cells[0][0] < top:
+                    continue   # Một phần mảnh nằm trên vùng
+                new_rows, lines = place(rows, self.width, cells, px, y)
+                result.append((-y, (piece_type, rotation, x, use_hold), new_rows,
+                               limit - lines, new_index, new_hold))
+        result.sort(key=lambda move: move[0])
+        for _, move, new_rows, new_limit, new_index, new_hold in result:
+            yield move, new_rows, new_limit, new_index, new_hold
+
+    def search(self, rows, limit, pieces, index, hold, can_hold=True):
+        """
+        Returns:
+            Danh sách nước đi tới đích, hoặc None
+        """
+        if index and self.solved(rows):
+            return []
+        key = (tuple(rows), limit, pieces[index:], hold)
+        if key in self.dead:
+            return None
+        self.count_node()
+        for move, new_rows, new_limit, new_index, new_hold in self.moves(
+                rows, limit, pieces, index, hold, can_hold):
+            if not self.feasible(new_rows, new_limit, pieces, new_index, new_hold):
+                continue
+            path = self.search(new_rows, new_limit, pieces, new_index, new_hold)
+            if path is not None:
+                return [move] + path
+        if can_hold:
+            self.dead.add(key)   # Gốc bị cấm giữ không đại diện cho khóa này
+        return None
+
+    # --- Điểm vào ------------------------------------------------------------
+
+    def solve(self, rows, pieces, lines=4, hold=None, workers=None, can_hold=True):
+        """
+        Tìm chuỗi nước đi.
+
+        Args:
+            rows: Bitboard đầy đủ (trên xuống dưới), ví dụ bot.board_rows(grid)
+            pieces: Chuỗi mảnh biết trước (mảnh hiện tại đứng đầu)
+            lines: Số hàng dưới cùng được dùng
+            hold: Mảnh đang giữ (None = ô giữ trống)
+            workers: Chia việc cho nhiều tiến trình (perfect clear; None = một tiến trình)
+            can_hold: False nếu mảnh hiện tại đã dùng ô giữ (chỉ cấm giữ ở nước đầu)
+
+        Returns:
+            Danh sách (loại, rotation, x, use_hold) theo thứ tự đặt, hoặc None.
+            (rotation, x, use_hold) đưa thẳng được cho bot.apply_placement.
+        """
+        pieces = tuple(pieces)
+        self.aborted = False
+        if any(rows[:len(rows) - lines]):
+            return None   # Có ô trên vùng: không giải được trong `lines` hàng
+        try:
+            if self.target is None:
+                if workers and workers > 1:
+                    return self.solve_clear_parallel(rows, lines, pieces, hold, can_hold, workers)
+                return self.solve_clear(rows, lines, pieces, hold, can_hold)
+            local = [0] * SPAWN_ROWS + list(rows[len(rows) - lines:])
+            if not self.feasible(local, lines, pieces, 0, hold):
+                return None
+            return self.search(local, lines, pieces, 0, hold, can_hold)
+        except _SearchAborted:
+            self.aborted = True
+            return None
+
+
+def _clear_branch(branch):
+    """Chạy trong tiến trình con: mọi cách phủ bắt đầu bằng một mảnh (bảng ghi nhớ riêng)"""
+    (width, use_hold, max_nodes, height, region, filled, counts, first, pieces, hold,
+     can_hold) = branch
+    solver = Solver(width, use_hold, max_nodes=max_nodes)
+    try:
+        for tiling in solver.tilings(height, filled | first.mask, counts):
+            path = solver.order([first] + tiling, region, pieces, hold, can_hold)
+            if path is not None:
+                return ([(p.piece_type, p.rotation, p.x, use_hold) for p, use_hold in path],
+                        solver.nodes, False)
+    except _SearchAborted:
+        return None, solver.nodes, True
+    return None, solver.nodes, False
+
+
+def bag_continuations(bag_remaining, length):
+    """
+    Mọi chuỗi `length` mảnh tiếp theo hợp với luật túi 7 mảnh.
+
+    Args:
+        bag_remaining: Các loại mảnh còn trong túi hiện tại (chưa lộ)
+    """
+    bags = [sorted(bag_remaining)]
+    total = len(bags[0])
+    while total < length:
+        bags.append(TetrominoType.all_types())
+        total += 7
+    for parts in itertools.product(*(itertools.permutations(bag) for bag in bags)):
+        yield tuple(piece for part in parts for piece in part)[:length]
+
+
+def needed_pieces(rows, lines, width=GRID_WIDTH):
+    """Số mảnh cần để lấp vùng `lines` hàng dưới cùng"""
+    region = rows[len(rows) - lines:]
+    return (lines * width - sum(_popcount(row) for row in region)) // 4
+
+
+def solve_bag(rows, known, bag_remaining, lines=4, hold=None, width=GRID_WIDTH, use_hold=True,
+              max_nodes=SOLVER_MAX_NODES):
+    """
+    Thử perfect clear với mọi phần tiếp theo của chuỗi theo luật túi 7 mảnh.
+
+    Args:
+        known: Các mảnh đã biết (mảnh hiện tại + hàng đợi)
+        bag_remaining: Các loại mảnh còn trong túi sau mảnh biết cuối cùng
+
+    Returns:
+        (số chuỗi giải được, tổng số chuỗi, một lời giải ví dụ hoặc None)
+    """
+    needed = needed_pieces(rows, lines, width) + use_hold   # Giữ có thể cần thêm một mảnh
+    unknown = max(0, needed - len(known))
+    # Các cách phủ chỉ phụ thuộc tập mảnh, nên được lưu và dùng lại giữa các chuỗi
+    solver = Solver(width, use_hold, max_nodes=max_nodes, cache_tilings=True)
+    solved = total = 0
+    example = None
+    seen = set()
+    for tail in bag_continuations(bag_remaining, unknown):
+        if tail in seen:
+            continue
+        seen.add(tail)
+        total += 1
+        solver.nodes = 0   # Giới hạn max_nodes tính cho từng chuỗi
+        path = solver.solve(rows, tuple(known) + tail, lines, hold)
+        if path is not None:
+            solved += 1
+            if example is None:
+                example = path
+    return solved, total, example
+
+
+def solve_game_state(game_state, lines=4, workers=None, use_hold=True, max_nodes=SOLVER_MAX_NODES):
+    """Perfect clear với mảnh hiện tại, hàng đợi xem trước và ô giữ của một GameState"""
+    rows = board_rows(game_state.grid)
+    pieces = [game_state.current_piece.piece_type] + list(game_state.next_queue)
+    solver = Solver(game_state.width, use_hold, max_nodes=max_nodes)
+    return solver.solve(rows, pieces, lines, game_state.held_piece_type, workers,
+                        can_hold=game_state.can_hold)
+
+
+def parse_board(lines, width=GRID_WIDTH, height=GRID_HEIGHT):
+    """Bitboard từ các chuỗi hàng ('X' hoặc '#' = ô đầy), xếp ở đáy bảng"""
+    rows = [0] * (height - len(lines))
+    for text in lines:
+        mask = 0
+        for x, char in enumerate(text[:width]):
+            if char in 'X#':
+                mask |= 1 << x
+        rows.append(mask)
+    return rows
+
+
+def benchmark(count=SOLVER_BENCH_OPENINGS, pieces=11, lines=4, seed=0, max_nodes=SOLVER_MAX_NODES):
+    """
+    Đo thời gian perfect clear từ bảng trống trên các chuỗi mở đầu của BagRandomizer.
+
+    Returns:
+        Danh sách (chuỗi, giây, số trạng thái, giải được, dừng vì max_nodes)
+    """
+    rng = random.Random(seed)
+    rows = [0] * GRID_HEIGHT
+    results = []
+    for _ in range(count):
+        bag = BagRandomizer(rng.randrange(1 << 32))
+        sequence = ''.join(bag.next() for _ in range(pieces))
+        solver = Solver(max_nodes=max_nodes)
+        started = time.perf_counter()
+        path = solver.solve(rows, sequence, lines)
+        elapsed = time.perf_counter() - started
+        results.append((sequence, elapsed, solver.nodes, path is not None, solver.aborted))
+        print("%s  %7.3fs  %7d trạng thái  %s" % (
+            sequence, elapsed, solver.nodes,
+            "dừng" if solver.aborted else ("%d hàng" % (4 * len(path) // GRID_WIDTH)
+                                           if path else "không có lời giải")))
+    times = sorted(result[1] for result in results)
+    print("trung vị %.3fs, chậm nhất %.3fs, giải được %d / %d"
+          % (times[len(times) // 2], times[-1], sum(result[3] for result in results), count))
+    return results
+
+
+def main(argv=None):
+    """Điểm khởi đầu dòng lệnh"""
+    parser = argparse.ArgumentParser(description="Giải perfect clear")
+    parser.add_argument('--pieces', help="Chuỗi mảnh, ví dụ IOTLJSZ")
+    parser.add_argument('--board', nargs='*', default=[], help="Các hàng dưới cùng, ví dụ XXXX....XX")
+    parser.add_argument('--lines', type=int, default=4, help="Số hàng dưới cùng được dùng")
+    parser.add_argument('--hold', default=None, help="Mảnh đang giữ")
+    parser.add_argument('--no-hold', action='store_true', help="Không dùng ô giữ")
+    parser.add_argument('--bag', action='store_true',
+                        help="Chuỗi chỉ biết một phần: thử mọi phần tiếp theo theo túi 7 mảnh")
+    parser.add_argument('--workers', type=int, default=None, help="Chia việc cho N tiến trình")
+    parser.add_argument('--max-nodes', type=int, default=SOLVER_MAX_NODES,
+                        help="Số trạng thái tối đa mỗi lần tìm (0 = không giới hạn)")
+    parser.add_argument('--bench', action='store_true',
+                        help="Đo trên các chuỗi mở đầu ngẫu nhiên từ bảng trống")
+    args = parser.parse_args(argv)
+
+    max_nodes = args.max_nodes or None
+    if args.bench:
+        benchmark(lines=args.lines, max_nodes=max_nodes)
+        return
+    if not args.pieces:
+        parser.error("cần --pieces (hoặc --bench)")
+    pieces = list(args.pieces.upper())
+    rows = parse_board(args.board)
+    started = time.perf_counter()
+    if args.bag:
+        seen = len(pieces) % 7
+        remaining = set(TetrominoType.all_types()) - set(pieces[len(pieces) - seen:]) if seen else set()
+        solved, total, path = solve_bag(rows, pieces, remaining, args.lines, args.hold,
+                                        use_hold=not args.no_hold, max_nodes=max_nodes)
+        print("Giải được %d / %d chuỗi (%.1f%%)" % (solved, total, 100.0 * solved / max(total, 1)))
+    else:
+        solver = Solver(use_hold=not args.no_hold, max_nodes=max_nodes)
+        path = solver.solve(rows, pieces, args.lines, args.hold, args.workers)
+        print("%d trạng thái%s" % (solver.nodes, " (dừng vì --max-nodes)" if solver.aborted else ""))
+    print("%.3fs" % (time.perf_counter() - started))
+    if path is None:
+        print("Không có lời giải")
+        return
+    for piece_type, rotation, x, use_hold in path:
+        print("%s  xoay %d  cột %d%s" % (piece_type, rotation, x, "  (giữ)" if use_hold else ""))
+
+
+if __name__ == "__main__":
+    main(sys.argv[1:])
@@ -0,0 +1,231 @@
+"""
+Thống kê Trực tiếp (PPS, APM, Số hàng mỗi phút, Thời gian mỗi cấp)
+
+- PPS: số mảnh đã khóa mỗi giây
+- APM: số lần nhấn phím mỗi phút (không tính ACTION_*_REPEAT do DAS/ARR)
+- KPP: số lần nhấn phím trung bình mỗi mảnh
+- LPM: số hàng đã xóa mỗi phút
+- Mốc thời gian đạt mỗi cấp (split)
+
+Mỗi tốc độ có hai giá trị: trung bình cả game và trung bình trong cửa sổ
+trượt STATS_WINDOW giây gần nhất. Cửa sổ trượt là một vòng các ngăn thời
+gian cố định (STATS_BUCKETS ngăn) kèm tổng chạy: thêm một sự kiện và đọc
+tổng đều O(1), bộ nhớ cố định bất kể tốc độ chơi.
+
+Đồng hồ thống kê là thời gian game (tổng delta_time của các khung được mô
+phỏng), nên tạm dừng không làm giảm PPS, và thống kê tính lại từ replay
+(stats_from_replay) khớp với lúc chơi.
+
+Cách dùng:
+    python src/stats.py replays/tetris_replay_123.json
+"""
+
+import json
+import os
+import sys
+import time
+from config import *
+from replay import Replay, ACTION_LEFT_REPEAT, ACTION_RIGHT_REPEAT, ACTION_HOLD, apply_action
+
+# Hành động không phải là một lần nhấn phím
+REPEAT_ACTIONS = (ACTION_LEFT_REPEAT, ACTION_RIGHT_REPEAT)
+
+
+class SlidingWindow:
+    """
+    Tổng các giá trị trong `seconds` giây gần nhất.
+
+    Thời gian được chia thành các ngăn rộng seconds / buckets; một vòng các
+    ngăn giữ giá trị của cửa sổ. Khi đồng hồ tiến, các ngăn đã ra khỏi cửa
+    sổ được trừ khỏi tổng và xóa (mỗi ngăn một lần, nên O(1) khấu hao).
+    """
+
+    def __init__(self, seconds=STATS_WINDOW, buckets=STATS_BUCKETS):
+        self.seconds = seconds
+        self.bucket_width = seconds / buckets
+        self.counts = [0] * buckets
+        self.total = 0
+        self.bucket = 0   # Chỉ số tuyệt đối của ngăn hiện tại
+
+    def advance(self, now):
+        """Tiến cửa sổ tới thời điểm `now` (giây)"""
+        target = int(now / self.bucket_width)
+        if target - self.bucket >= len(self.counts):
+            # Cả cửa sổ đã hết hạn
+            self.counts = [0] * len(self.counts)
+            self.total = 0
+            self.bucket = target
+            return
+        counts = self.counts
+        while self.bucket < target:
+            self.bucket += 1
+            slot = self.bucket % len(counts)
+            self.total -= counts[slot]
+            counts[slot] = 0
+
+    def add(self, now, value=1):
+        self.advance(now)
+        self.counts[self.bucket % len(self.counts)] += value
+        self.total += value
+
+    def rate(self, now, per=1.0):
+        """
+        Tốc độ trong cửa sổ (giá trị mỗi `per` giây).
+
+        Khi game chưa chạy đủ một cửa sổ, chỉ chia cho thời gian đã chạy.
+        """
+        self.advance(now)
+        span = min(self.seconds, now)
+        return self.total * per / span if span > 0 else 0.0
+
+
+class GameStats:
+    """
+    Thống kê của một game, cập nhật từ vòng lặp game.
+
+    Gọi on_frame(delta_time) cho mỗi khung được mô phỏng và observe(game_state,
+    action) sau mỗi hành động và mỗi lần update; mảnh mới, số hàng và cấp
+    được phát hiện bằng cách so với lần quan sát trước (mảnh mới: số mảnh
+    đã lấy khỏi túi tăng; xoay cũng thay đối tượng current_piece).
+
+    Thuộc tính:
+        clock: Thời gian game (giây)
+        pieces, inputs, lines: Tổng cả game
+        splits: Danh sách (cấp, thời điểm đạt cấp đó)
+    """
+
+    def __init__(self, game_state=None):
+        self.clock = 0.0
+        self.pieces = 0
+        self.inputs = 0
+        self.lines = 0
+        self.piece_window = SlidingWindow()
+        self.input_window = SlidingWindow()
+        self.line_window = SlidingWindow()
+        self.splits = [(1, 0.0)]
+        self.seed = None
+        self.drawn = 0   # Số mảnh đã lấy khỏi túi (mảnh mới làm số này tăng)
+        self.level = 1
+        self.lines_seen = 0
+        if game_state is not None:
+            self.seed = game_state.seed
+            self.drawn = game_state.bag_randomizer.drawn
+            self.level = game_state.level
+            self.lines_seen = game_state.lines_cleared
+            self.splits = [(game_state.level, 0.0)]
+
+    def resync(self, game_state):
+        """Nhận trạng thái mới (ví dụ sau khi tua lùi) làm mốc so sánh, không ghi gì"""
+        self.drawn = game_state.bag_randomizer.drawn
+        self.level = game_state.level
+        self.lines_seen = game_state.lines_cleared
+
+    def on_frame(self, delta_time):
+        self.clock += delta_time
+
+    def observe(self, game_state, action=None):
+        """
+        So trạng thái với lần trước và ghi các thay đổi.
+
+        Args:
+            action: Hành động vừa áp dụng (None nếu vừa update)
+        """
+        now = self.clock
+        if action is not None and action not in REPEAT_ACTIONS:
+            self.inputs += 1
+            self.input_window.add(now)
+        drawn = game_state.bag_randomizer.drawn
+        if drawn != self.drawn:
+            # Mảnh mới: do khóa mảnh trước, trừ khi là giữ mảnh lần đầu (ô giữ trống)
+            if action != ACTION_HOLD:
+                self.pieces += 1
+                self.piece_window.add(now)
+            self.drawn = drawn
+        if game_state.lines_cleared != self.lines_seen:
+            cleared = game_state.lines_cleared - self.lines_seen
+            self.lines_seen = game_state.lines_cleared
+            self.lines += cleared
+            self.line_window.add(now, cleared)
+        if game_state.level != self.level:
+            self.level = game_state.level
+            self.splits.append((self.level, now))
+
+    def pps(self, windowed=True):
+        if windowed:
+            return self.piece_window.rate(self.clock)
+        return self.pieces / self.clock if self.clock > 0 else 0.0
+
+    def apm(self, windowed=True):
+        if windowed:
+            return self.input_window.rate(self.clock, 60.0)
+        return self.inputs * 60.0 / self.clock if self.clock > 0 else 0.0
+
+    def lpm(self, windowed=True):
+        if windowed:
+            return self.line_window.rate(self.clock, 60.0)
+        return self.lines * 60.0 / self.clock if self.clock > 0 else 0.0
+
+    def inputs_per_piece(self, windowed=True):
+        if windowed:
+            pieces = self.piece_window.total
+            return self.input_window.total / pieces if pieces else 0.0
+        return self.inputs / self.pieces if self.pieces else 0.0
+
+    def level_times(self):
+        """Thời gian ở mỗi cấp: danh sách (cấp, số giây); cấp cuối tính tới hiện tại"""
+        ends = [t for _, t in self.splits[1:]] + [self.clock]
+        return [(level, end - start) for (level, start), end in zip(self.splits, ends)]
+
+    def summary(self):
+        """Thống kê cả game dưới dạng dict (để lưu JSON)"""
+        return {
+            'seed': self.seed,
+            'time': round(self.clock, 3),
+            'pieces': self.pieces,
+            'inputs': self.inputs,
+            'lines': self.lines,
+            'pps': round(self.pps(False), 3),
+            'apm': round(self.apm(False), 1),
+            'inputs_per_piece': round(self.inputs_per_piece(False), 2),
+            'lpm': round(self.lpm(False), 2),
+            'splits': [{'level': level, 'reached': round(start, 3), 'duration': round(duration, 3)}
+                       for (level, start), (_, duration) in zip(self.splits, self.level_times())],
+        }
+
+    def export(self, directory=STATS_DIR):
+        """
+        Ghi summary ra <directory>/stats_<seed>_<thời gian>.json.
+
+        Returns:
+            Đường dẫn file đã ghi
+        """
+        os.makedirs(directory, exist_ok=True)
+        path = os.path.join(directory, "stats_%s_%d.json" % (self.seed, int(time.time())))
+        with open(path, 'w') as f:
+            json.dump(self.summary(), f, indent=1)
+        return path
+
+
+def stats_from_replay(replay):
+    """Tính lại thống kê của một replay (cùng thứ tự như TetrisGame.run)"""
+    from game import GameState
+    game_state = GameState(replay.seed, high_score_file=None)
+    stats = GameStats(game_state)
+    for dt_ms, soft_drop, actions in replay.frames:
+        for action in actions:
+            apply_action(game_state, action)
+            stats.observe(game_state, action)
+        stats.on_frame(dt_ms / 1000.0)
+        game_state.update(dt_ms / 1000.0, soft_drop)
+        stats.observe(game_state)
+    return stats
+
+
+def main(argv=None):
+    """In thống kê của các file replay"""
+    for path in argv or []:
+        print("%s: %s" % (path, json.dumps(stats_from_replay(Replay.load(path)).summary())))
+
+
+if __name__ == "__main__":
+    main(sys.argv[1:])
@@ -0,0 +1,276 @@
+"""
+Truyền Trạng thái Bảng cho Khán giả (Nén Delta)
+
+File này chứa bộ mã hóa/giải mã để phát trực tiếp một game:
+- Khung chính (keyframe): toàn bộ lưới + mảnh hiện tại
+- Khung delta: chỉ những gì thay đổi so với khung trước
+  (hàng bị xóa, hàng rác đẩy lên, hàng bị sửa, vị trí/xoay của mảnh)
+
+Mỗi ô được gửi đúng như Board lưu nó: 1 byte id ô (0 = trống, 1-7 = loại
+mảnh, 8 = rác), nên một hàng được gửi thẳng từ bộ nhớ của bảng mà không
+chuyển đổi, một khung chính chỉ tốn khoảng 200 byte và một khung delta
+thường chỉ vài byte. Xóa hàng và hàng rác được gửi như thao tác dịch (lấy từ
+nhật ký row_shifts của GameState), không phải gửi lại mọi hàng bị dịch, nên
+khung delta vẫn nhỏ trên bảng rộng hoặc cao.
+"""
+
+import struct
+from config import *
+from board import Board
+from game import GameState
+from tetromino import PIECE_TYPES, PIECE_IDS, CELL_GARBAGE
+
+
+# Loại thông điệp
+MSG_KEYFRAME = 0
+MSG_DELTA = 1
+
+# Các thao tác trong khung delta
+OP_CLEAR = 1   # Xóa các hàng (dịch các hàng phía trên xuống)
+OP_ROW = 2     # Ghi đè nội dung một hàng
+OP_PIECE = 3   # Cập nhật mảnh hiện tại
+OP_SHIFT_UP = 4   # Đẩy các hàng rác lên từ đáy (dịch cả bảng lên)
+
+# Định dạng nhị phân (little-endian)
+HEADER_FORMAT = '<BI'       # loại thông điệp, số thứ tự khung
+SIZE_FORMAT = '<HH'         # chiều rộng, chiều cao
+PIECE_FORMAT = '<BhhB'      # id loại mảnh, x, y, trạng thái xoay
+CLEAR_FORMAT = '<BB'        # OP_CLEAR, số hàng
+ROW_INDEX_FORMAT = '<H'     # chỉ số một hàng
+SHIFT_UP_FORMAT = '<BB'     # OP_SHIFT_UP, số hàng rác; sau đó mỗi hàng một cột lỗ ('<H')
+HOLE_FORMAT = '<H'          # cột lỗ của một hàng rác
+
+_HEADER_SIZE = struct.calcsize(HEADER_FORMAT)
+_SIZE_SIZE = struct.calcsize(SIZE_FORMAT)
+_PIECE_SIZE = struct.calcsize(PIECE_FORMAT)
+_CLEAR_SIZE = struct.calcsize(CLEAR_FORMAT)
+_ROW_INDEX_SIZE = struct.calcsize(ROW_INDEX_FORMAT)
+_SHIFT_UP_SIZE = struct.calcsize(SHIFT_UP_FORMAT)
+_HOLE_SIZE = struct.calcsize(HOLE_FORMAT)
+
+# Id loại mảnh trong luồng giống id ô của Board (0 = không có mảnh)
+ID_TO_TYPE = [None] + PIECE_TYPES
+
+
+def piece_key(piece):
+    """Trả về tuple (id loại, x, y, xoay) của một mảnh, hoặc None"""
+    if piece is None:
+        return None
+    return (PIECE_IDS[piece.piece_type], piece.x, piece.y, piece.rotation)
+
+
+class BoardStreamEncoder:
+    """
+    Mã hóa trạng thái GameState thành chuỗi thông điệp nhị phân.
+
+    Bộ mã hóa giữ một bản sao "bóng" của lưới mà người xem đang có.
+    Mỗi khung, nó:
+    - Phát lại các lần dịch hàng mà game đã ghi vào row_shifts kể từ khung
+      trước: OP_CLEAR cho hàng đã xóa, OP_SHIFT_UP cho hàng rác (kể cả khi
+      xóa hàng xong ngay trong một khung, như game chạy ngầm)
+    - Gửi OP_ROW cho mỗi hàng còn khác bản bóng (thường do lock_piece)
+    - Gửi OP_PIECE khi mảnh hiện tại di chuyển hoặc xoay
+
+    Cứ mỗi keyframe_interval khung lại gửi một khung chính để người xem
+    mới tham gia (hoặc bị mất gói) có thể đồng bộ lại.
+    """
+
+    def __init__(self, keyframe_interval=STREAM_KEYFRAME_INTERVAL):
+        """
+        Args:
+            keyframe_interval: Số khung giữa hai khung chính
+        """
+        self.keyframe_interval = keyframe_interval
+        self.frame = 0
+        self.shadow = None           # Lưới người xem đang có (Board)
+        self.shadow_piece = None     # Mảnh người xem đang có
+        self.source = None           # Lưới của game đang phát (đổi khi game bị reset)
+        self.shift_count = 0         # row_shift_count của game tại khung trước
+        self.frames_since_keyframe = 0
+
+    def force_keyframe(self):
+        """Buộc khung tiếp theo là khung chính (ví dụ khi có người xem mới)"""
+        self.shadow = None
+
+    def encode(self, game_state):
+        """
+        Mã hóa một khung.
+
+        Args:
+            game_state: GameState cần phát
+
+        Returns:
+            bytes của thông điệp, hoặc None nếu không có gì thay đổi
+        """
+        grid = game_state.grid
+        self.frame += 1
+
+        # Khung chính: lần đầu, theo chu kỳ, khi game bị reset (lưới mới) hoặc
+        # khi nhật ký dịch hàng đã quên bớt các lần dịch chưa gửi
+        missed = game_state.row_shift_count - self.shift_count
+        if (self.shadow is None
+                or self.frames_since_keyframe >= self.keyframe_interval
+                or grid is not self.source
+                or not 0 <= missed <= len(game_state.row_shifts)):
+            return self._encode_keyframe(game_state)
+
+        self.frames_since_keyframe += 1
+        parts = []
+
+        # Các lần dịch hàng, theo đúng thứ tự game đã làm
+        if missed:
+            shifts = list(game_state.row_shifts)[len(game_state.row_shifts) - missed:]
+            self._encode_shifts(shifts, parts)
+            self.shift_count = game_state.row_shift_count
+
+        # Các hàng đã thay đổi (so sánh cả lưới trước, phần lớn khung không đổi gì)
+        shadow = self.shadow
+        if grid.to_bytes() != shadow.to_bytes():
+            for y in range(grid.height):
+                row = grid[y]
+                if row != shadow[y]:
+                    parts.append(struct.pack('<B', OP_ROW))
+                    parts.append(struct.pack(ROW_INDEX_FORMAT, y))
+                    parts.append(row)
+                    shadow.set_row(y, row)
+
+        # Mảnh hiện tại
+        key = piece_key(game_state.current_piece)
+        if key != self.shadow_piece:
+            parts.append(struct.pack('<B', OP_PIECE))
+            parts.append(struct.pack(PIECE_FORMAT, *key))
+            self.shadow_piece = key
+
+        if not parts:
+            return None
+        return struct.pack(HEADER_FORMAT, MSG_DELTA, self.frame) + b''.join(parts)
+
+    def _encode_shifts(self, shifts, parts):
+        """
+        Thêm OP_CLEAR / OP_SHIFT_UP cho các mục row_shifts và áp dụng lên bản bóng.
+
+        Các hàng rác liên tiếp được gộp vào một OP_SHIFT_UP (tối đa 255 hàng).
+        """
+        holes = []
+        for kind, data in shifts + [(None, None)]:
+            if kind == GameState.SHIFT_GARBAGE:
+                holes.append(data)
+                continue
+            for i in range(0, len(holes), 255):
+                chunk = holes[i:i + 255]
+                parts.append(struct.pack(SHIFT_UP_FORMAT, OP_SHIFT_UP, len(chunk)))
+                parts.extend(struct.pack(HOLE_FORMAT, x) for x in chunk)
+                for x in chunk:
+                    push_garbage(self.shadow, x)
+            holes = []
+            if kind == GameState.SHIFT_CLEAR:
+                parts.append(struct.pack(CLEAR_FORMAT, OP_CLEAR, len(data)))
+                parts.extend(struct.pack(ROW_INDEX_FORMAT, y) for y in data)
+                self.shadow.remove_rows(data)
+
+    def _encode_keyframe(self, game_state):
+        """Mã hóa toàn bộ lưới và mảnh hiện tại"""
+        grid = game_state.grid
+        self.shadow = Board(grid.width, grid.height)
+        for y in range(grid.height):
+            self.shadow.set_row(y, grid[y])
+        self.shadow_piece = piece_key(game_state.current_piece)
+        self.source = grid
+        self.shift_count = game_state.row_shift_count
+        self.frames_since_keyframe = 0
+
+        piece = self.shadow_piece or (0, 0, 0, 0)
+        return (struct.pack(HEADER_FORMAT, MSG_KEYFRAME, self.frame)
+                + struct.pack(SIZE_FORMAT, grid.width, grid.height)
+                + grid.to_bytes()
+                + struct.pack(PIECE_FORMAT, *piece))
+
+
+def push_garbage(board, hole_x):
+    """Đẩy một hàng rác có lỗ ở cột hole_x lên từ đáy (như GameState.add_garbage)"""
+    row = bytearray([CELL_GARBAGE]) * board.width
+    row[hole_x] = 0
+    board.push_bottom(row)
+
+
+class BoardStreamDecoder:
+    """
+    Dựng lại lưới GameState ở phía người xem.
+
+    Thuộc tính:
+        grid: Board các id ô, cùng dạng GameState.grid
+        piece: Tuple (loại mảnh, x, y, xoay) hoặc None
+        frame: Số thứ tự khung cuối cùng đã áp dụng
+        synced: False cho đến khi nhận được khung chính đầu tiên
+    """
+
+    def __init__(self):
+        self.grid = None
+        self.piece = None
+        self.frame = 0
+        self.synced = False
+
+    def apply(self, message):
+        """
+        Áp dụng một thông điệp từ BoardStreamEncoder.
+
+        Khung delta đến trước khung chính đầu tiên bị bỏ qua.
+
+        Returns:
+            True nếu thông điệp đã được áp dụng
+        """
+        msg_type, frame = struct.unpack_from(HEADER_FORMAT, message, 0)
+        offset = _HEADER_SIZE
+
+        if msg_type == MSG_KEYFRAME:
+            width, height = struct.unpack_from(SIZE_FORMAT, message, offset)
+            offset += _SIZE_SIZE
+            self.grid = Board(width, height)
+            for y in range(height):
+                self.grid.set_row(y, message[offset + y * width:offset + (y + 1) * width])
+            offset += width * height
+            self._set_piece(struct.unpack_from(PIECE_FORMAT, message, offset))
+            self.frame = frame
+            self.synced = True
+            return True
+
+        if not self.synced:
+            return False
+
+        width = self.grid.width
+        while offset < len(message):
+            op = message[offset]
+            if op == OP_CLEAR:
+                count = message[offset + 1]
+                offset += _CLEAR_SIZE
+                cleared = [struct.unpack_from(ROW_INDEX_FORMAT, message, offset + i * _ROW_INDEX_SIZE)[0]
+                           for i in range(count)]
+                offset += count * _ROW_INDEX_SIZE
+                self.grid.remove_rows(cleared)
+            elif op == OP_SHIFT_UP:
+                count = message[offset + 1]
+                offset += _SHIFT_UP_SIZE
+                for i in range(count):
+                    push_garbage(self.grid, struct.unpack_from(HOLE_FORMAT, message, offset)[0])
+                    offset += _HOLE_SIZE
+            elif op == OP_ROW:
+                y = struct.unpack_from(ROW_INDEX_FORMAT, message, offset + 1)[0]
+                offset += 1 + _ROW_INDEX_SIZE
+                self.grid.set_row(y, message[offset:offset + width])
+                offset += width
+            elif op == OP_PIECE:
+                self._set_piece(struct.unpack_from(PIECE_FORMAT, message, offset + 1))
+                offset += 1 + _PIECE_SIZE
+            else:
+                raise ValueError("Thao tác không hợp lệ trong luồng: %d" % op)
+
+        self.frame = frame
+        return True
+
+    def _set_piece(self, values):
+        """Lưu mảnh hiện tại từ tuple (id, x, y, xoay)"""
+        type_id, x, y, rotation = values
+        if type_id == 0:
+            self.piece = None
+        else:
+            self.piece = (ID_TO_TYPE[type_id], x, y, rotation)
@@ -0,0 +1,305 @@
+"""
+Telemetry - Luồng Sự kiện Gameplay có Cấu trúc
+
+Mỗi sự kiện (tạo mảnh, khóa mảnh, giữ mảnh, xóa hàng, lên cấp, game over,
+khung hình bị giật) được đẩy vào một bộ đệm vòng giới hạn trong bộ nhớ.
+Một luồng nền định kỳ lấy sự kiện ra theo lô và ghi xuống đĩa.
+
+Trên đường nóng (vòng lặp game), emit() chỉ làm:
+- Kiểm tra bộ đệm còn chỗ không (nếu đầy: tăng bộ đếm `dropped` rồi thoát;
+  lần ghi kế tiếp thêm một sự kiện `dropped` vào log để biết log bị hụt)
+- Lấy thời gian và append một tuple vào deque
+Không có khóa, không có I/O, nên không bao giờ chặn khung hình.
+
+Hai định dạng ghi:
+- JsonLinesSink: file JSON-lines, tự xoay vòng file theo dung lượng
+- BinarySink: các lô bản ghi struct kích thước cố định (gọn, đọc lại bằng read_binary_log)
+"""
+
+import json
+import os
+import struct
+import threading
+import time
+from collections import deque
+from config import *
+from tetromino import PIECE_IDS, PIECE_TYPES
+
+
+# Loại sự kiện và tên các trường dữ liệu đi kèm
+EVENT_PIECE_SPAWN = 1
+EVENT_PIECE_LOCK = 2
+EVENT_HOLD = 3
+EVENT_LINE_CLEAR = 4
+EVENT_LEVEL_UP = 5
+EVENT_GAME_OVER = 6
+EVENT_FRAME_SPIKE = 7
+EVENT_DROPPED = 8
+
+EVENT_NAMES = {
+    EVENT_PIECE_SPAWN: 'piece_spawn',
+    EVENT_PIECE_LOCK: 'piece_lock',
+    EVENT_HOLD: 'hold',
+    EVENT_LINE_CLEAR: 'line_clear',
+    EVENT_LEVEL_UP: 'level_up',
+    EVENT_GAME_OVER: 'game_over',
+    EVENT_FRAME_SPIKE: 'frame_spike',
+    EVENT_DROPPED: 'dropped',
+}
+
+EVENT_FIELDS = {
+    EVENT_PIECE_SPAWN: ('piece',),
+    EVENT_PIECE_LOCK: ('piece', 'x', 'y', 'rotation'),
+    EVENT_HOLD: ('piece', 'held'),
+    EVENT_LINE_CLEAR: ('lines', 'combo', 'score'),
+    EVENT_LEVEL_UP: ('level',),
+    EVENT_GAME_OVER: ('score', 'lines', 'level'),
+    EVENT_FRAME_SPIKE: ('frame_ms',),
+    EVENT_DROPPED: ('count',),   # Số sự kiện bị bỏ kể từ lần báo trước
+}
+
+
+# Định dạng nhị phân (little-endian): mỗi lô là BATCH_FORMAT rồi `count` bản ghi
+# EVENT_FORMAT. Trường mảnh (PIECE_FIELDS) lưu id 1-7 (0 = không có), các trường
+# khác là số nguyên; trường không dùng bằng 0.
+BATCH_FORMAT = '<dI'         # clock_offset, số sự kiện
+EVENT_FORMAT = '<dB4q'       # thời gian perf_counter, loại, tối đa 4 trường
+BATCH_SIZE = struct.calcsize(BATCH_FORMAT)
+EVENT_SIZE = struct.calcsize(EVENT_FORMAT)
+EVENT_SLOTS = 4
+PIECE_FIELDS = frozenset(('piece', 'held'))
+
+
+def event_to_dict(event, clock_offset):
+    """
+    Chuyển một sự kiện thô (thời gian perf_counter, loại, dữ liệu) thành dict.
+
+    Args:
+        event: Tuple (t, kind, data)
+        clock_offset: Số cộng vào perf_counter để ra thời gian thực (epoch)
+    """
+    t, kind, data = event
+    record = {'t': round(t + clock_offset, 6), 'event': EVENT_NAMES.get(kind, kind)}
+    for name, value in zip(EVENT_FIELDS.get(kind, ()), data):
+        record[name] = value
+    return record
+
+
+class JsonLinesSink:
+    """
+    Ghi sự kiện ra file JSON-lines, xoay vòng khi file vượt quá max_bytes.
+
+    File hiện tại là <dir>/telemetry.jsonl; các file cũ là telemetry.1.jsonl,
+    telemetry.2.jsonl, ... (giữ tối đa backup_count file).
+    """
+
+    def __init__(self, directory=TELEMETRY_DIR, max_bytes=TELEMETRY_MAX_BYTES,
+                 backup_count=TELEMETRY_BACKUP_COUNT):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self.backup_count = backup_count
+        os.makedirs(directory, exist_ok=True)
+        self.path = os.path.join(directory, 'telemetry.jsonl')
+        self.file = open(self.path, 'a')
+
+    def write_batch(self, events, clock_offset):
+        """Ghi một lô sự kiện"""
+        lines = [json.dumps(event_to_dict(event, clock_offset), separators=(',', ':'))
+                 for event in events]
+        self.file.write('\n'.join(lines) + '\n')
+        self.file.flush()
+        if self.file.tell() >= self.max_bytes:
+            self.rotate()
+
+    def rotate(self):
+        """Đổi tên các file cũ (n -> n+1) và mở file mới"""
+        self.file.close()
+        for i in range(self.backup_count - 1, 0, -1):
+            src = os.path.join(self.directory, 'telemetry.%d.jsonl' % i)
+            if os.path.exists(src):
+                os.replace(src, os.path.join(self.directory, 'telemetry.%d.jsonl' % (i + 1)))
+        if self.backup_count > 0:
+            os.replace(self.path, os.path.join(self.directory, 'telemetry.1.jsonl'))
+        else:
+            os.remove(self.path)
+        self.file = open(self.path, 'a')
+
+    def close(self):
+        self.file.close()
+
+
+def pack_event(event):
+    """Một sự kiện thô -> bản ghi EVENT_FORMAT"""
+    t, kind, data = event
+    values = [0] * EVENT_SLOTS
+    for i, (name, value) in enumerate(zip(EVENT_FIELDS.get(kind, ()), data)):
+        if name in PIECE_FIELDS:
+            values[i] = 0 if value is None else PIECE_IDS[value]
+        else:
+            values[i] = int(value)
+    return struct.pack(EVENT_FORMAT, t, kind, *values)
+
+
+def unpack_event(data, offset):
+    """Bản ghi EVENT_FORMAT ở `offset` -> sự kiện thô (t, kind, data)"""
+    t, kind, *values = struct.unpack_from(EVENT_FORMAT, data, offset)
+    fields = EVENT_FIELDS.get(kind, ())
+    return t, kind, tuple(
+        (PIECE_TYPES[value - 1] if value else None) if name in PIECE_FIELDS else value
+        for name, value in zip(fields, values))
+
+
+class BinarySink:
+    """
+    Ghi sự kiện dạng nhị phân gọn.
+
+    Mỗi lô: BATCH_FORMAT (clock_offset, số sự kiện) rồi các bản ghi EVENT_FORMAT
+    kích thước cố định. Dùng read_binary_log() để đọc lại.
+    """
+
+    def __init__(self, path):
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self.file = open(path, 'ab')
+
+    def write_batch(self, events, clock_offset):
+        self.file.write(struct.pack(BATCH_FORMAT, clock_offset, len(events))
+                        + b''.join(pack_event(event) for event in events))
+        self.file.flush()
+
+    def close(self):
+        self.file.close()
+
+
+def read_binary_log(path):
+    """
+    Đọc file do BinarySink ghi.
+
+    Yields:
+        dict cho mỗi sự kiện (cùng dạng với JSON-lines)
+    """
+    with open(path, 'rb') as f:
+        while True:
+            header = f.read(BATCH_SIZE)
+            if len(header) < BATCH_SIZE:
+                return
+            clock_offset, count = struct.unpack(BATCH_FORMAT, header)
+            data = f.read(count * EVENT_SIZE)
+            if len(data) < count * EVENT_SIZE:
+                return   # Lô cuối bị cắt (game dừng giữa lúc ghi)
+            for i in range(count):
+                yield event_to_dict(unpack_event(data, i * EVENT_SIZE), clock_offset)
+
+
+class Telemetry:
+    """
+    Bộ đệm sự kiện giới hạn + luồng nền ghi theo lô.
+
+    Thuộc tính:
+        capacity: Số sự kiện tối đa chờ ghi
+        emitted: Tổng số sự kiện đã nhận
+        dropped: Số sự kiện bị bỏ vì bộ đệm đầy
+        written: Số sự kiện đã ghi xuống sink
+    """
+
+    def __init__(self, sink=None, capacity=TELEMETRY_BUFFER_SIZE,
+                 flush_interval=TELEMETRY_FLUSH_INTERVAL, batch_size=TELEMETRY_BATCH_SIZE):
+        """
+        Args:
+            sink: Đối tượng có write_batch(events, clock_offset) và close()
+                  (None = chỉ giữ trong bộ nhớ, dùng drain() để lấy ra)
+            capacity: Kích thước bộ đệm
+            flush_interval: Số giây tối đa giữa hai lần ghi
+            batch_size: Số sự kiện tối đa mỗi lô
+        """
+        self.sink = sink
+        self.capacity = capacity
+        self.flush_interval = flush_interval
+        self.batch_size = batch_size
+        self.buffer = deque()
+        self.emitted = 0
+        self.dropped = 0
+        self.written = 0
+        self.reported_dropped = 0   # Phần của `dropped` đã được báo xuống sink
+        # Độ lệch để đổi perf_counter (nhanh, đơn điệu) sang thời gian thực
+        self.clock_offset = time.time() - time.perf_counter()
+        self._stop = threading.Event()
+        self._thread = None
+
+    def emit(self, kind, *data):
+        """
+        Ghi nhận một sự kiện (an toàn để gọi từ vòng lặp game).
+
+        Args:
+            kind: Một trong các hằng số EVENT_*
+            *data: Giá trị các trường theo EVENT_FIELDS[kind]
+        """
+        self.emitted += 1
+        if len(self.buffer) >= self.capacity:
+            self.dropped += 1
+            return
+        self.buffer.append((time.perf_counter(), kind, data))
+
+    def drain(self, limit=None):
+        """Lấy ra tối đa `limit` sự kiện theo thứ tự (None = tất cả)"""
+        buffer = self.buffer
+        count = len(buffer) if limit is None else min(limit, len(buffer))
+        return [buffer.popleft() for _ in range(count)]
+
+    def flush(self):
+        """
+        Ghi mọi sự kiện đang chờ xuống sink (theo lô), rồi một sự kiện
+        EVENT_DROPPED nếu có sự kiện bị bỏ kể từ lần ghi trước.
+        """
+        if self.sink is None:
+            return
+        while self.buffer:
+            batch = self.drain(self.batch_size)
+            self.sink.write_batch(batch, self.clock_offset)
+            self.written += len(batch)
+        dropped = self.dropped
+        if dropped > self.reported_dropped:
+            # Không tính vào `written`: emitted = written + dropped + pending
+            event = (time.perf_counter(), EVENT_DROPPED, (dropped - self.reported_dropped,))
+            self.sink.write_batch([event], self.clock_offset)
+            self.reported_dropped = dropped
+
+    def start(self):
+        """Khởi động luồng nền ghi định kỳ"""
+        if self._thread is not None:
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name="telemetry", daemon=True)
+        self._thread.start()
+
+    def _run(self):
+        """Vòng lặp của luồng nền"""
+        while not self._stop.wait(self.flush_interval):
+            try:
+                self.flush()
+            except OSError:
+                # Lỗi ghi đĩa không được làm hỏng game; sự kiện của lô đó bị mất
+                pass
+
+    def stop(self):
+        """Dừng luồng nền, ghi nốt sự kiện còn lại (kể cả số bị bỏ) và đóng sink"""
+        if self._thread is not None:
+            self._stop.set()
+            self._thread.join()
+            self._thread = None
+        try:
+            self.flush()
+        except OSError:
+            pass
+        if self.sink is not None:
+            self.sink.close()
+
+    def stats(self):
+        """Thống kê bộ đệm"""
+        return {
+            'emitted': self.emitted,
+            'dropped': self.dropped,
+            'written': self.written,
+            'pending': len(self.buffer),
+        }
@@ -32,6 +32,16 @@ class TetrominoType:
         }
         return colors[piece_type]
 
+    @staticmethod
+    def get_id(piece_type):
+        """Trả về id (1-7) của một loại mảnh, dùng để lưu trong Board"""
+        return PIECE_IDS[piece_type]
+
+    @staticmethod
+    def from_id(cell_id):
+        """Trả về loại mảnh của một id (1-7)"""
+        return PIECE_TYPES[cell_id - 1]
+
     @staticmethod
     def get_shape(piece_type):
         """
@@ -90,6 +100,17 @@ class TetrominoType:
         return shapes[piece_type]
 
 
+# Id ô trong Board: 0 = trống, 1-7 = loại mảnh (theo thứ tự all_types), 8 = rác
+CELL_EMPTY = 0
+CELL_GARBAGE = 8
+PIECE_TYPES = TetrominoType.all_types()
+PIECE_IDS = {piece_type: i + 1 for i, piece_type in enumerate(PIECE_TYPES)}
+
+# Bảng tra màu theo id ô (chỉ dùng khi vẽ)
+CELL_COLORS = ([None] + [TetrominoType.get_color(t) for t in PIECE_TYPES]
+               + [COLOR_GARBAGE])
+
+
 class Tetromino:
     """
     Đại diện cho một mảnh tetromino đơn có thể di chuyển và xoay.
@@ -101,18 +122,19 @@ class Tetromino:
         rotation: Trạng thái xoay hiện tại (0, 1, 2, hoặc 3)
     """
     
-    def __init__(self, piece_type):
+    def __init__(self, piece_type, grid_width=GRID_WIDTH):
         """
         Tạo một mảnh tetromino mới.
         
         Args:
             piece_type: Một trong các hằng số TetrominoType
+            grid_width: Chiều rộng bảng (để đặt mảnh ở giữa)
         """
         self.piece_type = piece_type
         self.shape = TetrominoType.get_shape(piece_type)
         
         # Vị trí bắt đầu: giữa trên cùng của lưới
-        self.x = GRID_WIDTH // 2 - 2
+        self.x = grid_width // 2 - 2
         self.y = 0
         self.rotation = 0
 
@@ -120,6 +142,10 @@ class Tetromino:
         """Trả về màu sắc của mảnh này"""
         return TetrominoType.get_color(self.piece_type)
 
+    def get_id(self):
+        """Trả về id ô của mảnh này (giá trị được ghi vào Board khi khóa)"""
+        return PIECE_IDS[self.piece_type]
+
     def get_blocks(self):
         """
         Trả về danh sách tọa độ (x, y) cho tất cả các khối đầy trong mảnh.
@@ -215,17 +241,49 @@ class BagRandomizer:
     
     Điều này đảm bảo phân phối công bằng - bạn sẽ không bao giờ phải đợi quá lâu
     mà không thấy một loại mảnh cụ thể.
+
+    Mỗi túi được xáo trộn bằng một bộ sinh số riêng suy ra từ (seed, số thứ tự túi),
+    nên cùng một seed luôn cho cùng một chuỗi mảnh (cần cho replay).
     """
     
-    def __init__(self):
-        """Tạo một bộ ngẫu nhiên túi mới với túi đầy đã xáo trộn"""
+    def __init__(self, seed=None):
+        """
+        Tạo một bộ ngẫu nhiên túi mới với túi đầy đã xáo trộn.
+
+        Args:
+            seed: Seed cho chuỗi mảnh (None = chọn ngẫu nhiên)
+        """
+        if seed is None:
+            seed = random.randrange(1 << 32)
+        self.seed = seed
+        self.bag_index = 0   # Số túi đã được đổ đầy
         self.bag = []
+        self.future_bags = {}  # Các túi sau đã được tạo sẵn cho preview (theo số thứ tự)
         self.refill_bag()
 
+    def make_bag(self, index):
+        """
+        Tạo túi thứ `index` (đã xáo trộn) mà không thay đổi trạng thái.
+
+        Mảnh được lấy từ cuối danh sách (pop), giống self.bag.
+        """
+        bag = self.future_bags.get(index)
+        if bag is None:
+            bag = TetrominoType.all_types()
+            rng = random.Random(self.seed ^ (index * 0x9E3779B97F4A7C15))
+            rng.shuffle(bag)
+        return list(bag)
+
     def refill_bag(self):
         """Đổ đầy túi với tất cả 7 loại mảnh và xáo trộn"""
-        self.bag = TetrominoType.all_types()
-        random.shuffle(self.bag)
+        self.bag = self.make_bag(self.bag_index)
+        self.future_bags.pop(self.bag_index, None)
+        self.bag_index += 1
+
+    @property
+    def drawn(self):
+        """Số mảnh đã lấy ra từ đầu game (không đổi khi túi được đổ đầy)"""
+        return 7 * self.bag_index - len(self.bag)
 
     def next(self):
         """
@@ -253,3 +311,41 @@ class BagRandomizer:
             self.refill_bag()
         return self.bag[-1]
 
+    def preview(self, count):
+        """
+        Xem trước `count` mảnh tiếp theo (có thể vượt sang các túi sau).
+
+        Vì mỗi túi chỉ phụ thuộc (seed, số thứ tự túi), các túi sau được tạo
+        trước mà không làm thay đổi chuỗi mảnh.
+
+        Returns:
+            Danh sách hằng số TetrominoType, mảnh sẽ ra trước đứng đầu
+        """
+        if len(self.bag) == 0:
+            self.refill_bag()
+        pieces = self.bag[::-1][:count]
+        index = self.bag_index
+        while len(pieces) < count:
+            if index not in self.future_bags:
+                self.future_bags[index] = self.make_bag(index)
+            pieces.extend(self.future_bags[index][::-1][:count - len(pieces)])
+            index += 1
+        return pieces
+
+    def unseen_in_bag(self, count):
+        """
+        Các loại mảnh chắc chắn còn trong túi sau `count` mảnh xem trước.
+
+        Đây là thông tin người chơi suy ra được từ quy tắc túi 7 mảnh (không
+        lộ thứ tự thật). Trả về tập rỗng nếu mảnh thứ count + 1 mở một túi mới.
+        """
+        if len(self.bag) == 0:
+            self.refill_bag()
+        if count < len(self.bag):
+            return frozenset(self.bag[:len(self.bag) - count])
+        used = (count - len(self.bag)) % 7
+        if used == 0:
+            return frozenset()
+        seen = self.preview(count)[count - used:]
+        return frozenset(TetrominoType.all_types()) - frozenset(seen)
+
@@ -0,0 +1,158 @@
+"""
+Bảng Chuyển vị (Transposition Table)
+
+Bot tìm kiếm thường gặp lại cùng một trạng thái (bảng, mảnh hiện tại,
+mảnh giữ, hàng đợi) qua các thứ tự nước đi khác nhau. Bảng chuyển vị
+ghi nhớ kết quả đã tính (điểm đánh giá, danh sách vị trí đặt, ...)
+theo giá trị băm Zobrist để không phải tính lại.
+
+Bảng có kích thước giới hạn, với ba chính sách thay thế:
+- 'lru':    Loại bỏ mục ít được dùng gần đây nhất khi đầy
+- 'always': Mỗi khóa có một ô cố định (hash(khóa) % dung lượng), luôn ghi đè
+- 'depth':  Như 'always' nhưng chỉ ghi đè khi độ sâu mới >= độ sâu cũ
+
+Khóa là số nguyên (băm Zobrist) hoặc bất kỳ giá trị hashable nào, ví dụ
+tuple trạng thái đầy đủ; mục được lưu kèm khóa và so sánh khi tra cứu.
+"""
+
+from collections import OrderedDict
+from config import *
+
+
+POLICY_LRU = 'lru'
+POLICY_ALWAYS = 'always'
+POLICY_DEPTH = 'depth'
+
+_MISSING = object()
+
+
+class TranspositionTable:
+    """
+    Bảng băm có giới hạn để ghi nhớ kết quả tìm kiếm.
+
+    Thuộc tính thống kê:
+        hits, misses: Số lần tra cứu trúng/trượt
+        stores: Số lần ghi
+        evictions: Số mục bị loại bỏ hoặc ghi đè
+    """
+
+    def __init__(self, capacity=TT_CAPACITY, policy=TT_POLICY):
+        """
+        Args:
+            capacity: Số mục tối đa
+            policy: Một trong 'lru', 'always', 'depth'
+        """
+        if policy not in (POLICY_LRU, POLICY_ALWAYS, POLICY_DEPTH):
+            raise ValueError("Chính sách thay thế không hợp lệ: %r" % (policy,))
+        if capacity <= 0:
+            raise ValueError("Dung lượng phải lớn hơn 0")
+        self.capacity = capacity
+        self.policy = policy
+        self.clear()
+
+    def clear(self):
+        """Xóa toàn bộ mục và reset thống kê"""
+        if self.policy == POLICY_LRU:
+            self.entries = OrderedDict()   # khóa -> (độ sâu, giá trị)
+        else:
+            self.slots = [None] * self.capacity  # mỗi ô: (khóa, độ sâu, giá trị)
+            self.size = 0
+        self.hits = 0
+        self.misses = 0
+        self.stores = 0
+        self.evictions = 0
+
+    def get(self, key, default=None, min_depth=0):
+        """
+        Tra cứu một khóa.
+
+        Args:
+            key: Khóa (số nguyên băm Zobrist hoặc giá trị hashable khác)
+            default: Giá trị trả về khi không tìm thấy
+            min_depth: Chỉ chấp nhận mục được tính với độ sâu >= giá trị này
+
+        Returns:
+            Giá trị đã lưu, hoặc default
+        """
+        if self.policy == POLICY_LRU:
+            entry = self.entries.get(key)
+            if entry is not None and entry[0] >= min_depth:
+                self.entries.move_to_end(key)
+                self.hits += 1
+                return entry[1]
+        else:
+            entry = self.slots[hash(key) % self.capacity]
+            if entry is not None and entry[0] == key and entry[1] >= min_depth:
+                self.hits += 1
+                return entry[2]
+        self.misses += 1
+        return default
+
+    def store(self, key, value, depth=0):
+        """
+        Lưu giá trị cho một khóa theo chính sách thay thế.
+
+        Returns:
+            True nếu giá trị đã được lưu
+        """
+        if self.policy == POLICY_LRU:
+            if key in self.entries:
+                self.entries.move_to_end(key)
+            elif len(self.entries) >= self.capacity:
+                self.entries.popitem(last=False)
+                self.evictions += 1
+            self.entries[key] = (depth, value)
+            self.stores += 1
+            return True
+
+        index = hash(key) % self.capacity
+        old = self.slots[index]
+        if old is None:
+            self.size += 1
+        elif old[0] != key:
+            # Chính sách 'depth': giữ lại mục được tính sâu hơn
+            if self.policy == POLICY_DEPTH and old[1] > depth:
+                return False
+            self.evictions += 1
+        self.slots[index] = (key, depth, value)
+        self.stores += 1
+        return True
+
+    def memoize(self, key, compute, depth=0):
+        """
+        Trả về giá trị đã lưu cho key, hoặc gọi compute() rồi lưu kết quả.
+
+        Args:
+            key: Khóa (như get)
+            compute: Hàm không tham số tính giá trị khi chưa có
+            depth: Độ sâu tìm kiếm của kết quả
+        """
+        value = self.get(key, _MISSING, depth)
+        if value is _MISSING:
+            value = compute()
+            self.store(key, value, depth)
+        return value
+
+    def __len__(self):
+        if self.policy == POLICY_LRU:
+            return len(self.entries)
+        return self.size
+
+    @property
+    def hit_rate(self):
+        """Tỉ lệ tra cứu trúng (0.0 - 1.0)"""
+        lookups = self.hits + self.misses
+        return self.hits / lookups if lookups else 0.0
+
+    def stats(self):
+        """Trả về dict thống kê (cho log hoặc hiển thị)"""
+        return {
+            'policy': self.policy,
+            'capacity': self.capacity,
+            'size': len(self),
+            'hits': self.hits,
+            'misses': self.misses,
+            'stores': self.stores,
+            'evictions': self.evictions,
+            'hit_rate': self.hit_rate,
+        }
@@ -0,0 +1,232 @@
+"""
+Dò Trọng số cho Bot (Cross-Entropy Method)
+
+Tìm trọng số của hàm đánh giá trong bot.py bằng phương pháp cross-entropy:
+1. Lấy mẫu `population` bộ trọng số từ phân phối chuẩn (mean, std)
+2. Cho mỗi bộ chơi `games` game chạy ngầm (cùng các seed trong một thế hệ,
+   để các ứng viên được so sánh trên cùng chuỗi mảnh)
+3. Giữ nhóm tốt nhất (elite) và đặt mean/std mới theo nhóm đó
+   (cộng thêm nhiễu giảm dần để phân phối không co lại quá sớm)
+
+Các ứng viên của một thế hệ được chấm song song trên một nhóm tiến trình.
+
+Tái lập và tiếp tục:
+- Mọi số ngẫu nhiên của thế hệ g đều suy ra từ (seed, g), và kết quả được
+  gom theo thứ tự ứng viên, nên cùng seed cho cùng kết quả với bất kỳ số
+  tiến trình nào.
+- Sau mỗi thế hệ, trạng thái được ghi ra file checkpoint JSON (ghi file tạm
+  rồi đổi tên, nên bị ngắt giữa chừng cũng không hỏng file). Chạy lại cùng
+  lệnh sẽ tiếp tục từ thế hệ cuối cùng đã xong.
+
+Cách dùng:
+    python src/tuner.py --checkpoint tuner.json --generations 50 --workers 16
+"""
+
+import argparse
+import json
+import math
+import os
+import random
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+from config import *
+from bot import Bot, FEATURE_NAMES, play_game
+
+
+def generation_rng(seed, generation):
+    """Bộ sinh số riêng của một thế hệ (không phụ thuộc các thế hệ trước)"""
+    return random.Random(seed * 1000003 + generation)
+
+
+def evaluate_candidate(weights, game_seeds, max_pieces):
+    """
+    Chấm một bộ trọng số (chạy trong tiến trình con).
+
+    Returns:
+        Số hàng trung bình đã xóa trên các game
+    """
+    bot = Bot(weights)
+    total = 0
+    for game_seed in game_seeds:
+        total += play_game(bot, game_seed, max_pieces)['lines']
+    return total / len(game_seeds)
+
+
+class CrossEntropyTuner:
+    """
+    Trạng thái của một lần dò trọng số (lưu được thành checkpoint).
+
+    Thuộc tính:
+        mean, std: Phân phối hiện tại của trọng số
+        generation: Số thế hệ đã xong
+        best_weights, best_fitness: Ứng viên tốt nhất từng gặp
+        history: Mỗi thế hệ một dict (fitness tốt nhất, trung bình, mean)
+    """
+
+    def __init__(self, seed=0, population=TUNER_POPULATION, elite_fraction=TUNER_ELITE_FRACTION,
+                 games=TUNER_GAMES, max_pieces=BOT_MAX_PIECES, initial_std=TUNER_INITIAL_STD,
+                 noise=TUNER_NOISE, initial_mean=BOT_WEIGHTS):
+        self.seed = seed
+        self.population = population
+        self.elite_fraction = elite_fraction
+        self.games = games
+        self.max_pieces = max_pieces
+        self.noise = noise
+        self.mean = list(initial_mean)
+        self.std = [initial_std] * len(self.mean)
+        self.generation = 0
+        self.best_weights = None
+        self.best_fitness = None
+        self.history = []
+
+    def sample(self):
+        """
+        Lấy mẫu ứng viên và seed game cho thế hệ tiếp theo.
+
+        Returns:
+            (danh sách bộ trọng số, danh sách seed game)
+        """
+        rng = generation_rng(self.seed, self.generation)
+        candidates = [[rng.gauss(m, s) for m, s in zip(self.mean, self.std)]
+                      for _ in range(self.population)]
+        game_seeds = [rng.randrange(1 << 32) for _ in range(self.games)]
+        return candidates, game_seeds
+
+    def update(self, candidates, fitnesses):
+        """Cập nhật phân phối từ kết quả của một thế hệ"""
+        ranked = sorted(zip(fitnesses, range(len(candidates))), key=lambda item: (-item[0], item[1]))
+        elite_count = max(1, int(round(len(candidates) * self.elite_fraction)))
+        elite = [candidates[i] for _, i in ranked[:elite_count]]
+
+        # Nhiễu thêm giảm tuyến tính theo thế hệ
+        extra = max(0.0, self.noise * (1.0 - self.generation / 100.0))
+        for k in range(len(self.mean)):
+            values = [weights[k] for weights in elite]
+            mean = sum(values) / len(values)
+            variance = sum((v - mean) ** 2 for v in values) / len(values)
+            self.mean[k] = mean
+            self.std[k] = math.sqrt(variance + extra)
+
+        top_fitness, top_index = ranked[0]
+        if self.best_fitness is None or top_fitness > self.best_fitness:
+            self.best_fitness = top_fitness
+            self.best_weights = list(candidates[top_index])
+
+        self.history.append({
+            'generation': self.generation,
+            'best': top_fitness,
+            'average': sum(fitnesses) / len(fitnesses),
+            'mean': list(self.mean),
+        })
+        self.generation += 1
+
+    def run_generation(self, pool):
+        """Chạy một thế hệ, chấm các ứng viên trên nhóm tiến trình"""
+        candidates, game_seeds = self.sample()
+        fitnesses = list(pool.map(evaluate_candidate, candidates,
+                                  [game_seeds] * len(candidates),
+                                  [self.max_pieces] * len(candidates)))
+        self.update(candidates, fitnesses)
+
+    def to_dict(self):
+        """Chuyển trạng thái thành dict để lưu JSON"""
+        return {
+            'seed': self.seed,
+            'population': self.population,
+            'elite_fraction': self.elite_fraction,
+            'games': self.games,
+            'max_pieces': self.max_pieces,
+            'noise': self.noise,
+            'features': list(FEATURE_NAMES),
+            'mean': self.mean,
+            'std': self.std,
+            'generation': self.generation,
+            'best_weights': self.best_weights,
+            'best_fitness': self.best_fitness,
+            'history': self.history,
+        }
+
+    @classmethod
+    def from_dict(cls, data):
+        """Tạo lại tuner từ checkpoint"""
+        tuner = cls(data['seed'], data['population'], data['elite_fraction'],
+                    data['games'], data['max_pieces'], noise=data['noise'])
+        tuner.mean = data['mean']
+        tuner.std = data['std']
+        tuner.generation = data['generation']
+        tuner.best_weights = data['best_weights']
+        tuner.best_fitness = data['best_fitness']
+        tuner.history = data['history']
+        return tuner
+
+    def save(self, path):
+        """Ghi checkpoint (ghi file tạm rồi đổi tên để không bao giờ để lại file hỏng)"""
+        temp_path = path + '.tmp'
+        with open(temp_path, 'w') as f:
+            json.dump(self.to_dict(), f, indent=1)
+        os.replace(temp_path, path)
+
+    @classmethod
+    def load(cls, path):
+        """Đọc checkpoint"""
+        with open(path, 'r') as f:
+            return cls.from_dict(json.load(f))
+
+
+def tune(checkpoint, generations, workers=None, **options):
+    """
+    Chạy (hoặc tiếp tục) việc dò trọng số tới khi đủ `generations` thế hệ.
+
+    Args:
+        checkpoint: File checkpoint (nếu đã có thì tiếp tục từ đó)
+        generations: Tổng số thế hệ cần đạt
+        workers: Số tiến trình (None = số lõi CPU)
+        **options: Tham số cho CrossEntropyTuner khi bắt đầu mới
+
+    Returns:
+        CrossEntropyTuner sau thế hệ cuối
+    """
+    if checkpoint and os.path.exists(checkpoint):
+        tuner = CrossEntropyTuner.load(checkpoint)
+        print("Tiếp tục từ thế hệ %d (%s)" % (tuner.generation, checkpoint))
+    else:
+        tuner = CrossEntropyTuner(**options)
+
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        while tuner.generation < generations:
+            started = time.perf_counter()
+            tuner.run_generation(pool)
+            if checkpoint:
+                tuner.save(checkpoint)
+            last = tuner.history[-1]
+            print("thế hệ %3d: tốt nhất %.1f, trung bình %.1f hàng (%.1fs) mean=%s"
+                  % (last['generation'], last['best'], last['average'],
+                     time.perf_counter() - started,
+                     ', '.join('%.3f' % w for w in tuner.mean)))
+    return tuner
+
+
+def main(argv=None):
+    """Điểm khởi đầu dòng lệnh"""
+    parser = argparse.ArgumentParser(description="Dò trọng số bot bằng cross-entropy method")
+    parser.add_argument('--checkpoint', default='tuner.json', help="File checkpoint JSON")
+    parser.add_argument('--generations', type=int, default=TUNER_GENERATIONS)
+    parser.add_argument('--population', type=int, default=TUNER_POPULATION)
+    parser.add_argument('--elite', type=float, default=TUNER_ELITE_FRACTION, help="Tỉ lệ elite")
+    parser.add_argument('--games', type=int, default=TUNER_GAMES, help="Số game mỗi ứng viên")
+    parser.add_argument('--max-pieces', type=int, default=BOT_MAX_PIECES)
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--workers', type=int, default=None, help="Số tiến trình")
+    args = parser.parse_args(argv)
+
+    tuner = tune(args.checkpoint, args.generations, args.workers,
+                 seed=args.seed, population=args.population, elite_fraction=args.elite,
+                 games=args.games, max_pieces=args.max_pieces)
+    print("Trọng số tốt nhất (%.1f hàng):" % (tuner.best_fitness or 0.0))
+    for name, weight in zip(FEATURE_NAMES, tuner.best_weights or []):
+        print("  %-10s %.4f" % (name, weight))
+
+
+if __name__ == "__main__":
+    main(sys.argv[1:])
@@ -0,0 +1,275 @@
+"""
+Kiểm chứng Điểm bằng Replay
+
+Điểm cao trong file điểm cao chỉ là một con số, ai cũng sửa được. Một điểm
+được nộp (giải đấu, bảng xếp hạng) phải kèm replay: seed + đầu vào của mỗi
+khung. Vì GameState tất định, mô phỏng lại replay không cần màn hình với
+đúng luật của game cho ra điểm thật; điểm khai báo được chấp nhận chỉ khi
+khớp.
+
+Một replay bị từ chối nếu:
+- có mã hành động không hợp lệ, hoặc quá VERIFY_MAX_ACTIONS_PER_FRAME hành động trong một khung
+- có hành động lúc game không nhận đầu vào (hoạt ảnh xóa hàng), như
+  GameState.accepts_input mà TetrisGame dùng
+- có thời gian khung âm hoặc dài hơn VERIFY_MAX_FRAME_MS
+- còn khung sau khi game đã kết thúc (TetrisGame dừng ghi ngay khi game over)
+- được đánh dấu luyện tập (game đã bị tua lùi, xem rewind.py)
+- điểm (hoặc số hàng, nếu được khai báo) không khớp với mô phỏng lại
+
+Nhiều replay được kiểm tra song song trên một nhóm tiến trình bằng số lõi
+CPU. Mỗi kết quả kèm thời gian CPU của tiến trình con, để báo cáo thông
+lượng theo số phút chơi được kiểm chứng mỗi giây CPU.
+
+Chế độ dịch vụ (watch): theo dõi một thư mục nộp bài, kiểm tra mỗi file
+.json mới, chuyển nó vào accepted/ hoặc rejected/ và ghi kết quả vào một
+file JSON-lines. Bài nộp nên được ghi ra tên tạm rồi đổi tên thành .json
+(os.replace) để dịch vụ không đọc phải file đang ghi dở.
+
+Cách dùng:
+    python src/verify.py check replays/ games.trpa
+    python src/verify.py watch submissions/ --results results.jsonl
+"""
+
+import argparse
+import json
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor, FIRST_COMPLETED, wait
+from config import *
+from game import GameState
+from replay import Replay, ALL_ACTIONS, apply_action
+from finesse import list_sources
+
+REASON_OK = 'ok'
+REASON_INVALID_ACTION = 'invalid action'
+REASON_INVALID_FRAME_TIME = 'invalid frame time'
+REASON_AFTER_GAME_OVER = 'frames after game over'
+REASON_SCORE_MISMATCH = 'score mismatch'
+REASON_LINES_MISMATCH = 'lines mismatch'
+REASON_PRACTICE = 'practice game'
+
+_VALID_ACTIONS = frozenset(ALL_ACTIONS)
+
+
+def verify_replay(replay, claimed_score=None, claimed_lines=None):
+    """
+    Mô phỏng lại một replay và so với điểm khai báo.
+
+    Args:
+        claimed_score: Điểm khai báo (mặc định replay.score)
+        claimed_lines: Số hàng khai báo (None = không kiểm tra)
+
+    Returns:
+        dict gồm seed, claimed, score, lines, accepted, reason, frames,
+        minutes (thời lượng game) và cpu (giây CPU đã dùng)
+    """
+    started = time.process_time()
+    if claimed_score is None:
+        claimed_score = replay.score
+    game_state = GameState(replay.seed, high_score_file=None)
+    reason = REASON_OK
+    frames = replay.frames
+    played = 0
+    if replay.practice:
+        # Không cần mô phỏng: điểm của game đã tua lùi không được công nhận
+        reason = REASON_PRACTICE
+        frames = []
+
+    for dt_ms, soft_drop, actions in frames:
+        if game_state.game_over:
+            reason = REASON_AFTER_GAME_OVER
+            break
+        if not 0 <= dt_ms <= VERIFY_MAX_FRAME_MS:
+            reason = REASON_INVALID_FRAME_TIME
+            break
+        if len(actions) > VERIFY_MAX_ACTIONS_PER_FRAME or not _VALID_ACTIONS.issuperset(actions):
+            reason = REASON_INVALID_ACTION
+            break
+        for action in actions:
+            if not game_state.accepts_input():
+                # Game thật bỏ qua phím trong hoạt ảnh xóa hàng (và sau game over),
+                # nên không replay thật nào có hành động ở đó
+                reason = REASON_INVALID_ACTION
+                break
+            apply_action(game_state, action)
+        if reason != REASON_OK:
+            break
+        game_state.update(dt_ms / 1000.0, soft_drop)
+        played += 1
+
+    if reason == REASON_OK:
+        if game_state.score != claimed_score:
+            reason = REASON_SCORE_MISMATCH
+        elif claimed_lines is not None and game_state.lines_cleared != claimed_lines:
+            reason = REASON_LINES_MISMATCH
+
+    return {
+        'seed': replay.seed,
+        'claimed': claimed_score,
+        'score': game_state.score,
+        'lines': game_state.lines_cleared,
+        'accepted': reason == REASON_OK,
+        'reason': reason,
+        'frames': played,
+        'minutes': sum(frame[0] for frame in frames[:played]) / 60000.0,
+        'cpu': time.process_time() - started,
+    }
+
+
+def _verify_source(source):
+    """Chạy trong tiến trình con: source là đường dẫn .json hoặc (kho, chỉ số)"""
+    claimed_lines = None
+    if isinstance(source, tuple):
+        path, index = source
+        name = '%s#%d' % (os.path.basename(path), index)
+    else:
+        name = os.path.basename(source)
+    try:
+        if isinstance(source, tuple):
+            from replay_archive import ReplayArchive
+            replay = ReplayArchive(path).load_replay(index)
+        else:
+            with open(source, 'r') as f:
+                data = json.load(f)
+            replay = Replay.from_dict(data)
+            claimed_lines = data.get('lines')
+        result = verify_replay(replay, claimed_lines=claimed_lines)
+    except (OSError, ValueError, KeyError, TypeError) as error:
+        # File hỏng hoặc bị sửa sai định dạng: từ chối, không làm dừng cả lô
+        result = {'accepted': False, 'reason': 'malformed: %s' % error,
+                  'minutes': 0.0, 'cpu': 0.0}
+    result['name'] = name
+    return result
+
+
+def verify_many(sources, workers=None):
+    """
+    Kiểm tra nhiều replay song song (số tiến trình mặc định = số lõi CPU).
+
+    Yields:
+        Kết quả của verify_replay (kèm 'name'), theo thứ tự sources
+    """
+    workers = workers or os.cpu_count() or 1
+    chunksize = max(1, len(sources) // (4 * workers))
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        yield from pool.map(_verify_source, sources, chunksize=chunksize)
+
+
+class Throughput:
+    """Tổng hợp số game, số phút chơi và thời gian CPU đã dùng"""
+
+    def __init__(self):
+        self.games = 0
+        self.accepted = 0
+        self.minutes = 0.0
+        self.cpu = 0.0
+        self.started = time.perf_counter()
+
+    def add(self, result):
+        self.games += 1
+        self.accepted += result['accepted']
+        self.minutes += result['minutes']
+        self.cpu += result['cpu']
+
+    def report(self):
+        elapsed = time.perf_counter() - self.started
+        rate = self.minutes / self.cpu if self.cpu > 0 else 0.0
+        return ("%d game, %d chấp nhận, %d từ chối; %.1f phút chơi trong %.2fs "
+                "(%.2fs CPU): %.1f phút chơi / giây CPU"
+                % (self.games, self.accepted, self.games - self.accepted,
+                   self.minutes, elapsed, self.cpu, rate))
+
+
+class VerifierService:
+    """
+    Dịch vụ kiểm tra liên tục một thư mục nộp bài.
+
+    File .json mới trong inbox được đưa vào nhóm tiến trình (tối đa
+    2 * workers việc đang chạy); khi xong, file được chuyển vào
+    inbox/accepted hoặc inbox/rejected và kết quả được ghi vào results.
+    """
+
+    def __init__(self, inbox, results, workers=None):
+        self.inbox = inbox
+        self.results = results
+        self.workers = workers or os.cpu_count() or 1
+        self.pending = {}   # future -> đường dẫn
+        self.throughput = Throughput()
+        for name in ('accepted', 'rejected'):
+            os.makedirs(os.path.join(inbox, name), exist_ok=True)
+
+    def new_files(self):
+        """Các file nộp chưa được đưa vào hàng đợi"""
+        queued = set(self.pending.values())
+        return [os.path.join(self.inbox, name) for name in sorted(os.listdir(self.inbox))
+                if name.endswith('.json') and os.path.join(self.inbox, name) not in queued]
+
+    def finish(self, future, log):
+        path = self.pending.pop(future)
+        result = future.result()
+        self.throughput.add(result)
+        folder = 'accepted' if result['accepted'] else 'rejected'
+        os.replace(path, os.path.join(self.inbox, folder, os.path.basename(path)))
+        log.write(json.dumps(result) + '\n')
+        log.flush()
+
+    def run(self, poll_interval=VERIFY_POLL_INTERVAL, stop_when_empty=False):
+        """Vòng lặp dịch vụ (Ctrl+C để dừng); stop_when_empty: dừng khi hết bài"""
+        with ProcessPoolExecutor(max_workers=self.workers) as pool, \
+                open(self.results, 'a') as log:
+            try:
+                while True:
+                    for path in self.new_files()[:2 * self.workers - len(self.pending)]:
+                        self.pending[pool.submit(_verify_source, path)] = path
+                    if not self.pending:
+                        if stop_when_empty:
+                            break
+                        time.sleep(poll_interval)
+                        continue
+                    done, _ = wait(list(self.pending), timeout=poll_interval,
+                                   return_when=FIRST_COMPLETED)
+                    for future in done:
+                        self.finish(future, log)
+            except KeyboardInterrupt:
+                pass
+            for future in list(self.pending):
+                self.finish(future, log)
+        print(self.throughput.report())
+
+
+def main(argv=None):
+    """Điểm khởi đầu dòng lệnh"""
+    parser = argparse.ArgumentParser(description="Kiểm chứng điểm bằng replay")
+    commands = parser.add_subparsers(dest='command', required=True)
+
+    check = commands.add_parser('check', help="Kiểm tra các replay rồi thoát")
+    check.add_argument('paths', nargs='+', help="File/thư mục replay .json hoặc kho replay")
+    check.add_argument('--workers', type=int, default=None, help="Số tiến trình (mặc định: số lõi)")
+    check.add_argument('--quiet', action='store_true', help="Chỉ in các replay bị từ chối")
+
+    watch = commands.add_parser('watch', help="Theo dõi thư mục nộp bài")
+    watch.add_argument('inbox')
+    watch.add_argument('--results', default='verify_results.jsonl')
+    watch.add_argument('--workers', type=int, default=None)
+    watch.add_argument('--once', action='store_true', help="Dừng khi đã kiểm tra hết bài hiện có")
+
+    args = parser.parse_args(argv)
+
+    if args.command == 'watch':
+        VerifierService(args.inbox, args.results, args.workers).run(stop_when_empty=args.once)
+        return
+
+    sources = [source for path in args.paths for source in list_sources(path)]
+    throughput = Throughput()
+    for result in verify_many(sources, args.workers):
+        throughput.add(result)
+        if not result['accepted'] or not args.quiet:
+            print("%-32s %-8s khai báo %-8s thật %-8s %s"
+                  % (result['name'], 'OK' if result['accepted'] else 'TỪ CHỐI',
+                     result.get('claimed', '-'), result.get('score', '-'), result['reason']))
+    print(throughput.report())
+
+
+if __name__ == "__main__":
+    main(sys.argv[1:])
@@ -0,0 +1,288 @@
+"""
+Màn hình Nhiều Bảng (Wall)
+
+Hiển thị 16-64 game cùng lúc trên một màn hình (sự kiện, xem bot đấu với
+nhau): mỗi game một ô, được xếp tự động với kích thước khối lớn nhất vừa màn hình.
+
+Để giữ 60 FPS trên một lõi CPU:
+- Mỗi ô có Surface riêng được giữ lại; chỉ ô có trạng thái thay đổi (bảng,
+  mảnh hiện tại, điểm) mới được vẽ lại và blit lên màn hình.
+- Bảng được vẽ bằng raster.BoardRasterizer (một lần blit, không vẽ từng ô)
+  và chỉ khi bảng thay đổi; mảnh rơi được vẽ đè lên bản sao của bảng.
+- Chỉ các vùng đã đổi được đưa lên màn hình (pygame.display.update(rects)).
+
+Nguồn game:
+- Bot (bot.py) chơi game mới theo seed, đặt WALL_BOT_PPS mảnh mỗi giây
+- Replay: các file .json trong một thư mục, hoặc một kho replay (replay_archive.py)
+
+Cách dùng:
+    python src/wall.py --boards 32
+    python src/wall.py --replays replays/
+    python src/wall.py --replays games.trpa --boards 64
+    python src/wall.py --boards 64 --bench 600    # đo không cần cửa sổ
+"""
+
+import argparse
+import math
+import os
+import sys
+import time
+import pygame
+from config import *
+from game import GameState
+from replay import Replay, ReplayPlayer
+from raster import BoardRasterizer
+
+
+class BotSource:
+    """Game do bot chơi; bot đặt một mảnh mỗi 1 / pps giây, ở giữa mảnh rơi theo trọng lực"""
+
+    def __init__(self, seed, pps=WALL_BOT_PPS, phase=0.0):
+        from bot import Bot
+        from opening import load_book
+        self.seed = seed
+        self.bot = Bot(book=load_book())
+        self.interval = 1.0 / pps
+        self.timer = phase * self.interval   # Lệch pha để các bot không cùng suy nghĩ một khung
+        self.game_state = GameState(seed, high_score_file=None)
+
+    def step(self, delta_time):
+        game_state = self.game_state
+        if game_state.game_over:
+            self.game_state = GameState(self.seed + 1000003, high_score_file=None)
+            self.seed += 1000003
+            return
+        self.timer += delta_time
+        if self.timer >= self.interval and game_state.state == GameState.STATE_PLAYING:
+            self.timer -= self.interval
+            self.bot.play_turn(game_state)
+        else:
+            game_state.update(delta_time, False)
+
+
+class ReplaySource:
+    """Phát lại một replay theo thời gian thực (lặp lại khi hết)"""
+
+    def __init__(self, replay):
+        self.player = ReplayPlayer(replay)
+        self.clock_ms = 0.0
+
+    @property
+    def game_state(self):
+        return self.player.game_state
+
+    def step(self, delta_time):
+        player = self.player
+        if player.finished():
+            player.restart()
+            self.clock_ms = 0.0
+        self.clock_ms += delta_time * 1000.0
+        frames = player.replay.frames
+        while not player.finished() and frames[player.frame][0] <= self.clock_ms:
+            self.clock_ms -= frames[player.frame][0]
+            player.step()
+
+
+def load_replay_sources(path, count):
+    """Nguồn replay từ một thư mục .json hoặc một kho replay"""
+    if os.path.isdir(path):
+        names = sorted(name for name in os.listdir(path) if name.endswith('.json'))[:count]
+        return [ReplaySource(Replay.load(os.path.join(path, name))) for name in names]
+    from replay_archive import ReplayArchive
+    archive = ReplayArchive(path)
+    return [ReplaySource(archive.load_replay(i)) for i in range(min(count, len(archive)))]
+
+
+def wall_layout(count, area, board_size, label_height=WALL_LABEL_HEIGHT, margin=WALL_MARGIN):
+    """
+    Chọn số cột và kích thước khối lớn nhất để `count` bảng vừa `area`.
+
+    Returns:
+        (số cột, kích thước khối)
+    """
+    width, height = area
+    cells_x, cells_y = board_size
+    best = (1, 1)
+    for columns in range(1, count + 1):
+        rows = math.ceil(count / columns)
+        block_w = (width - margin * (columns + 1)) // (columns * cells_x)
+        block_h = (height - margin * (rows + 1) - label_height * rows) // (rows * cells_y)
+        block = min(block_w, block_h)
+        if block > best[1]:
+            best = (columns, block)
+    return best
+
+
+class WallCell:
+    """
+    Một ô của màn hình nhiều bảng, với Surface được giữ lại.
+    """
+
+    def __init__(self, rect, block_size, font):
+        self.rect = pygame.Rect(rect)
+        self.block_size = block_size
+        self.font = font
+        self.rasterizer = BoardRasterizer(block_size)
+        self.surface = pygame.Surface(self.rect.size)
+        self.key = None
+        self.label = None
+        self.label_key = None
+
+    def state_key(self, game_state):
+        piece = game_state.current_piece
+        return (game_state.grid.to_bytes(), piece.piece_type, piece.x, piece.y, piece.rotation,
+                game_state.score, game_state.game_over, game_state.state)
+
+    def refresh(self, game_state):
+        """
+        Vẽ lại ô nếu trạng thái đã đổi.
+
+        Returns:
+            True nếu ô được vẽ lại
+        """
+        key = self.state_key(game_state)
+        if key == self.key:
+            return False
+        self.key = key
+        surface = self.surface
+        surface.fill(COLOR_BACKGROUND)
+
+        board = self.rasterizer.render(game_state.grid)
+        surface.blit(board, (0, WALL_LABEL_HEIGHT))
+
+        # Mảnh đang rơi
+        if not game_state.game_over:
+            size = self.block_size
+            color = game_state.current_piece.get_color()
+            for x, y in game_state.current_piece.get_blocks():
+                if y >= 0:
+                    surface.fill(color, (x * size + 1, WALL_LABEL_HEIGHT + y * size + 1,
+                                         size - 2, size - 2))
+        else:
+            shade = pygame.Surface(board.get_size())
+            shade.set_alpha(160)
+            shade.fill(COLOR_BACKGROUND)
+            surface.blit(shade, (0, WALL_LABEL_HEIGHT))
+
+        # Điểm (chỉ render chữ khi điểm đổi)
+        label_key = (game_state.score, game_state.lines_cleared)
+        if label_key != self.label_key:
+            self.label_key = label_key
+            self.label = self.font.render("%d  (%d)" % label_key, True, COLOR_TEXT)
+        surface.blit(self.label, (0, 0))
+        return True
+
+
+class WallView:
+    """
+    Vẽ nhiều nguồn game lên một màn hình, chỉ vẽ lại các ô đã đổi.
+
+    Thuộc tính:
+        sources: Danh sách nguồn (có game_state và step(delta_time))
+        cells: Một WallCell cho mỗi nguồn
+    """
+
+    def __init__(self, screen, sources):
+        self.screen = screen
+        self.sources = sources
+        game_state = sources[0].game_state
+        board_size = (game_state.width, game_state.height)
+        columns, block = wall_layout(len(sources), screen.get_size(), board_size)
+        self.block_size = max(block, 1)
+        font = pygame.font.Font(None, max(WALL_LABEL_HEIGHT + 2, 12))
+
+        cell_w = board_size[0] * self.block_size
+        cell_h = board_size[1] * self.block_size + WALL_LABEL_HEIGHT
+        self.cells = []
+        for i in range(len(sources)):
+            column, row = i % columns, i // columns
+            x = WALL_MARGIN + column * (cell_w + WALL_MARGIN)
+            y = WALL_MARGIN + row * (cell_h + WALL_MARGIN)
+            self.cells.append(WallCell((x, y, cell_w, cell_h), self.block_size, font))
+        self.screen.fill(COLOR_BACKGROUND)
+
+    def step(self, delta_time):
+        for source in self.sources:
+            source.step(delta_time)
+
+    def draw(self):
+        """
+        Blit các ô đã đổi lên màn hình.
+
+        Returns:
+            Danh sách vùng đã đổi (cho pygame.display.update)
+        """
+        dirty = []
+        for source, cell in zip(self.sources, self.cells):
+            if cell.refresh(source.game_state):
+                self.screen.blit(cell.surface, cell.rect)
+                dirty.append(cell.rect)
+        return dirty
+
+    def run(self, fps=60):
+        """Vòng lặp hiển thị (ESC hoặc đóng cửa sổ để thoát)"""
+        clock = pygame.time.Clock()
+        pygame.display.flip()
+        running = True
+        while running:
+            delta_time = clock.tick(fps) / 1000.0
+            for event in pygame.event.get():
+                if event.type == pygame.QUIT or (event.type == pygame.KEYDOWN
+                                                 and event.key == pygame.K_ESCAPE):
+                    running = False
+            self.step(delta_time)
+            pygame.display.update(self.draw())
+
+    def benchmark(self, frames, frame_time=1.0 / 60):
+        """Đo thời gian mô phỏng và vẽ mỗi khung (không giới hạn FPS)"""
+        simulate = draw = redrawn = 0
+        for _ in range(frames):
+            started = time.perf_counter()
+            self.step(frame_time)
+            middle = time.perf_counter()
+            redrawn += len(self.draw())
+            simulate += middle - started
+            draw += time.perf_counter() - middle
+        print("%d bảng, khối %dpx: mô phỏng %.2f ms/khung, vẽ %.2f ms/khung, "
+              "trung bình %.1f ô vẽ lại mỗi khung"
+              % (len(self.sources), self.block_size, simulate / frames * 1e3,
+                 draw / frames * 1e3, redrawn / frames))
+
+
+def main(argv=None):
+    """Điểm khởi đầu dòng lệnh"""
+    parser = argparse.ArgumentParser(description="Xem nhiều game cùng lúc")
+    parser.add_argument('--boards', type=int, default=16, help="Số bảng")
+    parser.add_argument('--replays', default=None, help="Thư mục replay .json hoặc file kho replay")
+    parser.add_argument('--seed', type=int, default=0, help="Seed đầu tiên cho game của bot")
+    parser.add_argument('--pps', type=float, default=WALL_BOT_PPS, help="Số mảnh mỗi giây của bot")
+    parser.add_argument('--bench', type=int, default=0, metavar='FRAMES',
+                        help="Đo FRAMES khung không cần cửa sổ rồi thoát")
+    args = parser.parse_args(argv)
+
+    if args.bench:
+        os.environ.setdefault('SDL_VIDEODRIVER', 'dummy')
+    pygame.init()
+    if args.bench:
+        screen = pygame.Surface((WALL_SCREEN_WIDTH, WALL_SCREEN_HEIGHT))
+    else:
+        screen = pygame.display.set_mode((WALL_SCREEN_WIDTH, WALL_SCREEN_HEIGHT))
+        pygame.display.set_caption("Tetris - %d bảng" % args.boards)
+
+    if args.replays:
+        sources = load_replay_sources(args.replays, args.boards)
+        if not sources:
+            parser.error("không tìm thấy replay trong %s" % args.replays)
+    else:
+        sources = [BotSource(args.seed + i, args.pps, i / args.boards) for i in range(args.boards)]
+
+    wall = WallView(screen, sources)
+    if args.bench:
+        wall.benchmark(args.bench)
+    else:
+        wall.run()
+    pygame.quit()
+
+
+if __name__ == "__main__":
+    main(sys.argv[1:])
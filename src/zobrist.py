@@ -0,0 +1,110 @@
+"""
+Băm Zobrist cho Trạng thái Bảng
+
+Mỗi "đặc điểm" của trạng thái (một ô đã đầy, loại mảnh hiện tại,
+mảnh đang giữ, từng vị trí trong hàng đợi mảnh tiếp theo) được gán
+một số ngẫu nhiên 64-bit. Giá trị băm của trạng thái là XOR của tất cả
+các số tương ứng với những đặc điểm đang có.
+
+Vì XOR tự đảo ngược (a ^ b ^ b == a), khi một ô thay đổi ta chỉ cần
+XOR thêm khóa của ô đó - không cần tính lại toàn bộ bảng.
+
+Khóa ô được gán theo hàng vật lý của bộ đệm vòng (board.py), không theo
+hàng logic, cộng thêm một khóa cho vị trí đầu vòng (offset). Xóa hàng hay
+thêm rác chỉ xoay offset và ghi lại vài hàng vật lý, nên băm chỉ đổi ở các
+hàng đó và ở khóa offset: O(số hàng thay đổi) thay vì O(cả bảng). Cái giá:
+hai bảng cùng nội dung nhưng khác offset có băm khác nhau (chỉ bỏ lỡ một
+lần trùng vị trí, không bao giờ nhận nhầm).
+"""
+
+import random
+from config import *
+from tetromino import TetrominoType
+
+
+class ZobristKeys:
+    """
+    Bộ khóa ngẫu nhiên cho một kích thước bảng nhất định.
+
+    Thuộc tính:
+        cells: cells[slot][x] là khóa của ô ở cột x, hàng vật lý slot, khi ô đó đầy
+        full_rows: full_rows[slot] là XOR mọi khóa ô của hàng vật lý slot (hàng đầy)
+        offsets: offsets[o] là khóa của offset o của bộ đệm vòng (offsets[0] = 0)
+        current: Khóa cho từng loại mảnh hiện tại
+        hold: Khóa cho từng loại mảnh đang giữ (không giữ = 0)
+        queue: queue[i][loại] là khóa cho mảnh thứ i trong hàng đợi
+    """
+
+    QUEUE_SLOTS = 16  # Số vị trí hàng đợi tối đa có khóa riêng
+
+    def __init__(self, width, height, seed=ZOBRIST_SEED):
+        rng = random.Random(seed ^ (width << 20) ^ height)
+        types = TetrominoType.all_types()
+        self.width = width
+        self.height = height
+        self.cells = [[rng.getrandbits(64) for _ in range(width)] for _ in range(height)]
+        self.current = {t: rng.getrandbits(64) for t in types}
+        self.hold = {t: rng.getrandbits(64) for t in types}
+        self.hold[None] = 0
+        self.queue = [{t: rng.getrandbits(64) for t in types}
+                      for _ in range(self.QUEUE_SLOTS)]
+        self.offsets = [0] + [rng.getrandbits(64) for _ in range(height - 1)]
+        self.full_rows = []
+        for keys in self.cells:
+            h = 0
+            for key in keys:
+                h ^= key
+            self.full_rows.append(h)
+
+    def row_hash(self, row, slot):
+        """
+        Băm của một hàng nằm ở hàng vật lý slot (XOR các khóa ô đầy).
+
+        Hàng trống hoặc gần đầy (hàng bị xóa, hàng rác, hàng dưới đáy) chỉ tốn
+        theo số ô trống: băm hàng đầy XOR khóa các ô trống, tìm bằng bytes.find.
+        """
+        row = bytes(row)
+        empty = row.count(0)
+        if empty == len(row):
+            return 0
+        keys = self.cells[slot]
+        if 2 * empty <= len(row):
+            h = self.full_rows[slot]
+            x = row.find(0)
+            while x >= 0:
+                h ^= keys[x]
+                x = row.find(0, x + 1)
+            return h
+        h = 0
+        for x, cell in enumerate(row):
+            if cell:
+                h ^= keys[x]
+        return h
+
+    def board_hash(self, grid):
+        """Băm toàn bộ lưới (Board) từ đầu (dùng khi kiểm tra)"""
+        offset = grid.offset
+        h = self.offsets[offset]
+        for y, row in enumerate(grid):
+            h ^= self.row_hash(row, (offset + y) % self.height)
+        return h
+
+    def queue_hash(self, queue):
+        """Băm hàng đợi mảnh tiếp theo (theo vị trí)"""
+        h = 0
+        for i, piece_type in enumerate(queue[:self.QUEUE_SLOTS]):
+            h ^= self.queue[i][piece_type]
+        return h
+
+
+# Bộ khóa được tạo một lần cho mỗi kích thước bảng
+_keys_cache = {}
+
+
+def get_zobrist_keys(width, height):
+    """Lấy (hoặc tạo) bộ khóa Zobrist cho kích thước bảng đã cho"""
+    keys = _keys_cache.get((width, height))
+    if keys is None:
+        keys = ZobristKeys(width, height)
+        _keys_cache[(width, height)] = keys
+    return keys
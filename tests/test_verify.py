@@ -0,0 +1,57 @@
+"""Kiểm chứng replay: replay thật được chấp nhận, replay giả mạo bị từ chối"""
+
+import os
+import sys
+
+os.environ.setdefault('SDL_VIDEODRIVER', 'dummy')
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'src'))
+
+from game import GameState
+from bot import Bot, apply_placement
+from replay import Replay, ACTION_HARD_DROP, ACTION_LEFT, apply_action
+from verify import verify_replay, REASON_OK, REASON_INVALID_ACTION
+
+FRAME_MS = 16
+
+
+def record_bot_game(seed=7, clears=1):
+    """Replay của bot chơi tới khi đã có `clears` lần xóa hàng (khung như TetrisGame ghi)"""
+    game_state = GameState(seed, high_score_file=None)
+    bot = Bot()
+    frames = []
+    seen = 0
+    while seen < clears and not game_state.game_over:
+        actions = apply_placement(game_state, *bot.choose(game_state))
+        frames.append((FRAME_MS, False, actions))
+        game_state.update(FRAME_MS / 1000.0, False)
+        if game_state.state != GameState.STATE_PLAYING:
+            seen += 1
+        while game_state.state != GameState.STATE_PLAYING and not game_state.game_over:
+            frames.append((FRAME_MS, False, []))
+            game_state.update(FRAME_MS / 1000.0, False)
+    return Replay(seed, frames, game_state.score)
+
+
+def test_bot_game_is_accepted():
+    result = verify_replay(record_bot_game())
+    assert result['reason'] == REASON_OK
+    assert result['accepted']
+
+
+def test_actions_during_line_clear_animation_are_rejected():
+    replay = record_bot_game()
+    # Khung đầu tiên sau khi hoạt ảnh xóa hàng bắt đầu: game thật bỏ qua mọi phím ở đây
+    game_state = GameState(replay.seed, high_score_file=None)
+    forged = []
+    for dt_ms, soft_drop, actions in replay.frames:
+        if not actions and game_state.state == GameState.STATE_LINE_CLEAR_ANIMATION:
+            actions = [ACTION_LEFT, ACTION_HARD_DROP, ACTION_HARD_DROP]
+        forged.append((dt_ms, soft_drop, actions))
+        for action in actions:
+            apply_action(game_state, action)
+        game_state.update(dt_ms / 1000.0, soft_drop)
+
+    # Điểm khai báo khớp với mô phỏng lại không kiểm tra: chỉ luật đầu vào bắt được
+    result = verify_replay(Replay(replay.seed, forged, game_state.score))
+    assert not result['accepted']
+    assert result['reason'] == REASON_INVALID_ACTION